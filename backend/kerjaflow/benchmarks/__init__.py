@@ -0,0 +1,6 @@
+"""KerjaFlow Benchmarks"""
+
+from .runner import BenchmarkRunner, compare_reports
+from .workforce import generate_workforce
+
+__all__ = ["BenchmarkRunner", "compare_reports", "generate_workforce"]
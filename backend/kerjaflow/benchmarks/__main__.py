@@ -0,0 +1,128 @@
+"""
+Statutory Engine Benchmark
+==========================
+
+    python -m kerjaflow.benchmarks --sizes 1000,10000,100000
+    python -m kerjaflow.benchmarks --source postgres --dsn postgresql:///kerjaflow --load-migrations
+    python -m kerjaflow.benchmarks --compare kerjaflow/benchmarks/baselines/seed-calculate_all.json
+    python -m kerjaflow.benchmarks --sizes 10000 --metrics metrics.json
+"""
+
+import argparse
+import json
+import logging
+import sys
+from datetime import date
+from pathlib import Path
+
+from ..services.instrumentation import CalculatorMetrics
+from .runner import (
+    ENGINES,
+    MIN_TIMED_EMPLOYEES,
+    BenchmarkRunner,
+    compare_reports,
+    load_migrations,
+    write_report,
+)
+
+BASELINES_DIR = Path(__file__).resolve().parent / "baselines"
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m kerjaflow.benchmarks")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated sizes")
+    parser.add_argument("--countries", help="Comma-separated country codes (default: all 9)")
+    parser.add_argument("--source", choices=("seed", "postgres"), default="seed")
+    parser.add_argument("--dsn", help="PostgreSQL DSN for --source postgres")
+    parser.add_argument("--load-migrations", action="store_true", help="Apply database/migrations")
+    parser.add_argument(
+        "--snapshots", action="store_true", help="Load rule snapshots first (postgres)"
+    )
+    parser.add_argument("--engine", choices=ENGINES, default="calculate_all")
+    parser.add_argument("--date", type=date.fromisoformat, default=date(2025, 11, 1))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    parser.add_argument("--compare", type=Path, help="Baseline report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--p99-tolerance", type=float, default=0.5)
+    parser.add_argument(
+        "--min-employees",
+        type=int,
+        default=MIN_TIMED_EMPLOYEES,
+        help="Smallest country sample whose timings are compared",
+    )
+    parser.add_argument(
+        "--metrics", type=Path, help="Instrument the calculator and write its summary here"
+    )
+    return parser.parse_args(argv)
+
+
+def _connect(args):
+    if args.source != "postgres":
+        return None
+    import psycopg2
+
+    connection = psycopg2.connect(args.dsn or "")
+    if args.load_migrations:
+        load_migrations(connection)
+    return connection
+
+
+def _print_run(run):
+    print(f"\n{run.size:,} employees")
+    print(f"  {'country':<8}{'employees':>10}{'emp/s':>12}{'q/emp':>8}{'p50 us':>10}{'p99 us':>10}")
+    for code, result in run.countries.items():
+        p50 = f"{result.p50_us:.1f}" if result.p50_us is not None else "-"
+        p99 = f"{result.p99_us:.1f}" if result.p99_us is not None else "-"
+        print(
+            f"  {code:<8}{result.employees:>10,}{result.employees_per_second:>12,.0f}"
+            f"{result.queries_per_employee:>8.2f}{p50:>10}{p99:>10}"
+        )
+    print(
+        f"  {'total':<8}{sum(c.employees for c in run.countries.values()):>10,}"
+        f"{run.employees_per_second:>12,.0f}{run.queries_per_employee:>8.2f}"
+    )
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    # Per-employee "no matching rate" warnings would dominate the timings
+    logging.getLogger("kerjaflow.services").setLevel(logging.ERROR)
+    connection = _connect(args)
+    runner = BenchmarkRunner(
+        connection,
+        engine=args.engine,
+        use_snapshots=args.snapshots,
+        calculation_date=args.date,
+        seed=args.seed,
+        metrics=CalculatorMetrics() if args.metrics else None,
+    )
+    countries = args.countries.split(",") if args.countries else None
+
+    runs = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        run = runner.run(size, countries)
+        _print_run(run)
+        runs.append(run)
+
+    report = runner.report(runs)
+    if args.output:
+        write_report(report, args.output)
+    if args.metrics:
+        with args.metrics.open("w", encoding="utf-8") as out:
+            runner.metrics.write_summary(out)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare_reports(
+            baseline, report, args.tolerance, args.p99_tolerance, args.min_employees
+        )
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
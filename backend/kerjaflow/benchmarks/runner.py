@@ -0,0 +1,270 @@
+"""
+Benchmark Runner
+================
+Throughput, query count and latency of the statutory engine per country
+"""
+
+import json
+import platform
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..services.instrumentation import CalculatorMetrics
+from ..services.rule_snapshot import RuleSnapshot
+from ..services.statutory_calculator import StatutoryCalculator
+from ..utils.seed_sql import MIGRATIONS_DIR, SeedRules
+from .workforce import generate_workforce
+
+ENGINES = ("calculate_all", "calculate_batch")
+
+# Snapshot window used for in-memory runs (covers every seeded rule change)
+SNAPSHOT_WINDOW = (date(2024, 1, 1), date(2032, 12, 31))
+
+# Timings of smaller country samples are too noisy to compare between runs
+MIN_TIMED_EMPLOYEES = 1000
+
+
+class CountingCursor:
+    """Cursor wrapper counting executed statements"""
+
+    def __init__(self, cursor, counter: "QueryCounter"):
+        self._cursor = cursor
+        self._counter = counter
+
+    def execute(self, query, params=None):
+        self._counter.queries += 1
+        return self._cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class QueryCounter:
+    """Connection wrapper counting the queries the calculator issues"""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.queries = 0
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._connection.cursor(*args, **kwargs), self)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+@dataclass
+class CountryResult:
+    """Measurements for one country in one run"""
+
+    employees: int
+    seconds: float
+    employees_per_second: float
+    queries: int
+    queries_per_employee: float
+    p50_us: Optional[float]  # Per-employee latency; None for whole-batch engines
+    p99_us: Optional[float]
+
+
+@dataclass
+class RunResult:
+    """Measurements for one workforce size"""
+
+    size: int
+    countries: Dict[str, CountryResult] = field(default_factory=dict)
+    employees_per_second: float = 0.0
+    queries_per_employee: float = 0.0
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty sample"""
+    ordered = sorted(samples)
+    rank = max(1, round(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def seed_snapshots(valid_from: date, valid_until: date) -> List[RuleSnapshot]:
+    """In-memory snapshots of every seeded country, read from the migrations"""
+    rules = SeedRules.from_migrations()
+    return [
+        RuleSnapshot(code, valid_from, valid_until, **rules.rule_rows(code))
+        for code in rules.country_codes()
+    ]
+
+
+def load_migrations(connection, migrations_dir: Path = MIGRATIONS_DIR) -> int:
+    """
+    Apply every database/migrations/*.sql file in name order
+
+    Returns:
+        Number of files applied
+    """
+    paths = sorted(Path(migrations_dir).glob("*.sql"))
+    cursor = connection.cursor()
+    for path in paths:
+        cursor.execute(path.read_text(encoding="utf-8"))
+    cursor.close()
+    connection.commit()
+    return len(paths)
+
+
+class BenchmarkRunner:
+    """
+    Run the calculator over synthetic workforces and collect measurements
+
+    With a connection the calculator issues live SQL (or loads snapshots
+    first when use_snapshots is set, which is counted too); without one it
+    answers from in-memory snapshots built from the seed migrations.
+    """
+
+    def __init__(
+        self,
+        connection=None,
+        engine: str = "calculate_all",
+        use_snapshots: bool = False,
+        calculation_date: date = date(2025, 11, 1),
+        seed: int = 0,
+        metrics: Optional[CalculatorMetrics] = None,
+    ):
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {ENGINES}")
+        self.counter = QueryCounter(connection) if connection is not None else None
+        self.engine = engine
+        self.use_snapshots = use_snapshots or connection is None
+        self.calculation_date = calculation_date
+        self.seed = seed
+        self.metrics = metrics  # Instrumentation shared by every calculator (timings include it)
+        self._seed_snapshots = None if connection is not None else seed_snapshots(*SNAPSHOT_WINDOW)
+
+    @property
+    def source(self) -> str:
+        if self.counter is None:
+            return "seed-snapshot"
+        return "postgres-snapshot" if self.use_snapshots else "postgres"
+
+    def run(self, size: int, countries: Optional[List[str]] = None) -> RunResult:
+        """Benchmark one workforce size, country by country"""
+        workforce = generate_workforce(size, self.calculation_date, countries, self.seed)
+        result = RunResult(size=size)
+        for country_code, employees in workforce.items():
+            if employees:
+                result.countries[country_code] = self._run_country(country_code, employees)
+
+        total = sum(c.employees for c in result.countries.values())
+        seconds = sum(c.seconds for c in result.countries.values())
+        queries = sum(c.queries for c in result.countries.values())
+        result.employees_per_second = total / seconds if seconds else 0.0
+        result.queries_per_employee = queries / total if total else 0.0
+        return result
+
+    def _calculator(self, country_code: str) -> StatutoryCalculator:
+        if self.counter is None:
+            return StatutoryCalculator(snapshots=self._seed_snapshots, metrics=self.metrics)
+        calculator = StatutoryCalculator(self.counter, metrics=self.metrics)
+        if self.use_snapshots:
+            calculator.load_snapshot(country_code, self.calculation_date, self.calculation_date)
+        return calculator
+
+    def _run_country(self, country_code: str, employees: list) -> CountryResult:
+        queries_before = self.counter.queries if self.counter else 0
+        started = time.perf_counter()
+        calculator = self._calculator(country_code)
+
+        latencies: List[float] = []
+        if self.engine == "calculate_batch":
+            calculator.calculate_batch(employees, self.calculation_date)
+        else:
+            clock = time.perf_counter_ns
+            for employee in employees:
+                before = clock()
+                calculator.calculate_all(employee, self.calculation_date)
+                latencies.append((clock() - before) / 1000)
+
+        seconds = time.perf_counter() - started
+        queries = (self.counter.queries if self.counter else 0) - queries_before
+        return CountryResult(
+            employees=len(employees),
+            seconds=round(seconds, 6),
+            employees_per_second=round(len(employees) / seconds, 1),
+            queries=queries,
+            queries_per_employee=round(queries / len(employees), 3),
+            p50_us=round(statistics.median(latencies), 2) if latencies else None,
+            p99_us=round(percentile(latencies, 0.99), 2) if latencies else None,
+        )
+
+    def report(self, runs: List[RunResult]) -> dict:
+        """JSON-ready report of several runs"""
+        return {
+            "meta": {
+                "source": self.source,
+                "engine": self.engine,
+                "calculation_date": self.calculation_date.isoformat(),
+                "seed": self.seed,
+                "python": platform.python_version(),
+                "platform": platform.platform(terse=True),
+            },
+            "runs": [asdict(run) for run in runs],
+        }
+
+
+def write_report(report: dict, path: Path) -> None:
+    """Write a report as stable, diff-friendly JSON"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def compare_reports(
+    baseline: dict,
+    current: dict,
+    tolerance: float = 0.2,
+    p99_tolerance: float = 0.5,
+    min_employees: int = MIN_TIMED_EMPLOYEES,
+) -> List[str]:
+    """
+    Regressions of current against baseline
+
+    Any increase in queries per employee counts as a regression. Timings are
+    only compared where both runs timed at least min_employees of the
+    country: throughput below (1 - tolerance) of the baseline, or p99
+    latency above (1 + p99_tolerance) of it, is a regression there.
+
+    Returns:
+        One human-readable line per regression
+    """
+    regressions = []
+    baseline_runs = {run["size"]: run for run in baseline["runs"]}
+    for run in current["runs"]:
+        base_run = baseline_runs.get(run["size"])
+        if base_run is None:
+            continue
+        for code, now in run["countries"].items():
+            before = base_run["countries"].get(code)
+            if before is None:
+                continue
+            label = f"{run['size']}/{code}"
+            if now["queries_per_employee"] > before["queries_per_employee"]:
+                regressions.append(
+                    f"{label}: {now['queries_per_employee']} queries/employee "
+                    f"(baseline {before['queries_per_employee']})"
+                )
+            if min(now["employees"], before["employees"]) < min_employees:
+                continue
+            if now["employees_per_second"] < before["employees_per_second"] * (1 - tolerance):
+                regressions.append(
+                    f"{label}: {now['employees_per_second']:.0f} employees/s "
+                    f"(baseline {before['employees_per_second']:.0f})"
+                )
+            if (
+                now["p99_us"]
+                and before["p99_us"]
+                and now["p99_us"] > before["p99_us"] * (1 + p99_tolerance)
+            ):
+                regressions.append(
+                    f"{label}: p99 {now['p99_us']:.1f}us (baseline {before['p99_us']:.1f}us)"
+                )
+    return regressions
@@ -0,0 +1,137 @@
+"""
+Synthetic Workforce
+===================
+Deterministic ASEAN employee populations for throughput benchmarks
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from ..models.statutory import EmployeeContext, NationalityType, RiskCategory
+
+
+@dataclass(frozen=True)
+class CountryProfile:
+    """Salary and demographic distribution of one country's workforce"""
+
+    country_code: str
+    share: float  # Fraction of the regional workforce
+    median_salary: int  # Monthly, local currency
+    salary_sigma: float  # Log-normal spread
+    foreign_share: float
+    pr_share: float = 0.0
+    uses_risk_category: bool = False
+    additional_wage_share: float = 0.0  # Employees with a bonus this month
+
+
+# Rough regional payroll mix; salaries are monthly medians in local currency
+PROFILES: Tuple[CountryProfile, ...] = (
+    CountryProfile("MY", 0.22, 3_500, 0.55, foreign_share=0.15),
+    CountryProfile("SG", 0.14, 5_500, 0.60, foreign_share=0.30, pr_share=0.10,
+                   additional_wage_share=0.08),
+    CountryProfile("ID", 0.20, 6_000_000, 0.60, foreign_share=0.01, uses_risk_category=True),
+    CountryProfile("TH", 0.12, 18_000, 0.55, foreign_share=0.05),
+    CountryProfile("PH", 0.12, 25_000, 0.60, foreign_share=0.01),
+    CountryProfile("VN", 0.12, 12_000_000, 0.55, foreign_share=0.02),
+    CountryProfile("KH", 0.04, 1_300_000, 0.45, foreign_share=0.03),
+    CountryProfile("MM", 0.03, 400_000, 0.50, foreign_share=0.01),
+    CountryProfile("BN", 0.01, 2_200, 0.55, foreign_share=0.30),
+)  # fmt: skip
+
+PROFILES_BY_COUNTRY: Dict[str, CountryProfile] = {p.country_code: p for p in PROFILES}
+
+# Company headcounts drawn for every employee (drives headcount-tiered rates)
+COMPANY_SIZES = (8, 25, 60, 150, 400, 1200)
+
+# JKK risk mix (Indonesia): mostly offices and light industry
+RISK_WEIGHTS = (
+    (RiskCategory.VERY_LOW, 0.35),
+    (RiskCategory.LOW, 0.30),
+    (RiskCategory.MEDIUM, 0.20),
+    (RiskCategory.HIGH, 0.10),
+    (RiskCategory.VERY_HIGH, 0.05),
+)
+
+
+def country_sizes(size: int, countries: Optional[List[str]] = None) -> Dict[str, int]:
+    """Split a workforce size across countries by share (largest remainder)"""
+    profiles = [p for p in PROFILES if countries is None or p.country_code in countries]
+    total_share = sum(p.share for p in profiles)
+    exact = {p.country_code: size * p.share / total_share for p in profiles}
+    sizes = {code: int(value) for code, value in exact.items()}
+    by_remainder = sorted(exact, key=lambda code: exact[code] - sizes[code], reverse=True)
+    for code in by_remainder[: size - sum(sizes.values())]:
+        sizes[code] += 1
+    return sizes
+
+
+def _age(rng: random.Random) -> int:
+    return min(72, max(18, round(rng.gauss(37, 11))))
+
+
+def _salary(rng: random.Random, profile: CountryProfile) -> Decimal:
+    amount = profile.median_salary * rng.lognormvariate(0, profile.salary_sigma)
+    # Whole currency units for the large-denomination currencies, cents otherwise
+    if profile.median_salary >= 100_000:
+        return Decimal(round(amount, -3))
+    return Decimal(round(amount * 100)).scaleb(-2)
+
+
+def _nationality(rng: random.Random, profile: CountryProfile) -> NationalityType:
+    draw = rng.random()
+    if draw < profile.foreign_share:
+        return NationalityType.FOREIGN
+    if draw < profile.foreign_share + profile.pr_share:
+        return NationalityType.PR
+    return NationalityType.CITIZEN
+
+
+def generate_country(
+    country_code: str, size: int, calculation_date: date, seed: int = 0
+) -> List[EmployeeContext]:
+    """Employees of one country; the same arguments always give the same workforce"""
+    profile = PROFILES_BY_COUNTRY[country_code]
+    rng = random.Random(f"{seed}-{country_code}-{size}")
+    risks = [risk for risk, _ in RISK_WEIGHTS]
+    risk_weights = [weight for _, weight in RISK_WEIGHTS]
+
+    employees = []
+    for i in range(size):
+        salary = _salary(rng, profile)
+        additional = None
+        if rng.random() < profile.additional_wage_share:
+            additional = salary * rng.choice((1, 2, 3))
+        employees.append(
+            EmployeeContext(
+                country_code=country_code,
+                nationality=_nationality(rng, profile),
+                age=_age(rng),
+                gross_salary=salary,
+                basic_salary=salary,
+                ordinary_wages=salary,
+                additional_wages=additional,
+                risk_category=(
+                    rng.choices(risks, risk_weights)[0] if profile.uses_risk_category else None
+                ),
+                company_id=f"{country_code}-{i % 97:02d}",
+                company_employee_count=rng.choice(COMPANY_SIZES),
+                calculation_date=calculation_date,
+            )
+        )
+    return employees
+
+
+def generate_workforce(
+    size: int,
+    calculation_date: date,
+    countries: Optional[List[str]] = None,
+    seed: int = 0,
+) -> Dict[str, List[EmployeeContext]]:
+    """Regional workforce of the given size, keyed by country"""
+    return {
+        code: generate_country(code, count, calculation_date, seed)
+        for code, count in country_sizes(size, countries).items()
+    }
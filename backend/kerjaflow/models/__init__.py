@@ -1,9 +1,18 @@
 """KerjaFlow Data Models"""
 
+from .columnar import ContributionColumns
 from .statutory import (
+    BatchCalculationResult,
+    CalculationFailure,
     CalculationMethod,
+    ContributionChunk,
+    ContributionSummary,
     Country,
     EmployeeContext,
+    FrozenContributionSummary,
+    FrozenEmployeeContext,
+    FrozenStatutoryContribution,
+    FrozenStatutoryRate,
     NationalityType,
     RoundingMethod,
     SchemeType,
@@ -11,6 +20,8 @@ from .statutory import (
     StatutoryContribution,
     StatutoryRate,
     StatutoryScheme,
+    StatutoryTableLookup,
+    freeze,
 )
 
 __all__ = [
@@ -18,10 +29,21 @@ __all__ = [
     "StatutoryScheme",
     "StatutoryRate",
     "StatutoryCeiling",
+    "StatutoryTableLookup",
     "StatutoryContribution",
     "EmployeeContext",
     "NationalityType",
     "SchemeType",
     "CalculationMethod",
     "RoundingMethod",
+    "ContributionSummary",
+    "CalculationFailure",
+    "BatchCalculationResult",
+    "ContributionChunk",
+    "ContributionColumns",
+    "FrozenEmployeeContext",
+    "FrozenStatutoryRate",
+    "FrozenStatutoryContribution",
+    "FrozenContributionSummary",
+    "freeze",
 ]
@@ -0,0 +1,228 @@
+"""
+Columnar Contributions
+======================
+Compact column storage for the contributions of large batches
+
+Each StatutoryContribution costs several hundred bytes as objects, most of
+it in Decimal amounts. ContributionColumns keeps one typed array per field
+instead: amounts as int64 coefficients with an int8 exponent (so every
+Decimal is read back with the same digits and exponent), strings and the
+rule row ids as codes into a table of distinct values and enums as one-byte
+codes.
+"""
+
+from array import array
+from decimal import Decimal
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+from .statutory import BatchCalculationResult, CalculationMethod, StatutoryContribution
+
+# Decimal fields, stored as (coefficient, exponent) pairs
+DECIMAL_FIELDS = (
+    "calculation_base_amount",
+    "applied_salary",
+    "employee_amount",
+    "employer_amount",
+    "total_amount",
+    "employee_rate",
+    "employer_rate",
+)
+
+# String fields, stored as codes into a table of distinct values
+TEXT_FIELDS = ("scheme_code", "scheme_name", "tier_code", "tier_description", "notes")
+
+# Rule row ids, stored together as one code (a batch uses few combinations)
+RULE_FIELDS = ("scheme_id", "rate_id", "ceiling_id", "table_lookup_id")
+
+METHODS = tuple(CalculationMethod)
+METHOD_CODES = {method: code for code, method in enumerate(METHODS)}
+
+# Exponent marking a None decimal (real exponents stay far from it)
+_NONE_EXPONENT = -128
+
+_CAPPED = 1
+_ROUNDED = 2
+
+
+def _split(value: Decimal) -> Tuple[int, int]:
+    """(coefficient, exponent) of a finite Decimal"""
+    text = str(value)
+    if "E" not in text and text[-1].isdigit():
+        # Plain notation (the usual case): parsing the string beats as_tuple()
+        whole, _, fraction = text.partition(".")
+        return int(whole + fraction), -len(fraction)
+    exponent = value.as_tuple().exponent
+    if not isinstance(exponent, int) or exponent == _NONE_EXPONENT:
+        raise ValueError(f"Cannot store {value} in a decimal column")
+    return int(value.scaleb(-exponent)), exponent
+
+
+class _DecimalColumn:
+    """Decimals as int64 coefficients and int8 exponents"""
+
+    __slots__ = ("coefficients", "exponents")
+
+    def __init__(self):
+        self.coefficients = array("q")
+        self.exponents = array("b")
+
+    def append(self, value: Optional[Decimal]) -> None:
+        if value is None:
+            self.coefficients.append(0)
+            self.exponents.append(_NONE_EXPONENT)
+            return
+        coefficient, exponent = _split(value)
+        self.coefficients.append(coefficient)
+        self.exponents.append(exponent)
+
+    def __getitem__(self, index: int) -> Optional[Decimal]:
+        exponent = self.exponents[index]
+        if exponent == _NONE_EXPONENT:
+            return None
+        return Decimal(self.coefficients[index]).scaleb(exponent)
+
+    def total(self) -> Decimal:
+        """Sum of all values (None counts as zero), exact"""
+        by_exponent: Dict[int, int] = {}
+        for coefficient, exponent in zip(self.coefficients, self.exponents):
+            if exponent != _NONE_EXPONENT:
+                by_exponent[exponent] = by_exponent.get(exponent, 0) + coefficient
+        return sum(
+            (Decimal(value).scaleb(exponent) for exponent, value in by_exponent.items()),
+            Decimal(0),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.coefficients) * 9
+
+
+class _CodedColumn:
+    """Values as uint16 codes into a table of distinct values (None is code 0)"""
+
+    __slots__ = ("codes", "values", "_index")
+
+    def __init__(self):
+        self.codes = array("H")
+        self.values: List[Optional[Hashable]] = [None]
+        self._index: Dict[Optional[Hashable], int] = {None: 0}
+
+    def append(self, value: Optional[Hashable]) -> None:
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, index: int) -> Optional[Hashable]:
+        return self.values[self.codes[index]]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.codes) * self.codes.itemsize
+
+
+class ContributionColumns:
+    """
+    Contributions of a batch in column arrays, one row per contribution
+
+    positions holds the index of each row's employee in the batch (plus
+    offset), so rows of one employee are contiguous and in scheme order.
+    Rows are read back as StatutoryContribution objects equal, field for
+    field, to the originals; a negative zero amount reads back as zero.
+    """
+
+    __slots__ = ("positions", "methods", "flags", "_decimals", "_texts", "_rules")
+
+    def __init__(self):
+        self.positions = array("q")
+        self.methods = array("B")  # Index into METHODS
+        self.flags = array("B")  # capped | rounding_applied
+        self._decimals = {name: _DecimalColumn() for name in DECIMAL_FIELDS}
+        self._texts = {name: _CodedColumn() for name in TEXT_FIELDS}
+        self._rules = _CodedColumn()  # RULE_FIELDS tuples
+
+    @classmethod
+    def from_batch(cls, batch: BatchCalculationResult, offset: int = 0) -> "ContributionColumns":
+        """Columns of every contribution in a batch (failed employees have no rows)"""
+        columns = cls()
+        columns.extend(batch, offset)
+        return columns
+
+    def extend(self, batch: BatchCalculationResult, offset: int = 0) -> None:
+        """Append every contribution of a batch, e.g. one calculate_iter chunk"""
+        for index, summary in enumerate(batch.results, offset):
+            if summary is not None:
+                for contribution in summary.contributions:
+                    self.append(index, contribution)
+
+    def append(self, position: int, contribution: StatutoryContribution) -> None:
+        self.positions.append(position)
+        self.methods.append(METHOD_CODES[contribution.calculation_method])
+        self.flags.append(
+            (_CAPPED if contribution.capped else 0)
+            | (_ROUNDED if contribution.rounding_applied else 0)
+        )
+        for name, column in self._decimals.items():
+            column.append(getattr(contribution, name))
+        for name, column in self._texts.items():
+            column.append(getattr(contribution, name))
+        self._rules.append(tuple(getattr(contribution, name) for name in RULE_FIELDS))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, index: int) -> StatutoryContribution:
+        if index < 0:
+            index += len(self)
+        flags = self.flags[index]
+        values = {name: column[index] for name, column in self._decimals.items()}
+        values.update((name, column[index]) for name, column in self._texts.items())
+        values.update(zip(RULE_FIELDS, self._rules[index]))
+        return StatutoryContribution(
+            capped=bool(flags & _CAPPED),
+            rounding_applied=bool(flags & _ROUNDED),
+            calculation_method=METHODS[self.methods[index]],
+            **values,
+        )
+
+    def __iter__(self) -> Iterator[StatutoryContribution]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def column(self, name: str) -> list:
+        """Every value of one field, decoded"""
+        if name in self._decimals:
+            column = self._decimals[name]
+            return [column[i] for i in range(len(self))]
+        if name in self._texts:
+            column = self._texts[name]
+            return [column.values[code] for code in column.codes]
+        if name in RULE_FIELDS:
+            field = RULE_FIELDS.index(name)
+            return [self._rules.values[code][field] for code in self._rules.codes]
+        if name == "calculation_method":
+            return [METHODS[code] for code in self.methods]
+        if name == "capped":
+            return [bool(flags & _CAPPED) for flags in self.flags]
+        if name == "rounding_applied":
+            return [bool(flags & _ROUNDED) for flags in self.flags]
+        if name == "position":
+            return list(self.positions)
+        raise KeyError(name)
+
+    def total(self, name: str) -> Decimal:
+        """Exact sum of a decimal field over every row"""
+        return self._decimals[name].total()
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays (excluding the distinct-value tables)"""
+        return (
+            len(self.positions) * self.positions.itemsize
+            + len(self.methods)
+            + len(self.flags)
+            + sum(column.nbytes for column in self._decimals.values())
+            + sum(column.nbytes for column in self._texts.values())
+            + self._rules.nbytes
+        )
@@ -4,11 +4,11 @@ Statutory Data Models
 Python data models for KerjaFlow ASEAN Statutory Framework
 """
 
-from dataclasses import dataclass, field
+from dataclasses import MISSING, dataclass, field, fields, make_dataclass
 from datetime import date
 from decimal import Decimal
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
 class NationalityType(str, Enum):
@@ -142,7 +142,7 @@ class StatutoryScheme:
     notes: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class StatutoryRate:
     """Contribution rate with tier conditions"""
 
@@ -199,6 +199,21 @@ class StatutoryCeiling:
 
 
 @dataclass
+class StatutoryTableLookup:
+    """Wage band row for table-driven (SOCSO-style) contributions"""
+
+    id: int
+    scheme_id: int
+    wage_from: Decimal
+    wage_to: Decimal
+    employee_amount: Decimal
+    employer_amount: Decimal
+    category: Optional[str] = None
+    effective_from: date = field(default_factory=date.today)
+    effective_until: Optional[date] = None
+
+
+@dataclass(slots=True)
 class EmployeeContext:
     """Employee context for statutory calculations"""
 
@@ -218,8 +233,12 @@ class EmployeeContext:
     # Date context
     calculation_date: date = field(default_factory=date.today)
 
+    # Added after calculation_date so positional construction keeps working
+    employee_id: Optional[str] = None  # Keys the YTD ledger
+    company_id: Optional[str] = None  # Shards pay runs
 
-@dataclass
+
+@dataclass(slots=True)
 class StatutoryContribution:
     """Calculated statutory contribution result"""
 
@@ -247,8 +266,14 @@ class StatutoryContribution:
     rounding_applied: bool = False
     notes: Optional[str] = None
 
+    # Rule rows used (dependency tracking for retro recalculation)
+    scheme_id: Optional[int] = None
+    rate_id: Optional[int] = None
+    ceiling_id: Optional[int] = None  # MONTHLY ceiling
+    table_lookup_id: Optional[int] = None
 
-@dataclass
+
+@dataclass(slots=True)
 class ContributionSummary:
     """Summary of all statutory contributions for an employee"""
 
@@ -266,11 +291,104 @@ class ContributionSummary:
     calculation_timestamp: Optional[str] = None
 
     def __post_init__(self):
-        """Calculate totals"""
-        self.total_employee_amount = sum(
-            (c.employee_amount for c in self.contributions), Decimal("0.00")
-        )
-        self.total_employer_amount = sum(
-            (c.employer_amount for c in self.contributions), Decimal("0.00")
-        )
-        self.total_combined_amount = self.total_employee_amount + self.total_employer_amount
+        """Calculate totals (object.__setattr__ so the frozen variant can share this)"""
+        employee = sum((c.employee_amount for c in self.contributions), Decimal("0.00"))
+        employer = sum((c.employer_amount for c in self.contributions), Decimal("0.00"))
+        object.__setattr__(self, "total_employee_amount", employee)
+        object.__setattr__(self, "total_employer_amount", employer)
+        object.__setattr__(self, "total_combined_amount", employee + employer)
+
+
+@dataclass
+class CalculationFailure:
+    """Employee that could not be calculated in a batch"""
+
+    index: int  # Position in the batch input
+    employee_context: EmployeeContext
+    error: str
+    scheme_code: Optional[str] = None
+
+
+@dataclass
+class BatchCalculationResult:
+    """Results of StatutoryCalculator.calculate_batch, in input order"""
+
+    # One entry per input employee; None where the employee failed
+    results: List[Optional[ContributionSummary]]
+    failures: List[CalculationFailure] = field(default_factory=list)
+    group_count: int = 0
+
+    @property
+    def succeeded(self) -> int:
+        """Number of employees calculated without failure"""
+        return len(self.results) - len(self.failures)
+
+
+@dataclass
+class ContributionChunk:
+    """One chunk of StatutoryCalculator.calculate_iter"""
+
+    index: int  # Chunk number, from 0
+    offset: int  # Stream position of the chunk's first employee
+    batch: BatchCalculationResult
+
+    @property
+    def size(self) -> int:
+        return len(self.batch.results)
+
+
+# ============================================================================
+# FROZEN VARIANTS
+# ============================================================================
+
+
+def _frozen_variant(cls: type, name: str) -> type:
+    """Frozen, slotted dataclass with the same fields, defaults and __post_init__"""
+    specs = []
+    for f in fields(cls):
+        if f.default is not MISSING:
+            spec = field(default=f.default)
+        elif f.default_factory is not MISSING:
+            spec = field(default_factory=f.default_factory)
+        else:
+            spec = field()
+        specs.append((f.name, f.type, spec))
+    namespace = {"__doc__": f"Immutable {cls.__name__} (see freeze)"}
+    if "__post_init__" in cls.__dict__:
+        namespace["__post_init__"] = cls.__dict__["__post_init__"]
+    variant = make_dataclass(name, specs, namespace=namespace, frozen=True, slots=True)
+    variant.__module__ = __name__
+    return variant
+
+
+FrozenEmployeeContext = _frozen_variant(EmployeeContext, "FrozenEmployeeContext")
+FrozenStatutoryRate = _frozen_variant(StatutoryRate, "FrozenStatutoryRate")
+FrozenStatutoryContribution = _frozen_variant(StatutoryContribution, "FrozenStatutoryContribution")
+FrozenContributionSummary = _frozen_variant(ContributionSummary, "FrozenContributionSummary")
+
+FROZEN_VARIANTS: Dict[type, type] = {
+    EmployeeContext: FrozenEmployeeContext,
+    StatutoryRate: FrozenStatutoryRate,
+    StatutoryContribution: FrozenStatutoryContribution,
+    ContributionSummary: FrozenContributionSummary,
+}
+
+
+def freeze(value: Any) -> Any:
+    """
+    Immutable copy of an EmployeeContext, StatutoryRate, StatutoryContribution
+    or ContributionSummary
+
+    A summary is frozen together with its employee context and contributions
+    (its contributions become a tuple). Frozen values have the same attributes
+    and are hashable, so they can be shared between runs and cached safely.
+    Already-frozen values are returned as they are.
+    """
+    if type(value) in FROZEN_VARIANTS.values():
+        return value
+    variant = FROZEN_VARIANTS[type(value)]
+    values = {f.name: getattr(value, f.name) for f in fields(value)}
+    if variant is FrozenContributionSummary:
+        values["employee_context"] = freeze(value.employee_context)
+        values["contributions"] = tuple(freeze(c) for c in value.contributions)
+    return variant(**values)
@@ -1,5 +1,6 @@
 """KerjaFlow Services"""
 
+from .rule_snapshot import RuleSnapshot
 from .statutory_calculator import StatutoryCalculator
 
-__all__ = ["StatutoryCalculator"]
+__all__ = ["StatutoryCalculator", "RuleSnapshot"]
@@ -0,0 +1,128 @@
+"""
+Arrears
+=======
+Back-pay over many pay periods in one call
+
+A salary revision effective several months back means recalculating each
+of those months and paying the difference. ArrearsCalculator takes the
+revised wage timeline (one EmployeeContext per period) and what was paid for
+each period, calculates the whole timeline with
+StatutoryCalculator.calculate_timeline (rules loaded once, schemes and
+ceilings resolved once per stretch between rule boundaries such as the
+October 2024 EIS change or the January 2026 CPF tiers) and returns a
+per-period before/after breakdown.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Sequence, Tuple, Union
+
+from ..models.statutory import ContributionSummary, EmployeeContext
+from .retro_recalculation import ZERO, ArrearsDiff
+from .statutory_calculator import StatutoryCalculator
+
+# What was paid for a period: the stored summary, the context it was
+# calculated from (recalculated under the rules of the time), or None
+Paid = Union[ContributionSummary, EmployeeContext, None]
+
+
+@dataclass
+class ArrearsResult:
+    """Per-period arrears of a revised wage timeline"""
+
+    periods: List[ArrearsDiff]  # One per period, in date order (before: paid, after: due)
+    boundaries: List[date] = field(default_factory=list)  # Rule changes inside the timeline
+
+    @property
+    def employee_arrears(self) -> Decimal:
+        """Employee contributions still owed over the timeline (negative: overpaid)"""
+        return sum((period.employee_arrears for period in self.periods), ZERO)
+
+    @property
+    def employer_arrears(self) -> Decimal:
+        return sum((period.employer_arrears for period in self.periods), ZERO)
+
+    def by_scheme(self) -> Dict[str, Tuple[Decimal, Decimal]]:
+        """(employee, employer) arrears per scheme code over the timeline"""
+        totals: Dict[str, Tuple[Decimal, Decimal]] = {}
+        for period in self.periods:
+            for code, (ee, er) in period.scheme_deltas().items():
+                total_ee, total_er = totals.get(code, (ZERO, ZERO))
+                totals[code] = (total_ee + ee, total_er + er)
+        return dict(sorted(totals.items()))
+
+
+class ArrearsCalculator:
+    """Arrears of revised wage timelines against what was paid"""
+
+    def __init__(self, calculator: StatutoryCalculator):
+        self.calculator = calculator
+
+    def calculate(self, revised: Sequence[EmployeeContext], paid: Sequence[Paid]) -> ArrearsResult:
+        """
+        Calculate what each period should have cost and the difference
+
+        Args:
+            revised: One context per period with the revised wages, dated by
+                calculation_date
+            paid: What was paid for the same periods, in the same order
+
+        Returns:
+            ArrearsResult with one ArrearsDiff per period
+
+        Raises:
+            ValueError: If a revised period is undated or paid does not line
+                up with revised
+        """
+        revised = list(revised)
+        paid = list(paid)
+        for index, employee in enumerate(revised):
+            if employee.calculation_date is None:
+                raise ValueError(f"Revised period {index} has no calculation_date")
+        if len(paid) != len(revised):
+            raise ValueError(f"{len(revised)} revised periods but {len(paid)} paid")
+        for employee, before in zip(revised, paid):
+            if before is not None and before.calculation_date != employee.calculation_date:
+                raise ValueError(
+                    f"Paid period {before.calculation_date} does not match "
+                    f"{employee.calculation_date}"
+                )
+
+        recalculate = [before for before in paid if isinstance(before, EmployeeContext)]
+        calculator = self.calculator
+        with calculator.batch_snapshots(revised + recalculate):
+            # Paid first, so a YTD ledger ends up holding the revised months
+            recalculated = iter(calculator.calculate_timeline(recalculate))
+            due = calculator.calculate_timeline(revised)
+            boundaries = self._boundaries(revised)
+
+        periods = []
+        for employee, before, after in zip(revised, paid, due):
+            if isinstance(before, EmployeeContext):
+                before = next(recalculated)
+            elif before is None:
+                before = ContributionSummary(
+                    country_code=employee.country_code,
+                    employee_context=employee,
+                    contributions=[],
+                    calculation_date=employee.calculation_date,
+                )
+            key = (employee.employee_id, employee.calculation_date)
+            periods.append(ArrearsDiff(key, before, after))
+
+        periods.sort(key=lambda period: period.calculation_date)
+        return ArrearsResult(periods, boundaries)
+
+    def _boundaries(self, revised: List[EmployeeContext]) -> List[date]:
+        """Rule boundaries of the installed snapshots between the first and last period"""
+        if not revised:
+            return []
+        first = min(employee.calculation_date for employee in revised)
+        last = max(employee.calculation_date for employee in revised)
+        dates = set()
+        for country_code in {employee.country_code for employee in revised}:
+            snapshot = self.calculator.snapshot_for(country_code, first)
+            if snapshot is not None and snapshot.covers(last):
+                dates.update(d for d in snapshot.boundaries if first < d <= last)
+        return sorted(dates)
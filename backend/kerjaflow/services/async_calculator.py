@@ -0,0 +1,241 @@
+"""
+Async Statutory Calculator
+==========================
+StatutoryCalculator over an asyncio connection pool (asyncpg)
+
+The blocking calculator issues its scheme, ceiling, rate and table lookup
+queries one after another, and the rate and ceiling queries depend on the
+scheme ids returned by the first. Here the four rule queries for a country
+and date filter on the country's schemes with a subquery instead, so they
+are independent and run concurrently on separate pool connections: a
+calculation that is not covered by an installed snapshot costs about one
+round trip. The rows become a RuleSnapshot for that date and the
+contribution itself is calculated by StatutoryCalculator, so results are
+identical to the blocking calculator.
+
+Concurrent calls for the same country and date share one in-flight load;
+nothing is cached once it completes, so every call sees current rule data.
+"""
+
+import asyncio
+import logging
+from datetime import date
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models.statutory import BatchCalculationResult, ContributionSummary, EmployeeContext
+from .contribution_memo import ContributionMemo
+from .instrumentation import CalculatorMetrics
+from .rule_snapshot import (
+    CEILING_COLUMNS,
+    RATE_COLUMNS,
+    SCHEME_COLUMNS,
+    TABLE_LOOKUP_COLUMNS,
+    RuleSnapshot,
+)
+from .statutory_calculator import StatutoryCalculator
+from .ytd_ledger import YtdLedger
+
+logger = logging.getLogger(__name__)
+
+# $1 country code, $2 last date covered, $3 first date covered
+_COUNTRY_SCHEMES = """
+    FROM kf_statutory_scheme
+    WHERE country_id = (SELECT id FROM kf_country WHERE code = $1)
+      AND effective_from <= $2
+      AND (effective_until IS NULL OR effective_until >= $3)
+      AND is_active = true
+"""
+
+RULE_QUERIES: Dict[str, str] = {
+    "scheme": f"""
+        SELECT {SCHEME_COLUMNS}
+        {_COUNTRY_SCHEMES}
+        ORDER BY sort_order, code
+    """,
+    **{
+        name: f"""
+            SELECT {columns}
+            FROM {table}
+            WHERE scheme_id IN (SELECT id {_COUNTRY_SCHEMES})
+              AND effective_from <= $2
+              AND (effective_until IS NULL OR effective_until >= $3)
+        """
+        for name, table, columns in (
+            ("rate", "kf_statutory_rate", RATE_COLUMNS),
+            ("ceiling", "kf_statutory_ceiling", CEILING_COLUMNS),
+            ("table_lookup", "kf_statutory_table_lookup", TABLE_LOOKUP_COLUMNS),
+        )
+    },
+}
+
+
+class AsyncStatutoryCalculator:
+    """
+    Statutory contribution calculator for asyncio applications
+
+    Same semantics as StatutoryCalculator (calculate_all, calculate_batch,
+    snapshots, memo, ledger, metrics); only rule loading is asynchronous.
+
+    Args:
+        pool: asyncpg.Pool, or any object whose acquire() is an async context
+            manager yielding a connection with ``await fetch(query, *args)``.
+            May be None when every calculation date is covered by a snapshot.
+        snapshots: Preloaded rule snapshots to answer lookups from memory
+        memo: Cache for contributions with identical normalized inputs
+        ledger: Year-to-date ledger enforcing ANNUAL and AW_ANNUAL ceilings
+        metrics: Instrumentation; rule loads are recorded as "rules" latency
+            and as round trips per table
+    """
+
+    def __init__(
+        self,
+        pool=None,
+        snapshots: Optional[Iterable[RuleSnapshot]] = None,
+        memo: Optional[ContributionMemo] = None,
+        ledger: Optional[YtdLedger] = None,
+        metrics: Optional[CalculatorMetrics] = None,
+    ):
+        self.pool = pool
+        self.memo = memo
+        self.ledger = ledger
+        self.metrics = metrics
+        self._snapshots: Dict[str, RuleSnapshot] = {}
+        self._engine = self._calculator(())
+        # In-flight rule loads per (country, first date, last date)
+        self._loading: Dict[Tuple[str, date, date], asyncio.Future] = {}
+        for snapshot in snapshots or ():
+            self.use_snapshot(snapshot)
+
+    def _calculator(self, snapshots: Iterable[RuleSnapshot]) -> StatutoryCalculator:
+        return StatutoryCalculator(
+            snapshots=snapshots, memo=self.memo, ledger=self.ledger, metrics=self.metrics
+        )
+
+    async def load_snapshot(
+        self, country_code: str, valid_from: date, valid_until: date
+    ) -> RuleSnapshot:
+        """Load and install a rule snapshot for a country (four concurrent queries)"""
+        snapshot = await self._rules(country_code, valid_from, valid_until)
+        self.use_snapshot(snapshot)
+        return snapshot
+
+    def use_snapshot(self, snapshot: RuleSnapshot) -> None:
+        """Install a snapshot, replacing any previous one for the same country"""
+        self._snapshots[snapshot.country_code] = snapshot
+        self._engine.use_snapshot(snapshot)
+
+    def invalidate_snapshot(self, country_code: Optional[str] = None) -> None:
+        """Drop installed snapshots so calculations load rules from the database again"""
+        if country_code is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.pop(country_code, None)
+        self._engine.invalidate_snapshot(country_code)
+
+    @property
+    def snapshot_versions(self) -> Dict[str, str]:
+        """Version of every installed snapshot, keyed by country code"""
+        return {code: snapshot.version for code, snapshot in self._snapshots.items()}
+
+    def _covered(self, country_code: str, first: date, last: date) -> bool:
+        snapshot = self._snapshots.get(country_code)
+        return snapshot is not None and snapshot.covers(first) and snapshot.covers(last)
+
+    async def calculate_all(
+        self, employee: EmployeeContext, calculation_date: Optional[date] = None
+    ) -> ContributionSummary:
+        """
+        Calculate ALL statutory contributions for an employee
+
+        Without an installed snapshot covering the date, the country's rules
+        for that date are fetched with four concurrent queries.
+
+        Args:
+            employee: Employee context with salary and demographics
+            calculation_date: Date for rate lookup (defaults to today)
+
+        Returns:
+            ContributionSummary with all applicable contributions
+        """
+        if calculation_date is None:
+            calculation_date = employee.calculation_date or date.today()
+        country_code = employee.country_code
+
+        if self._covered(country_code, calculation_date, calculation_date):
+            return self._engine.calculate_all(employee, calculation_date)
+
+        snapshot = await self._rules(country_code, calculation_date, calculation_date)
+        return self._calculator([snapshot]).calculate_all(employee, calculation_date)
+
+    async def calculate_batch(
+        self, employees: Iterable[EmployeeContext], calculation_date: Optional[date] = None
+    ) -> BatchCalculationResult:
+        """
+        Calculate statutory contributions for many employees at once
+
+        Rules for every country the installed snapshots don't cover are
+        loaded concurrently (one snapshot per country spanning the batch
+        dates, four queries each), then the batch is calculated exactly as
+        StatutoryCalculator.calculate_batch does. The calculation runs on the
+        event loop; split very large pay runs into chunks.
+
+        Args:
+            employees: Employee contexts to calculate
+            calculation_date: Date for rate lookup (defaults to each
+                employee's calculation_date)
+
+        Returns:
+            BatchCalculationResult with one result per employee, in input order
+        """
+        employees = list(employees)
+        date_ranges: Dict[str, Tuple[date, date]] = {}
+        for employee in employees:
+            on = calculation_date or employee.calculation_date or date.today()
+            first, last = date_ranges.get(employee.country_code, (on, on))
+            date_ranges[employee.country_code] = (min(first, on), max(last, on))
+
+        missing = [
+            (country_code, first, last)
+            for country_code, (first, last) in date_ranges.items()
+            if not self._covered(country_code, first, last)
+        ]
+        if not missing:
+            return self._engine.calculate_batch(employees, calculation_date)
+
+        loaded = await asyncio.gather(*(self._rules(*window) for window in missing))
+        snapshots = {**self._snapshots, **{snapshot.country_code: snapshot for snapshot in loaded}}
+        return self._calculator(snapshots.values()).calculate_batch(employees, calculation_date)
+
+    async def _rules(self, country_code: str, first: date, last: date) -> RuleSnapshot:
+        """Rules of a country for [first, last], sharing a load already in flight"""
+        key = (country_code, first, last)
+        loading = self._loading.get(key)
+        if loading is None:
+            loading = asyncio.ensure_future(self._fetch(country_code, first, last))
+            self._loading[key] = loading
+            loading.add_done_callback(lambda _: self._loading.pop(key, None))
+        elif self.metrics is not None:
+            self.metrics.count("rule_loads_shared", country_code)
+        # A cancelled caller must not cancel the load other callers wait on
+        return await asyncio.shield(loading)
+
+    async def _fetch(self, country_code: str, first: date, last: date) -> RuleSnapshot:
+        """Run the four rule queries concurrently and build a snapshot"""
+        if self.pool is None:
+            raise LookupError(
+                "No connection pool configured and no rule snapshot covers this lookup"
+            )
+        started = perf_counter()
+        rows = await asyncio.gather(
+            *(self._fetch_rows(query, country_code, first, last) for query in RULE_QUERIES.values())
+        )
+        if self.metrics is not None:
+            self.metrics.observe("rules", country_code, None, perf_counter() - started)
+        return RuleSnapshot(country_code, first, last, *rows)
+
+    async def _fetch_rows(self, query: str, country_code: str, first: date, last: date) -> List:
+        if self.metrics is not None:
+            self.metrics.round_trip(query)
+        async with self.pool.acquire() as connection:
+            return await connection.fetch(query, country_code, last, first)
@@ -0,0 +1,201 @@
+"""
+Contribution Memo
+=================
+Opt-in LRU cache of scheme contributions for identical statutory inputs
+"""
+
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from ..models.statutory import (
+    EmployeeContext,
+    NationalityType,
+    StatutoryContribution,
+    StatutoryScheme,
+)
+from .rule_snapshot import RuleSnapshot
+
+# Returned by ContributionMemo.get when there is no entry (None is a valid result)
+MISS = object()
+
+
+@dataclass
+class MemoStats:
+    """Hit/miss counters of a ContributionMemo"""
+
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class _SchemeBands:
+    """
+    Age, salary and headcount breakpoints of one scheme's rate tiers
+
+    Two employees in the same band of every dimension match the same tier,
+    so the band index can stand in for the raw value in a memo key.
+    """
+
+    __slots__ = ("ages", "salaries", "headcounts", "risks")
+
+    def __init__(self, snapshot: RuleSnapshot, scheme_id: int):
+        tiers = snapshot.compiled_tiers(scheme_id)
+        rates = tiers.rates if tiers is not None else []
+        self.ages = self._points((r.min_age, r.max_age) for r in rates)
+        self.salaries = self._points((r.min_salary, r.max_salary) for r in rates)
+        self.headcounts = self._points((r.employee_count_min, r.employee_count_max) for r in rates)
+        self.risks = tiers.risk_keys if tiers is not None else (None,)
+
+    @staticmethod
+    def _points(bounds) -> List[tuple]:
+        # Same (value, 0) / (value, 1) encoding as the compiled tier partitions
+        points = set()
+        for lower, upper in bounds:
+            if lower is not None:
+                points.add((lower, 0))
+            if upper is not None:
+                points.add((upper, 1))
+        return sorted(points)
+
+    @staticmethod
+    def band(points: List[tuple], value) -> int:
+        return bisect_right(points, (value, 0))
+
+
+class ContributionMemo:
+    """
+    LRU cache of StatutoryContribution results keyed on normalized inputs
+
+    Only lookups answered from a rule snapshot are memoized. The key holds
+    the country, snapshot version, scheme, calculation date, nationality,
+    the age, salary and headcount bands of the scheme's tiers, the risk
+    category as far as any tier distinguishes it, and the exact wage base.
+    Entries of a country are dropped when its snapshot version changes, and
+    a stale version can never produce a hit because it is part of the key.
+
+    Cached contributions are shared between employees with identical inputs;
+    treat them as read-only.
+    """
+
+    def __init__(self, maxsize: int = 65536):
+        """
+        Create an empty memo
+
+        Args:
+            maxsize: Maximum number of cached contributions
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[tuple, Optional[StatutoryContribution]]" = OrderedDict()
+        self._bands: Dict[Tuple[str, int], _SchemeBands] = {}
+        self._versions: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(
+        self,
+        snapshot: RuleSnapshot,
+        scheme: StatutoryScheme,
+        employee: EmployeeContext,
+        calculation_date: date,
+        wage_base: Decimal,
+    ) -> tuple:
+        """Normalized memo key of one scheme contribution"""
+        self._track_version(snapshot)
+        bands = self._bands.get((snapshot.version, scheme.id))
+        if bands is None:
+            bands = _SchemeBands(snapshot, scheme.id)
+            self._bands[(snapshot.version, scheme.id)] = bands
+
+        nationality = employee.nationality
+        if nationality == NationalityType.ALL:
+            nationality = None
+        risk = employee.risk_category if employee.risk_category in bands.risks else None
+        # 0 and unknown headcounts match the same tiers (SQL: count or 0 / count or 999999)
+        headcount = employee.company_employee_count or None
+
+        return (
+            snapshot.country_code,
+            snapshot.version,
+            scheme.id,
+            calculation_date,
+            nationality,
+            bands.band(bands.ages, employee.age),
+            bands.band(bands.salaries, employee.gross_salary),
+            wage_base,
+            risk,
+            None if headcount is None else bands.band(bands.headcounts, headcount),
+        )
+
+    def get(self, key: tuple):
+        """Cached contribution for a key, or MISS"""
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return MISS
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, contribution: Optional[StatutoryContribution]) -> None:
+        """Store a contribution, evicting the least recently used entry if full"""
+        self._entries[key] = contribution
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, country_code: Optional[str] = None) -> None:
+        """
+        Drop cached entries
+
+        Args:
+            country_code: Country to drop (None for all countries)
+        """
+        if country_code is None:
+            self._entries.clear()
+            self._bands.clear()
+            self._versions.clear()
+        else:
+            version = self._versions.pop(country_code, None)
+            for key in [k for k in self._entries if k[0] == country_code]:
+                del self._entries[key]
+            self._bands = {k: v for k, v in self._bands.items() if k[0] != version}
+        self.invalidations += 1
+
+    def stats(self) -> MemoStats:
+        return MemoStats(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            invalidations=self.invalidations,
+            size=len(self._entries),
+            maxsize=self.maxsize,
+        )
+
+    def _track_version(self, snapshot: RuleSnapshot) -> None:
+        """Drop a country's entries the first time a new snapshot version shows up"""
+        current = self._versions.get(snapshot.country_code)
+        if current != snapshot.version:
+            if current is not None:
+                self.invalidate(snapshot.country_code)
+            self._versions[snapshot.country_code] = snapshot.version
@@ -0,0 +1,279 @@
+"""
+Contribution Streaming
+======================
+Bounded-memory pay runs: calculate_iter chunks piped into a sink
+
+A producer calculates chunks while a writer thread drains them into a sink
+(CSV, NDJSON or a database table). At most max_pending chunks wait between
+the two, so a slow sink throttles calculation instead of letting results
+pile up in memory.
+"""
+
+import abc
+import csv
+import json
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import IO, Iterable, Iterator, Optional
+
+from ..models.statutory import ContributionChunk, ContributionSummary, EmployeeContext
+from ..utils.sql import validate_identifier
+from .statutory_calculator import StatutoryCalculator
+
+# One row per contribution, as written by CsvSink and DatabaseSink
+CONTRIBUTION_COLUMNS = (
+    "position",
+    "company_id",
+    "country_code",
+    "calculation_date",
+    "scheme_code",
+    "tier_code",
+    "calculation_base_amount",
+    "applied_salary",
+    "capped",
+    "employee_amount",
+    "employer_amount",
+    "total_amount",
+)
+
+
+def contribution_rows(chunk: ContributionChunk) -> Iterator[tuple]:
+    """Flatten a chunk into CONTRIBUTION_COLUMNS tuples (failed employees have none)"""
+    for position, summary in enumerate(chunk.batch.results, chunk.offset):
+        if summary is None:
+            continue
+        employee = summary.employee_context
+        for c in summary.contributions:
+            yield (
+                position,
+                employee.company_id,
+                summary.country_code,
+                summary.calculation_date,
+                c.scheme_code,
+                c.tier_code,
+                c.calculation_base_amount,
+                c.applied_salary,
+                c.capped,
+                c.employee_amount,
+                c.employer_amount,
+                c.total_amount,
+            )
+
+
+class ContributionSink(abc.ABC):
+    """Destination for calculated chunks; write() is called from one thread"""
+
+    @abc.abstractmethod
+    def write(self, chunk: ContributionChunk) -> None:
+        """Persist one chunk"""
+
+    def close(self) -> None:
+        """Flush buffered output (called once, after the last chunk)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CsvSink(ContributionSink):
+    """CSV with a header and one row per contribution"""
+
+    def __init__(self, stream: IO[str], header: bool = True):
+        self.stream = stream
+        self._writer = csv.writer(stream)
+        if header:
+            self._writer.writerow(CONTRIBUTION_COLUMNS)
+
+    def write(self, chunk: ContributionChunk) -> None:
+        self._writer.writerows(contribution_rows(chunk))
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class NdjsonSink(ContributionSink):
+    """
+    Newline-delimited JSON, one object per employee
+
+    Amounts are strings so no precision is lost; failed employees are
+    written with their error instead of contributions.
+    """
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+
+    def write(self, chunk: ContributionChunk) -> None:
+        failures = {failure.index: failure for failure in chunk.batch.failures}
+        lines = []
+        for index, summary in enumerate(chunk.batch.results):
+            if summary is None:
+                failure = failures.get(index)
+                record = {
+                    "position": chunk.offset + index,
+                    "error": failure.error if failure else None,
+                    "scheme_code": failure.scheme_code if failure else None,
+                }
+            else:
+                record = self._summary_record(chunk.offset + index, summary)
+            lines.append(json.dumps(record, separators=(",", ":")))
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+
+    @staticmethod
+    def _summary_record(position: int, summary: ContributionSummary) -> dict:
+        return {
+            "position": position,
+            "company_id": summary.employee_context.company_id,
+            "country_code": summary.country_code,
+            "calculation_date": summary.calculation_date.isoformat(),
+            "total_employee_amount": str(summary.total_employee_amount),
+            "total_employer_amount": str(summary.total_employer_amount),
+            "contributions": [
+                {
+                    "scheme_code": c.scheme_code,
+                    "tier_code": c.tier_code,
+                    "applied_salary": str(c.applied_salary),
+                    "capped": c.capped,
+                    "employee_amount": str(c.employee_amount),
+                    "employer_amount": str(c.employer_amount),
+                }
+                for c in summary.contributions
+            ],
+        }
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class DatabaseSink(ContributionSink):
+    """
+    Insert contribution rows into a table with CONTRIBUTION_COLUMNS
+
+    Each chunk is one executemany; with commit_every_chunk the transaction
+    is committed per chunk so a long run does not hold one huge transaction.
+    """
+
+    def __init__(self, db_connection, table: str, commit_every_chunk: bool = True):
+        validate_identifier(table)
+        self.db = db_connection
+        self.commit_every_chunk = commit_every_chunk
+        placeholders = ", ".join(["%s"] * len(CONTRIBUTION_COLUMNS))
+        self._insert = (
+            f"INSERT INTO {table} ({', '.join(CONTRIBUTION_COLUMNS)}) VALUES ({placeholders})"
+        )
+
+    def write(self, chunk: ContributionChunk) -> None:
+        rows = list(contribution_rows(chunk))
+        if not rows:
+            return
+        cursor = self.db.cursor()
+        try:
+            cursor.executemany(self._insert, rows)
+        finally:
+            cursor.close()
+        if self.commit_every_chunk:
+            self.db.commit()
+
+    def close(self) -> None:
+        if not self.commit_every_chunk:
+            self.db.commit()
+
+
+@dataclass
+class StreamSummary:
+    """Totals of a streamed pay run"""
+
+    chunks: int = 0
+    employees: int = 0
+    failures: int = 0
+    elapsed_seconds: float = 0.0
+    max_queued: int = 0  # Most chunks ever waiting for the sink
+
+
+# Marks the end of the stream on the writer queue
+_DONE = object()
+
+
+class ContributionStream:
+    """
+    Calculate an employee stream and write it to a sink in chunks
+
+    With max_pending > 0 the sink runs on a writer thread behind a queue of
+    at most max_pending chunks; the producer blocks when the queue is full.
+    With max_pending = 0 every chunk is written before the next one is
+    calculated. Either way memory holds a bounded number of chunks, however
+    long the input is.
+    """
+
+    def __init__(
+        self,
+        calculator: StatutoryCalculator,
+        sink: ContributionSink,
+        chunk_size: int = 1000,
+        max_pending: int = 2,
+        calculation_date: Optional[date] = None,
+    ):
+        if max_pending < 0:
+            raise ValueError("max_pending must not be negative")
+        self.calculator = calculator
+        self.sink = sink
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending
+        self.calculation_date = calculation_date
+
+    def run(self, employees: Iterable[EmployeeContext]) -> StreamSummary:
+        """Stream every employee through the sink and close it"""
+        started = time.perf_counter()
+        summary = StreamSummary()
+        chunks = self.calculator.calculate_iter(employees, self.calculation_date, self.chunk_size)
+        if self.max_pending == 0:
+            for chunk in chunks:
+                self.sink.write(chunk)
+                self._count(summary, chunk)
+        else:
+            self._run_threaded(chunks, summary)
+        self.sink.close()
+        summary.elapsed_seconds = time.perf_counter() - started
+        return summary
+
+    @staticmethod
+    def _count(summary: StreamSummary, chunk: ContributionChunk) -> None:
+        summary.chunks += 1
+        summary.employees += chunk.size
+        summary.failures += len(chunk.batch.failures)
+
+    def _run_threaded(self, chunks: Iterator[ContributionChunk], summary: StreamSummary) -> None:
+        pending: "queue.Queue" = queue.Queue(maxsize=self.max_pending)
+        error: list = []
+
+        def drain():
+            while True:
+                chunk = pending.get()
+                if chunk is _DONE:
+                    return
+                if not error:
+                    try:
+                        self.sink.write(chunk)
+                    except BaseException as e:  # Re-raised in the producer
+                        error.append(e)
+
+        writer = threading.Thread(target=drain, name="contribution-sink", daemon=True)
+        writer.start()
+        try:
+            for chunk in chunks:
+                if error:
+                    break
+                pending.put(chunk)  # Blocks while the sink is max_pending chunks behind
+                summary.max_queued = max(summary.max_queued, pending.qsize())
+                self._count(summary, chunk)
+        finally:
+            chunks.close()
+            pending.put(_DONE)
+            writer.join()
+        if error:
+            raise error[0]
@@ -0,0 +1,239 @@
+"""
+Fixed-Point Arithmetic
+======================
+Integer minor-unit contribution arithmetic with Decimal-identical rounding
+
+Salaries are integers in minor units (cents, sen) and rates are integers
+scaled by a power of ten, so a contribution is one integer multiplication
+and one integer division. Decimal values are produced only for the result.
+"""
+
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Optional, Tuple
+
+from ..models.statutory import RoundingMethod, StatutoryRate
+
+# Decimal places of minor units (cents) for salaries
+MINOR_PLACES = 2
+MINOR_FACTOR = 10**MINOR_PLACES
+
+
+def decimal_places(value: Optional[Decimal]) -> int:
+    """Decimal places needed to represent value exactly (0 for None or zero)"""
+    if not value:
+        return 0
+    return max(0, -value.normalize().as_tuple().exponent)
+
+
+def scaled(value: Optional[Decimal], places: int) -> int:
+    """
+    value * 10**places as an exact int (0 for None)
+
+    Raises:
+        ValueError: If value has more than places decimal places
+    """
+    if not value:
+        return 0
+    result = value.scaleb(places)
+    if result != result.to_integral_value():
+        raise ValueError(f"{value} has more than {places} decimal places")
+    return int(result)
+
+
+def to_minor(amount: Decimal, places: int = MINOR_PLACES) -> Optional[int]:
+    """amount * 10**places as an int, or None if that is not exact"""
+    numerator, denominator = amount.as_integer_ratio()
+    factor = 10**places
+    if factor % denominator:
+        return None
+    return numerator * (factor // denominator)
+
+
+def from_minor(value: int, places: int) -> Decimal:
+    """Decimal with exactly places decimal places, as Decimal.quantize returns it"""
+    return Decimal(value).scaleb(-places)
+
+
+def round_minor(value: int, divisor: int, method: RoundingMethod) -> int:
+    """
+    Divide a non-negative scaled amount by divisor, rounding like Decimal.quantize
+
+    NEAREST and NEAREST_RINGGIT are ROUND_HALF_UP, FLOOR is ROUND_DOWN and
+    CEILING is ROUND_UP.
+    """
+    quotient, remainder = divmod(value, divisor)
+    if method == RoundingMethod.NEAREST or method == RoundingMethod.NEAREST_RINGGIT:
+        if 2 * remainder >= divisor:
+            quotient += 1
+    elif method == RoundingMethod.CEILING:
+        if remainder:
+            quotient += 1
+    return quotient
+
+
+def rounding_places(method: RoundingMethod, precision: int) -> Optional[int]:
+    """Decimal places a rounding method rounds to, or None if it does not round"""
+    if method == RoundingMethod.NEAREST_RINGGIT:
+        return 0
+    if method in (RoundingMethod.NEAREST, RoundingMethod.FLOOR, RoundingMethod.CEILING):
+        # quantize(Decimal(10) ** -precision): for a negative precision the
+        # quantum is an integer with exponent 0, so amounts round to units
+        return max(precision, 0)
+    return None
+
+
+class FixedRate:
+    """
+    A rate tier with every rate and fixed amount as an integer
+
+    Amounts are in raw units of 10**-(MINOR_PLACES + places): the product of
+    a minor-unit salary and a rate scaled by 10**places. Fixed amounts are
+    scaled to the same raw units so they replace a product like for like.
+    """
+
+    __slots__ = ("places", "employee_rate", "employer_rate", "employee_fixed", "employer_fixed")
+
+    def __init__(self, rate: StatutoryRate):
+        places = max(
+            decimal_places(rate.employee_rate),
+            decimal_places(rate.employer_rate),
+            decimal_places(rate.employee_fixed) - MINOR_PLACES,
+            decimal_places(rate.employer_fixed) - MINOR_PLACES,
+            0,
+        )
+        raw_places = MINOR_PLACES + places
+        self.places = places
+        self.employee_rate = scaled(rate.employee_rate, places)
+        self.employer_rate = scaled(rate.employer_rate, places)
+        # Only a non-zero fixed amount replaces the percentage (as in _calculate_percentage)
+        self.employee_fixed = scaled(rate.employee_fixed, raw_places) or None
+        self.employer_fixed = scaled(rate.employer_fixed, raw_places) or None
+
+    @property
+    def negative(self) -> bool:
+        return any(
+            value is not None and value < 0
+            for value in (
+                self.employee_rate,
+                self.employer_rate,
+                self.employee_fixed,
+                self.employer_fixed,
+            )
+        )
+
+
+class PercentagePlan:
+    """A FixedRate bound to one rounding method and precision"""
+
+    __slots__ = ("fixed", "divisor", "multiplier", "method", "quantum")
+
+    def __init__(self, fixed: FixedRate, method: RoundingMethod, places: int):
+        self.fixed = fixed
+        self.method = method
+        shift = MINOR_PLACES + fixed.places - places
+        self.divisor = 10**shift if shift > 0 else 1
+        self.multiplier = 10**-shift if shift < 0 else 1
+        # Decimal(n) * quantum has exactly `places` decimal places
+        self.quantum = Decimal(1).scaleb(-places)
+
+    def amounts(self, salary_minor: int) -> Tuple[Decimal, Decimal, Decimal]:
+        """Rounded (employee, employer, total) amounts for a minor-unit salary"""
+        fixed = self.fixed
+        employee = fixed.employee_fixed
+        if employee is None:
+            employee = salary_minor * fixed.employee_rate
+        employer = fixed.employer_fixed
+        if employer is None:
+            employer = salary_minor * fixed.employer_rate
+
+        if self.divisor != 1:
+            employee = round_minor(employee, self.divisor, self.method)
+            employer = round_minor(employer, self.divisor, self.method)
+        elif self.multiplier != 1:
+            employee *= self.multiplier
+            employer *= self.multiplier
+
+        employee_amount = Decimal(employee) * self.quantum
+        employer_amount = Decimal(employer) * self.quantum
+        return employee_amount, employer_amount, employee_amount + employer_amount
+
+
+class FixedPointArithmetic:
+    """
+    Percentage contributions in integer minor units
+
+    Rate tiers are converted to integer plans once per rounding method and
+    cached by their rates and fixed amounts, so reloaded snapshots and tiers
+    rebuilt on every database lookup share one plan and the cache stays
+    bounded. Amounts integers cannot reproduce exactly, i.e. negative
+    amounts, salaries with fractions of a minor unit and rounding methods
+    that do not round, are declined with None so the caller uses the Decimal
+    path.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """
+        Args:
+            maxsize: Maximum number of cached plans
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._plans: "OrderedDict[tuple, Optional[PercentagePlan]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def plan(
+        self, rate: StatutoryRate, method: RoundingMethod, precision: int
+    ) -> Optional[PercentagePlan]:
+        """Integer plan for a tier and rounding, or None if the tier needs Decimal"""
+        # Equal Decimals (0.1 and 0.10) convert to the same FixedRate
+        key = (
+            rate.employee_rate,
+            rate.employer_rate,
+            rate.employee_fixed,
+            rate.employer_fixed,
+            method,
+            precision,
+        )
+        try:
+            plan = self._plans[key]
+        except KeyError:
+            pass
+        else:
+            self._plans.move_to_end(key)
+            return plan
+
+        places = rounding_places(method, precision)
+        fixed = FixedRate(rate)
+        plan = None
+        if places is not None and not fixed.negative:
+            plan = PercentagePlan(fixed, method, places)
+        self._plans[key] = plan
+        if len(self._plans) > self.maxsize:
+            self._plans.popitem(last=False)
+        return plan
+
+    def percentage(
+        self,
+        salary: Decimal,
+        rate: StatutoryRate,
+        method: RoundingMethod,
+        precision: int,
+    ) -> Optional[Tuple[Decimal, Decimal, Decimal]]:
+        """
+        Rounded employee, employer and total amounts of a percentage tier
+
+        Returns:
+            (employee_amount, employer_amount, total_amount), identical to the
+            Decimal path, or None when the amounts must be computed with Decimal
+        """
+        plan = self.plan(rate, method, precision)
+        if plan is None:
+            return None
+        numerator, denominator = salary.as_integer_ratio()
+        if numerator < 0 or MINOR_FACTOR % denominator:
+            return None
+        return plan.amounts(numerator * (MINOR_FACTOR // denominator))
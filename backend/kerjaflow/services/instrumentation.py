@@ -0,0 +1,278 @@
+"""
+Calculator Instrumentation
+==========================
+Counters, latency histograms and an optional per-employee trace for
+StatutoryCalculator
+
+Attach a CalculatorMetrics (StatutoryCalculator(metrics=...), or set
+calculator.metrics) to record, per method, country and scheme:
+
+- latency of scheme resolution ("schemes"), ceiling lookup ("ceiling"),
+  rate matching ("rate"), wage band lookup ("table_lookup", inside
+  "amounts"), amount arithmetic with rounding ("amounts"), a whole scheme
+  ("scheme") and a whole employee ("employee");
+- database round trips per table, memo hits and misses, lookups answered
+  from a snapshot and wage band tables reused;
+- with trace=True, one TraceEntry per scheme naming the tier, ceiling and
+  band chosen.
+
+Without metrics every hook is a single attribute test.
+"""
+
+import json
+import re
+from dataclasses import asdict, dataclass
+from datetime import date
+from decimal import Decimal
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+
+from ..models.statutory import EmployeeContext, StatutoryContribution
+
+# Histogram bucket upper bounds in microseconds: 1-2-5 steps from 1us to 10s
+BUCKET_BOUNDS_US: Tuple[float, ...] = tuple(
+    float(step * 10**power) for power in range(0, 7) for step in (1, 2, 5)
+) + (1e7,)
+
+# Table named by a statement, for per-table round trip counts
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+([\w.]+)", re.IGNORECASE)
+
+# (method or counter name, country_code, scheme_code)
+MetricKey = Tuple[str, str, Optional[str]]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (microsecond buckets, exact count/sum/min/max)"""
+
+    __slots__ = ("counts", "count", "total", "minimum", "maximum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_US) + 1)  # Last bucket: above 10s
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        micros = seconds * 1e6
+        bucket = 0
+        while bucket < len(BUCKET_BOUNDS_US) and micros > BUCKET_BOUNDS_US[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += micros
+        self.minimum = min(self.minimum, micros)
+        self.maximum = max(self.maximum, micros)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound (us) of the bucket holding the fraction-th observation"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                bound = BUCKET_BOUNDS_US[bucket] if bucket < len(BUCKET_BOUNDS_US) else self.maximum
+                return round(min(bound, self.maximum), 2)
+        return round(self.maximum, 2)
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_us": round(self.total, 1),
+            "mean_us": round(self.total / self.count, 2) if self.count else None,
+            "min_us": round(self.minimum, 2) if self.count else None,
+            "max_us": round(self.maximum, 2),
+            "p50_us": self.percentile(0.50),
+            "p90_us": self.percentile(0.90),
+            "p99_us": self.percentile(0.99),
+        }
+
+
+@dataclass(slots=True)
+class TraceEntry:
+    """Rule rows chosen for one employee and scheme"""
+
+    employee_id: Optional[str]
+    country_code: str
+    calculation_date: date
+    scheme_code: str
+    tier_code: Optional[str]
+    rate_id: Optional[int]
+    ceiling_id: Optional[int]
+    table_lookup_id: Optional[int]
+    capped: bool
+    employee_amount: Decimal
+    employer_amount: Decimal
+    memo_hit: bool
+    microseconds: float
+
+    @classmethod
+    def of(
+        cls,
+        employee: EmployeeContext,
+        calculation_date: date,
+        contribution: StatutoryContribution,
+        memo_hit: bool,
+        seconds: float,
+    ) -> "TraceEntry":
+        return cls(
+            employee_id=employee.employee_id,
+            country_code=employee.country_code,
+            calculation_date=calculation_date,
+            scheme_code=contribution.scheme_code,
+            tier_code=contribution.tier_code,
+            rate_id=contribution.rate_id,
+            ceiling_id=contribution.ceiling_id,
+            table_lookup_id=contribution.table_lookup_id,
+            capped=contribution.capped,
+            employee_amount=contribution.employee_amount,
+            employer_amount=contribution.employer_amount,
+            memo_hit=memo_hit,
+            microseconds=round(seconds * 1e6, 2),
+        )
+
+
+class CountingCursor:
+    """Cursor wrapper recording each executed statement as a round trip"""
+
+    def __init__(self, cursor, metrics: "CalculatorMetrics"):
+        self._cursor = cursor
+        self._metrics = metrics
+
+    def execute(self, query, params=None):
+        self._metrics.round_trip(query)
+        return self._cursor.execute(query, params)
+
+    def executemany(self, query, params_seq):
+        self._metrics.round_trip(query)
+        return self._cursor.executemany(query, params_seq)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class CountingConnection:
+    """Connection wrapper handing out CountingCursors"""
+
+    def __init__(self, connection, metrics: "CalculatorMetrics"):
+        self._connection = connection
+        self._metrics = metrics
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._connection.cursor(*args, **kwargs), self._metrics)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class CalculatorMetrics:
+    """
+    Measurements of one or more calculations, exportable as a summary
+
+    Args:
+        trace: Keep a TraceEntry per employee and scheme
+        trace_limit: Entries kept before further ones are only counted
+    """
+
+    def __init__(self, trace: bool = False, trace_limit: int = 100_000):
+        self.trace_enabled = trace
+        self.trace_limit = trace_limit
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop every measurement (e.g. between pay runs)"""
+        self.histograms: Dict[MetricKey, Histogram] = {}
+        self.counters: Dict[MetricKey, int] = {}
+        self.round_trips: Dict[str, int] = {}  # Per table
+        self.trace: List[TraceEntry] = []
+        self.trace_dropped = 0
+
+    def observe(
+        self, method: str, country_code: str, scheme_code: Optional[str], seconds: float
+    ) -> None:
+        key = (method, country_code, scheme_code)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def timed(
+        self,
+        method: str,
+        country_code: str,
+        scheme_code: Optional[str],
+        function: Callable,
+        *args,
+    ):
+        """Call function(*args) and record its latency"""
+        started = perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.observe(method, country_code, scheme_code, perf_counter() - started)
+
+    def count(
+        self, name: str, country_code: str = "", scheme_code: Optional[str] = None, amount: int = 1
+    ) -> None:
+        key = (name, country_code, scheme_code)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def round_trip(self, query: str) -> None:
+        match = _TABLE.search(query)
+        table = match.group(1) if match else "other"
+        self.round_trips[table] = self.round_trips.get(table, 0) + 1
+
+    def record(self, entry: TraceEntry) -> None:
+        if len(self.trace) < self.trace_limit:
+            self.trace.append(entry)
+        else:
+            self.trace_dropped += 1
+
+    def connection(self, db_connection) -> CountingConnection:
+        return CountingConnection(db_connection, self)
+
+    def counter(self, name: str, country_code: Optional[str] = None) -> int:
+        """Total of a counter, optionally for one country"""
+        return sum(
+            value
+            for (counter, country, _), value in self.counters.items()
+            if counter == name and (country_code is None or country == country_code)
+        )
+
+    def summary(self) -> dict:
+        """JSON-ready summary: latency per (method, country, scheme), counters, round trips"""
+        return {
+            "latency": [
+                {"method": method, "country": country, "scheme": scheme, **histogram.as_dict()}
+                for (method, country, scheme), histogram in sorted(
+                    self.histograms.items(), key=lambda item: _sort_key(item[0])
+                )
+            ],
+            "counters": [
+                {"name": name, "country": country, "scheme": scheme, "count": count}
+                for (name, country, scheme), count in sorted(
+                    self.counters.items(), key=lambda item: _sort_key(item[0])
+                )
+            ],
+            "db_round_trips": dict(
+                sorted(self.round_trips.items()), total=sum(self.round_trips.values())
+            ),
+            "trace": {"entries": len(self.trace), "dropped": self.trace_dropped},
+        }
+
+    def write_summary(self, out: TextIO) -> None:
+        json.dump(self.summary(), out, indent=2, sort_keys=True)
+        out.write("\n")
+
+    def write_trace(self, out: TextIO) -> None:
+        """Trace entries as newline-delimited JSON"""
+        for entry in self.trace:
+            out.write(json.dumps(asdict(entry), default=str, sort_keys=True))
+            out.write("\n")
+
+
+def _sort_key(key: MetricKey) -> tuple:
+    name, country, scheme = key
+    return name, country, scheme or ""
@@ -0,0 +1,274 @@
+"""
+Pay-Run Executor
+================
+Multi-process statutory calculation for regional pay runs
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ..models.statutory import BatchCalculationResult, EmployeeContext
+from .rate_bundle import RateBundleWatcher
+from .rule_snapshot import RuleSnapshot
+from .statutory_calculator import StatutoryCalculator
+
+logger = logging.getLogger(__name__)
+
+ShardKey = Tuple[Optional[str], str]  # (company_id, country_code)
+
+
+@dataclass
+class PayRunShard:
+    """Employees of one company and country sent to a worker together"""
+
+    index: int  # Position in the run's output order
+    company_id: Optional[str]
+    country_code: str
+    positions: List[int]  # Input positions of the employees
+    employees: List[EmployeeContext]
+
+
+@dataclass
+class PayRunShardResult:
+    """Calculated shard, handed to the writer in shard order"""
+
+    index: int
+    company_id: Optional[str]
+    country_code: str
+    positions: List[int]
+    batch: BatchCalculationResult
+
+
+@dataclass
+class PayRunProgress:
+    """Snapshot of pay-run progress passed to the progress callback"""
+
+    shards_written: int
+    employees_written: int
+    employees_read: int
+    failures: int
+    elapsed_seconds: float
+
+    @property
+    def employees_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.employees_written / self.elapsed_seconds
+
+
+@dataclass
+class PayRunSummary:
+    """Totals of a completed pay run"""
+
+    shards: int = 0
+    employees: int = 0
+    failures: int = 0
+    elapsed_seconds: float = 0.0
+    companies: Dict[ShardKey, int] = field(default_factory=dict)  # employees per shard key
+
+
+# Calculator of the current worker process and its bundle watcher, set by _init_worker
+_worker_calculator: Optional[StatutoryCalculator] = None
+_worker_bundle: Optional[RateBundleWatcher] = None
+
+
+def _init_worker(
+    snapshots: Optional[Sequence[RuleSnapshot]],
+    connection_factory: Optional[Callable[[], object]],
+    bundle_path: Optional[str] = None,
+) -> None:
+    """Give each worker process its own calculator, snapshots and DB connection"""
+    global _worker_calculator, _worker_bundle
+    connection = connection_factory() if connection_factory is not None else None
+    _worker_calculator = StatutoryCalculator(connection, snapshots=snapshots)
+    _worker_bundle = None
+    if bundle_path is not None:
+        _worker_bundle = RateBundleWatcher(bundle_path, _worker_calculator)
+        _worker_bundle.check()
+
+
+def _calculate_shard(shard: PayRunShard) -> PayRunShardResult:
+    if _worker_bundle is not None:
+        _worker_bundle.check()  # Picks up a rebuilt bundle between shards
+    batch = _worker_calculator.calculate_batch(shard.employees)
+    return PayRunShardResult(
+        index=shard.index,
+        company_id=shard.company_id,
+        country_code=shard.country_code,
+        positions=shard.positions,
+        batch=batch,
+    )
+
+
+class PayRunExecutor:
+    """
+    Shard a pay run by company and country across a process pool
+
+    Employees are read lazily and buffered per (company, country) until a
+    shard is full, so memory is bounded by the open shard buffers plus at
+    most max_pending shards in flight or awaiting their turn. Every worker
+    builds its own StatutoryCalculator from the given snapshots, a compiled
+    rate bundle and/or a connection factory (connections cannot cross
+    process boundaries). Workers given a bundle path map the file themselves
+    instead of unpickling snapshots, and install a rebuilt bundle before
+    their next shard.
+
+    Results reach the single writer in shard order. Shard numbering depends
+    only on the input order and shard_size, never on the worker count or
+    scheduling, so two runs over the same input write identical output.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        snapshots: Optional[Sequence[RuleSnapshot]] = None,
+        connection_factory: Optional[Callable[[], object]] = None,
+        shard_size: int = 1000,
+        max_pending: Optional[int] = None,
+        progress: Optional[Callable[[PayRunProgress], None]] = None,
+        bundle_path: Optional[str] = None,
+    ):
+        """
+        Configure the executor
+
+        Args:
+            workers: Worker processes; 0 or 1 calculates in this process
+            snapshots: Rule snapshots shipped to every worker
+            connection_factory: Picklable callable opening a DB connection in
+                each worker, e.g. functools.partial(psycopg2.connect, dsn)
+            shard_size: Maximum employees per shard
+            max_pending: Shards in flight or buffered for ordering
+                (default: twice the worker count)
+            progress: Called after every written shard
+            bundle_path: Rate bundle file each worker opens and watches
+                (see rate_bundle.build_bundle)
+        """
+        if shard_size < 1:
+            raise ValueError("shard_size must be at least 1")
+        if snapshots is None and connection_factory is None and bundle_path is None:
+            raise ValueError(
+                "PayRunExecutor needs rule snapshots, a rate bundle or a connection factory"
+            )
+
+        self.workers = workers
+        self.snapshots = list(snapshots or [])
+        self.connection_factory = connection_factory
+        self.shard_size = shard_size
+        self.max_pending = max(max_pending or 2 * max(workers, 1), 1)
+        self.progress = progress
+        self.bundle_path = None if bundle_path is None else str(bundle_path)
+
+    def run(
+        self,
+        employees: Iterable[EmployeeContext],
+        writer: Callable[[PayRunShardResult], None],
+    ) -> PayRunSummary:
+        """
+        Calculate a pay run and stream shard results to the writer
+
+        Args:
+            employees: Employee contexts, consumed lazily
+            writer: Called in this process with each shard result, in order
+
+        Returns:
+            PayRunSummary with run totals
+        """
+        started = time.monotonic()
+        summary = PayRunSummary()
+        read = [0]
+
+        def counted() -> Iterator[EmployeeContext]:
+            for employee in employees:
+                read[0] += 1
+                yield employee
+
+        def write(result: PayRunShardResult) -> None:
+            writer(result)
+            summary.shards += 1
+            summary.employees += len(result.positions)
+            summary.failures += len(result.batch.failures)
+            key = (result.company_id, result.country_code)
+            summary.companies[key] = summary.companies.get(key, 0) + len(result.positions)
+            if self.progress is not None:
+                self.progress(
+                    PayRunProgress(
+                        shards_written=summary.shards,
+                        employees_written=summary.employees,
+                        employees_read=read[0],
+                        failures=summary.failures,
+                        elapsed_seconds=time.monotonic() - started,
+                    )
+                )
+
+        shards = self._shards(counted())
+        if self.workers <= 1:
+            _init_worker(self.snapshots, self.connection_factory, self.bundle_path)
+            for shard in shards:
+                write(_calculate_shard(shard))
+        else:
+            self._run_pool(shards, write)
+
+        summary.elapsed_seconds = time.monotonic() - started
+        logger.info(
+            f"Pay run finished: {summary.employees} employees in {summary.shards} shards, "
+            f"{summary.failures} failures, {summary.elapsed_seconds:.1f}s"
+        )
+        return summary
+
+    def _run_pool(
+        self, shards: Iterator[PayRunShard], write: Callable[[PayRunShardResult], None]
+    ) -> None:
+        """Keep at most max_pending shards outstanding and write them in index order"""
+        pending: Dict[Future, int] = {}
+        finished: Dict[int, PayRunShardResult] = {}
+        next_index = 0
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.snapshots, self.connection_factory, self.bundle_path),
+        ) as pool:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) + len(finished) < self.max_pending:
+                    shard = next(shards, None)
+                    if shard is None:
+                        exhausted = True
+                        break
+                    pending[pool.submit(_calculate_shard, shard)] = shard.index
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.pop(future)
+                    result = future.result()  # Re-raises worker errors and stops the run
+                    finished[result.index] = result
+
+                while next_index in finished:
+                    write(finished.pop(next_index))
+                    next_index += 1
+
+    def _shards(self, employees: Iterable[EmployeeContext]) -> Iterator[PayRunShard]:
+        """Group employees into (company, country) shards of at most shard_size"""
+        buffers: Dict[ShardKey, Tuple[List[int], List[EmployeeContext]]] = {}
+        index = 0
+
+        for position, employee in enumerate(employees):
+            key = (employee.company_id, employee.country_code)
+            positions, members = buffers.setdefault(key, ([], []))
+            positions.append(position)
+            members.append(employee)
+            if len(members) >= self.shard_size:
+                del buffers[key]
+                yield PayRunShard(index, key[0], key[1], positions, members)
+                index += 1
+
+        # Remaining partial shards, in order of first appearance
+        for (company_id, country_code), (positions, members) in buffers.items():
+            yield PayRunShard(index, company_id, country_code, positions, members)
+            index += 1
@@ -0,0 +1,445 @@
+"""
+Rate Bundle
+===========
+Compiled, checksummed rule data for database-free calculators
+
+    python -m kerjaflow.services.rate_bundle --output rules.kfrb
+    python -m kerjaflow.services.rate_bundle --source postgres --dsn postgresql:///kerjaflow \\
+        --valid-from 2025-01-01 --valid-until 2026-12-31 --output rules.kfrb
+
+A bundle holds the rule rows of one RuleSnapshot per country (schemes, rate
+tiers, ceilings and table lookup bands) in one binary file:
+
+    header   magic, format version, country count, index position, SHA-256
+             of everything after the header
+    index    JSON: bundle version, build time, source and, per country, the
+             section position, validity window and snapshot version
+    sections one per country: the four row sets, each value tagged with its
+             type (None, bool, int, str, Decimal, date)
+
+RateBundle.open() memory-maps the file, checks the header and checksum and
+reads the index; a country's section is decoded into a RuleSnapshot the first
+time it is asked for, and the rebuilt snapshot must reproduce the version
+stored at build time. Opening a bundle takes milliseconds, so workers start
+without touching the database, and previews, simulations and tests run with
+no database at all.
+
+The bundle version is a digest of the per-country snapshot versions, so
+rebuilding unchanged rules yields the same version. build_bundle() replaces
+the target file atomically; RateBundleWatcher notices a replaced file and
+installs the new snapshots into running calculators.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import stat
+import struct
+import sys
+import tempfile
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .rule_snapshot import RuleSnapshot
+from .statutory_calculator import StatutoryCalculator
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"KFRULES\x00"
+FORMAT_VERSION = 1
+
+# magic, format version, reserved, country count, index offset, index length, SHA-256
+HEADER = struct.Struct("<8sHHIQQ32s")
+
+ROW_SETS = ("scheme", "rate", "ceiling", "table_lookup")
+
+# Value tags
+_NONE, _TRUE, _FALSE, _INT, _STR, _DECIMAL, _DATE = range(7)
+
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_I32 = struct.Struct("<i")
+_I64 = struct.Struct("<q")
+
+
+class RateBundleError(ValueError):
+    """Bundle file is malformed, corrupted or of an unsupported format"""
+
+
+def _encode_value(value, out: bytearray) -> None:
+    # bool before int: bool is an int subclass
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, int):
+        out.append(_INT)
+        out += _I64.pack(value)
+    elif isinstance(value, Decimal):
+        # str keeps the exponent, so the snapshot version survives the round trip
+        text = str(value).encode("ascii")
+        out.append(_DECIMAL)
+        out += _U16.pack(len(text)) + text
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        out.append(_DATE)
+        out += _I32.pack(value.toordinal())
+    elif isinstance(value, str):
+        text = value.encode("utf-8")
+        out.append(_STR)
+        out += _U32.pack(len(text)) + text
+    else:
+        raise TypeError(f"Cannot store {type(value).__name__} in a rate bundle: {value!r}")
+
+
+def _encode_section(snapshot: RuleSnapshot) -> bytes:
+    out = bytearray()
+    for name in ROW_SETS:
+        rows = snapshot.rows[name]
+        out += _U32.pack(len(rows))
+        for row in rows:
+            out += _U16.pack(len(row))
+            for value in row:
+                _encode_value(value, out)
+    return bytes(out)
+
+
+def _decode_section(buffer, offset: int, end: int) -> Dict[str, List[tuple]]:
+    rows_by_set = {}
+    for name in ROW_SETS:
+        (count,) = _U32.unpack_from(buffer, offset)
+        offset += 4
+        rows = []
+        for _ in range(count):
+            (width,) = _U16.unpack_from(buffer, offset)
+            offset += 2
+            row = []
+            for _ in range(width):
+                tag = buffer[offset]
+                offset += 1
+                if tag == _NONE:
+                    row.append(None)
+                elif tag == _TRUE:
+                    row.append(True)
+                elif tag == _FALSE:
+                    row.append(False)
+                elif tag == _INT:
+                    row.append(_I64.unpack_from(buffer, offset)[0])
+                    offset += 8
+                elif tag == _DECIMAL:
+                    (size,) = _U16.unpack_from(buffer, offset)
+                    text = buffer[offset + 2 : offset + 2 + size]  # noqa: E203
+                    row.append(Decimal(text.decode("ascii")))
+                    offset += 2 + size
+                elif tag == _DATE:
+                    row.append(date.fromordinal(_I32.unpack_from(buffer, offset)[0]))
+                    offset += 4
+                elif tag == _STR:
+                    (size,) = _U32.unpack_from(buffer, offset)
+                    row.append(buffer[offset + 4 : offset + 4 + size].decode("utf-8"))  # noqa: E203
+                    offset += 4 + size
+                else:
+                    raise RateBundleError(f"Unknown value tag {tag} at offset {offset - 1}")
+            rows.append(tuple(row))
+        rows_by_set[name] = rows
+    if offset != end:
+        raise RateBundleError(f"Section ends at {offset}, index says {end}")
+    return rows_by_set
+
+
+def bundle_version(snapshots: Iterable[RuleSnapshot]) -> str:
+    """Content version of a set of snapshots (independent of build time and order)"""
+    digest = hashlib.sha256(f"kfrules/{FORMAT_VERSION}".encode())
+    for snapshot in sorted(snapshots, key=lambda s: s.country_code):
+        digest.update(f"\n{snapshot.country_code}|{snapshot.version}".encode())
+    return digest.hexdigest()
+
+
+def build_bundle(
+    snapshots: Sequence[RuleSnapshot], path, source: str = "", built_at: Optional[datetime] = None
+) -> str:
+    """
+    Compile rule snapshots into a bundle file
+
+    The file is written next to its destination and renamed over it, so a
+    reader sees either the old or the new bundle, never a partial one. A
+    replaced bundle keeps its permissions; a new one is created 0644.
+
+    Args:
+        snapshots: One snapshot per country
+        path: Destination file
+        source: Free-text provenance recorded in the index (e.g. "seed")
+        built_at: Build time recorded in the index (default: now, UTC)
+
+    Returns:
+        The bundle version
+    """
+    countries = [s.country_code for s in snapshots]
+    duplicates = sorted({c for c in countries if countries.count(c) > 1})
+    if duplicates:
+        raise ValueError(f"More than one snapshot for {', '.join(duplicates)}")
+
+    version = bundle_version(snapshots)
+    sections = [(snapshot, _encode_section(snapshot)) for snapshot in snapshots]
+
+    # The index records section offsets relative to the end of the index, so
+    # it can be serialized before those offsets are final
+    entries = {}
+    position = 0
+    for snapshot, section in sections:
+        entries[snapshot.country_code] = {
+            "offset": position,
+            "length": len(section),
+            "valid_from": snapshot.valid_from.isoformat(),
+            "valid_until": snapshot.valid_until.isoformat(),
+            "snapshot_version": snapshot.version,
+        }
+        position += len(section)
+    index = json.dumps(
+        {
+            "version": version,
+            "built_at": (built_at or datetime.now(timezone.utc)).isoformat(),
+            "source": source,
+            "countries": entries,
+        },
+        sort_keys=True,
+    ).encode("utf-8")
+
+    payload = hashlib.sha256(index)
+    for _, section in sections:
+        payload.update(section)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, len(sections), HEADER.size, len(index), payload.digest()
+    )
+
+    path = Path(path)
+    try:
+        mode = stat.S_IMODE(path.stat().st_mode)
+    except FileNotFoundError:
+        mode = 0o644
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        # mkstemp creates 0600; workers may run as another user than the builder
+        os.chmod(temporary, mode)
+        with os.fdopen(descriptor, "wb") as out:
+            out.write(header)
+            out.write(index)
+            for _, section in sections:
+                out.write(section)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+    logger.info(f"Built rate bundle {version[:12]} ({', '.join(countries)}) at {path}")
+    return version
+
+
+class RateBundle:
+    """
+    Memory-mapped rate bundle
+
+    Use RateBundle.open(); snapshots are decoded per country on first use.
+    """
+
+    def __init__(self, path: Path, mapped: mmap.mmap, index: dict, body_offset: int):
+        self.path = path
+        self._map = mapped
+        self._body_offset = body_offset
+        self.version: str = index["version"]
+        self.built_at: str = index["built_at"]
+        self.source: str = index["source"]
+        self._entries: Dict[str, dict] = index["countries"]
+        self._snapshots: Dict[str, RuleSnapshot] = {}
+
+    @classmethod
+    def open(cls, path, verify: bool = True) -> "RateBundle":
+        """
+        Map a bundle file and read its index
+
+        Args:
+            path: Bundle file
+            verify: Check the SHA-256 of the whole payload (a few ms per MB)
+
+        Raises:
+            RateBundleError: Wrong magic, unsupported format or bad checksum
+        """
+        path = Path(path)
+        with path.open("rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(mapped) < HEADER.size:
+                raise RateBundleError(f"{path} is too short to be a rate bundle")
+            magic, fmt, _, count, index_offset, index_length, checksum = HEADER.unpack_from(
+                mapped, 0
+            )
+            if magic != MAGIC:
+                raise RateBundleError(f"{path} is not a rate bundle")
+            if fmt != FORMAT_VERSION:
+                raise RateBundleError(f"{path} has bundle format {fmt}, expected {FORMAT_VERSION}")
+            if verify:
+                with memoryview(mapped) as view, view[HEADER.size :] as payload:  # noqa: E203
+                    if hashlib.sha256(payload).digest() != checksum:
+                        raise RateBundleError(f"{path} failed its checksum")
+            index = json.loads(mapped[index_offset : index_offset + index_length])  # noqa: E203
+            if len(index["countries"]) != count:
+                raise RateBundleError(f"{path} index lists {len(index['countries'])} countries")
+        except BaseException:
+            mapped.close()
+            raise
+        return cls(path, mapped, index, index_offset + index_length)
+
+    @property
+    def countries(self) -> List[str]:
+        """Country codes in the bundle, sorted"""
+        return list(self._entries)
+
+    def window(self, country_code: str) -> Tuple[date, date]:
+        """Validity window of a country's snapshot"""
+        entry = self._entries[country_code]
+        return date.fromisoformat(entry["valid_from"]), date.fromisoformat(entry["valid_until"])
+
+    def snapshot(self, country_code: str) -> RuleSnapshot:
+        """
+        A country's rule snapshot, decoded on first use
+
+        Raises:
+            KeyError: The country is not in the bundle
+            RateBundleError: The decoded rows do not reproduce the stored version
+        """
+        snapshot = self._snapshots.get(country_code)
+        if snapshot is not None:
+            return snapshot
+
+        entry = self._entries[country_code]
+        start = self._body_offset + entry["offset"]
+        rows = _decode_section(self._map, start, start + entry["length"])
+        valid_from, valid_until = self.window(country_code)
+        snapshot = RuleSnapshot(
+            country_code,
+            valid_from,
+            valid_until,
+            rows["scheme"],
+            rows["rate"],
+            rows["ceiling"],
+            rows["table_lookup"],
+        )
+        if snapshot.version != entry["snapshot_version"]:
+            raise RateBundleError(
+                f"{self.path}: {country_code} decodes to version {snapshot.version[:12]}, "
+                f"built as {entry['snapshot_version'][:12]}"
+            )
+        self._snapshots[country_code] = snapshot
+        return snapshot
+
+    def snapshots(self, countries: Optional[Iterable[str]] = None) -> List[RuleSnapshot]:
+        """Snapshots of the given countries (default: all)"""
+        return [self.snapshot(code) for code in (countries or self.countries)]
+
+    def close(self) -> None:
+        """Unmap the file; decoded snapshots stay usable"""
+        self._map.close()
+
+    def __enter__(self) -> "RateBundle":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class RateBundleWatcher:
+    """
+    Hot-swaps a bundle file into running calculators
+
+    check() is one stat() call while the file is unchanged. When the file has
+    been replaced (build_bundle renames a new file over it) and holds a new
+    version, its snapshots are installed into every calculator through
+    use_bundle; a calculation already running keeps the snapshot it started
+    with. Call check() between batches or shards.
+    """
+
+    def __init__(self, path, *calculators: StatutoryCalculator, countries=None):
+        self.path = Path(path)
+        self.calculators = list(calculators)
+        self.countries = list(countries) if countries else None
+        self.version: Optional[str] = None
+        self._stat: Optional[Tuple[int, int, int]] = None
+
+    def check(self) -> bool:
+        """
+        Install the bundle if the file changed since the last check
+
+        Returns:
+            True if a new bundle version was installed
+        """
+        stat = self.path.stat()
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if key == self._stat:
+            return False
+        with RateBundle.open(self.path) as bundle:
+            self._stat = key
+            if bundle.version == self.version:
+                return False
+            for calculator in self.calculators:
+                calculator.use_bundle(bundle, self.countries)
+            previous, self.version = self.version, bundle.version
+        if previous is not None:
+            logger.info(f"Rate bundle {self.path} swapped: {previous[:12]} -> {self.version[:12]}")
+        return True
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m kerjaflow.services.rate_bundle")
+    parser.add_argument("--output", type=Path, required=True, help="Bundle file to write")
+    parser.add_argument("--source", choices=("seed", "postgres"), default="seed")
+    parser.add_argument("--dsn", help="PostgreSQL DSN for --source postgres")
+    parser.add_argument("--countries", help="Comma-separated country codes (default: all)")
+    parser.add_argument("--valid-from", type=date.fromisoformat, default=date(2020, 1, 1))
+    parser.add_argument("--valid-until", type=date.fromisoformat, default=date(2030, 12, 31))
+    return parser.parse_args(argv)
+
+
+def _snapshots(args) -> List[RuleSnapshot]:
+    countries = args.countries.split(",") if args.countries else None
+    if args.source == "seed":
+        from ..utils.seed_sql import SeedRules
+
+        seed = SeedRules.from_migrations()
+        return [
+            RuleSnapshot(code, args.valid_from, args.valid_until, **seed.rule_rows(code))
+            for code in countries or seed.country_codes()
+        ]
+
+    import psycopg2
+
+    connection = psycopg2.connect(args.dsn or "")
+    try:
+        if countries is None:
+            cursor = connection.cursor()
+            cursor.execute("SELECT code FROM kf_country ORDER BY code")
+            countries = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        return [
+            RuleSnapshot.load(connection, code, args.valid_from, args.valid_until)
+            for code in countries
+        ]
+    finally:
+        connection.close()
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    snapshots = _snapshots(args)
+    version = build_bundle(snapshots, args.output, source=args.source)
+    print(f"{args.output}: version {version} ({', '.join(s.country_code for s in snapshots)})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
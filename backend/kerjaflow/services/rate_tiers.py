@@ -0,0 +1,284 @@
+"""
+Compiled Rate Tiers
+===================
+Decision structure replacing the per-employee rate tier query
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date
+from itertools import combinations
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ..models.statutory import EmployeeContext, NationalityType, RiskCategory, StatutoryRate
+
+# Interval bounds are (value, 0) for "from value" and (value, 1) for "after
+# value", so inclusive lower and upper limits share one sort order. A query
+# for x probes (x, 0): x >= lo  <=>  (x, 0) >= (lo, 0), and
+# x <= hi  <=>  (x, 0) < (hi, 1).
+Bound = Optional[Tuple[object, int]]
+
+# Employee nationality keys; None stands for "no nationality" (SQL passes 'ALL')
+NATIONALITY_KEYS: Tuple[Optional[NationalityType], ...] = (
+    NationalityType.CITIZEN,
+    NationalityType.PR,
+    NationalityType.FOREIGN,
+    None,
+)
+
+
+def _date_bounds(rate: StatutoryRate) -> Tuple[Bound, Bound]:
+    upper = (rate.effective_until, 1) if rate.effective_until is not None else None
+    return (rate.effective_from, 0), upper
+
+
+def _age_bounds(rate: StatutoryRate) -> Tuple[Bound, Bound]:
+    lower = (rate.min_age, 0) if rate.min_age is not None else None
+    upper = (rate.max_age, 1) if rate.max_age is not None else None
+    return lower, upper
+
+
+def _salary_bounds(rate: StatutoryRate) -> Tuple[Bound, Bound]:
+    lower = (rate.min_salary, 0) if rate.min_salary is not None else None
+    upper = (rate.max_salary, 1) if rate.max_salary is not None else None
+    return lower, upper
+
+
+DIMENSIONS: Tuple[Callable[[StatutoryRate], Tuple[Bound, Bound]], ...] = (
+    _date_bounds,
+    _age_bounds,
+    _salary_bounds,
+)
+
+
+def tier_priority(rate: StatutoryRate) -> tuple:
+    """
+    Sort key reproducing the ORDER BY of StatutoryCalculator._find_matching_rate
+
+    More specific tiers first, then the latest effective_from, then bounded
+    tiers before open-ended ones. The rate id, the final SQL sort column, is
+    left out so equal keys identify genuinely ambiguous tiers.
+    """
+    return (
+        rate.min_age is None,
+        rate.min_salary is None,
+        rate.nationality_condition == NationalityType.ALL,
+        -rate.effective_from.toordinal(),
+        rate.max_age is None,
+        rate.max_salary is None,
+    )
+
+
+def _headcount_matches(rate: StatutoryRate, employee_count: Optional[int]) -> bool:
+    """Headcount condition, with the SQL defaults for an unknown headcount"""
+    if rate.employee_count_min is not None and rate.employee_count_min > (employee_count or 0):
+        return False
+    if rate.employee_count_max is not None and rate.employee_count_max < (employee_count or 999999):
+        return False
+    return True
+
+
+def _headcount_covers(outer: StatutoryRate, inner: StatutoryRate) -> bool:
+    """True if every headcount inner accepts is also accepted by outer"""
+    if outer.employee_count_min is not None and (
+        inner.employee_count_min is None or inner.employee_count_min < outer.employee_count_min
+    ):
+        return False
+    if outer.employee_count_max is not None and (
+        inner.employee_count_max is None or inner.employee_count_max > outer.employee_count_max
+    ):
+        return False
+    return True
+
+
+def _headcount_intersects(a: StatutoryRate, b: StatutoryRate) -> bool:
+    lows = [n for n in (a.employee_count_min, b.employee_count_min) if n is not None]
+    highs = [n for n in (a.employee_count_max, b.employee_count_max) if n is not None]
+    return not lows or not highs or max(lows) <= min(highs)
+
+
+class _Partition:
+    """
+    Sorted breakpoints of one dimension
+
+    A dimension no tier constrains has no keys and a single child.
+    children[0] covers everything below keys[0]; children[i] covers
+    [keys[i - 1], keys[i]); the last child covers keys[-1] and above.
+    """
+
+    __slots__ = ("keys", "children")
+
+    def __init__(self, keys: List[tuple], children: list):
+        self.keys = keys
+        self.children = children
+
+    def find(self, key: tuple):
+        return self.children[bisect_right(self.keys, key)]
+
+
+def _build(rates: Sequence[StatutoryRate], depth: int = 0):
+    """Partition rates on DIMENSIONS[depth:], leaves are priority-ordered tuples"""
+    if depth == len(DIMENSIONS):
+        return tuple(rates)
+
+    bounds = [DIMENSIONS[depth](rate) for rate in rates]
+    points = sorted({b for pair in bounds for b in pair if b is not None})
+
+    keys: List[tuple] = []
+    children = []
+    previous_members = None
+    for i in range(len(points) + 1):
+        start = points[i - 1] if i > 0 else None
+        end = points[i] if i < len(points) else None
+        members = [
+            rate
+            for rate, (lower, upper) in zip(rates, bounds)
+            if (lower is None or (start is not None and lower <= start))
+            and (upper is None or (end is not None and upper >= end))
+        ]
+        ids = [rate.id for rate in members]
+        if ids == previous_members:
+            continue
+        if start is not None:
+            keys.append(start)
+        children.append(_build(members, depth + 1))
+        previous_members = ids
+
+    return _Partition(keys, children)
+
+
+@dataclass
+class TierRegion:
+    """One cell of the compiled structure and the tiers that can match in it"""
+
+    nationality: Optional[NationalityType]
+    risk_category: Optional[RiskCategory]
+    dates: Tuple[Bound, Bound]
+    ages: Tuple[Bound, Bound]
+    salaries: Tuple[Bound, Bound]
+    tiers: Tuple[StatutoryRate, ...]  # Priority order; the first with matching headcount wins
+
+    def describe(self) -> str:
+        """Human-readable summary, e.g. 'CITIZEN/- date [2025-01-01, inf) ... -> EPF_A'"""
+
+        def interval(bounds: Tuple[Bound, Bound]) -> str:
+            lower, upper = bounds
+            left = "(-inf" if lower is None else ("[" if lower[1] == 0 else "(") + str(lower[0])
+            right = "inf)" if upper is None else str(upper[0]) + ("]" if upper[1] == 1 else ")")
+            return f"{left}, {right}"
+
+        nationality = self.nationality.value if self.nationality else "-"
+        risk = self.risk_category.value if self.risk_category else "-"
+        tiers = ", ".join(rate.tier_code for rate in self.tiers) or "(none)"
+        return (
+            f"{nationality}/{risk} date {interval(self.dates)} age {interval(self.ages)} "
+            f"salary {interval(self.salaries)} -> {tiers}"
+        )
+
+
+@dataclass
+class TierDiagnostics:
+    """Problems found while compiling a scheme's rate tiers"""
+
+    # Pairs that can both match the same employee with equal priority, so
+    # only the row id decides between them
+    overlaps: List[Tuple[StatutoryRate, StatutoryRate]]
+    # Tiers that never win for any employee
+    unreachable: List[StatutoryRate]
+
+    @property
+    def clean(self) -> bool:
+        return not self.overlaps and not self.unreachable
+
+
+class CompiledRateTiers:
+    """
+    Rate tiers of one scheme compiled into a decision structure
+
+    Tiers are keyed on (employee nationality, risk category), then split
+    into interval partitions on calculation date, age and salary. Each leaf
+    holds the tiers covering that whole cell in "most specific wins" order,
+    so a lookup is three bisections plus a headcount check on what is almost
+    always a single candidate. Headcount stays a residual check because an
+    unknown headcount means 0 for the minimum and 999999 for the maximum.
+
+    The result is the same tier the SQL query in
+    StatutoryCalculator._find_matching_rate returns.
+    """
+
+    def __init__(self, rates: Iterable[StatutoryRate]):
+        """
+        Compile a scheme's tiers
+
+        Args:
+            rates: The scheme's StatutoryRate rows
+        """
+        self.rates: List[StatutoryRate] = sorted(
+            rates, key=lambda rate: (tier_priority(rate), rate.id)
+        )
+        risks = sorted({r.risk_category for r in self.rates if r.risk_category is not None})
+        self.risk_keys: Tuple[Optional[RiskCategory], ...] = (None, *risks)
+
+        self._trees: Dict[Tuple[Optional[NationalityType], Optional[RiskCategory]], object] = {}
+        for nationality in NATIONALITY_KEYS:
+            for risk in self.risk_keys:
+                candidates = [
+                    rate
+                    for rate in self.rates
+                    if rate.nationality_condition in (NationalityType.ALL, nationality)
+                    and rate.risk_category in (None, risk)
+                ]
+                self._trees[(nationality, risk)] = _build(candidates)
+
+    def find(self, employee: EmployeeContext, calculation_date: date) -> Optional[StatutoryRate]:
+        """Winning tier for an employee on a date, or None"""
+        nationality = employee.nationality
+        if nationality == NationalityType.ALL:
+            nationality = None
+        # A risk category no tier names can only match tiers without one
+        risk = employee.risk_category if employee.risk_category in self.risk_keys else None
+
+        node = self._trees[(nationality, risk)]
+        for key in ((calculation_date, 0), (employee.age, 0), (employee.gross_salary, 0)):
+            node = node.find(key)
+
+        for rate in node:
+            if _headcount_matches(rate, employee.company_employee_count):
+                return rate
+        return None
+
+    def regions(self) -> Iterator[TierRegion]:
+        """Every non-empty cell of the structure, for dumps and reviews"""
+        for (nationality, risk), tree in self._trees.items():
+            for bounds, tiers in self._walk(tree, 0, []):
+                if tiers:
+                    yield TierRegion(nationality, risk, *bounds, tiers)
+
+    def _walk(self, node, depth: int, bounds: list):
+        if depth == len(DIMENSIONS):
+            yield tuple(bounds), node
+            return
+        edges = [None, *node.keys, None]
+        for i, child in enumerate(node.children):
+            yield from self._walk(child, depth + 1, bounds + [(edges[i], edges[i + 1])])
+
+    def diagnostics(self) -> TierDiagnostics:
+        """Find ambiguous overlaps and tiers shadowed everywhere"""
+        overlaps: Dict[Tuple[int, int], Tuple[StatutoryRate, StatutoryRate]] = {}
+        reachable = set()
+
+        for region in self.regions():
+            tiers = region.tiers
+            for i, rate in enumerate(tiers):
+                if not any(_headcount_covers(earlier, rate) for earlier in tiers[:i]):
+                    reachable.add(rate.id)
+            for rate, other in combinations(tiers, 2):
+                if tier_priority(rate) == tier_priority(other) and _headcount_intersects(
+                    rate, other
+                ):
+                    overlaps[(rate.id, other.id)] = (rate, other)
+
+        return TierDiagnostics(
+            overlaps=list(overlaps.values()),
+            unreachable=[rate for rate in self.rates if rate.id not in reachable],
+        )
@@ -0,0 +1,374 @@
+"""
+Calculation Result Store
+========================
+Content-addressed payslip results for idempotent re-runs
+
+Each stored result carries a hash of the employee's normalized calculation
+inputs and the content version of the rule snapshot it was calculated with
+(its rule rows, not the window they were loaded for). A re-run recalculates
+and writes only employees whose input hash changed (an HR edit, a new
+employee, a rule change); everything else is read back as stored. Run totals
+come from the stored results, and a digest over their result hashes tells
+whether two runs produced identical payslips.
+
+Contributions capped by a YtdLedger also depend on earlier months, which the
+input hash does not cover: after correcting an earlier month, use
+StatutoryCalculator.replay_ytd for the later ones.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models.statutory import CalculationFailure, ContributionSummary, EmployeeContext
+from ..utils.sql import validate_identifier
+from .statutory_calculator import StatutoryCalculator
+
+# (employee_id, calculation_date)
+ResultKey = Tuple[str, date]
+
+# (scheme_code, employee_amount, employer_amount)
+SchemeAmounts = Tuple[str, Decimal, Decimal]
+
+
+def _canonical(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, Decimal):
+        return str(value.normalize())  # 5000, 5000.0 and 5000.00 hash alike
+    return str(getattr(value, "value", value))
+
+
+def input_hash(
+    employee: EmployeeContext, calculation_date: date, rule_version: Optional[str]
+) -> str:
+    """SHA-256 of everything a calculation depends on, except YTD ledger state"""
+    values = (
+        employee.country_code,
+        calculation_date.isoformat(),
+        rule_version,
+        employee.nationality,
+        employee.age,
+        employee.gross_salary,
+        employee.basic_salary,
+        employee.ordinary_wages,
+        employee.additional_wages,
+        employee.pr_years,
+        employee.risk_category,
+        employee.company_employee_count,
+    )
+    return hashlib.sha256("|".join(map(_canonical, values)).encode()).hexdigest()
+
+
+def result_hash(summary: ContributionSummary) -> str:
+    """SHA-256 of the calculated amounts and the rule rows behind them"""
+    digest = hashlib.sha256()
+    for c in summary.contributions:
+        values = (
+            c.scheme_code,
+            c.tier_code,
+            c.applied_salary,
+            c.capped,
+            c.employee_amount,
+            c.employer_amount,
+            c.rate_id,
+            c.ceiling_id,
+            c.table_lookup_id,
+        )
+        digest.update(("\n" + "|".join(map(_canonical, values))).encode())
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class StoredResult:
+    """One employee's stored calculation for one date"""
+
+    employee_id: str
+    calculation_date: date
+    country_code: str
+    input_hash: str
+    rule_version: Optional[str]
+    result_hash: str
+    contributions: Tuple[SchemeAmounts, ...]
+
+    @property
+    def key(self) -> ResultKey:
+        return self.employee_id, self.calculation_date
+
+    @property
+    def total_employee_amount(self) -> Decimal:
+        return sum((amounts[1] for amounts in self.contributions), Decimal("0.00"))
+
+    @property
+    def total_employer_amount(self) -> Decimal:
+        return sum((amounts[2] for amounts in self.contributions), Decimal("0.00"))
+
+    @classmethod
+    def of(cls, summary: ContributionSummary, hashed_inputs: str, rule_version: Optional[str]):
+        employee = summary.employee_context
+        return cls(
+            employee_id=employee.employee_id,
+            calculation_date=summary.calculation_date,
+            country_code=summary.country_code,
+            input_hash=hashed_inputs,
+            rule_version=rule_version,
+            result_hash=result_hash(summary),
+            contributions=tuple(
+                (c.scheme_code, c.employee_amount, c.employer_amount) for c in summary.contributions
+            ),
+        )
+
+
+@dataclass
+class RunTotals:
+    """Totals of a set of stored results and a digest identifying them"""
+
+    employees: int = 0
+    total_employee_amount: Decimal = Decimal("0.00")
+    total_employer_amount: Decimal = Decimal("0.00")
+    by_scheme: Dict[str, Tuple[Decimal, Decimal]] = field(default_factory=dict)
+    digest: str = ""
+
+    @classmethod
+    def of(cls, results: Iterable[StoredResult]) -> "RunTotals":
+        totals = cls()
+        digest = hashlib.sha256()
+        for result in sorted(results, key=lambda r: r.key):
+            totals.employees += 1
+            for scheme_code, employee_amount, employer_amount in result.contributions:
+                totals.total_employee_amount += employee_amount
+                totals.total_employer_amount += employer_amount
+                scheme_employee, scheme_employer = totals.by_scheme.get(
+                    scheme_code, (Decimal("0.00"), Decimal("0.00"))
+                )
+                totals.by_scheme[scheme_code] = (
+                    scheme_employee + employee_amount,
+                    scheme_employer + employer_amount,
+                )
+            digest.update(
+                f"{result.employee_id}|{result.calculation_date}|{result.result_hash}\n".encode()
+            )
+        totals.digest = digest.hexdigest()
+        return totals
+
+
+class ResultStore:
+    """In-memory result store; subclasses persist results elsewhere"""
+
+    def __init__(self):
+        self._results: Dict[ResultKey, StoredResult] = {}
+
+    def get_many(self, keys: Iterable[ResultKey]) -> Dict[ResultKey, StoredResult]:
+        """Stored results for the keys that have one"""
+        found = {}
+        for key in keys:
+            result = self._results.get(key)
+            if result is not None:
+                found[key] = result
+        return found
+
+    def put_many(self, results: Iterable[StoredResult]) -> None:
+        """Insert or replace results"""
+        for result in results:
+            self._results[result.key] = result
+
+    def totals(self, keys: Iterable[ResultKey]) -> RunTotals:
+        """Run totals from the stored results of these keys"""
+        return RunTotals.of(self.get_many(keys).values())
+
+
+class DatabaseResultStore(ResultStore):
+    """
+    Results in a kf_statutory_result table (database/migrations/015)
+
+    Lookups are one query per calculation date; writes are one executemany
+    upsert on (employee_id, calculation_date), committed per call.
+    """
+
+    COLUMNS = (
+        "employee_id",
+        "calculation_date",
+        "country_code",
+        "input_hash",
+        "rule_version",
+        "result_hash",
+        "total_employee_amount",
+        "total_employer_amount",
+        "contributions",
+    )
+
+    def __init__(self, db_connection, table: str = "kf_statutory_result"):
+        validate_identifier(table)
+        self.db = db_connection
+        self.table = table
+        columns = ", ".join(self.COLUMNS)
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in self.COLUMNS[2:])
+        self._upsert = (
+            f"INSERT INTO {table} ({columns}, calculated_at) "
+            f"VALUES ({', '.join(['%s'] * len(self.COLUMNS))}, now()) "
+            f"ON CONFLICT (employee_id, calculation_date) DO UPDATE SET {updates}, "
+            f"calculated_at = now()"
+        )
+
+    def get_many(self, keys: Iterable[ResultKey]) -> Dict[ResultKey, StoredResult]:
+        by_date: Dict[date, List[str]] = {}
+        for employee_id, on in keys:
+            by_date.setdefault(on, []).append(employee_id)
+
+        found = {}
+        cursor = self.db.cursor()
+        try:
+            for on, employee_ids in by_date.items():
+                cursor.execute(
+                    f"""
+                    SELECT {", ".join(self.COLUMNS)}
+                    FROM {self.table}
+                    WHERE calculation_date = %s AND employee_id = ANY(%s)
+                    """,
+                    (on, employee_ids),
+                )
+                for row in cursor.fetchall():
+                    result = self._parse_row(row)
+                    found[result.key] = result
+        finally:
+            cursor.close()
+        return found
+
+    def put_many(self, results: Iterable[StoredResult]) -> None:
+        rows = [self._row(result) for result in results]
+        if not rows:
+            return
+        cursor = self.db.cursor()
+        try:
+            cursor.executemany(self._upsert, rows)
+        finally:
+            cursor.close()
+        self.db.commit()
+
+    @staticmethod
+    def _row(result: StoredResult) -> tuple:
+        contributions = [
+            [scheme_code, str(employee_amount), str(employer_amount)]
+            for scheme_code, employee_amount, employer_amount in result.contributions
+        ]
+        return (
+            result.employee_id,
+            result.calculation_date,
+            result.country_code,
+            result.input_hash,
+            result.rule_version,
+            result.result_hash,
+            result.total_employee_amount,
+            result.total_employer_amount,
+            json.dumps(contributions),
+        )
+
+    @staticmethod
+    def _parse_row(row: tuple) -> StoredResult:
+        contributions = row[8]
+        if isinstance(contributions, str):
+            contributions = json.loads(contributions)
+        return StoredResult(
+            employee_id=row[0],
+            calculation_date=row[1],
+            country_code=row[2],
+            input_hash=row[3],
+            rule_version=row[4],
+            result_hash=row[5],
+            contributions=tuple(
+                (scheme_code, Decimal(employee_amount), Decimal(employer_amount))
+                for scheme_code, employee_amount, employer_amount in contributions
+            ),
+        )
+
+
+@dataclass
+class PayRunReport:
+    """Outcome of an IncrementalPayRun"""
+
+    calculated: int = 0  # Employees whose inputs changed (or were new)
+    skipped: int = 0  # Employees whose stored result was reused
+    changed: int = 0  # Calculated employees whose amounts differ from the stored ones
+    failures: List[CalculationFailure] = field(default_factory=list)
+    totals: RunTotals = field(default_factory=RunTotals)
+
+
+class IncrementalPayRun:
+    """
+    Pay run that recalculates only employees whose input hash changed
+
+    Every employee needs an employee_id. Rules are hashed by snapshot
+    content version, so the countries in a run need a snapshot covering its dates;
+    with a database connection the calculator loads one for the duration of
+    the run. Employees without one are always recalculated.
+    """
+
+    def __init__(self, calculator: StatutoryCalculator, store: ResultStore):
+        self.calculator = calculator
+        self.store = store
+
+    def run(
+        self, employees: Iterable[EmployeeContext], calculation_date: Optional[date] = None
+    ) -> PayRunReport:
+        """
+        Calculate changed employees, store their results and total the run
+
+        Args:
+            employees: Employee contexts of the pay run
+            calculation_date: Date for rate lookup (defaults to each
+                employee's calculation_date)
+
+        Returns:
+            PayRunReport; totals cover every employee of the run that has a
+            stored result, calculated now or earlier
+        """
+        employees = list(employees)
+        dates = [calculation_date or e.calculation_date or date.today() for e in employees]
+        for employee in employees:
+            if employee.employee_id is None:
+                raise ValueError("IncrementalPayRun needs an employee_id for every employee")
+
+        calculator = self.calculator
+        with calculator.batch_snapshots(employees, calculation_date):
+            versions = [
+                calculator.rule_content_version(e.country_code, on)
+                for e, on in zip(employees, dates)
+            ]
+            hashes = [input_hash(e, on, v) for e, on, v in zip(employees, dates, versions)]
+            keys = [(e.employee_id, on) for e, on in zip(employees, dates)]
+            stored = self.store.get_many(keys)
+
+            pending = [
+                index
+                for index, key in enumerate(keys)
+                if versions[index] is None
+                or key not in stored
+                or stored[key].input_hash != hashes[index]
+            ]
+            batch = calculator.calculate_batch(
+                [employees[index] for index in pending], calculation_date
+            )
+
+        report = PayRunReport(calculated=len(pending), skipped=len(employees) - len(pending))
+        written = []
+        for position, summary in enumerate(batch.results):
+            index = pending[position]
+            if summary is None:
+                continue
+            result = StoredResult.of(summary, hashes[index], versions[index])
+            previous = stored.get(keys[index])
+            if previous is None or previous.result_hash != result.result_hash:
+                report.changed += 1
+            written.append(result)
+            stored[keys[index]] = result
+        for failure in batch.failures:
+            failure.index = pending[failure.index]
+            stored.pop(keys[failure.index], None)
+            report.failures.append(failure)
+
+        self.store.put_many(written)
+        report.totals = RunTotals.of(stored[key] for key in dict.fromkeys(keys) if key in stored)
+        return report
@@ -0,0 +1,490 @@
+"""
+Retro Recalculation
+===================
+Dependency index over stored contributions and incremental recalculation
+after a statutory rule row is corrected
+
+Every StatutoryContribution names the scheme, rate tier, MONTHLY ceiling and
+wage band rows it was calculated from. DependencyIndex keeps stored payslip
+summaries indexed by those row ids and by calculation date, so a corrected
+row maps to the payslips it can change:
+
+- a row whose matching conditions and validity are unchanged (a corrected
+  rate, amount or band amount) affects only the payslips that used it, and a
+  corrected ceiling amount only those whose wage base exceeds the lower of
+  the old and new amount;
+- a row whose conditions or validity moved also affects the payslips of its
+  validity window it now matches (for a band, whose wage base it covers);
+- ANNUAL and AW_ANNUAL ceilings affect the scheme's payslips in their
+  validity window, scheme rows every payslip of the country in theirs;
+- metadata-only rate edits (source_reference, verified_date, notes) and
+  ceiling types the calculator never reads affect nothing.
+
+RetroRecalculator recalculates only those payslips with the corrected rules
+and returns a before/after arrears diff for each one that changed.
+"""
+
+import logging
+from dataclasses import dataclass, field, fields
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from ..models.statutory import ContributionSummary, StatutoryContribution, StatutoryRate
+from .rule_snapshot import (
+    RuleSnapshot,
+    parse_ceiling_row,
+    parse_rate_row,
+    parse_scheme_row,
+    parse_table_lookup_row,
+    rate_matches,
+)
+from .statutory_calculator import StatutoryCalculator
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal("0.00")
+
+# Identifies one stored payslip: (employee_id, calculation_date) by default
+RecordKey = Hashable
+
+# Fields deciding which employees and dates a row applies to
+RATE_SCOPE = (
+    "scheme_id",
+    "min_age",
+    "max_age",
+    "min_salary",
+    "max_salary",
+    "nationality_condition",
+    "pr_year_condition",
+    "risk_category",
+    "employee_count_min",
+    "employee_count_max",
+    "effective_from",
+    "effective_until",
+)
+CEILING_SCOPE = ("scheme_id", "ceiling_type", "effective_from", "effective_until")
+BAND_SCOPE = ("scheme_id", "wage_from", "wage_to", "effective_from", "effective_until")
+
+# Rate fields no calculation reads, and every other one
+RATE_METADATA = ("source_reference", "verified_date", "notes")
+RATE_CALCULATED = tuple(f.name for f in fields(StatutoryRate) if f.name not in RATE_METADATA)
+
+# Ceilings enforced through the YTD ledger, so not recorded per contribution
+ANNUAL_CEILING_TYPES = ("ANNUAL", "AW_ANNUAL")
+
+ROW_PARSERS = {
+    "rate": parse_rate_row,
+    "ceiling": parse_ceiling_row,
+    "table_lookup": parse_table_lookup_row,
+}
+
+
+@dataclass
+class RuleChange:
+    """
+    One inserted, corrected or deleted rule row
+
+    kind is a RuleSnapshot.rows key ("scheme", "rate", "ceiling" or
+    "table_lookup"); before is None for an insert, after None for a delete.
+    """
+
+    country_code: str
+    kind: str
+    before: Optional[object] = None
+    after: Optional[object] = None
+
+    @property
+    def row_id(self) -> int:
+        return (self.after if self.after is not None else self.before).id
+
+    @property
+    def rows(self) -> List[object]:
+        """The old and new versions of the row that exist"""
+        return [row for row in (self.before, self.after) if row is not None]
+
+    def changed(self, names: Sequence[str]) -> bool:
+        """True unless both versions exist and agree on every named field"""
+        if self.before is None or self.after is None:
+            return True
+        return any(getattr(self.before, name) != getattr(self.after, name) for name in names)
+
+
+def diff_snapshots(before: RuleSnapshot, after: RuleSnapshot) -> List[RuleChange]:
+    """
+    Rule rows inserted, changed or deleted between two snapshots of a country
+
+    Args:
+        before: Snapshot the stored contributions were calculated with
+        after: Snapshot holding the corrected rules
+
+    Returns:
+        One RuleChange per differing row id, by kind and id
+    """
+    if before.country_code != after.country_code:
+        raise ValueError(f"Cannot diff {before.country_code} against {after.country_code}")
+
+    country_code = after.country_code
+    changes = []
+    for kind in ("scheme", "rate", "ceiling", "table_lookup"):
+        old = {row[0]: row for row in before.rows[kind]}
+        new = {row[0]: row for row in after.rows[kind]}
+        for row_id in sorted(old.keys() | new.keys()):
+            if old.get(row_id) == new.get(row_id):
+                continue
+            versions = [
+                _parse(kind, rows[row_id], country_code) if row_id in rows else None
+                for rows in (old, new)
+            ]
+            changes.append(RuleChange(country_code, kind, *versions))
+    return changes
+
+
+def _parse(kind: str, row: tuple, country_code: str) -> object:
+    if kind == "scheme":
+        return parse_scheme_row(row, country_code)
+    return ROW_PARSERS[kind](row)
+
+
+def _in_effect(row, on: date) -> bool:
+    return row.effective_from <= on and (row.effective_until is None or row.effective_until >= on)
+
+
+def _contribution(summary: ContributionSummary, scheme_id: int) -> Optional[StatutoryContribution]:
+    for contribution in summary.contributions:
+        if contribution.scheme_id == scheme_id:
+            return contribution
+    return None
+
+
+def _add(index: dict, row_id, key: RecordKey) -> None:
+    index.setdefault(row_id, set()).add(key)
+
+
+def _remove(index: dict, row_id, key: RecordKey) -> None:
+    keys = index.get(row_id)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del index[row_id]
+
+
+def record_key(summary: ContributionSummary) -> RecordKey:
+    """Default payslip key: (employee_id, calculation_date)"""
+    employee_id = summary.employee_context.employee_id
+    if employee_id is None:
+        raise ValueError("Summaries without an employee_id need an explicit key")
+    return employee_id, summary.calculation_date
+
+
+class DependencyIndex:
+    """
+    Stored payslip summaries indexed by the rule rows they depend on
+
+    Keys identify payslips (a payslip id, or (employee_id, calculation_date)
+    by default); adding a summary under an existing key replaces it.
+    """
+
+    def __init__(self):
+        self._summaries: Dict[RecordKey, ContributionSummary] = {}
+        self._by_rate: Dict[int, Set[RecordKey]] = {}
+        self._by_ceiling: Dict[int, Set[RecordKey]] = {}
+        self._by_band: Dict[int, Set[RecordKey]] = {}
+        # scheme id / country code -> calculation date -> keys
+        self._by_scheme: Dict[int, Dict[date, Set[RecordKey]]] = {}
+        self._by_country: Dict[str, Dict[date, Set[RecordKey]]] = {}
+        # (employee_id, year) -> keys, for YTD-dependent later months
+        self._by_employee_year: Dict[Tuple[str, int], Set[RecordKey]] = {}
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def __contains__(self, key: RecordKey) -> bool:
+        return key in self._summaries
+
+    def get(self, key: RecordKey) -> Optional[ContributionSummary]:
+        return self._summaries.get(key)
+
+    def add(self, summary: ContributionSummary, key: Optional[RecordKey] = None) -> RecordKey:
+        """Store a summary (replacing the key's previous one) and index its rule rows"""
+        if key is None:
+            key = record_key(summary)
+        self.discard(key)
+        self._summaries[key] = summary
+
+        on = summary.calculation_date
+        _add(self._by_country.setdefault(summary.country_code, {}), on, key)
+        employee_id = summary.employee_context.employee_id
+        if employee_id is not None:
+            _add(self._by_employee_year, (employee_id, on.year), key)
+        for contribution in summary.contributions:
+            if contribution.scheme_id is not None:
+                _add(self._by_scheme.setdefault(contribution.scheme_id, {}), on, key)
+            for index, row_id in self._row_ids(contribution):
+                if row_id is not None:
+                    _add(index, row_id, key)
+        return key
+
+    def discard(self, key: RecordKey) -> None:
+        """Forget a stored summary (no-op for unknown keys)"""
+        summary = self._summaries.pop(key, None)
+        if summary is None:
+            return
+
+        on = summary.calculation_date
+        _remove(self._by_country.get(summary.country_code, {}), on, key)
+        employee_id = summary.employee_context.employee_id
+        if employee_id is not None:
+            _remove(self._by_employee_year, (employee_id, on.year), key)
+        for contribution in summary.contributions:
+            if contribution.scheme_id is not None:
+                _remove(self._by_scheme.get(contribution.scheme_id, {}), on, key)
+            for index, row_id in self._row_ids(contribution):
+                _remove(index, row_id, key)
+
+    def _row_ids(self, contribution: StatutoryContribution) -> Iterator[Tuple[dict, Optional[int]]]:
+        yield self._by_rate, contribution.rate_id
+        yield self._by_ceiling, contribution.ceiling_id
+        yield self._by_band, contribution.table_lookup_id
+
+    def users(self, kind: str, row_id: int) -> Set[RecordKey]:
+        """Keys of the payslips calculated from a rate, ceiling or table_lookup row"""
+        index = {"rate": self._by_rate, "ceiling": self._by_ceiling, "table_lookup": self._by_band}
+        return set(index[kind].get(row_id, ()))
+
+    def affected(self, change: RuleChange) -> Set[RecordKey]:
+        """Keys of the stored payslips a rule change can alter"""
+        if change.kind == "rate":
+            return self._affected_by_rate(change)
+        if change.kind == "ceiling":
+            return self._affected_by_ceiling(change)
+        if change.kind == "table_lookup":
+            return self._affected_by_band(change)
+        if change.kind == "scheme":
+            return set(self._dated(self._by_country.get(change.country_code, {}), change.rows))
+        raise ValueError(f"Unknown rule kind: {change.kind}")
+
+    def later_in_year(self, key: RecordKey) -> Set[RecordKey]:
+        """Keys of the same employee's payslips later in the key's calendar year"""
+        summary = self._summaries[key]
+        employee_id = summary.employee_context.employee_id
+        if employee_id is None:
+            return set()
+        on = summary.calculation_date
+        return {
+            later
+            for later in self._by_employee_year.get((employee_id, on.year), ())
+            if self._summaries[later].calculation_date > on
+        }
+
+    def _affected_by_rate(self, change: RuleChange) -> Set[RecordKey]:
+        if not change.changed(RATE_CALCULATED):
+            return set()  # Metadata only
+        keys = self.users("rate", change.before.id) if change.before is not None else set()
+        if not change.changed(RATE_SCOPE):
+            return keys
+        rate = change.after
+        if rate is not None:
+            for key in self._dated(self._by_country.get(change.country_code, {}), [rate]):
+                summary = self._summaries[key]
+                if rate_matches(rate, summary.employee_context, summary.calculation_date):
+                    keys.add(key)
+        return keys
+
+    def _affected_by_ceiling(self, change: RuleChange) -> Set[RecordKey]:
+        keys: Set[RecordKey] = set()
+        for row in change.rows:
+            if row.ceiling_type in ANNUAL_CEILING_TYPES:
+                keys.update(self._dated(self._by_scheme.get(row.scheme_id, {}), [row]))
+        if not any(row.ceiling_type == "MONTHLY" for row in change.rows):
+            return keys
+
+        before, after = change.before, change.after
+        if not change.changed(CEILING_SCOPE):
+            # Only the amount moved: payslips at or under both amounts are unchanged
+            if before.ceiling_amount != after.ceiling_amount:
+                threshold = min(before.ceiling_amount, after.ceiling_amount)
+                for key in self.users("ceiling", before.id):
+                    contribution = _contribution(self._summaries[key], before.scheme_id)
+                    if contribution is None or contribution.calculation_base_amount > threshold:
+                        keys.add(key)
+            return keys
+
+        if before is not None:
+            keys.update(self.users("ceiling", before.id))
+        for row in change.rows:
+            if row.ceiling_type == "MONTHLY":
+                keys.update(self._dated(self._by_scheme.get(row.scheme_id, {}), [row]))
+        return keys
+
+    def _affected_by_band(self, change: RuleChange) -> Set[RecordKey]:
+        keys = self.users("table_lookup", change.before.id) if change.before is not None else set()
+        if not change.changed(BAND_SCOPE):
+            return keys
+        band = change.after
+        if band is not None:
+            for key in self._dated(self._by_scheme.get(band.scheme_id, {}), [band]):
+                contribution = _contribution(self._summaries[key], band.scheme_id)
+                if contribution is not None and (
+                    band.wage_from <= contribution.calculation_base_amount <= band.wage_to
+                ):
+                    keys.add(key)
+        return keys
+
+    @staticmethod
+    def _dated(by_date: Dict[date, Set[RecordKey]], rows: Sequence[object]) -> Iterator[RecordKey]:
+        """Keys calculated on a date inside any of the rows' validity"""
+        for on, keys in by_date.items():
+            if any(_in_effect(row, on) for row in rows):
+                yield from keys
+
+
+@dataclass
+class ArrearsDiff:
+    """Before/after amounts of one recalculated payslip"""
+
+    key: RecordKey
+    before: ContributionSummary
+    after: ContributionSummary
+
+    @property
+    def calculation_date(self) -> date:
+        return self.after.calculation_date
+
+    @property
+    def employee_arrears(self) -> Decimal:
+        """Employee contribution still owed (negative: overpaid)"""
+        return self.after.total_employee_amount - self.before.total_employee_amount
+
+    @property
+    def employer_arrears(self) -> Decimal:
+        return self.after.total_employer_amount - self.before.total_employer_amount
+
+    def scheme_deltas(self) -> Dict[str, Tuple[Decimal, Decimal]]:
+        """(employee, employer) change per scheme code whose amounts changed"""
+        amounts: Dict[str, List[Decimal]] = {}
+        for sign, summary in ((-1, self.before), (1, self.after)):
+            for contribution in summary.contributions:
+                totals = amounts.setdefault(contribution.scheme_code, [ZERO, ZERO])
+                totals[0] += sign * contribution.employee_amount
+                totals[1] += sign * contribution.employer_amount
+        return {code: (ee, er) for code, (ee, er) in sorted(amounts.items()) if ee or er}
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.scheme_deltas())
+
+
+@dataclass
+class RetroResult:
+    """Outcome of recalculating the payslips affected by rule changes"""
+
+    changes: List[RuleChange]
+    recalculated: int = 0  # Payslips recalculated (affected slice)
+    diffs: List[ArrearsDiff] = field(default_factory=list)  # Payslips whose amounts changed
+    failures: Dict[RecordKey, str] = field(default_factory=dict)  # Kept at their stored values
+
+    @property
+    def employee_arrears(self) -> Decimal:
+        return sum((diff.employee_arrears for diff in self.diffs), ZERO)
+
+    @property
+    def employer_arrears(self) -> Decimal:
+        return sum((diff.employer_arrears for diff in self.diffs), ZERO)
+
+    def by_employee(self) -> Dict[Optional[str], Tuple[Decimal, Decimal]]:
+        """(employee, employer) arrears per employee_id"""
+        totals: Dict[Optional[str], Tuple[Decimal, Decimal]] = {}
+        for diff in self.diffs:
+            employee_id = diff.after.employee_context.employee_id
+            ee, er = totals.get(employee_id, (ZERO, ZERO))
+            totals[employee_id] = (ee + diff.employee_arrears, er + diff.employer_arrears)
+        return totals
+
+
+class RetroRecalculator:
+    """
+    Recalculates the stored payslips affected by rule changes
+
+    The calculator must already answer with the corrected rules (corrected
+    snapshot installed, or the database updated). Recalculated summaries
+    replace the stored ones in the index, so successive corrections build on
+    each other.
+    """
+
+    def __init__(self, calculator: StatutoryCalculator, index: DependencyIndex):
+        self.calculator = calculator
+        self.index = index
+
+    def affected(self, changes: Iterable[RuleChange]) -> Set[RecordKey]:
+        """
+        Keys of the payslips to recalculate for a set of changes
+
+        With a YTD ledger, later months of the same employee and year are
+        included: their annual ceiling room depends on the corrected month.
+        """
+        keys: Set[RecordKey] = set()
+        for change in changes:
+            keys.update(self.index.affected(change))
+        if self.calculator.ledger is not None:
+            for key in list(keys):
+                keys.update(self.index.later_in_year(key))
+        return keys
+
+    def apply(self, changes: Iterable[RuleChange]) -> RetroResult:
+        """
+        Recalculate the affected payslips and diff them against the stored ones
+
+        Payslips are recalculated in calculation date order, one batch per
+        date, so a YTD ledger sees the months of a year in pay-run order.
+
+        Args:
+            changes: Rule rows inserted, corrected or deleted
+
+        Returns:
+            RetroResult with a diff for every payslip whose amounts changed
+        """
+        changes = list(changes)
+        result = RetroResult(changes=changes)
+
+        by_date: Dict[date, List[RecordKey]] = {}
+        for key in self.affected(changes):
+            by_date.setdefault(self.index.get(key).calculation_date, []).append(key)
+
+        replayed: Set[Tuple[str, int]] = set()
+        for on in sorted(by_date):
+            keys = sorted(by_date[on], key=repr)
+            befores = [self.index.get(key) for key in keys]
+            batch = self.calculator.calculate_batch(
+                [summary.employee_context for summary in befores], calculation_date=on
+            )
+            failures = {failure.index: failure.error for failure in batch.failures}
+            for position, (key, before, after) in enumerate(zip(keys, befores, batch.results)):
+                result.recalculated += 1
+                if after is None:
+                    result.failures[key] = failures.get(position, "not calculated")
+                    continue
+                self.index.add(after, key)
+                diff = ArrearsDiff(key, before, after)
+                if diff.changed:
+                    result.diffs.append(diff)
+                employee_id = after.employee_context.employee_id
+                if employee_id is not None:
+                    replayed.add((employee_id, on.year))
+
+        if self.calculator.ledger is not None:
+            # Every later month of the affected years was recalculated above
+            for employee_id, year in replayed:
+                self.calculator.ledger.mark_replayed(employee_id, year)
+
+        logger.info(
+            f"Retro recalculation: {len(changes)} rule changes, {result.recalculated} of "
+            f"{len(self.index)} payslips recalculated, {len(result.diffs)} changed"
+        )
+        return result
+
+    def apply_snapshot(self, before: RuleSnapshot, after: RuleSnapshot) -> RetroResult:
+        """Install a corrected snapshot and recalculate what its changed rows affect"""
+        changes = diff_snapshots(before, after)
+        self.calculator.use_snapshot(after)
+        return self.apply(changes)
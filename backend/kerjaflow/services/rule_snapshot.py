@@ -0,0 +1,484 @@
+"""
+Rule Snapshot
+=============
+Preloaded in-memory copy of the statutory rule tables for one country
+"""
+
+import hashlib
+import logging
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..models.statutory import (
+    CalculationBase,
+    CalculationMethod,
+    EmployeeContext,
+    NationalityType,
+    RiskCategory,
+    RoundingMethod,
+    SchemeType,
+    StatutoryCeiling,
+    StatutoryRate,
+    StatutoryScheme,
+    StatutoryTableLookup,
+)
+from .rate_tiers import CompiledRateTiers
+from .wage_band_index import SchemeBandTable
+
+logger = logging.getLogger(__name__)
+
+# Column lists shared by the snapshot loader and the row parsers below.
+# Row tuples must follow exactly this order.
+SCHEME_COLUMNS = """
+    id, country_id, authority_id, code, name_en, name_local,
+    description, scheme_type, calculation_method, calculation_base,
+    employee_contribution, employer_contribution,
+    citizen_applicable, pr_applicable, foreign_worker_applicable,
+    member_number_required, member_number_label,
+    rounding_method, rounding_precision,
+    effective_from, effective_until, legal_reference, notes,
+    sort_order
+"""
+
+RATE_COLUMNS = """
+    id, scheme_id, tier_code, tier_description,
+    min_age, max_age, min_salary, max_salary,
+    nationality_condition, pr_year_condition,
+    risk_category, employee_count_min, employee_count_max,
+    employee_rate, employer_rate, employee_fixed, employer_fixed, total_rate,
+    effective_from, effective_until,
+    source_reference, verified_date, notes
+"""
+
+CEILING_COLUMNS = """
+    id, scheme_id, ceiling_type, ceiling_amount, min_amount,
+    effective_from, effective_until
+"""
+
+TABLE_LOOKUP_COLUMNS = """
+    id, scheme_id, wage_from, wage_to, category,
+    employee_amount, employer_amount, effective_from, effective_until
+"""
+
+
+def parse_scheme_row(row: tuple, country_code: str = "") -> StatutoryScheme:
+    """Parse a kf_statutory_scheme row (SCHEME_COLUMNS order)"""
+    return StatutoryScheme(
+        id=row[0],
+        country_code=country_code,
+        authority_id=row[2],
+        code=row[3],
+        name_en=row[4],
+        name_local=row[5],
+        description=row[6],
+        scheme_type=SchemeType(row[7]),
+        calculation_method=CalculationMethod(row[8]),
+        calculation_base=CalculationBase(row[9]),
+        employee_contribution=row[10],
+        employer_contribution=row[11],
+        citizen_applicable=row[12],
+        pr_applicable=row[13],
+        foreign_worker_applicable=row[14],
+        member_number_required=row[15],
+        member_number_label=row[16],
+        rounding_method=RoundingMethod(row[17]),
+        rounding_precision=row[18],
+        effective_from=row[19],
+        effective_until=row[20],
+        legal_reference=row[21],
+        notes=row[22],
+    )
+
+
+def parse_rate_row(row: tuple) -> StatutoryRate:
+    """Parse a kf_statutory_rate row (RATE_COLUMNS order)"""
+    return StatutoryRate(
+        id=row[0],
+        scheme_id=row[1],
+        tier_code=row[2],
+        tier_description=row[3],
+        min_age=row[4],
+        max_age=row[5],
+        min_salary=Decimal(str(row[6])) if row[6] else None,
+        max_salary=Decimal(str(row[7])) if row[7] else None,
+        nationality_condition=NationalityType(row[8]) if row[8] else NationalityType.ALL,
+        pr_year_condition=row[9],
+        risk_category=RiskCategory(row[10]) if row[10] else None,
+        employee_count_min=row[11],
+        employee_count_max=row[12],
+        employee_rate=Decimal(str(row[13])) if row[13] else None,
+        employer_rate=Decimal(str(row[14])) if row[14] else None,
+        employee_fixed=Decimal(str(row[15])) if row[15] else None,
+        employer_fixed=Decimal(str(row[16])) if row[16] else None,
+        total_rate=Decimal(str(row[17])) if row[17] else None,
+        effective_from=row[18],
+        effective_until=row[19],
+        source_reference=row[20],
+        verified_date=row[21],
+        notes=row[22],
+    )
+
+
+def parse_ceiling_row(row: tuple) -> StatutoryCeiling:
+    """Parse a kf_statutory_ceiling row (CEILING_COLUMNS order)"""
+    return StatutoryCeiling(
+        id=row[0],
+        scheme_id=row[1],
+        ceiling_type=row[2],
+        ceiling_amount=Decimal(str(row[3])),
+        min_amount=Decimal(str(row[4])) if row[4] else None,
+        effective_from=row[5],
+        effective_until=row[6],
+    )
+
+
+def parse_table_lookup_row(row: tuple) -> StatutoryTableLookup:
+    """Parse a kf_statutory_table_lookup row (TABLE_LOOKUP_COLUMNS order)"""
+    return StatutoryTableLookup(
+        id=row[0],
+        scheme_id=row[1],
+        wage_from=Decimal(str(row[2])),
+        wage_to=Decimal(str(row[3])),
+        category=row[4],
+        employee_amount=Decimal(str(row[5])),
+        employer_amount=Decimal(str(row[6])),
+        effective_from=row[7],
+        effective_until=row[8],
+    )
+
+
+def _in_effect(effective_from: date, effective_until: Optional[date], on: date) -> bool:
+    """Same validity test the SQL lookups use"""
+    return effective_from <= on and (effective_until is None or effective_until >= on)
+
+
+def rate_matches(rate: StatutoryRate, employee: EmployeeContext, calculation_date: date) -> bool:
+    """Python equivalent of the WHERE clause in StatutoryCalculator._find_matching_rate"""
+    if not _in_effect(rate.effective_from, rate.effective_until, calculation_date):
+        return False
+    if rate.min_age is not None and rate.min_age > employee.age:
+        return False
+    if rate.max_age is not None and rate.max_age < employee.age:
+        return False
+    if rate.min_salary is not None and rate.min_salary > employee.gross_salary:
+        return False
+    if rate.max_salary is not None and rate.max_salary < employee.gross_salary:
+        return False
+
+    nationality = employee.nationality.value if employee.nationality else "ALL"
+    if rate.nationality_condition != NationalityType.ALL and (
+        rate.nationality_condition.value != nationality
+    ):
+        return False
+
+    # NULL = NULL is not true in SQL, so an employee without a risk category
+    # only matches tiers that carry no risk condition
+    if rate.risk_category is not None and (
+        employee.risk_category is None or rate.risk_category != employee.risk_category
+    ):
+        return False
+
+    if rate.employee_count_min is not None and rate.employee_count_min > (
+        employee.company_employee_count or 0
+    ):
+        return False
+    if rate.employee_count_max is not None and rate.employee_count_max < (
+        employee.company_employee_count or 999999
+    ):
+        return False
+
+    return True
+
+
+class RuleSnapshot:
+    """
+    Immutable in-memory copy of one country's statutory rules
+
+    Holds kf_statutory_scheme, kf_statutory_rate, kf_statutory_ceiling and
+    kf_statutory_table_lookup rows whose validity overlaps
+    [valid_from, valid_until], indexed by scheme id. Every lookup the
+    calculator needs is answered from memory.
+
+    The version is a SHA-256 digest of the rule rows and the validity window,
+    so two snapshots of unchanged data share a version and any edit to a rule
+    row produces a new one. content_version digests the rule rows alone: it
+    is the same for snapshots of identical rules loaded over different
+    windows.
+    """
+
+    def __init__(
+        self,
+        country_code: str,
+        valid_from: date,
+        valid_until: date,
+        scheme_rows: Sequence[tuple],
+        rate_rows: Sequence[tuple] = (),
+        ceiling_rows: Sequence[tuple] = (),
+        table_lookup_rows: Sequence[tuple] = (),
+    ):
+        """
+        Build a snapshot from raw table rows
+
+        Args:
+            country_code: ISO 2-letter country code
+            valid_from: First calculation date the snapshot may answer for
+            valid_until: Last calculation date the snapshot may answer for
+            scheme_rows: kf_statutory_scheme rows in SCHEME_COLUMNS order
+            rate_rows: kf_statutory_rate rows in RATE_COLUMNS order
+            ceiling_rows: kf_statutory_ceiling rows in CEILING_COLUMNS order
+            table_lookup_rows: kf_statutory_table_lookup rows in TABLE_LOOKUP_COLUMNS order
+        """
+        if valid_until < valid_from:
+            raise ValueError(f"Snapshot window ends before it starts: {valid_from} > {valid_until}")
+
+        self.country_code = country_code
+        self.valid_from = valid_from
+        self.valid_until = valid_until
+        self.loaded_at = datetime.now()
+
+        # Matches ORDER BY sort_order, code of the scheme query
+        ordered_scheme_rows = sorted(scheme_rows, key=lambda r: (r[23] or 0, r[3]))
+        self.rows = {
+            "scheme": tuple(tuple(r) for r in ordered_scheme_rows),
+            "rate": tuple(sorted((tuple(r) for r in rate_rows), key=lambda r: r[0])),
+            "ceiling": tuple(sorted((tuple(r) for r in ceiling_rows), key=lambda r: r[0])),
+            "table_lookup": tuple(
+                sorted((tuple(r) for r in table_lookup_rows), key=lambda r: r[0])
+            ),
+        }
+        self.content_version = self._compute_version(window=False)
+        self.version = self._compute_version()
+
+        self.schemes: List[StatutoryScheme] = [
+            parse_scheme_row(row, country_code) for row in self.rows["scheme"]
+        ]
+        self._scheme_ids = {scheme.id for scheme in self.schemes}
+
+        rates_by_scheme: Dict[int, List[StatutoryRate]] = {}
+        for row in self.rows["rate"]:
+            rate = parse_rate_row(row)
+            rates_by_scheme.setdefault(rate.scheme_id, []).append(rate)
+        self._tiers: Dict[int, CompiledRateTiers] = {
+            scheme_id: CompiledRateTiers(rates) for scheme_id, rates in rates_by_scheme.items()
+        }
+        self._report_tier_problems()
+
+        self._ceilings: Dict[Tuple[int, str], List[StatutoryCeiling]] = {}
+        for row in self.rows["ceiling"]:
+            ceiling = parse_ceiling_row(row)
+            self._ceilings.setdefault((ceiling.scheme_id, ceiling.ceiling_type), []).append(ceiling)
+        for ceilings in self._ceilings.values():
+            ceilings.sort(key=lambda c: c.effective_from, reverse=True)
+
+        self._table_lookups: Dict[int, List[StatutoryTableLookup]] = {}
+        for row in self.rows["table_lookup"]:
+            band = parse_table_lookup_row(row)
+            self._table_lookups.setdefault(band.scheme_id, []).append(band)
+
+        # Bisection indexes, built on first lookup per scheme
+        self._band_tables: Dict[int, SchemeBandTable] = {}
+        self._boundaries: Optional[Tuple[date, ...]] = None
+
+    @classmethod
+    def load(
+        cls, db_connection, country_code: str, valid_from: date, valid_until: date
+    ) -> "RuleSnapshot":
+        """
+        Load a snapshot for one country with four queries
+
+        Args:
+            db_connection: Database connection object (psycopg2 or similar)
+            country_code: ISO 2-letter country code
+            valid_from: First calculation date to cover
+            valid_until: Last calculation date to cover
+
+        Returns:
+            RuleSnapshot covering [valid_from, valid_until]
+        """
+        cursor = db_connection.cursor()
+        try:
+            cursor.execute(
+                f"""
+                SELECT {SCHEME_COLUMNS}
+                FROM kf_statutory_scheme
+                WHERE country_id = (SELECT id FROM kf_country WHERE code = %s)
+                  AND effective_from <= %s
+                  AND (effective_until IS NULL OR effective_until >= %s)
+                  AND is_active = true
+                ORDER BY sort_order, code
+                """,
+                (country_code, valid_until, valid_from),
+            )
+            scheme_rows = cursor.fetchall()
+            scheme_ids = [row[0] for row in scheme_rows]
+
+            rule_rows = {}
+            for name, table, columns in (
+                ("rate", "kf_statutory_rate", RATE_COLUMNS),
+                ("ceiling", "kf_statutory_ceiling", CEILING_COLUMNS),
+                ("table_lookup", "kf_statutory_table_lookup", TABLE_LOOKUP_COLUMNS),
+            ):
+                cursor.execute(
+                    f"""
+                    SELECT {columns}
+                    FROM {table}
+                    WHERE scheme_id = ANY(%s)
+                      AND effective_from <= %s
+                      AND (effective_until IS NULL OR effective_until >= %s)
+                    """,
+                    (scheme_ids, valid_until, valid_from),
+                )
+                rule_rows[name] = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        snapshot = cls(
+            country_code,
+            valid_from,
+            valid_until,
+            scheme_rows,
+            rule_rows["rate"],
+            rule_rows["ceiling"],
+            rule_rows["table_lookup"],
+        )
+        logger.info(
+            f"Loaded {country_code} rule snapshot {snapshot.version[:12]} "
+            f"({len(scheme_rows)} schemes, {len(rule_rows['rate'])} rates) "
+            f"for {valid_from}..{valid_until}"
+        )
+        return snapshot
+
+    def _compute_version(self, window: bool = True) -> str:
+        """Content digest of every rule row, and of the validity window if window"""
+        digest = hashlib.sha256()
+        if window:
+            digest.update(f"{self.country_code}|{self.valid_from}|{self.valid_until}".encode())
+        else:
+            digest.update(self.country_code.encode())
+        for name in ("scheme", "rate", "ceiling", "table_lookup"):
+            digest.update(f"\n#{name}".encode())
+            for row in self.rows[name]:
+                digest.update(("\n" + "|".join(map(str, row))).encode())
+        return digest.hexdigest()
+
+    def covers(self, calculation_date: date) -> bool:
+        """True if the snapshot may answer lookups for this date"""
+        return self.valid_from <= calculation_date <= self.valid_until
+
+    def has_scheme(self, scheme_id: int) -> bool:
+        """True if the scheme belongs to this snapshot"""
+        return scheme_id in self._scheme_ids
+
+    def get_applicable_schemes(
+        self, nationality: NationalityType, calculation_date: date
+    ) -> List[StatutoryScheme]:
+        """In-memory equivalent of StatutoryCalculator._get_applicable_schemes"""
+        schemes = []
+        for scheme in self.schemes:
+            if not _in_effect(scheme.effective_from, scheme.effective_until, calculation_date):
+                continue
+            if nationality == NationalityType.CITIZEN and not scheme.citizen_applicable:
+                continue
+            if nationality == NationalityType.PR and not scheme.pr_applicable:
+                continue
+            if nationality == NationalityType.FOREIGN and not scheme.foreign_worker_applicable:
+                continue
+            schemes.append(scheme)
+        return schemes
+
+    def find_matching_rate(
+        self, scheme_id: int, employee: EmployeeContext, calculation_date: date
+    ) -> Optional[StatutoryRate]:
+        """In-memory equivalent of StatutoryCalculator._find_matching_rate"""
+        tiers = self._tiers.get(scheme_id)
+        if tiers is None:
+            return None
+        return tiers.find(employee, calculation_date)
+
+    def compiled_tiers(self, scheme_id: int) -> Optional[CompiledRateTiers]:
+        """Compiled rate tier structure of a scheme, for inspection"""
+        return self._tiers.get(scheme_id)
+
+    def _report_tier_problems(self) -> None:
+        """Log overlapping and unreachable rate tiers found while compiling"""
+        codes = {scheme.id: scheme.code for scheme in self.schemes}
+        for scheme_id, tiers in self._tiers.items():
+            diagnostics = tiers.diagnostics()
+            scheme_code = codes.get(scheme_id, scheme_id)
+            for first, second in diagnostics.overlaps:
+                logger.warning(
+                    f"{self.country_code} {scheme_code}: tiers {first.tier_code} and "
+                    f"{second.tier_code} overlap with equal priority"
+                )
+            for rate in diagnostics.unreachable:
+                logger.warning(
+                    f"{self.country_code} {scheme_code}: tier {rate.tier_code} is unreachable"
+                )
+
+    def get_ceiling(
+        self, scheme_id: int, calculation_date: date, ceiling_type: str = "MONTHLY"
+    ) -> Optional[StatutoryCeiling]:
+        """In-memory equivalent of StatutoryCalculator._get_ceiling"""
+        for ceiling in self._ceilings.get((scheme_id, ceiling_type), ()):
+            if _in_effect(ceiling.effective_from, ceiling.effective_until, calculation_date):
+                return ceiling
+        return None
+
+    def find_table_band(
+        self, scheme_id: int, salary: Decimal, calculation_date: date
+    ) -> Optional[StatutoryTableLookup]:
+        """
+        In-memory equivalent of the range query in StatutoryCalculator._calculate_table_lookup
+
+        The scheme's wage bands are indexed for bisection on first use.
+        """
+        return self.band_table(scheme_id).find(salary, calculation_date)
+
+    def band_table(self, scheme_id: int) -> SchemeBandTable:
+        """Wage band index of a table-lookup scheme, built lazily"""
+        table = self._band_tables.get(scheme_id)
+        if table is None:
+            table = SchemeBandTable(self._table_lookups.get(scheme_id, ()))
+            self._band_tables[scheme_id] = table
+            for effective_from, _, index in table.periods:
+                if index.overlapping:
+                    logger.warning(
+                        f"{self.country_code} scheme {scheme_id} has overlapping wage bands "
+                        f"effective {effective_from}"
+                    )
+        return table
+
+    @property
+    def boundaries(self) -> Tuple[date, ...]:
+        """
+        Dates inside the window on which a scheme, rate, ceiling or wage band
+        starts or stops applying, in order
+
+        Between two consecutive boundaries every lookup has the same rows to
+        choose from, so schemes and ceilings resolved for one date hold for
+        the whole segment.
+        """
+        if self._boundaries is None:
+            periods = [(s.effective_from, s.effective_until) for s in self.schemes]
+            for tiers in self._tiers.values():
+                periods.extend((r.effective_from, r.effective_until) for r in tiers.rates)
+            for ceilings in self._ceilings.values():
+                periods.extend((c.effective_from, c.effective_until) for c in ceilings)
+            for bands in self._table_lookups.values():
+                periods.extend((b.effective_from, b.effective_until) for b in bands)
+
+            dates = set()
+            for effective_from, effective_until in periods:
+                dates.add(effective_from)
+                if effective_until is not None and effective_until < date.max:
+                    dates.add(effective_until + timedelta(days=1))
+            self._boundaries = tuple(
+                sorted(d for d in dates if self.valid_from < d <= self.valid_until)
+            )
+        return self._boundaries
+
+    def segment(self, calculation_date: date) -> int:
+        """Index of the stretch between boundaries that contains a date"""
+        return bisect_right(self.boundaries, calculation_date)
@@ -0,0 +1,169 @@
+"""
+SQL Calculator
+==============
+Bulk statutory contributions computed inside PostgreSQL
+
+Migration 018_create_bulk_contribution_functions.sql defines
+kf_calculate_contributions, a chain of set-returning SQL functions that
+reproduces StatutoryCalculator.calculate_all (scheme applicability, wage
+base, MONTHLY ceilings, rate tier matching, table lookup bands and rounding)
+for a whole set of employees. SqlCalculator sends the employees as one JSON
+array and reads every contribution back from a single statement per chunk,
+so the database does the work next to the rule tables and a pay run costs a
+handful of round trips instead of several per employee.
+
+Annual ceilings need the YTD ledger and are not applied; use
+StatutoryCalculator with a YtdLedger for schemes that have them.
+"""
+
+import json
+from datetime import date
+from decimal import Decimal
+from itertools import islice
+from typing import Iterable, List, Optional
+
+from ..models.statutory import (
+    CalculationMethod,
+    ContributionSummary,
+    EmployeeContext,
+    StatutoryContribution,
+)
+
+# kf_contribution_result columns read back, in this order
+RESULT_COLUMNS = """
+    employee_index, scheme_id, scheme_code, scheme_name, calculation_method,
+    calculation_base_amount, applied_salary, capped,
+    employee_amount, employer_amount, total_amount,
+    employee_rate, employer_rate, tier_code, tier_description,
+    rate_id, ceiling_id, table_lookup_id
+"""
+
+
+def _text(value) -> Optional[str]:
+    """JSON value of an optional Decimal, date or enum (strings keep Decimal exact)"""
+    if value is None:
+        return None
+    return str(getattr(value, "value", value))
+
+
+def employee_payload(employees: List[EmployeeContext]) -> str:
+    """JSON array of kf_contribution_input objects, in input order"""
+    return json.dumps(
+        [
+            {
+                "employee_ref": employee.employee_id,
+                "country_code": employee.country_code,
+                "nationality": _text(employee.nationality),
+                "age": employee.age,
+                "gross_salary": _text(employee.gross_salary),
+                "basic_salary": _text(employee.basic_salary),
+                "ordinary_wages": _text(employee.ordinary_wages),
+                "additional_wages": _text(employee.additional_wages),
+                "risk_category": _text(employee.risk_category),
+                "company_employee_count": employee.company_employee_count,
+                "calculation_date": _text(employee.calculation_date),
+            }
+            for employee in employees
+        ]
+    )
+
+
+def _decimal(value) -> Optional[Decimal]:
+    return Decimal(str(value)) if value is not None else None
+
+
+def parse_result_row(row: tuple) -> StatutoryContribution:
+    """Parse a kf_contribution_result row (RESULT_COLUMNS order, without employee_index)"""
+    return StatutoryContribution(
+        scheme_code=row[1],
+        scheme_name=row[2],
+        calculation_method=CalculationMethod(row[3]),
+        calculation_base_amount=_decimal(row[4]),
+        applied_salary=_decimal(row[5]),
+        capped=row[6],
+        employee_amount=_decimal(row[7]),
+        employer_amount=_decimal(row[8]),
+        total_amount=_decimal(row[9]),
+        employee_rate=_decimal(row[10]),
+        employer_rate=_decimal(row[11]),
+        tier_code=row[12],
+        tier_description=row[13],
+        rounding_applied=True,
+        scheme_id=row[0],
+        rate_id=row[14],
+        ceiling_id=row[15],
+        table_lookup_id=row[16],
+    )
+
+
+class SqlCalculator:
+    """
+    Statutory contributions of many employees from kf_calculate_contributions
+
+    Results have the same shape and amounts as StatutoryCalculator.calculate_all.
+    """
+
+    def __init__(self, db_connection, chunk_size: int = 5000):
+        """
+        Args:
+            db_connection: Database connection object (psycopg2 or similar)
+                to a database with migration 018 applied
+            chunk_size: Employees sent per statement
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.db = db_connection
+        self.chunk_size = chunk_size
+
+    def calculate(
+        self, employees: Iterable[EmployeeContext], calculation_date: Optional[date] = None
+    ) -> List[ContributionSummary]:
+        """
+        Calculate statutory contributions for every employee in the database
+
+        Args:
+            employees: Employee contexts
+            calculation_date: Date for rate lookup (defaults to each
+                employee's calculation_date)
+
+        Returns:
+            One ContributionSummary per employee, in input order
+        """
+        summaries = []
+        employees = iter(employees)
+        while True:
+            chunk = list(islice(employees, self.chunk_size))
+            if not chunk:
+                return summaries
+            summaries.extend(self._calculate_chunk(chunk, calculation_date))
+
+    def _calculate_chunk(
+        self, employees: List[EmployeeContext], calculation_date: Optional[date]
+    ) -> List[ContributionSummary]:
+        cursor = self.db.cursor()
+        try:
+            cursor.execute(
+                f"""
+                SELECT {RESULT_COLUMNS}
+                FROM kf_calculate_contributions_json(%s::jsonb, %s)
+                """,
+                (employee_payload(employees), calculation_date),
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        # Rows come back ordered by employee_index (1-based), then scheme order
+        contributions: List[List[StatutoryContribution]] = [[] for _ in employees]
+        for row in rows:
+            contributions[row[0] - 1].append(parse_result_row(row[1:]))
+
+        return [
+            ContributionSummary(
+                country_code=employee.country_code,
+                employee_context=employee,
+                contributions=employee_contributions,
+                calculation_date=calculation_date or employee.calculation_date or date.today(),
+            )
+            for employee, employee_contributions in zip(employees, contributions)
+        ]
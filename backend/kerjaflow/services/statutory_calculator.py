@@ -5,25 +5,48 @@ Core calculation engine for ASEAN statutory contributions
 """
 
 import logging
+from contextlib import contextmanager
 from datetime import date
 from decimal import ROUND_DOWN, ROUND_HALF_UP, ROUND_UP, Decimal
-from typing import List, Optional
+from itertools import islice
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from ..models.statutory import (
+    BatchCalculationResult,
+    CalculationBase,
+    CalculationFailure,
     CalculationMethod,
+    ContributionChunk,
     ContributionSummary,
     EmployeeContext,
     NationalityType,
-    RiskCategory,
     RoundingMethod,
     StatutoryCeiling,
     StatutoryContribution,
     StatutoryRate,
     StatutoryScheme,
+    StatutoryTableLookup,
 )
+from .contribution_memo import MISS, ContributionMemo
+from .fixed_point import FixedPointArithmetic
+from .instrumentation import CalculatorMetrics, TraceEntry
+from .rule_snapshot import (
+    TABLE_LOOKUP_COLUMNS,
+    RuleSnapshot,
+    parse_ceiling_row,
+    parse_rate_row,
+    parse_scheme_row,
+    parse_table_lookup_row,
+)
+from .wage_band_index import SchemeBandTable
+from .ytd_ledger import YtdCorrection, YtdEntry, YtdLedger, cap_annual
 
 logger = logging.getLogger(__name__)
 
+# Methods whose amounts the integer fast path computes
+FIXED_POINT_METHODS = (CalculationMethod.PERCENTAGE, CalculationMethod.TIERED_PERCENTAGE)
+
 
 class StatutoryCalculator:
     """
@@ -34,17 +57,196 @@ class StatutoryCalculator:
     - Tiered rates (age, salary, nationality, risk)
     - Wage ceilings
     - Multiple rounding methods
+    - Optional in-memory rule snapshots (no per-employee SQL)
+    - Batch calculation grouped by country, nationality and date
+    - Chunked streaming calculation with bounded memory
+    - Multi-period timelines (back-pay) walked across rule boundaries once
+    - Optional memoization of identical scheme inputs
+    - Integer minor-unit arithmetic for percentage schemes
+    - ANNUAL and AW_ANNUAL ceilings through an optional YTD ledger
+    - Optional latency, cache and query instrumentation with a per-scheme trace
     - Comprehensive logging
     """
 
-    def __init__(self, db_connection):
+    def __init__(
+        self,
+        db_connection=None,
+        snapshots: Optional[Iterable[RuleSnapshot]] = None,
+        memo: Optional[ContributionMemo] = None,
+        ledger: Optional[YtdLedger] = None,
+        metrics: Optional[CalculatorMetrics] = None,
+    ):
         """
         Initialize calculator with database connection
 
         Args:
-            db_connection: Database connection object (psycopg2 or similar)
+            db_connection: Database connection object (psycopg2 or similar).
+                May be None when every calculation date is covered by a snapshot.
+            snapshots: Preloaded rule snapshots to answer lookups from memory
+            memo: Cache for contributions with identical normalized inputs
+                (only used for lookups answered from a snapshot)
+            ledger: Year-to-date ledger enforcing ANNUAL and AW_ANNUAL
+                ceilings for employees with an employee_id
+            metrics: Instrumentation to record latencies, counters and the
+                optional trace into (None: hooks off)
         """
         self.db = db_connection
+        self.memo = memo
+        self.ledger = ledger
+        self.metrics = metrics
+        self._snapshots: Dict[str, RuleSnapshot] = {}
+        self._snapshot_by_scheme: Dict[int, RuleSnapshot] = {}
+        # Wage band indexes for schemes looked up without a snapshot
+        self._band_tables: Dict[int, SchemeBandTable] = {}
+        self._fixed_point = FixedPointArithmetic()
+        for snapshot in snapshots or ():
+            self.use_snapshot(snapshot)
+
+    def load_snapshot(self, country_code: str, valid_from: date, valid_until: date) -> RuleSnapshot:
+        """
+        Load and install a rule snapshot for a country
+
+        Every scheme, ceiling, rate and table lookup for calculation dates in
+        [valid_from, valid_until] is then answered from memory.
+
+        Args:
+            country_code: ISO 2-letter country code
+            valid_from: First calculation date to cover
+            valid_until: Last calculation date to cover
+
+        Returns:
+            The installed RuleSnapshot
+        """
+        snapshot = RuleSnapshot.load(self._require_db(), country_code, valid_from, valid_until)
+        self.use_snapshot(snapshot)
+        return snapshot
+
+    def use_snapshot(self, snapshot: RuleSnapshot) -> None:
+        """Install a snapshot, replacing any previous one for the same country"""
+        previous = self._snapshots.get(snapshot.country_code)
+        if self.memo is not None and previous is not None and previous.version != snapshot.version:
+            self.memo.invalidate(snapshot.country_code)
+        self._snapshots[snapshot.country_code] = snapshot
+        self._reindex_snapshots()
+
+    def use_bundle(self, bundle, countries: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Install the snapshots of a compiled rate bundle (see rate_bundle.RateBundle)
+
+        Countries not in the bundle keep their installed snapshots.
+
+        Args:
+            bundle: Open RateBundle
+            countries: Countries to install (default: every country in the bundle)
+
+        Returns:
+            Country codes whose installed snapshot version changed
+        """
+        changed = []
+        for snapshot in bundle.snapshots(countries):
+            previous = self._snapshots.get(snapshot.country_code)
+            if previous is None or previous.version != snapshot.version:
+                self.use_snapshot(snapshot)
+                changed.append(snapshot.country_code)
+        return changed
+
+    def invalidate_snapshot(self, country_code: Optional[str] = None) -> None:
+        """
+        Drop installed snapshots so lookups go back to the database
+
+        Wage band indexes cached outside snapshots and memoized
+        contributions are dropped as well.
+
+        Args:
+            country_code: Country to invalidate (None for all countries)
+        """
+        if country_code is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.pop(country_code, None)
+        self._band_tables.clear()
+        if self.memo is not None:
+            self.memo.invalidate(country_code)
+        self._reindex_snapshots()
+
+    def refresh_snapshot(self, country_code: str) -> bool:
+        """
+        Reload a country's snapshot over the same validity window
+
+        Returns:
+            True if the rule data changed (new version installed)
+        """
+        current = self._snapshots.get(country_code)
+        if current is None:
+            raise KeyError(f"No rule snapshot installed for {country_code}")
+
+        reloaded = RuleSnapshot.load(
+            self._require_db(), country_code, current.valid_from, current.valid_until
+        )
+        if reloaded.version == current.version:
+            return False
+
+        logger.info(
+            f"Rule snapshot for {country_code} changed: "
+            f"{current.version[:12]} -> {reloaded.version[:12]}"
+        )
+        self.use_snapshot(reloaded)
+        return True
+
+    @property
+    def snapshot_versions(self) -> Dict[str, str]:
+        """Version of every installed snapshot, keyed by country code"""
+        return {code: snapshot.version for code, snapshot in self._snapshots.items()}
+
+    def snapshot_for(self, country_code: str, calculation_date: date) -> Optional[RuleSnapshot]:
+        """Installed snapshot answering for a country and date, if any"""
+        snapshot = self._snapshots.get(country_code)
+        if snapshot is not None and snapshot.covers(calculation_date):
+            return snapshot
+        return None
+
+    def rule_version(self, country_code: str, calculation_date: date) -> Optional[str]:
+        """Version of the installed snapshot answering for a country and date, if any"""
+        snapshot = self.snapshot_for(country_code, calculation_date)
+        return snapshot.version if snapshot is not None else None
+
+    def rule_content_version(self, country_code: str, calculation_date: date) -> Optional[str]:
+        """
+        Content version of the installed snapshot answering for a country and
+        date, if any (independent of the snapshot's validity window)
+        """
+        snapshot = self.snapshot_for(country_code, calculation_date)
+        return snapshot.content_version if snapshot is not None else None
+
+    def _reindex_snapshots(self) -> None:
+        self._snapshot_by_scheme = {
+            scheme.id: snapshot
+            for snapshot in self._snapshots.values()
+            for scheme in snapshot.schemes
+        }
+
+    def _snapshot_for_scheme(
+        self, scheme_id: int, calculation_date: date
+    ) -> Optional[RuleSnapshot]:
+        snapshot = self._snapshot_by_scheme.get(scheme_id)
+        if snapshot is not None and snapshot.covers(calculation_date):
+            return snapshot
+        return None
+
+    def _require_db(self):
+        if self.db is None:
+            raise LookupError(
+                "No database connection configured and no rule snapshot covers this lookup"
+            )
+        if self.metrics is not None:
+            return self.metrics.connection(self.db)
+        return self.db
+
+    def _timed(self, method: str, country_code: str, scheme_code: Optional[str], function, *args):
+        """function(*args), timed when instrumentation is on"""
+        if self.metrics is None:
+            return function(*args)
+        return self.metrics.timed(method, country_code, scheme_code, function, *args)
 
     def calculate_all(
         self, employee: EmployeeContext, calculation_date: Optional[date] = None
@@ -61,11 +263,16 @@ class StatutoryCalculator:
         """
         if calculation_date is None:
             calculation_date = employee.calculation_date or date.today()
+        arguments = (employee.country_code, employee.nationality, calculation_date)
 
         # Get all applicable schemes for this country
-        schemes = self._get_applicable_schemes(
-            employee.country_code, employee.nationality, calculation_date
-        )
+        if self.metrics is None:
+            schemes = self._get_applicable_schemes(*arguments)
+        else:
+            started = perf_counter()
+            schemes = self.metrics.timed(
+                "schemes", employee.country_code, None, self._get_applicable_schemes, *arguments
+            )
 
         contributions = []
         for scheme in schemes:
@@ -75,8 +282,13 @@ class StatutoryCalculator:
                     contributions.append(contribution)
             except Exception as e:
                 logger.error(f"Failed to calculate {scheme.code} for {employee.country_code}: {e}")
+                if self.metrics is not None:
+                    self.metrics.count("failures", employee.country_code, scheme.code)
                 continue
 
+        if self.metrics is not None:
+            self.metrics.observe("employee", employee.country_code, None, perf_counter() - started)
+            self.metrics.count("employees", employee.country_code)
         return ContributionSummary(
             country_code=employee.country_code,
             employee_context=employee,
@@ -84,6 +296,294 @@ class StatutoryCalculator:
             calculation_date=calculation_date,
         )
 
+    def calculate_batch(
+        self, employees: Iterable[EmployeeContext], calculation_date: Optional[date] = None
+    ) -> BatchCalculationResult:
+        """
+        Calculate statutory contributions for many employees at once
+
+        Employees are grouped by (country, nationality, calculation date).
+        Schemes and ceilings are resolved once per group; rate tiers are
+        matched per employee through the snapshot's compiled tiers. Countries
+        without a snapshot covering the batch dates get one loaded for the
+        duration of the call, so the whole batch costs four queries per country.
+
+        Unlike calculate_all, a scheme that fails to calculate is not skipped:
+        the employee is reported in failures and gets no summary.
+
+        Args:
+            employees: Employee contexts to calculate
+            calculation_date: Date for rate lookup (defaults to each
+                employee's calculation_date)
+
+        Returns:
+            BatchCalculationResult with one result per employee, in input order
+        """
+        installed = dict(self._snapshots)
+        try:
+            return self._calculate_chunk(list(employees), calculation_date)
+        finally:
+            self._restore_snapshots(installed)
+
+    def calculate_iter(
+        self,
+        employees: Iterable[EmployeeContext],
+        calculation_date: Optional[date] = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[ContributionChunk]:
+        """
+        Calculate an employee stream chunk by chunk
+
+        Employees are pulled lazily, chunk_size at a time, so a server-side
+        cursor or generator can feed a pay run of any size while only one
+        chunk of contexts and results is held. Each chunk is calculated as
+        by calculate_batch; snapshots loaded for a chunk are kept until the
+        stream ends, so later chunks with the same dates cost no queries.
+
+        Args:
+            employees: Employee contexts to calculate (any iterable)
+            calculation_date: Date for rate lookup (defaults to each
+                employee's calculation_date)
+            chunk_size: Employees per chunk
+
+        Yields:
+            ContributionChunk per chunk_size employees, in input order
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        iterator = iter(employees)
+        installed = dict(self._snapshots)
+        try:
+            index = offset = 0
+            while True:
+                chunk = list(islice(iterator, chunk_size))
+                if not chunk:
+                    return
+                batch = self._calculate_chunk(chunk, calculation_date)
+                yield ContributionChunk(index=index, offset=offset, batch=batch)
+                index += 1
+                offset += len(chunk)
+        finally:
+            self._restore_snapshots(installed)
+
+    def _calculate_chunk(
+        self, employees: List[EmployeeContext], calculation_date: Optional[date]
+    ) -> BatchCalculationResult:
+        """Group, load snapshots for and calculate a list of employees"""
+        dates = [calculation_date or e.calculation_date or date.today() for e in employees]
+
+        groups: Dict[Tuple[str, NationalityType, date], List[int]] = {}
+        for index, employee in enumerate(employees):
+            key = (employee.country_code, employee.nationality, dates[index])
+            groups.setdefault(key, []).append(index)
+
+        batch = BatchCalculationResult(results=[None] * len(employees), group_count=len(groups))
+        self._load_batch_snapshots(employees, dates)
+        for (country_code, nationality, group_date), indexes in groups.items():
+            self._calculate_group(employees, indexes, country_code, nationality, group_date, batch)
+
+        batch.failures.sort(key=lambda failure: failure.index)
+        return batch
+
+    @contextmanager
+    def batch_snapshots(
+        self, employees: List[EmployeeContext], calculation_date: Optional[date] = None
+    ) -> Iterator[None]:
+        """
+        Keep snapshots covering these employees installed inside a with block
+
+        Countries the installed snapshots don't cover get one loaded, as
+        calculate_batch does, and dropped again on exit; calculations and
+        rule_version() and rule_content_version() in the block are answered
+        from them.
+        """
+        installed = dict(self._snapshots)
+        try:
+            dates = [calculation_date or e.calculation_date or date.today() for e in employees]
+            self._load_batch_snapshots(employees, dates)
+            yield
+        finally:
+            self._restore_snapshots(installed)
+
+    def _restore_snapshots(self, installed: Dict[str, RuleSnapshot]) -> None:
+        """Drop snapshots loaded for a batch or stream, keeping the caller's"""
+        if self._snapshots != installed:
+            self._snapshots = installed
+            self._reindex_snapshots()
+
+    def _load_batch_snapshots(self, employees: List[EmployeeContext], dates: List[date]) -> None:
+        """Load a temporary snapshot for each country the installed ones don't cover"""
+        if self.db is None:
+            return
+
+        date_ranges: Dict[str, Tuple[date, date]] = {}
+        for employee, on in zip(employees, dates):
+            first, last = date_ranges.get(employee.country_code, (on, on))
+            date_ranges[employee.country_code] = (min(first, on), max(last, on))
+
+        for country_code, (first, last) in date_ranges.items():
+            snapshot = self._snapshots.get(country_code)
+            if snapshot is not None and snapshot.covers(first) and snapshot.covers(last):
+                continue
+            self.load_snapshot(country_code, first, last)
+
+    def _calculate_group(
+        self,
+        employees: List[EmployeeContext],
+        indexes: List[int],
+        country_code: str,
+        nationality: NationalityType,
+        calculation_date: date,
+        batch: BatchCalculationResult,
+    ) -> None:
+        """Calculate one (country, nationality, date) group of a batch"""
+        try:
+            schemes = self._timed(
+                "schemes",
+                country_code,
+                None,
+                self._get_applicable_schemes,
+                country_code,
+                nationality,
+                calculation_date,
+            )
+            plans = [
+                (
+                    scheme,
+                    self._timed(
+                        "ceiling",
+                        country_code,
+                        scheme.code,
+                        self._get_ceiling,
+                        scheme.id,
+                        calculation_date,
+                    ),
+                )
+                for scheme in schemes
+            ]
+        except Exception as e:
+            logger.error(f"Failed to resolve schemes for {country_code} on {calculation_date}: {e}")
+            for index in indexes:
+                batch.failures.append(CalculationFailure(index, employees[index], str(e)))
+            return
+
+        metrics = self.metrics
+        for index in indexes:
+            employee = employees[index]
+            if metrics is not None:
+                started = perf_counter()
+            contributions = []
+            for scheme, ceiling in plans:
+                try:
+                    contribution = self._planned_contribution(
+                        employee, scheme, calculation_date, ceiling
+                    )
+                except Exception as e:
+                    batch.failures.append(
+                        CalculationFailure(index, employee, str(e), scheme_code=scheme.code)
+                    )
+                    if metrics is not None:
+                        metrics.count("failures", country_code, scheme.code)
+                    break
+                if contribution:
+                    contributions.append(contribution)
+            else:
+                batch.results[index] = ContributionSummary(
+                    country_code=employee.country_code,
+                    employee_context=employee,
+                    contributions=contributions,
+                    calculation_date=calculation_date,
+                )
+            if metrics is not None:
+                metrics.observe("employee", country_code, None, perf_counter() - started)
+                metrics.count("employees", country_code)
+
+    def calculate_timeline(self, periods: Iterable[EmployeeContext]) -> List[ContributionSummary]:
+        """
+        Calculate a run of pay periods (e.g. back-pay months) in one pass
+
+        Each context is one period, dated by its calculation_date. Rules for
+        the whole span are loaded once (as by calculate_batch) and the
+        periods are walked in date order across the snapshot's rule
+        boundaries: schemes and ceilings are resolved once per stretch between
+        boundaries and nationality, and only rate tiers are matched per
+        period. Date order also posts YTD ledger months in sequence.
+
+        As in calculate_all, a scheme that fails to calculate is logged and
+        left out of that period's summary.
+
+        Args:
+            periods: One employee context per period
+
+        Returns:
+            One ContributionSummary per period, in input order
+
+        Raises:
+            ValueError: If a period has no calculation_date
+        """
+        periods = list(periods)
+        for index, employee in enumerate(periods):
+            if employee.calculation_date is None:
+                raise ValueError(f"Period {index} has no calculation_date")
+        results: List[Optional[ContributionSummary]] = [None] * len(periods)
+        with self.batch_snapshots(periods):
+            plans: Dict[tuple, List[Tuple[StatutoryScheme, Optional[StatutoryCeiling]]]] = {}
+            for index in sorted(range(len(periods)), key=lambda i: periods[i].calculation_date):
+                employee = periods[index]
+                on = employee.calculation_date
+                country_code = employee.country_code
+                snapshot = self.snapshot_for(country_code, on)
+                segment = snapshot.segment(on) if snapshot is not None else on
+                key = (country_code, employee.nationality, segment)
+                plan = plans.get(key)
+                if plan is None:
+                    schemes = self._get_applicable_schemes(country_code, employee.nationality, on)
+                    plan = plans[key] = [
+                        (scheme, self._get_ceiling(scheme.id, on)) for scheme in schemes
+                    ]
+
+                contributions = []
+                for scheme, ceiling in plan:
+                    try:
+                        contribution = self._planned_contribution(employee, scheme, on, ceiling)
+                    except Exception as e:
+                        logger.error(f"Failed to calculate {scheme.code} for {country_code}: {e}")
+                        if self.metrics is not None:
+                            self.metrics.count("failures", country_code, scheme.code)
+                        continue
+                    if contribution:
+                        contributions.append(contribution)
+                results[index] = ContributionSummary(
+                    country_code=country_code,
+                    employee_context=employee,
+                    contributions=contributions,
+                    calculation_date=on,
+                )
+        return results
+
+    def _planned_contribution(
+        self,
+        employee: EmployeeContext,
+        scheme: StatutoryScheme,
+        calculation_date: date,
+        ceiling: Optional[StatutoryCeiling],
+    ) -> Optional[StatutoryContribution]:
+        """calculate_scheme with the ceiling already resolved"""
+        if self.metrics is not None:
+            return self._measured_contribution(employee, scheme, calculation_date, ceiling)
+
+        key = self._memo_key(employee, scheme, calculation_date)
+        contribution = self.memo.get(key) if key is not None else MISS
+        if contribution is MISS:
+            rate = self._find_matching_rate(scheme.id, employee, calculation_date)
+            contribution = self._build_contribution(
+                employee, scheme, calculation_date, ceiling, rate
+            )
+            if key is not None:
+                self.memo.put(key, contribution)
+        return contribution
+
     def calculate_scheme(
         self, employee: EmployeeContext, scheme: StatutoryScheme, calculation_date: date
     ) -> Optional[StatutoryContribution]:
@@ -98,11 +598,101 @@ class StatutoryCalculator:
         Returns:
             StatutoryContribution or None if not applicable
         """
+        if self.metrics is not None:
+            # Times the ceiling lookup too
+            return self._measured_contribution(employee, scheme, calculation_date)
+
+        ceiling = self._get_ceiling(scheme.id, calculation_date)
+        return self._planned_contribution(employee, scheme, calculation_date, ceiling)
+
+    def _measured_contribution(
+        self,
+        employee: EmployeeContext,
+        scheme: StatutoryScheme,
+        calculation_date: date,
+        ceiling=MISS,
+    ) -> Optional[StatutoryContribution]:
+        """
+        calculate_scheme with every step timed, counted and traced
+
+        The ceiling is looked up unless the caller already resolved it for
+        its group (MISS: not resolved; None: no ceiling).
+        """
+        metrics = self.metrics
+        country_code = employee.country_code
+        started = perf_counter()
+
+        key = self._memo_key(employee, scheme, calculation_date)
+        contribution = self.memo.get(key) if key is not None else MISS
+        memo_hit = contribution is not MISS
+        if not memo_hit:
+            if ceiling is MISS:
+                ceiling = metrics.timed(
+                    "ceiling",
+                    country_code,
+                    scheme.code,
+                    self._get_ceiling,
+                    scheme.id,
+                    calculation_date,
+                )
+            rate = metrics.timed(
+                "rate",
+                country_code,
+                scheme.code,
+                self._find_matching_rate,
+                scheme.id,
+                employee,
+                calculation_date,
+            )
+            contribution = self._build_contribution(
+                employee, scheme, calculation_date, ceiling, rate
+            )
+            if key is not None:
+                self.memo.put(key, contribution)
+
+        elapsed = perf_counter() - started
+        metrics.observe("scheme", country_code, scheme.code, elapsed)
+        from_snapshot = self._snapshot_for_scheme(scheme.id, calculation_date) is not None
+        metrics.count(
+            "snapshot_hit" if from_snapshot else "snapshot_miss", country_code, scheme.code
+        )
+        if key is not None:
+            metrics.count("memo_hit" if memo_hit else "memo_miss", country_code, scheme.code)
+        if contribution is None:
+            metrics.count("no_contribution", country_code, scheme.code)
+        elif metrics.trace_enabled:
+            metrics.record(
+                TraceEntry.of(employee, calculation_date, contribution, memo_hit, elapsed)
+            )
+        return contribution
+
+    def _memo_key(
+        self, employee: EmployeeContext, scheme: StatutoryScheme, calculation_date: date
+    ) -> Optional[tuple]:
+        """Memo key for a scheme contribution, or None when memoization does not apply"""
+        if self.memo is None:
+            return None
+        snapshot = self._snapshot_for_scheme(scheme.id, calculation_date)
+        if snapshot is None:
+            return None
+        if self._annual_ceilings(employee, scheme, calculation_date) is not None:
+            return None  # Depends on the employee's YTD, not just the inputs
+        wage_base = self._get_calculation_base(employee, scheme)
+        return self.memo.key(snapshot, scheme, employee, calculation_date, wage_base)
+
+    def _build_contribution(
+        self,
+        employee: EmployeeContext,
+        scheme: StatutoryScheme,
+        calculation_date: date,
+        ceiling: Optional[StatutoryCeiling],
+        rate: Optional[StatutoryRate],
+    ) -> Optional[StatutoryContribution]:
+        """Calculate one contribution from an already resolved ceiling and rate tier"""
         # Get calculation base amount
         base_amount = self._get_calculation_base(employee, scheme)
 
         # Apply ceiling if exists
-        ceiling = self._get_ceiling(scheme.id, calculation_date)
         applied_salary = base_amount
         capped = False
 
@@ -111,9 +701,6 @@ class StatutoryCalculator:
                 applied_salary = ceiling.ceiling_amount
                 capped = True
 
-        # Find matching rate tier
-        rate = self._find_matching_rate(scheme.id, employee, calculation_date)
-
         if not rate:
             logger.warning(
                 f"No matching rate found for {scheme.code} "
@@ -121,28 +708,42 @@ class StatutoryCalculator:
             )
             return None
 
-        # Calculate amounts based on method
-        if scheme.calculation_method == CalculationMethod.PERCENTAGE:
-            employee_amount, employer_amount = self._calculate_percentage(applied_salary, rate)
-        elif scheme.calculation_method == CalculationMethod.TIERED_PERCENTAGE:
-            employee_amount, employer_amount = self._calculate_tiered_percentage(
-                applied_salary, rate, employee, scheme
+        # Annual ceilings against the wages already subject this year
+        ytd_entry = None
+        annual_ceilings = self._annual_ceilings(employee, scheme, calculation_date)
+        if annual_ceilings is not None:
+            ytd_entry, uncapped = self._ytd_entry(
+                employee, scheme, calculation_date, applied_salary, *annual_ceilings
             )
-        elif scheme.calculation_method == CalculationMethod.TABLE_LOOKUP:
-            employee_amount, employer_amount = self._calculate_table_lookup(
-                base_amount, scheme, calculation_date
+            applied_salary = ytd_entry.wages
+            capped = capped or applied_salary < uncapped
+
+        if self.metrics is None:
+            amounts = self._compute_amounts(
+                employee, scheme, calculation_date, base_amount, applied_salary, rate
             )
         else:
-            logger.error(f"Unsupported calculation method: {scheme.calculation_method}")
+            amounts = self.metrics.timed(
+                "amounts",
+                employee.country_code,
+                scheme.code,
+                self._compute_amounts,
+                employee,
+                scheme,
+                calculation_date,
+                base_amount,
+                applied_salary,
+                rate,
+            )
+        if amounts is None:
             return None
+        employee_amount, employer_amount, total_amount, band = amounts
 
-        # Apply rounding
-        employee_amount = self._apply_rounding(
-            employee_amount, scheme.rounding_method, scheme.rounding_precision
-        )
-        employer_amount = self._apply_rounding(
-            employer_amount, scheme.rounding_method, scheme.rounding_precision
-        )
+        if ytd_entry is not None:
+            ytd_entry.employee_amount = employee_amount
+            ytd_entry.employer_amount = employer_amount
+            self.ledger.post(employee.employee_id, scheme.code, calculation_date, ytd_entry)
+            self.ledger.remember(employee, calculation_date)
 
         return StatutoryContribution(
             scheme_code=scheme.code,
@@ -152,20 +753,86 @@ class StatutoryCalculator:
             capped=capped,
             employee_amount=employee_amount,
             employer_amount=employer_amount,
-            total_amount=employee_amount + employer_amount,
+            total_amount=total_amount,
             employee_rate=rate.employee_rate,
             employer_rate=rate.employer_rate,
             tier_code=rate.tier_code,
             tier_description=rate.tier_description,
             calculation_method=scheme.calculation_method,
             rounding_applied=True,
+            scheme_id=scheme.id,
+            rate_id=rate.id,
+            ceiling_id=ceiling.id if ceiling else None,
+            table_lookup_id=band.id if band is not None else None,
         )
 
+    def _compute_amounts(
+        self,
+        employee: EmployeeContext,
+        scheme: StatutoryScheme,
+        calculation_date: date,
+        base_amount: Decimal,
+        applied_salary: Decimal,
+        rate: StatutoryRate,
+    ) -> Optional[Tuple[Decimal, Decimal, Decimal, Optional[StatutoryTableLookup]]]:
+        """
+        Rounded (employee, employer, total) amounts and the wage band used
+
+        Returns:
+            The amounts and band (None unless a table lookup matched), or
+            None for an unsupported calculation method
+        """
+        # Percentage schemes in integer minor units where that is exact
+        if scheme.calculation_method in FIXED_POINT_METHODS:
+            amounts = self._fixed_point.percentage(
+                applied_salary, rate, scheme.rounding_method, scheme.rounding_precision
+            )
+            if amounts is not None:
+                return amounts + (None,)
+
+        band = None
+        if scheme.calculation_method == CalculationMethod.PERCENTAGE:
+            employee_amount, employer_amount = self._calculate_percentage(applied_salary, rate)
+        elif scheme.calculation_method == CalculationMethod.TIERED_PERCENTAGE:
+            employee_amount, employer_amount = self._calculate_tiered_percentage(
+                applied_salary, rate, employee, scheme
+            )
+        elif scheme.calculation_method == CalculationMethod.TABLE_LOOKUP:
+            band = self._timed(
+                "table_lookup",
+                employee.country_code,
+                scheme.code,
+                self._find_table_band,
+                base_amount,
+                scheme,
+                calculation_date,
+            )
+            if band is not None:
+                employee_amount, employer_amount = band.employee_amount, band.employer_amount
+            else:
+                employee_amount, employer_amount = Decimal("0.00"), Decimal("0.00")
+        else:
+            logger.error(f"Unsupported calculation method: {scheme.calculation_method}")
+            return None
+
+        # Apply rounding
+        employee_amount = self._apply_rounding(
+            employee_amount, scheme.rounding_method, scheme.rounding_precision
+        )
+        employer_amount = self._apply_rounding(
+            employer_amount, scheme.rounding_method, scheme.rounding_precision
+        )
+        return employee_amount, employer_amount, employee_amount + employer_amount, band
+
     def _get_applicable_schemes(
         self, country_code: str, nationality: NationalityType, calculation_date: date
     ) -> List[StatutoryScheme]:
         """Get all applicable schemes for country and nationality"""
-        cursor = self.db.cursor()
+        snapshot = self._snapshots.get(country_code)
+        if snapshot is not None and snapshot.covers(calculation_date):
+            return snapshot.get_applicable_schemes(nationality, calculation_date)
+
+        cursor = self._require_db().cursor()
 
         # Build nationality filter
         nationality_filter = ""
@@ -219,7 +886,11 @@ class StatutoryCalculator:
         - Risk category
         - Employee count
         """
-        cursor = self.db.cursor()
+        snapshot = self._snapshot_for_scheme(scheme_id, calculation_date)
+        if snapshot is not None:
+            return snapshot.find_matching_rate(scheme_id, employee, calculation_date)
+
+        cursor = self._require_db().cursor()
 
         query = """
             SELECT
@@ -238,7 +909,9 @@ class StatutoryCalculator:
               AND (max_age IS NULL OR max_age >= %s)
               AND (min_salary IS NULL OR min_salary <= %s)
               AND (max_salary IS NULL OR max_salary >= %s)
-              AND (nationality_condition = 'ALL' OR nationality_condition = %s)
+              AND (nationality_condition IS NULL
+                   OR nationality_condition = 'ALL'
+                   OR nationality_condition = %s)
               AND (risk_category IS NULL OR risk_category = %s)
               AND (employee_count_min IS NULL OR employee_count_min <= %s)
               AND (employee_count_max IS NULL OR employee_count_max >= %s)
@@ -247,7 +920,11 @@ class StatutoryCalculator:
                 CASE WHEN min_age IS NOT NULL THEN 1 ELSE 2 END,
                 CASE WHEN min_salary IS NOT NULL THEN 1 ELSE 2 END,
                 CASE WHEN nationality_condition != 'ALL' THEN 1 ELSE 2 END,
-                effective_from DESC
+                effective_from DESC,
+                -- Bounded tiers before open-ended ones (salary <= 5000 before any salary)
+                CASE WHEN max_age IS NOT NULL THEN 1 ELSE 2 END,
+                CASE WHEN max_salary IS NOT NULL THEN 1 ELSE 2 END,
+                id
             LIMIT 1
         """
 
@@ -280,7 +957,11 @@ class StatutoryCalculator:
         self, scheme_id: int, calculation_date: date, ceiling_type: str = "MONTHLY"
     ) -> Optional[StatutoryCeiling]:
         """Get wage ceiling for a scheme"""
-        cursor = self.db.cursor()
+        snapshot = self._snapshot_for_scheme(scheme_id, calculation_date)
+        if snapshot is not None:
+            return snapshot.get_ceiling(scheme_id, calculation_date, ceiling_type)
+
+        cursor = self._require_db().cursor()
 
         query = """
             SELECT id, scheme_id, ceiling_type, ceiling_amount, min_amount,
@@ -301,15 +982,109 @@ class StatutoryCalculator:
         if not row:
             return None
 
-        return StatutoryCeiling(
-            id=row[0],
-            scheme_id=row[1],
-            ceiling_type=row[2],
-            ceiling_amount=Decimal(str(row[3])),
-            min_amount=Decimal(str(row[4])) if row[4] else None,
-            effective_from=row[5],
-            effective_until=row[6],
+        return parse_ceiling_row(row)
+
+    def _annual_ceilings(
+        self, employee: EmployeeContext, scheme: StatutoryScheme, calculation_date: date
+    ) -> Optional[Tuple[Optional[Decimal], Optional[Decimal]]]:
+        """
+        (ANNUAL, AW_ANNUAL) ceiling amounts when the ledger tracks this
+        employee and scheme, None when annual ceilings do not apply
+        """
+        if self.ledger is None or employee.employee_id is None:
+            return None
+        annual = self._get_ceiling(scheme.id, calculation_date, "ANNUAL")
+        aw_annual = self._get_ceiling(scheme.id, calculation_date, "AW_ANNUAL")
+        if annual is None and aw_annual is None:
+            return None
+        return (
+            annual.ceiling_amount if annual is not None else None,
+            aw_annual.ceiling_amount if aw_annual is not None else None,
+        )
+
+    def _ytd_entry(
+        self,
+        employee: EmployeeContext,
+        scheme: StatutoryScheme,
+        calculation_date: date,
+        applied_salary: Decimal,
+        annual_ceiling: Optional[Decimal],
+        aw_ceiling: Optional[Decimal],
+    ) -> Tuple[YtdEntry, Decimal]:
+        """
+        Wages of this month still subject to the scheme after the annual
+        ceilings, and the wages that were subject before them
+        """
+        ordinary, additional = applied_salary, Decimal("0.00")
+        if scheme.calculation_base == CalculationBase.ADDITIONAL_WAGES:
+            ordinary, additional = Decimal("0.00"), applied_salary
+        elif aw_ceiling is not None and scheme.calculation_base == CalculationBase.ORDINARY_WAGES:
+            # Additional wages are subject to the scheme up to the AW ceiling
+            additional = employee.additional_wages or Decimal("0.00")
+
+        ytd = self.ledger.ytd(employee.employee_id, scheme.code, calculation_date)
+        uncapped = ordinary + additional
+        ordinary, additional = cap_annual(ytd, ordinary, additional, annual_ceiling, aw_ceiling)
+        return YtdEntry(ordinary_wages=ordinary, additional_wages=additional), uncapped
+
+    def replay_ytd(
+        self, employee: EmployeeContext, calculation_date: Optional[date] = None
+    ) -> List[YtdCorrection]:
+        """
+        Apply a retro correction to the YTD ledger
+
+        Recalculates the corrected month from the given context, then every
+        later month of the same year already in the ledger from the contexts
+        they were calculated with. Earlier months are untouched. Entries of
+        schemes a recalculated month no longer posts (the scheme stopped
+        applying or matching a tier) are removed and reported with
+        current=None.
+
+        Args:
+            employee: Corrected context of the month (employee_id required)
+            calculation_date: Month to correct (defaults to employee.calculation_date)
+
+        Returns:
+            One YtdCorrection per month and scheme whose ledger entry changed
+
+        Raises:
+            LookupError: If a later posted month has no remembered context
+                (e.g. a ledger rebuilt with from_entries)
+        """
+        if self.ledger is None or employee.employee_id is None:
+            raise ValueError("replay_ytd needs a ledger and an employee_id")
+        period = calculation_date or employee.calculation_date
+        employee_id = employee.employee_id
+
+        later = self.ledger.later_periods(employee_id, period)
+        unknown = sorted(
+            {m for m in self.ledger.posted_months(employee_id, period.year) if m > period.month}
+            - {on.month for on, _ in later}
         )
+        if unknown:
+            raise LookupError(
+                f"No context remembered for {employee_id} in months {unknown} of "
+                f"{period.year}; remember() them before replaying"
+            )
+
+        corrections = []
+        for on, context in [(period, employee)] + later:
+            previous = self.ledger.month_entries(employee_id, on)
+            self.calculate_all(context, on)
+            current = self.ledger.month_entries(employee_id, on)
+            for scheme_code, entry in previous.items():
+                if current.get(scheme_code) is entry:  # Not posted again
+                    self.ledger.remove(employee_id, scheme_code, on)
+                    del current[scheme_code]
+            for scheme_code in sorted(set(previous) | set(current)):
+                if previous.get(scheme_code) != current.get(scheme_code):
+                    corrections.append(
+                        YtdCorrection(
+                            on, scheme_code, previous.get(scheme_code), current.get(scheme_code)
+                        )
+                    )
+        self.ledger.mark_replayed(employee_id, period.year)
+        return corrections
 
     def _get_calculation_base(self, employee: EmployeeContext, scheme: StatutoryScheme) -> Decimal:
         """Get the wage amount to use as calculation base"""
@@ -361,31 +1136,49 @@ class StatutoryCalculator:
     def _calculate_table_lookup(
         self, salary: Decimal, scheme: StatutoryScheme, calculation_date: date
     ) -> tuple[Decimal, Decimal]:
-        """Calculate using SOCSO-style table lookup"""
-        cursor = self.db.cursor()
+        """Calculate using SOCSO-style table lookup (bisection over the scheme's wage bands)"""
+        band = self._find_table_band(salary, scheme, calculation_date)
+        if band is None:
+            return Decimal("0.00"), Decimal("0.00")
+        return band.employee_amount, band.employer_amount
 
-        query = """
-            SELECT employee_amount, employer_amount
+    def _find_table_band(
+        self, salary: Decimal, scheme: StatutoryScheme, calculation_date: date
+    ) -> Optional[StatutoryTableLookup]:
+        """Wage band covering a salary, or None (logged) when the table has a gap"""
+        snapshot = self._snapshot_for_scheme(scheme.id, calculation_date)
+        if snapshot is not None:
+            band = snapshot.find_table_band(scheme.id, salary, calculation_date)
+        else:
+            band = self._get_band_table(scheme.id).find(salary, calculation_date)
+
+        if band is None:
+            logger.warning(f"No table lookup found for salary {salary} in {scheme.code}")
+        return band
+
+    def _get_band_table(self, scheme_id: int) -> SchemeBandTable:
+        """Load every wage band of a scheme once and index it for bisection"""
+        table = self._band_tables.get(scheme_id)
+        if self.metrics is not None:
+            self.metrics.count("band_table_hit" if table is not None else "band_table_miss")
+        if table is not None:
+            return table
+
+        cursor = self._require_db().cursor()
+
+        query = f"""
+            SELECT {TABLE_LOOKUP_COLUMNS}
             FROM kf_statutory_table_lookup
             WHERE scheme_id = %s
-              AND wage_from <= %s
-              AND wage_to >= %s
-              AND effective_from <= %s
-              AND (effective_until IS NULL OR effective_until >= %s)
-            ORDER BY effective_from DESC
-            LIMIT 1
         """
 
-        cursor.execute(query, (scheme.id, salary, salary, calculation_date, calculation_date))
-
-        row = cursor.fetchone()
+        cursor.execute(query, (scheme_id,))
+        rows = cursor.fetchall()
         cursor.close()
 
-        if not row:
-            logger.warning(f"No table lookup found for salary {salary} in {scheme.code}")
-            return Decimal("0.00"), Decimal("0.00")
-
-        return Decimal(str(row[0])), Decimal(str(row[1]))
+        table = SchemeBandTable(parse_table_lookup_row(row) for row in rows)
+        self._band_tables[scheme_id] = table
+        return table
 
     def _apply_rounding(self, amount: Decimal, method: RoundingMethod, precision: int) -> Decimal:
         """Apply rounding based on method"""
@@ -403,57 +1196,9 @@ class StatutoryCalculator:
 
     def _parse_scheme_row(self, row: tuple) -> StatutoryScheme:
         """Parse database row into StatutoryScheme object"""
-        # This is a simplified parser - in production, use proper ORM
-        return StatutoryScheme(
-            id=row[0],
-            country_code="",  # Would need to join to get this
-            authority_id=row[2],
-            code=row[3],
-            name_en=row[4],
-            name_local=row[5],
-            description=row[6],
-            scheme_type=row[7],
-            calculation_method=CalculationMethod(row[8]),
-            calculation_base=row[9],
-            employee_contribution=row[10],
-            employer_contribution=row[11],
-            citizen_applicable=row[12],
-            pr_applicable=row[13],
-            foreign_worker_applicable=row[14],
-            member_number_required=row[15],
-            member_number_label=row[16],
-            rounding_method=RoundingMethod(row[17]),
-            rounding_precision=row[18],
-            effective_from=row[19],
-            effective_until=row[20],
-            legal_reference=row[21],
-            notes=row[22],
-        )
+        # country_code would need a join to kf_country; snapshots fill it in
+        return parse_scheme_row(row)
 
     def _parse_rate_row(self, row: tuple) -> StatutoryRate:
         """Parse database row into StatutoryRate object"""
-        return StatutoryRate(
-            id=row[0],
-            scheme_id=row[1],
-            tier_code=row[2],
-            tier_description=row[3],
-            min_age=row[4],
-            max_age=row[5],
-            min_salary=Decimal(str(row[6])) if row[6] else None,
-            max_salary=Decimal(str(row[7])) if row[7] else None,
-            nationality_condition=NationalityType(row[8]) if row[8] else NationalityType.ALL,
-            pr_year_condition=row[9],
-            risk_category=RiskCategory(row[10]) if row[10] else None,
-            employee_count_min=row[11],
-            employee_count_max=row[12],
-            employee_rate=Decimal(str(row[13])) if row[13] else None,
-            employer_rate=Decimal(str(row[14])) if row[14] else None,
-            employee_fixed=Decimal(str(row[15])) if row[15] else None,
-            employer_fixed=Decimal(str(row[16])) if row[16] else None,
-            total_rate=Decimal(str(row[17])) if row[17] else None,
-            effective_from=row[18],
-            effective_until=row[19],
-            source_reference=row[20],
-            verified_date=row[21],
-            notes=row[22],
-        )
+        return parse_rate_row(row)
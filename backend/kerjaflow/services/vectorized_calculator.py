@@ -0,0 +1,409 @@
+"""
+Vectorized Calculator
+=====================
+NumPy contribution engine for bulk runs over integer-cent arrays
+
+Requires the optional ``numpy`` dependency (``pip install kerjaflow-statutory[vectorized]``).
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ..models.statutory import (
+    CalculationBase,
+    CalculationMethod,
+    NationalityType,
+    RiskCategory,
+    RoundingMethod,
+    StatutoryRate,
+    StatutoryScheme,
+)
+from .fixed_point import decimal_places, scaled
+from .rule_snapshot import RuleSnapshot
+
+# Employee nationality codes; ALL and None both mean "no nationality filter"
+NATIONALITY_CODES: Dict[Optional[NationalityType], int] = {
+    None: 0,
+    NationalityType.ALL: 0,
+    NationalityType.CITIZEN: 1,
+    NationalityType.PR: 2,
+    NationalityType.FOREIGN: 3,
+}
+
+RISK_CODES: Dict[Optional[RiskCategory], int] = {
+    None: 0,
+    **{risk: i + 1 for i, risk in enumerate(RiskCategory)},
+}
+
+# Percentage and tiered schemes differ only in how the tier is chosen
+VECTORIZED_METHODS = (
+    CalculationMethod.PERCENTAGE,
+    CalculationMethod.TIERED_PERCENTAGE,
+    CalculationMethod.TABLE_LOOKUP,
+)
+
+
+def to_cents(amounts: Iterable[Optional[Decimal]]) -> np.ndarray:
+    """
+    Convert Decimal amounts to an int64 cent array (None becomes 0)
+
+    Raises:
+        ValueError: If an amount has fractions of a cent
+    """
+    cents = []
+    for amount in amounts:
+        if amount is None:
+            cents.append(0)
+            continue
+        scaled = Decimal(amount).scaleb(2)
+        if scaled != scaled.to_integral_value():
+            raise ValueError(f"Amount {amount} is not a whole number of cents")
+        cents.append(int(scaled))
+    return np.array(cents, dtype=np.int64)
+
+
+def from_cents(cents: np.ndarray) -> List[Decimal]:
+    """Convert an int cent array back to Decimal amounts with two places"""
+    return [Decimal(int(value)).scaleb(-2) for value in cents]
+
+
+def round_scaled(amounts: np.ndarray, divisor: int, method: RoundingMethod) -> np.ndarray:
+    """
+    Divide scaled integer amounts by divisor, rounding like Decimal.quantize
+
+    NEAREST and NEAREST_RINGGIT are ROUND_HALF_UP, FLOOR is ROUND_DOWN and
+    CEILING is ROUND_UP; all three round magnitudes, as Decimal does for
+    negative amounts.
+    """
+    if divisor == 1:
+        return amounts
+    sign = np.sign(amounts)
+    quotient, remainder = np.divmod(np.abs(amounts), divisor)
+    if method in (RoundingMethod.NEAREST, RoundingMethod.NEAREST_RINGGIT):
+        quotient += 2 * remainder >= divisor
+    elif method == RoundingMethod.CEILING:
+        quotient += remainder > 0
+    return sign * quotient
+
+
+@dataclass
+class SchemeColumns:
+    """Per-employee results of one scheme, aligned with the input arrays"""
+
+    scheme_code: str
+    calculation_method: CalculationMethod
+    applicable: np.ndarray  # False where calculate_all would produce no contribution
+    tier_index: np.ndarray  # Index into tier_codes, -1 where no tier matched
+    tier_codes: Sequence[str]
+    base_cents: np.ndarray
+    applied_cents: np.ndarray
+    capped: np.ndarray
+    employee_cents: np.ndarray
+    employer_cents: np.ndarray
+
+    def tier_code(self, i: int) -> Optional[str]:
+        """Tier applied to employee i"""
+        k = int(self.tier_index[i])
+        return self.tier_codes[k] if k >= 0 else None
+
+
+@dataclass
+class VectorizedResult:
+    """Contribution arrays for every scheme of one country and date"""
+
+    country_code: str
+    calculation_date: date
+    schemes: Dict[str, SchemeColumns] = field(default_factory=dict)
+    employee_cents: Optional[np.ndarray] = None
+    employer_cents: Optional[np.ndarray] = None
+
+
+class VectorizedCalculator:
+    """
+    Array-at-a-time equivalent of StatutoryCalculator.calculate_all
+
+    Works from a RuleSnapshot on int64 cent arrays: ceilings, tier
+    selection, percentage rates, fixed amounts, wage-band tables and every
+    RoundingMethod are applied column-wise. Rates are scaled to integers so
+    no floating point is involved, and results agree to the cent with the
+    scalar Decimal path.
+    """
+
+    def __init__(self, snapshot: RuleSnapshot):
+        self.snapshot = snapshot
+
+    def calculate(
+        self,
+        gross_cents: np.ndarray,
+        ages: np.ndarray,
+        nationalities: Sequence[Optional[NationalityType]],
+        calculation_date: date,
+        basic_cents: Optional[np.ndarray] = None,
+        ordinary_cents: Optional[np.ndarray] = None,
+        additional_cents: Optional[np.ndarray] = None,
+        risk_categories: Optional[Sequence[Optional[RiskCategory]]] = None,
+        employee_counts: Optional[np.ndarray] = None,
+    ) -> VectorizedResult:
+        """
+        Calculate every applicable scheme for a column of employees
+
+        Optional wage columns follow the scalar fallbacks: a 0 basic or
+        ordinary wage means "use gross", as an unset one does in
+        EmployeeContext. An employee count of 0 means unknown.
+
+        Args:
+            gross_cents: Gross salary per employee, in cents
+            ages: Age per employee
+            nationalities: NationalityType (or None) per employee
+            calculation_date: Date for rule lookup, shared by the whole column
+            basic_cents: Basic salary per employee, in cents
+            ordinary_cents: CPF ordinary wages per employee, in cents
+            additional_cents: CPF additional wages per employee, in cents
+            risk_categories: RiskCategory (or None) per employee
+            employee_counts: Company headcount per employee
+
+        Returns:
+            VectorizedResult with one SchemeColumns per scheme in effect
+        """
+        if not self.snapshot.covers(calculation_date):
+            raise LookupError(
+                f"{self.snapshot.country_code} snapshot does not cover {calculation_date}"
+            )
+
+        count = len(gross_cents)
+        columns = {
+            "gross": np.asarray(gross_cents, dtype=np.int64),
+            "age": np.asarray(ages, dtype=np.int64),
+            "nationality": np.array([NATIONALITY_CODES[n] for n in nationalities], dtype=np.int8),
+            "risk": np.array(
+                [RISK_CODES[r] for r in risk_categories or [None] * count], dtype=np.int8
+            ),
+        }
+        headcount = (
+            np.zeros(count, dtype=np.int64)
+            if employee_counts is None
+            else np.asarray(employee_counts, dtype=np.int64)
+        )
+        # `company_employee_count or 0` / `or 999999` in the scalar path
+        columns["headcount_low"] = np.where(headcount > 0, headcount, 0)
+        columns["headcount_high"] = np.where(headcount > 0, headcount, 999999)
+        for name, values in (
+            ("basic", basic_cents),
+            ("ordinary", ordinary_cents),
+            ("additional", additional_cents),
+        ):
+            columns[name] = None if values is None else np.asarray(values, dtype=np.int64)
+
+        result = VectorizedResult(self.snapshot.country_code, calculation_date)
+        result.employee_cents = np.zeros(count, dtype=np.int64)
+        result.employer_cents = np.zeros(count, dtype=np.int64)
+
+        for scheme in self.snapshot.get_applicable_schemes(None, calculation_date):
+            scheme_columns = self._calculate_scheme(scheme, columns, calculation_date)
+            result.schemes[scheme.code] = scheme_columns
+            applicable = scheme_columns.applicable
+            result.employee_cents += np.where(applicable, scheme_columns.employee_cents, 0)
+            result.employer_cents += np.where(applicable, scheme_columns.employer_cents, 0)
+
+        return result
+
+    def _calculate_scheme(
+        self, scheme: StatutoryScheme, columns: dict, calculation_date: date
+    ) -> SchemeColumns:
+        count = len(columns["gross"])
+        nationality = columns["nationality"]
+
+        applicable = np.ones(count, dtype=bool)
+        for code, allowed in (
+            (1, scheme.citizen_applicable),
+            (2, scheme.pr_applicable),
+            (3, scheme.foreign_worker_applicable),
+        ):
+            if not allowed:
+                applicable &= nationality != code
+
+        base = self._calculation_base(scheme, columns)
+        ceiling = self.snapshot.get_ceiling(scheme.id, calculation_date)
+        if ceiling is not None:
+            ceiling_cents = scaled(ceiling.ceiling_amount, 2)
+            capped = base > ceiling_cents
+            applied = np.where(capped, ceiling_cents, base)
+        else:
+            capped = np.zeros(count, dtype=bool)
+            applied = base
+
+        tiers = self._tiers_in_effect(scheme.id, calculation_date)
+        tier_index = self._select_tiers(tiers, columns)
+        applicable &= tier_index >= 0
+        if scheme.calculation_method not in VECTORIZED_METHODS:
+            applicable[:] = False
+
+        precision = (
+            0
+            if scheme.rounding_method == RoundingMethod.NEAREST_RINGGIT
+            else scheme.rounding_precision
+        )
+        if precision > 2 or precision < 0:
+            raise ValueError(
+                f"{scheme.code}: rounding precision {precision} cannot be expressed in cents"
+            )
+
+        if scheme.calculation_method == CalculationMethod.TABLE_LOOKUP:
+            # Bands are keyed on the uncapped base, as in the scalar path
+            employee_raw, employer_raw = self._table_amounts(scheme.id, base, calculation_date)
+            places = 0
+        else:
+            places = max(
+                [decimal_places(r.employee_rate) for r in tiers]
+                + [decimal_places(r.employer_rate) for r in tiers]
+                + [0]
+            )
+            safe_index = np.maximum(tier_index, 0)
+            employee_raw = self._percentage_amounts(
+                tiers, safe_index, applied, places, "employee_rate", "employee_fixed"
+            )
+            employer_raw = self._percentage_amounts(
+                tiers, safe_index, applied, places, "employer_rate", "employer_fixed"
+            )
+
+        # Raw amounts are in units of 10**-(2 + places) currency
+        divisor = 10 ** (2 + places - precision)
+        to_cents_factor = 10 ** (2 - precision)
+        employee = round_scaled(employee_raw, divisor, scheme.rounding_method) * to_cents_factor
+        employer = round_scaled(employer_raw, divisor, scheme.rounding_method) * to_cents_factor
+
+        zeros = np.zeros(count, dtype=np.int64)
+        return SchemeColumns(
+            scheme_code=scheme.code,
+            calculation_method=scheme.calculation_method,
+            applicable=applicable,
+            tier_index=tier_index,
+            tier_codes=tuple(rate.tier_code for rate in tiers),
+            base_cents=base,
+            applied_cents=applied,
+            capped=capped,
+            employee_cents=np.where(applicable, employee, zeros),
+            employer_cents=np.where(applicable, employer, zeros),
+        )
+
+    @staticmethod
+    def _calculation_base(scheme: StatutoryScheme, columns: dict) -> np.ndarray:
+        """Vector form of StatutoryCalculator._get_calculation_base"""
+        gross = columns["gross"]
+        if scheme.calculation_base == CalculationBase.ADDITIONAL_WAGES:
+            additional = columns["additional"]
+            return np.zeros_like(gross) if additional is None else additional
+        source = {
+            CalculationBase.BASIC: columns["basic"],
+            CalculationBase.ORDINARY_WAGES: columns["ordinary"],
+        }.get(scheme.calculation_base)
+        if source is None:
+            return gross
+        return np.where(source != 0, source, gross)
+
+    def _tiers_in_effect(self, scheme_id: int, calculation_date: date) -> List[StatutoryRate]:
+        compiled = self.snapshot.compiled_tiers(scheme_id)
+        if compiled is None:
+            return []
+        return [
+            rate
+            for rate in compiled.rates
+            if rate.effective_from <= calculation_date
+            and (rate.effective_until is None or rate.effective_until >= calculation_date)
+        ]
+
+    @staticmethod
+    def _select_tiers(tiers: List[StatutoryRate], columns: dict) -> np.ndarray:
+        """First matching tier in priority order, as masks over the whole column"""
+        gross = columns["gross"]
+        age = columns["age"]
+        chosen = np.full(len(gross), -1, dtype=np.int64)
+        for k, rate in enumerate(tiers):
+            mask = chosen == -1
+            if rate.min_age is not None:
+                mask &= age >= rate.min_age
+            if rate.max_age is not None:
+                mask &= age <= rate.max_age
+            if rate.min_salary is not None:
+                mask &= gross >= scaled(rate.min_salary, 2)
+            if rate.max_salary is not None:
+                mask &= gross <= scaled(rate.max_salary, 2)
+            if rate.nationality_condition != NationalityType.ALL:
+                mask &= columns["nationality"] == NATIONALITY_CODES[rate.nationality_condition]
+            if rate.risk_category is not None:
+                mask &= columns["risk"] == RISK_CODES[rate.risk_category]
+            if rate.employee_count_min is not None:
+                mask &= columns["headcount_low"] >= rate.employee_count_min
+            if rate.employee_count_max is not None:
+                mask &= columns["headcount_high"] <= rate.employee_count_max
+            chosen[mask] = k
+        return chosen
+
+    @staticmethod
+    def _percentage_amounts(
+        tiers: List[StatutoryRate],
+        tier_index: np.ndarray,
+        applied: np.ndarray,
+        places: int,
+        rate_field: str,
+        fixed_field: str,
+    ) -> np.ndarray:
+        """applied * rate, or the fixed amount where the tier has one"""
+        if not tiers:
+            return np.zeros_like(applied)
+        rates = np.array([scaled(getattr(r, rate_field), places) for r in tiers], dtype=np.int64)
+        fixed = np.array(
+            [scaled(getattr(r, fixed_field), 2) * 10**places for r in tiers], dtype=np.int64
+        )
+        has_fixed = np.array([bool(getattr(r, fixed_field)) for r in tiers])
+
+        largest = int(np.abs(applied).max(initial=0)) * int(np.abs(rates).max(initial=0))
+        if largest >= 2**63:
+            raise OverflowError("Salary x rate exceeds int64; use the scalar calculator")
+
+        return np.where(has_fixed[tier_index], fixed[tier_index], applied * rates[tier_index])
+
+    def _table_amounts(self, scheme_id: int, base: np.ndarray, calculation_date: date):
+        """Band amounts in cents; 0 where no band covers the wage, as in the scalar path"""
+        employee = np.zeros(len(base), dtype=np.int64)
+        employer = np.zeros(len(base), dtype=np.int64)
+        unresolved = np.ones(len(base), dtype=bool)
+
+        for effective_from, effective_until, index in self.snapshot.band_table(scheme_id).periods:
+            if effective_from > calculation_date or (
+                effective_until is not None and effective_until < calculation_date
+            ):
+                continue
+            if not len(index):
+                continue
+            if index.overlapping:
+                for i in np.flatnonzero(unresolved):
+                    band = index.find(Decimal(int(base[i])).scaleb(-2))
+                    if band is not None:
+                        employee[i] = scaled(band.employee_amount, 2)
+                        employer[i] = scaled(band.employer_amount, 2)
+                        unresolved[i] = False
+                continue
+
+            starts = np.array([scaled(b.wage_from, 2) for b in index.bands], dtype=np.int64)
+            ends = np.array([scaled(b.wage_to, 2) for b in index.bands], dtype=np.int64)
+            position = np.searchsorted(starts, base, side="right") - 1
+            safe = np.maximum(position, 0)
+            hit = unresolved & (position >= 0) & (ends[safe] >= base)
+            employee = np.where(
+                hit,
+                np.array([scaled(b.employee_amount, 2) for b in index.bands])[safe],
+                employee,
+            )
+            employer = np.where(
+                hit,
+                np.array([scaled(b.employer_amount, 2) for b in index.bands])[safe],
+                employer,
+            )
+            unresolved &= ~hit
+
+        return employee, employer
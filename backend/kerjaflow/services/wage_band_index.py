@@ -0,0 +1,84 @@
+"""
+Wage Band Index
+===============
+Bisection index over kf_statutory_table_lookup wage bands
+"""
+
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models.statutory import StatutoryTableLookup
+
+
+class WageBandIndex:
+    """
+    Wage bands of one scheme and effective period, sorted for bisection
+
+    Bands are sorted by wage_from and searched with bisect, so a lookup is
+    O(log n). Published contribution tables never overlap; if a table does,
+    the running maximum of wage_to lets the search step back to an earlier,
+    wider band instead of missing it.
+    """
+
+    def __init__(self, bands: Iterable[StatutoryTableLookup]):
+        self.bands: List[StatutoryTableLookup] = sorted(
+            bands, key=lambda band: (band.wage_from, band.wage_to, band.id)
+        )
+        self._starts: List[Decimal] = [band.wage_from for band in self.bands]
+
+        # _reach[i] = highest wage_to among bands[0..i]
+        self._reach: List[Decimal] = []
+        for band in self.bands:
+            reach = self._reach[-1] if self._reach else band.wage_to
+            self._reach.append(max(reach, band.wage_to))
+
+        self.overlapping = any(
+            self._reach[i - 1] >= self.bands[i].wage_from for i in range(1, len(self.bands))
+        )
+
+    def __len__(self) -> int:
+        return len(self.bands)
+
+    def find(self, salary: Decimal) -> Optional[StatutoryTableLookup]:
+        """Band with wage_from <= salary <= wage_to, or None if salary falls in a gap"""
+        i = bisect_right(self._starts, salary) - 1
+        while i >= 0 and self._reach[i] >= salary:
+            if self.bands[i].wage_to >= salary:
+                return self.bands[i]
+            i -= 1
+        return None
+
+
+class SchemeBandTable:
+    """
+    All effective periods of one table-lookup scheme
+
+    Periods are kept latest effective_from first, matching the
+    ORDER BY effective_from DESC of the SQL range query.
+    """
+
+    def __init__(self, bands: Iterable[StatutoryTableLookup]):
+        periods: Dict[Tuple[date, Optional[date]], List[StatutoryTableLookup]] = {}
+        for band in bands:
+            periods.setdefault((band.effective_from, band.effective_until), []).append(band)
+
+        self.periods: List[Tuple[date, Optional[date], WageBandIndex]] = [
+            (effective_from, effective_until, WageBandIndex(period_bands))
+            for (effective_from, effective_until), period_bands in sorted(
+                periods.items(), key=lambda item: item[0][0], reverse=True
+            )
+        ]
+
+    def find(self, salary: Decimal, calculation_date: date) -> Optional[StatutoryTableLookup]:
+        """Band for salary in the latest period in effect on calculation_date"""
+        for effective_from, effective_until, index in self.periods:
+            if effective_from > calculation_date:
+                continue
+            if effective_until is not None and effective_until < calculation_date:
+                continue
+            band = index.find(salary)
+            if band is not None:
+                return band
+        return None
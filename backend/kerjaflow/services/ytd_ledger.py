@@ -0,0 +1,248 @@
+"""
+Year-to-Date Ledger
+===================
+Per-employee, per-scheme running totals for ANNUAL and AW_ANNUAL ceilings
+
+The calculator reads the wages already subject to a scheme this calendar
+year, caps the current month against the annual ceilings and posts the
+month back. Months are posted in pay-run order, so reading and posting are
+O(1); a month before the latest posted one is a retro correction, after
+which the later months of that year are stale until replayed
+(StatutoryCalculator.replay_ytd).
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from ..models.statutory import EmployeeContext
+
+ZERO = Decimal("0.00")
+
+# (employee_id, scheme_code, year)
+LedgerKey = Tuple[str, str, int]
+
+
+@dataclass(slots=True)
+class YtdEntry:
+    """Wages subject to a scheme and contributions of one pay month"""
+
+    ordinary_wages: Decimal = ZERO  # Ordinary wage base after ceilings
+    additional_wages: Decimal = ZERO  # Additional wages after the AW ceiling
+    employee_amount: Decimal = ZERO
+    employer_amount: Decimal = ZERO
+
+    @property
+    def wages(self) -> Decimal:
+        return self.ordinary_wages + self.additional_wages
+
+
+@dataclass(slots=True)
+class YtdTotals:
+    """Running totals of the posted months of one year"""
+
+    ordinary_wages: Decimal = ZERO
+    additional_wages: Decimal = ZERO
+    employee_amount: Decimal = ZERO
+    employer_amount: Decimal = ZERO
+
+    @property
+    def wages(self) -> Decimal:
+        return self.ordinary_wages + self.additional_wages
+
+    def add(self, entry: YtdEntry, sign: int = 1) -> None:
+        self.ordinary_wages += sign * entry.ordinary_wages
+        self.additional_wages += sign * entry.additional_wages
+        self.employee_amount += sign * entry.employee_amount
+        self.employer_amount += sign * entry.employer_amount
+
+
+@dataclass
+class YtdCorrection:
+    """Change to one posted month found by a retro replay"""
+
+    period: date
+    scheme_code: str
+    previous: Optional[YtdEntry]
+    current: Optional[YtdEntry]
+
+    @property
+    def employee_delta(self) -> Decimal:
+        return _amount(self.current, "employee_amount") - _amount(self.previous, "employee_amount")
+
+    @property
+    def employer_delta(self) -> Decimal:
+        return _amount(self.current, "employer_amount") - _amount(self.previous, "employer_amount")
+
+
+def _amount(entry: Optional[YtdEntry], name: str) -> Decimal:
+    return getattr(entry, name) if entry is not None else ZERO
+
+
+def cap_annual(
+    ytd: YtdTotals,
+    ordinary: Decimal,
+    additional: Decimal,
+    annual_ceiling: Optional[Decimal],
+    aw_ceiling: Optional[Decimal],
+) -> Tuple[Decimal, Decimal]:
+    """
+    Wages of the current month still subject to the scheme
+
+    AW_ANNUAL limits additional wages to the ceiling less the ordinary wages
+    subject this year (including this month) and the additional wages already
+    subject (the CPF rule). ANNUAL limits all subject wages of the year.
+
+    Returns:
+        (ordinary, additional) after both ceilings
+    """
+    if aw_ceiling is not None:
+        room = aw_ceiling - ytd.ordinary_wages - ordinary - ytd.additional_wages
+        additional = min(additional, max(room, ZERO))
+    if annual_ceiling is not None:
+        room = max(annual_ceiling - ytd.wages, ZERO)
+        ordinary = min(ordinary, room)
+        additional = min(additional, room - ordinary)
+    return ordinary, additional
+
+
+class _Year:
+    """Posted months of one employee, scheme and year"""
+
+    __slots__ = ("months", "totals", "last_month")
+
+    def __init__(self):
+        self.months: Dict[int, YtdEntry] = {}
+        self.totals = YtdTotals()
+        self.last_month = 0
+
+    def before(self, month: int) -> YtdTotals:
+        if month > self.last_month:
+            return self.totals
+        if month == self.last_month:
+            totals = YtdTotals()
+            totals.add(self.totals)
+            totals.add(self.months[month], -1)
+            return totals
+        # Retro month: at most eleven earlier months to add up
+        totals = YtdTotals()
+        for earlier, entry in self.months.items():
+            if earlier < month:
+                totals.add(entry)
+        return totals
+
+
+class YtdLedger:
+    """
+    In-memory YTD ledger, optionally seeded from and exported to storage
+
+    Entries are keyed by (employee_id, scheme_code, year) and month. The
+    employee context of every posted month is kept so a retro correction can
+    recalculate the months after it.
+    """
+
+    def __init__(self):
+        self._years: Dict[LedgerKey, _Year] = {}
+        self._contexts: Dict[Tuple[str, int], Dict[int, Tuple[date, EmployeeContext]]] = {}
+        self._schemes: Dict[str, Set[str]] = {}  # Scheme codes posted per employee
+        # (employee_id, year) -> first month whose successors need a replay
+        self._stale: Dict[Tuple[str, int], int] = {}
+
+    def ytd(self, employee_id: str, scheme_code: str, period: date) -> YtdTotals:
+        """Totals of the months of period's year before period's month"""
+        year = self._years.get((employee_id, scheme_code, period.year))
+        if year is None:
+            return YtdTotals()
+        return year.before(period.month)
+
+    def entry(self, employee_id: str, scheme_code: str, period: date) -> Optional[YtdEntry]:
+        year = self._years.get((employee_id, scheme_code, period.year))
+        return year.months.get(period.month) if year is not None else None
+
+    def post(self, employee_id: str, scheme_code: str, period: date, entry: YtdEntry) -> None:
+        """Record (or replace) a month; replacing the latest month is a re-run, not a retro"""
+        key = (employee_id, scheme_code, period.year)
+        year = self._years.get(key)
+        if year is None:
+            year = self._years[key] = _Year()
+            self._schemes.setdefault(employee_id, set()).add(scheme_code)
+        previous = year.months.get(period.month)
+        if previous is not None:
+            year.totals.add(previous, -1)
+        year.months[period.month] = entry
+        year.totals.add(entry)
+        if period.month < year.last_month:
+            stale_key = (employee_id, period.year)
+            self._stale[stale_key] = min(self._stale.get(stale_key, 13), period.month)
+        year.last_month = max(year.last_month, period.month)
+
+    def remove(self, employee_id: str, scheme_code: str, period: date) -> Optional[YtdEntry]:
+        """Drop a posted month (e.g. the scheme no longer applies after a correction)"""
+        year = self._years.get((employee_id, scheme_code, period.year))
+        if year is None or period.month not in year.months:
+            return None
+        entry = year.months.pop(period.month)
+        year.totals.add(entry, -1)
+        if period.month < year.last_month:
+            stale_key = (employee_id, period.year)
+            self._stale[stale_key] = min(self._stale.get(stale_key, 13), period.month)
+        else:
+            year.last_month = max(year.months, default=0)
+        return entry
+
+    def posted_months(self, employee_id: str, year: int) -> Set[int]:
+        """Months of a year with at least one posted entry for the employee"""
+        months = set()
+        for scheme_code in self._schemes.get(employee_id, ()):
+            posted = self._years.get((employee_id, scheme_code, year))
+            if posted is not None:
+                months.update(posted.months)
+        return months
+
+    def month_entries(self, employee_id: str, period: date) -> Dict[str, YtdEntry]:
+        """Posted entries of one employee and month, keyed by scheme code"""
+        entries = {}
+        for scheme_code in self._schemes.get(employee_id, ()):
+            entry = self.entry(employee_id, scheme_code, period)
+            if entry is not None:
+                entries[scheme_code] = entry
+        return entries
+
+    def remember(self, employee: EmployeeContext, period: date) -> None:
+        """Keep the context and date a month was calculated with (for replays)"""
+        months = self._contexts.setdefault((employee.employee_id, period.year), {})
+        months[period.month] = (period, employee)
+
+    def later_periods(self, employee_id: str, period: date) -> List[Tuple[date, EmployeeContext]]:
+        """Remembered (date, context) of the months of period's year after period, in order"""
+        months = self._contexts.get((employee_id, period.year), {})
+        return [months[month] for month in sorted(months) if month > period.month]
+
+    def stale_from(self, employee_id: str, year: int) -> Optional[int]:
+        """Month after which posted months are stale (None if consistent)"""
+        return self._stale.get((employee_id, year))
+
+    def mark_replayed(self, employee_id: str, year: int) -> None:
+        self._stale.pop((employee_id, year), None)
+
+    def entries(self) -> Iterator[Tuple[str, str, int, int, YtdEntry]]:
+        """Every posted month as (employee_id, scheme_code, year, month, entry)"""
+        for (employee_id, scheme_code, year), posted in self._years.items():
+            for month in sorted(posted.months):
+                yield employee_id, scheme_code, year, month, posted.months[month]
+
+    @classmethod
+    def from_entries(cls, entries: Iterator[Tuple[str, str, int, int, YtdEntry]]) -> "YtdLedger":
+        """
+        Rebuild a ledger from entries(), e.g. loaded from a table at startup
+
+        Contexts are not part of the entries: remember() the months that may
+        be replayed before calling StatutoryCalculator.replay_ytd.
+        """
+        ledger = cls()
+        for employee_id, scheme_code, year, month, entry in sorted(
+            entries, key=lambda e: (e[0], e[1], e[2], e[3])
+        ):
+            ledger.post(employee_id, scheme_code, date(year, month, 1), entry)
+        return ledger
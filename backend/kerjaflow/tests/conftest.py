@@ -11,7 +11,9 @@ import psycopg2
 import pytest
 
 from ..models.statutory import EmployeeContext, NationalityType, RiskCategory
+from ..services.rule_snapshot import RuleSnapshot
 from ..services.statutory_calculator import StatutoryCalculator
+from .factories import malaysia_rule_rows
 
 
 @pytest.fixture(scope="session")
@@ -45,6 +47,29 @@ def calculator(db_connection) -> StatutoryCalculator:
     return StatutoryCalculator(db_connection)
 
 
+# ============================================================================
+# IN-MEMORY RULE SNAPSHOT FIXTURES (no database required)
+# ============================================================================
+
+
+@pytest.fixture
+def my_rule_rows() -> dict:
+    """Raw Malaysia-like rule rows"""
+    return malaysia_rule_rows()
+
+
+@pytest.fixture
+def my_snapshot(my_rule_rows) -> RuleSnapshot:
+    """Malaysia-like rule snapshot covering 2024-2026"""
+    return RuleSnapshot("MY", date(2024, 1, 1), date(2026, 12, 31), **my_rule_rows)
+
+
+@pytest.fixture
+def snapshot_calculator(my_snapshot) -> StatutoryCalculator:
+    """Calculator answering every lookup from the Malaysia-like snapshot"""
+    return StatutoryCalculator(snapshots=[my_snapshot])
+
+
 # ============================================================================
 # MALAYSIA FIXTURES
 # ============================================================================
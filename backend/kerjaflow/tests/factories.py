@@ -0,0 +1,294 @@
+"""
+Rule Row Factories
+==================
+Build employee contexts, raw statutory table rows and fake connections for
+database-free tests
+"""
+
+import asyncio
+import random
+import re
+from contextlib import asynccontextmanager
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from ..models.statutory import EmployeeContext, NationalityType, RiskCategory
+
+
+def employee(**overrides) -> EmployeeContext:
+    """Malaysian citizen aged 30 earning 4,500 in June 2025, with overrides"""
+    values = dict(
+        country_code="MY",
+        nationality=NationalityType.CITIZEN,
+        age=30,
+        gross_salary=Decimal("4500.00"),
+        calculation_date=date(2025, 6, 1),
+    )
+    values.update(overrides)
+    return EmployeeContext(**values)
+
+
+# Wage thresholds of the seed rules (in major units before the country's scale)
+WAGE_BOUNDARIES = (500, 1500, 2800, 3000, 4000, 4500, 5000, 6000, 7400, 8000, 17500, 30000)
+AGE_BOUNDARIES = (18, 21, 30, 54, 55, 56, 59, 60, 61, 62, 65, 66, 70, 71, 80)
+# Salary multiplier of currencies with small units
+WAGE_SCALE = {"ID": 1000, "VN": 5000, "KH": 200, "MM": 100}
+
+
+def boundary_workforce(
+    country_code: str, calculation_date: date, size: int = 200, seed: str = ""
+) -> list:
+    """
+    Deterministic employees around the age, salary and headcount boundaries
+
+    About 30% of salaries sit one cent either side of a wage threshold; the
+    rest are spread up to 50,000 (scaled). Differential tests of the engines
+    run the same workforce through both; seed separates their workforces.
+    """
+    rng = random.Random(f"{seed}{country_code}-{calculation_date}")
+    scale = WAGE_SCALE.get(country_code, 1)
+    cent = Decimal("0.01")
+    employees = []
+    for i in range(size):
+        if rng.random() < 0.3:
+            cents = rng.choice(WAGE_BOUNDARIES) * scale * 100 + rng.choice([-1, 0, 1])
+        else:
+            cents = rng.randrange(1, 5_000_000 * scale)
+        salary = Decimal(cents).scaleb(-2)
+        employees.append(
+            EmployeeContext(
+                country_code=country_code,
+                nationality=rng.choice([*NationalityType, None]),
+                age=rng.choice(AGE_BOUNDARIES),
+                gross_salary=salary,
+                basic_salary=rng.choice([None, salary, (salary * 4 / 5).quantize(cent)]),
+                ordinary_wages=rng.choice([None, salary, min(salary, Decimal("7000.00"))]),
+                additional_wages=rng.choice([None, None, salary]),
+                risk_category=rng.choice([None, *RiskCategory]),
+                company_employee_count=rng.choice([None, 0, 5, 50, 100, 500]),
+                calculation_date=calculation_date,
+                employee_id=f"{country_code}{i:04d}",
+            )
+        )
+    return employees
+
+
+def scheme_row(
+    id: int,
+    code: str,
+    calculation_method: str = "PERCENTAGE",
+    calculation_base: str = "GROSS",
+    citizen_applicable: bool = True,
+    pr_applicable: bool = True,
+    foreign_worker_applicable: bool = False,
+    rounding_method: str = "NEAREST",
+    rounding_precision: int = 2,
+    effective_from: date = date(2025, 1, 1),
+    effective_until: Optional[date] = None,
+    sort_order: int = 0,
+) -> tuple:
+    """kf_statutory_scheme row in SCHEME_COLUMNS order"""
+    return (
+        id, 1, None, code, f"{code} scheme", None,
+        None, "SOCIAL_SECURITY", calculation_method, calculation_base,
+        True, True,
+        citizen_applicable, pr_applicable, foreign_worker_applicable,
+        False, None,
+        rounding_method, rounding_precision,
+        effective_from, effective_until, None, None,
+        sort_order,
+    )  # fmt: skip
+
+
+def rate_row(
+    id: int,
+    scheme_id: int,
+    tier_code: str,
+    employee_rate: Optional[str] = None,
+    employer_rate: Optional[str] = None,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+    min_salary: Optional[str] = None,
+    max_salary: Optional[str] = None,
+    nationality_condition: Optional[str] = "ALL",
+    risk_category: Optional[str] = None,
+    employee_count_min: Optional[int] = None,
+    employee_count_max: Optional[int] = None,
+    employee_fixed: Optional[str] = None,
+    employer_fixed: Optional[str] = None,
+    effective_from: date = date(2025, 1, 1),
+    effective_until: Optional[date] = None,
+) -> tuple:
+    """kf_statutory_rate row in RATE_COLUMNS order"""
+
+    def dec(value):
+        return Decimal(value) if value is not None else None
+
+    return (
+        id, scheme_id, tier_code, f"{tier_code} tier",
+        min_age, max_age, dec(min_salary), dec(max_salary),
+        nationality_condition, None,
+        risk_category, employee_count_min, employee_count_max,
+        dec(employee_rate), dec(employer_rate), dec(employee_fixed), dec(employer_fixed), None,
+        effective_from, effective_until,
+        None, None, None,
+    )  # fmt: skip
+
+
+def ceiling_row(
+    id: int,
+    scheme_id: int,
+    ceiling_amount: str,
+    ceiling_type: str = "MONTHLY",
+    effective_from: date = date(2025, 1, 1),
+    effective_until: Optional[date] = None,
+) -> tuple:
+    """kf_statutory_ceiling row in CEILING_COLUMNS order"""
+    return (
+        id, scheme_id, ceiling_type, Decimal(ceiling_amount), None,
+        effective_from, effective_until,
+    )  # fmt: skip
+
+
+def table_lookup_row(
+    id: int,
+    scheme_id: int,
+    wage_from: str,
+    wage_to: str,
+    employee_amount: str,
+    employer_amount: str,
+    effective_from: date = date(2025, 1, 1),
+    effective_until: Optional[date] = None,
+    category: Optional[str] = None,
+) -> tuple:
+    """kf_statutory_table_lookup row in TABLE_LOOKUP_COLUMNS order"""
+    return (
+        id, scheme_id, Decimal(wage_from), Decimal(wage_to), category,
+        Decimal(employee_amount), Decimal(employer_amount),
+        effective_from, effective_until,
+    )  # fmt: skip
+
+
+def malaysia_rule_rows() -> dict:
+    """
+    Small Malaysia-like rule set
+
+    EPF (age/salary tiers), SOCSO (percentage + ceiling), EIS (Oct 2024 change)
+    and a three-band table-lookup scheme.
+    """
+    return {
+        "scheme_rows": [
+            scheme_row(1, "EPF", "TIERED_PERCENTAGE", sort_order=1),
+            scheme_row(2, "SOCSO", sort_order=2),
+            scheme_row(3, "EIS", effective_from=date(2024, 1, 1), sort_order=3),
+            scheme_row(4, "SOCSO_TABLE", "TABLE_LOOKUP", sort_order=4),
+            scheme_row(5, "EPF_FOREIGN", citizen_applicable=False, pr_applicable=False,
+                       foreign_worker_applicable=True, effective_from=date(2025, 10, 1),
+                       sort_order=5),
+        ],  # fmt: skip
+        "rate_rows": [
+            rate_row(10, 1, "MY_UNDER60_UNDER5K", "0.11", "0.13", max_age=59, max_salary="5000"),
+            rate_row(11, 1, "MY_UNDER60_OVER5K", "0.11", "0.12", max_age=59),
+            rate_row(12, 1, "MY_OVER60", "0.055", "0.04", min_age=60),
+            rate_row(20, 2, "SOCSO_STANDARD", "0.005", "0.0125", nationality_condition=None),
+            rate_row(30, 3, "EIS_OLD", "0.004", "0.004", effective_from=date(2024, 1, 1),
+                     effective_until=date(2024, 9, 30)),
+            rate_row(31, 3, "EIS_STANDARD", "0.002", "0.002", effective_from=date(2024, 10, 1)),
+            rate_row(40, 4, "SOCSO_TABLE", "0", "0"),
+            rate_row(50, 5, "FOREIGN_2025", "0.02", "0.02", nationality_condition="FOREIGN",
+                     effective_from=date(2025, 10, 1)),
+        ],  # fmt: skip
+        "ceiling_rows": [
+            ceiling_row(100, 2, "5000.00"),
+            ceiling_row(
+                101,
+                3,
+                "4000.00",
+                effective_from=date(2024, 1, 1),
+                effective_until=date(2024, 9, 30),
+            ),
+            ceiling_row(102, 3, "6000.00", effective_from=date(2024, 10, 1)),
+        ],
+        "table_lookup_rows": [
+            table_lookup_row(200, 4, "0.00", "2999.99", "14.75", "51.65"),
+            table_lookup_row(201, 4, "3000.00", "3999.99", "19.75", "69.05"),
+            table_lookup_row(202, 4, "4000.00", "4999.99", "24.75", "86.65"),
+        ],
+    }
+
+
+class FakeCursor:
+    """Cursor serving canned rows per table and counting executed queries"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._rows = []
+
+    def execute(self, query, params=None):
+        self.connection.queries.append(query)
+        for table, rows in self.connection.tables.items():
+            if f"FROM {table}\n" in query:
+                self._rows = rows
+                return
+        raise AssertionError(f"Unexpected query: {query}")
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Connection over malaysia_rule_rows()-shaped data, recording every query"""
+
+    def __init__(self, rows):
+        self.queries = []
+        self.set_rows(rows)
+
+    def set_rows(self, rows):
+        self.tables = {
+            "kf_statutory_scheme": rows["scheme_rows"],
+            "kf_statutory_rate": rows["rate_rows"],
+            "kf_statutory_ceiling": rows["ceiling_rows"],
+            "kf_statutory_table_lookup": rows["table_lookup_rows"],
+        }
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeAsyncPool:
+    """
+    asyncpg-style pool over malaysia_rule_rows()-shaped data
+
+    Each fetch waits `delay` seconds (a simulated round trip) and is
+    recorded; max_in_flight is the highest number of fetches that were
+    waiting at the same time.
+    """
+
+    def __init__(self, rows, delay: float = 0.0):
+        self.connection = FakeConnection(rows)
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def queries(self):
+        return self.connection.queries
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    async def fetch(self, query, *args):
+        self.queries.append(query)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        table = re.search(r"FROM (\w+)", query).group(1)
+        return list(self.connection.tables[table])
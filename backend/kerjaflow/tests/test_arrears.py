@@ -0,0 +1,150 @@
+"""
+Test Suite: Arrears
+===================
+Multi-period timelines across rule boundaries and back-pay arrears
+"""
+
+from calendar import monthrange
+from dataclasses import replace
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from ..models.statutory import EmployeeContext, NationalityType
+from ..services.arrears import ArrearsCalculator
+from ..services.rule_snapshot import RuleSnapshot
+from ..services.statutory_calculator import StatutoryCalculator
+from ..utils.seed_sql import SeedRules
+from .factories import FakeConnection
+
+
+def _months(country_code: str, salary: str, age: int, year: int, month: int, count: int):
+    """One context per month-end, starting at (year, month)"""
+    periods = []
+    for offset in range(count):
+        y, m = year + (month - 1 + offset) // 12, (month - 1 + offset) % 12 + 1
+        periods.append(
+            EmployeeContext(
+                country_code=country_code,
+                nationality=NationalityType.CITIZEN,
+                age=age,
+                gross_salary=Decimal(salary),
+                employee_id="E1",
+                calculation_date=date(y, m, monthrange(y, m)[1]),
+            )
+        )
+    return periods
+
+
+def _scheme(summary, code):
+    return next(c for c in summary.contributions if c.scheme_code == code)
+
+
+class TestTimeline:
+    """calculate_timeline walks rule boundaries once"""
+
+    def test_matches_calculate_all_per_period(self, snapshot_calculator):
+        periods = _months("MY", "5500.00", 30, 2024, 7, 6)
+
+        timeline = snapshot_calculator.calculate_timeline(periods)
+
+        assert timeline == [snapshot_calculator.calculate_all(p) for p in periods]
+        assert [_scheme(s, "EIS").tier_code for s in timeline] == ["EIS_OLD"] * 3 + [
+            "EIS_STANDARD"
+        ] * 3
+
+    def test_schemes_resolved_once_per_segment(self, snapshot_calculator, my_snapshot):
+        resolved = []
+        resolve = snapshot_calculator._get_applicable_schemes
+
+        def counting(*args):
+            resolved.append(args[2])
+            return resolve(*args)
+
+        snapshot_calculator._get_applicable_schemes = counting
+        periods = _months("MY", "5500.00", 30, 2024, 7, 6)
+        snapshot_calculator.calculate_timeline(list(reversed(periods)))
+
+        assert date(2024, 10, 1) in my_snapshot.boundaries
+        assert resolved == [date(2024, 7, 31), date(2024, 10, 31)]
+
+    def test_database_timeline_loads_rules_once(self, my_rule_rows):
+        connection = FakeConnection(my_rule_rows)
+        calculator = StatutoryCalculator(connection)
+
+        timeline = calculator.calculate_timeline(_months("MY", "5500.00", 30, 2024, 1, 24))
+
+        assert len(timeline) == 24
+        assert len(connection.queries) == 4
+        assert calculator.snapshot_versions == {}
+
+    def test_undated_period_rejected(self, snapshot_calculator):
+        periods = _months("MY", "5500.00", 30, 2025, 1, 3)
+        periods[1] = replace(periods[1], calculation_date=None)
+        with pytest.raises(ValueError, match="Period 1 has no calculation_date"):
+            snapshot_calculator.calculate_timeline(periods)
+
+
+class TestArrears:
+    """Revised timelines against what was paid"""
+
+    def test_eis_october_2024_change(self, snapshot_calculator):
+        paid = _months("MY", "4500.00", 30, 2024, 7, 6)
+        revised = [replace(p, gross_salary=Decimal("5500.00")) for p in paid]
+
+        result = ArrearsCalculator(snapshot_calculator).calculate(revised, paid)
+
+        assert result.boundaries == [date(2024, 10, 1)]
+        eis = [period.scheme_deltas().get("EIS") for period in result.periods]
+        # Up to September both salaries exceed the RM4,000 ceiling at 0.4%;
+        # from October the ceiling is RM6,000 at 0.2%
+        assert eis[:3] == [None] * 3
+        assert eis[3:] == [(Decimal("2.00"), Decimal("2.00"))] * 3
+        assert result.by_scheme()["EIS"] == (Decimal("6.00"), Decimal("6.00"))
+        assert result.employee_arrears == sum(
+            snapshot_calculator.calculate_all(r).total_employee_amount
+            - snapshot_calculator.calculate_all(p).total_employee_amount
+            for r, p in zip(revised, paid)
+        )
+
+    def test_singapore_cpf_2025_2026_tiers(self):
+        snapshot = RuleSnapshot(
+            "SG",
+            date(2025, 1, 1),
+            date(2026, 12, 31),
+            **SeedRules.from_migrations().rule_rows("SG"),
+        )
+        calculator = StatutoryCalculator(snapshots=[snapshot])
+        paid = _months("SG", "5000.00", 58, 2025, 10, 5)
+        revised = [replace(p, gross_salary=Decimal("6000.00")) for p in paid]
+
+        result = ArrearsCalculator(calculator).calculate(revised, paid)
+
+        assert date(2026, 1, 1) in result.boundaries
+        tiers = [_scheme(period.after, "CPF").tier_code for period in result.periods]
+        assert tiers == ["SG_CITIZEN_55_60_2025"] * 3 + ["SG_CITIZEN_55_60_2026"] * 2
+        cpf = [period.scheme_deltas()["CPF"][0] for period in result.periods]
+        assert cpf == [Decimal("165.00")] * 3 + [Decimal("170.00")] * 2
+
+    def test_paid_summaries_and_unpaid_periods(self, snapshot_calculator):
+        revised = _months("MY", "3000.00", 30, 2025, 1, 3)
+        paid = [snapshot_calculator.calculate_all(revised[0]), None, revised[2]]
+
+        result = ArrearsCalculator(snapshot_calculator).calculate(revised, paid)
+
+        assert [period.changed for period in result.periods] == [False, True, False]
+        assert result.employee_arrears == result.periods[1].after.total_employee_amount
+
+    def test_misaligned_periods_rejected(self, snapshot_calculator):
+        revised = _months("MY", "3000.00", 30, 2025, 1, 2)
+        with pytest.raises(ValueError):
+            ArrearsCalculator(snapshot_calculator).calculate(revised, revised[:1])
+        with pytest.raises(ValueError):
+            ArrearsCalculator(snapshot_calculator).calculate(revised, list(reversed(revised)))
+
+    def test_undated_revised_period_rejected(self, snapshot_calculator):
+        revised = _months("MY", "3000.00", 30, 2025, 1, 2)
+        revised[0] = replace(revised[0], calculation_date=None)
+        with pytest.raises(ValueError, match="Revised period 0 has no calculation_date"):
+            ArrearsCalculator(snapshot_calculator).calculate(revised, [None, None])
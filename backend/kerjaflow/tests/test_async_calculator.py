@@ -0,0 +1,105 @@
+"""
+Test Suite: Async Statutory Calculator
+======================================
+Concurrent rule loading over a pool, with results identical to StatutoryCalculator
+"""
+
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from ..services.async_calculator import AsyncStatutoryCalculator
+from ..services.instrumentation import CalculatorMetrics
+from .factories import FakeAsyncPool, employee
+
+
+def _workforce():
+    return [
+        employee(
+            gross_salary=Decimal(2000 + 500 * (i % 6)),
+            age=25 + i % 40,
+            calculation_date=date(2024, 9 + i % 3, 28),
+        )
+        for i in range(30)
+    ]
+
+
+class TestCalculateAll:
+    """Interactive single-employee calculation"""
+
+    def test_matches_blocking_calculator_in_one_round_trip(self, my_rule_rows, snapshot_calculator):
+        pool = FakeAsyncPool(my_rule_rows, delay=0.01)
+        calculator = AsyncStatutoryCalculator(pool)
+
+        summary = asyncio.run(calculator.calculate_all(employee()))
+
+        assert summary == snapshot_calculator.calculate_all(employee())
+        assert len(pool.queries) == 4
+        assert pool.max_in_flight == 4  # All four rule queries in flight together
+
+    def test_concurrent_calls_share_a_load(self, my_rule_rows):
+        pool = FakeAsyncPool(my_rule_rows, delay=0.01)
+        metrics = CalculatorMetrics()
+        calculator = AsyncStatutoryCalculator(pool, metrics=metrics)
+
+        async def preview():
+            return await asyncio.gather(*(calculator.calculate_all(employee()) for _ in range(10)))
+
+        summaries = asyncio.run(preview())
+
+        assert len(set(s.total_employee_amount for s in summaries)) == 1
+        assert len(pool.queries) == 4
+        assert metrics.counter("rule_loads_shared") == 9
+
+        # Nothing is kept once the load completes
+        asyncio.run(calculator.calculate_all(employee()))
+        assert len(pool.queries) == 8
+
+    def test_installed_snapshot_needs_no_pool(self, my_snapshot, snapshot_calculator):
+        calculator = AsyncStatutoryCalculator(snapshots=[my_snapshot])
+
+        summary = asyncio.run(calculator.calculate_all(employee()))
+
+        assert summary == snapshot_calculator.calculate_all(employee())
+        assert calculator.snapshot_versions == {"MY": my_snapshot.version}
+        with pytest.raises(LookupError):
+            asyncio.run(calculator.calculate_all(employee(calculation_date=date(2030, 1, 31))))
+
+
+class TestCalculateBatch:
+    """Many employees over a shared pool"""
+
+    def test_matches_blocking_batch(self, my_rule_rows, snapshot_calculator):
+        pool = FakeAsyncPool(my_rule_rows)
+        calculator = AsyncStatutoryCalculator(pool)
+
+        batch = asyncio.run(calculator.calculate_batch(_workforce()))
+
+        assert batch.results == snapshot_calculator.calculate_batch(_workforce()).results
+        assert batch.succeeded == 30
+        assert len(pool.queries) == 4  # One snapshot for the country spanning the dates
+        assert calculator.snapshot_versions == {}
+
+    def test_load_snapshot_then_batch_without_queries(self, my_rule_rows):
+        pool = FakeAsyncPool(my_rule_rows)
+        metrics = CalculatorMetrics()
+        calculator = AsyncStatutoryCalculator(pool, metrics=metrics)
+
+        snapshot = asyncio.run(calculator.load_snapshot("MY", date(2024, 1, 1), date(2025, 12, 31)))
+        asyncio.run(calculator.calculate_batch(_workforce()))
+
+        assert len(pool.queries) == 4
+        assert calculator.snapshot_versions == {"MY": snapshot.version}
+        assert metrics.round_trips == {
+            "kf_statutory_scheme": 1,
+            "kf_statutory_rate": 1,
+            "kf_statutory_ceiling": 1,
+            "kf_statutory_table_lookup": 1,
+        }
+        assert metrics.histograms[("rules", "MY", None)].count == 1
+
+        calculator.invalidate_snapshot("MY")
+        asyncio.run(calculator.calculate_batch(_workforce()))
+        assert len(pool.queries) == 8
@@ -0,0 +1,94 @@
+"""
+Test Suite: Batch Calculation
+=============================
+StatutoryCalculator.calculate_batch grouping, ordering and failure reporting
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from ..models.statutory import NationalityType
+from ..services.statutory_calculator import StatutoryCalculator
+from .factories import FakeConnection, employee
+
+
+def _mixed_workforce() -> list:
+    """Employees interleaved across nationalities and dates"""
+    employees = []
+    for i in range(60):
+        employees.append(
+            employee(
+                age=20 + i % 45,
+                gross_salary=Decimal(1500 + 137 * i),
+                nationality=(NationalityType.FOREIGN if i % 5 == 0 else NationalityType.CITIZEN),
+                calculation_date=(date(2024, 9, 1) if i % 3 == 0 else date(2025, 11, 1)),
+            )
+        )
+    return employees
+
+
+class TestCalculateBatch:
+    """Batch results match calculate_all one employee at a time"""
+
+    def test_results_in_input_order_match_calculate_all(self, snapshot_calculator):
+        employees = _mixed_workforce()
+
+        batch = snapshot_calculator.calculate_batch(employees)
+
+        assert batch.failures == []
+        assert batch.succeeded == len(employees)
+        assert batch.group_count == 4
+        for context, summary in zip(employees, batch.results):
+            assert summary.employee_context is context
+            assert summary == snapshot_calculator.calculate_all(context)
+
+    def test_calculation_date_overrides_employee_dates(self, snapshot_calculator):
+        employees = _mixed_workforce()
+
+        batch = snapshot_calculator.calculate_batch(employees, date(2024, 9, 1))
+
+        assert batch.group_count == 2
+        assert {summary.calculation_date for summary in batch.results} == {date(2024, 9, 1)}
+
+    def test_per_employee_failures_reported(self, snapshot_calculator):
+        employees = [
+            employee(),
+            employee(gross_salary=None),
+            employee(calculation_date=date(2030, 1, 1)),
+            employee(age=61),
+        ]
+
+        batch = snapshot_calculator.calculate_batch(employees)
+
+        assert [f.index for f in batch.failures] == [1, 2]
+        assert batch.failures[0].scheme_code == "EPF"
+        assert batch.failures[0].employee_context is employees[1]
+        assert batch.failures[1].scheme_code is None
+        assert batch.results[1] is None and batch.results[2] is None
+        assert batch.results[0].total_employee_amount > 0
+        assert batch.results[3].employee_context.age == 61
+        assert batch.succeeded == 2
+
+    def test_loads_rules_once_per_country(self, my_rule_rows):
+        connection = FakeConnection(my_rule_rows)
+        calculator = StatutoryCalculator(connection)
+
+        batch = calculator.calculate_batch(_mixed_workforce())
+
+        assert batch.succeeded == 60
+        assert len(connection.queries) == 4
+        # The temporary snapshot is dropped again after the batch
+        assert calculator.snapshot_versions == {}
+
+    def test_installed_snapshot_is_reused(self, my_rule_rows, my_snapshot):
+        connection = FakeConnection(my_rule_rows)
+        calculator = StatutoryCalculator(connection, snapshots=[my_snapshot])
+
+        calculator.calculate_batch(_mixed_workforce())
+
+        assert connection.queries == []
+        assert calculator.snapshot_versions == {"MY": my_snapshot.version}
+
+    def test_empty_batch(self, snapshot_calculator):
+        batch = snapshot_calculator.calculate_batch([])
+        assert batch.results == [] and batch.failures == [] and batch.succeeded == 0
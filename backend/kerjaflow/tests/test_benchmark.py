@@ -0,0 +1,118 @@
+"""
+Test Suite: Benchmark Harness
+=============================
+Synthetic workforce and benchmark report (no database required)
+"""
+
+from datetime import date
+
+from ..benchmarks.runner import BenchmarkRunner, QueryCounter, compare_reports, percentile
+from ..benchmarks.workforce import PROFILES, country_sizes, generate_workforce
+
+
+class FakeCursor:
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return []
+
+
+class FakeConnection:
+    def cursor(self):
+        return FakeCursor()
+
+
+class TestWorkforce:
+    """Seeded, per-country workforce generation"""
+
+    def test_sizes_add_up(self):
+        for size in (1, 9, 1000, 12345):
+            assert sum(country_sizes(size).values()) == size
+        assert set(country_sizes(100)) == {p.country_code for p in PROFILES}
+        assert country_sizes(10, ["MY", "SG"]) == {"MY": 6, "SG": 4}
+
+    def test_deterministic_for_a_seed(self):
+        first = generate_workforce(500, date(2025, 11, 1), seed=3)
+        again = generate_workforce(500, date(2025, 11, 1), seed=3)
+        other = generate_workforce(500, date(2025, 11, 1), seed=4)
+        assert first == again
+        assert first != other
+
+    def test_realistic_fields(self):
+        workforce = generate_workforce(2000, date(2025, 11, 1))
+        for code, employees in workforce.items():
+            for employee in employees:
+                assert employee.country_code == code
+                assert 18 <= employee.age <= 72
+                assert employee.gross_salary > 0
+                assert employee.company_id.startswith(code)
+                assert (employee.risk_category is not None) == (code == "ID")
+        assert any(e.additional_wages for e in workforce["SG"])
+
+
+class TestRunner:
+    """Measurements and regression comparison"""
+
+    def test_seed_run_reports_every_country(self):
+        runner = BenchmarkRunner()
+        run = runner.run(90)
+        report = runner.report([run])
+
+        assert report["meta"]["source"] == "seed-snapshot"
+        countries = report["runs"][0]["countries"]
+        assert sum(c["employees"] for c in countries.values()) == 90
+        for result in countries.values():
+            assert result["queries"] == 0
+            assert result["employees_per_second"] > 0
+            assert result["p50_us"] <= result["p99_us"]
+
+    def test_batch_engine_has_no_latencies(self):
+        run = BenchmarkRunner(engine="calculate_batch").run(40, ["MY"])
+        assert run.countries["MY"].p99_us is None
+
+    def test_query_counter(self):
+        counter = QueryCounter(FakeConnection())
+        cursor = counter.cursor()
+        cursor.execute("SELECT 1")
+        cursor.execute("SELECT 2")
+        assert counter.queries == 2
+        assert cursor.fetchall() == []
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        assert percentile(samples, 0.5) == 50
+        assert percentile(samples, 0.99) == 99
+        assert percentile([7], 0.99) == 7
+
+    def test_compare_flags_regressions(self):
+        def report(eps, qpe, p99, employees=5000):
+            country = {
+                "employees": employees,
+                "employees_per_second": eps,
+                "queries_per_employee": qpe,
+                "p99_us": p99,
+            }
+            return {"runs": [{"size": 10000, "countries": {"MY": country}}]}
+
+        baseline = report(1000, 1.0, 50.0)
+        assert compare_reports(baseline, report(900, 1.0, 70.0)) == []
+        assert len(compare_reports(baseline, report(700, 1.0, 50.0))) == 1
+        assert len(compare_reports(baseline, report(1000, 1.5, 50.0))) == 1
+        assert len(compare_reports(baseline, report(1000, 1.0, 80.0))) == 1
+        assert compare_reports(baseline, report(700, 1.0, 50.0), tolerance=0.5) == []
+
+    def test_compare_skips_timings_of_small_samples(self):
+        def report(eps, qpe, p99):
+            country = {
+                "employees": 40,
+                "employees_per_second": eps,
+                "queries_per_employee": qpe,
+                "p99_us": p99,
+            }
+            return {"runs": [{"size": 1000, "countries": {"KH": country}}]}
+
+        baseline = report(1000, 1.0, 50.0)
+        assert compare_reports(baseline, report(300, 1.0, 500.0)) == []
+        assert len(compare_reports(baseline, report(1000, 1.5, 50.0))) == 1
+        assert len(compare_reports(baseline, report(300, 1.0, 50.0), min_employees=10)) == 1
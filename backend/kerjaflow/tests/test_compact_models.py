@@ -0,0 +1,177 @@
+"""
+Test Suite: Compact Models
+==========================
+Slotted dataclasses, frozen variants and columnar contribution storage
+"""
+
+import dataclasses
+import pickle
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from ..benchmarks.workforce import generate_country
+from ..models.columnar import ContributionColumns
+from ..models.statutory import (
+    ContributionSummary,
+    EmployeeContext,
+    FrozenContributionSummary,
+    FrozenEmployeeContext,
+    NationalityType,
+    RiskCategory,
+    StatutoryContribution,
+    StatutoryRate,
+    freeze,
+)
+from ..services.rule_snapshot import RuleSnapshot
+from ..services.statutory_calculator import StatutoryCalculator
+from ..utils.seed_sql import SeedRules
+
+
+def _contribution(**overrides) -> StatutoryContribution:
+    values = dict(
+        scheme_code="EPF",
+        scheme_name="Employees Provident Fund",
+        calculation_base_amount=Decimal("4500.00"),
+        applied_salary=Decimal("4500.00"),
+        capped=False,
+        employee_amount=Decimal("495.00"),
+        employer_amount=Decimal("585.00"),
+        total_amount=Decimal("1080.00"),
+        employee_rate=Decimal("0.11"),
+        employer_rate=Decimal("0.13"),
+        tier_code="MY_EPF_LT60",
+    )
+    values.update(overrides)
+    return StatutoryContribution(**values)
+
+
+def _seed_batch(country_code: str, size: int = 400):
+    rows = SeedRules.from_migrations().rule_rows(country_code)
+    snapshot = RuleSnapshot(country_code, date(2024, 1, 1), date(2028, 12, 31), **rows)
+    calculator = StatutoryCalculator(snapshots=[snapshot])
+    return calculator.calculate_batch(generate_country(country_code, size, date(2025, 11, 1)))
+
+
+class TestSlots:
+    """The four hot models have no per-instance __dict__"""
+
+    @pytest.mark.parametrize(
+        "cls", [EmployeeContext, StatutoryContribution, StatutoryRate, ContributionSummary]
+    )
+    def test_slotted(self, cls):
+        assert "__slots__" in cls.__dict__
+        assert "__dict__" not in cls.__dict__
+
+    def test_attribute_api_unchanged(self):
+        employee = EmployeeContext("MY", NationalityType.CITIZEN, 30, Decimal("4500.00"))
+        employee.gross_salary = Decimal("5000.00")
+        assert employee.gross_salary == Decimal("5000.00")
+        with pytest.raises(AttributeError):
+            employee.unknown_field = 1
+
+        summary = ContributionSummary("MY", employee, [_contribution()])
+        assert summary.total_combined_amount == Decimal("1080.00")
+        assert pickle.loads(pickle.dumps(summary)) == summary
+
+
+class TestFieldOrder:
+    """Fields added later come last, so positional construction is unchanged"""
+
+    def test_positional_context(self):
+        employee = EmployeeContext(
+            "MY", NationalityType.PR, 30, Decimal("4500.00"), None, None, None,
+            3, RiskCategory.LOW, 40, date(2025, 6, 30),
+        )  # fmt: skip
+
+        assert (employee.pr_years, employee.risk_category) == (3, RiskCategory.LOW)
+        assert employee.company_employee_count == 40
+        assert employee.calculation_date == date(2025, 6, 30)
+        assert (employee.employee_id, employee.company_id) == (None, None)
+
+
+class TestFrozen:
+    """Immutable, hashable copies"""
+
+    def test_freeze_summary_deeply(self):
+        employee = EmployeeContext("MY", NationalityType.CITIZEN, 30, Decimal("4500.00"))
+        summary = ContributionSummary("MY", employee, [_contribution(), _contribution()])
+
+        frozen = freeze(summary)
+
+        assert isinstance(frozen, FrozenContributionSummary)
+        assert isinstance(frozen.employee_context, FrozenEmployeeContext)
+        assert frozen.contributions == (freeze(_contribution()), freeze(_contribution()))
+        assert frozen.total_employee_amount == summary.total_employee_amount
+        assert hash(frozen) == hash(freeze(summary))
+        assert freeze(frozen) is frozen
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            frozen.country_code = "SG"
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            frozen.contributions[0].employee_amount = Decimal(0)
+
+    def test_same_fields_and_defaults(self):
+        frozen = FrozenEmployeeContext("MY", NationalityType.CITIZEN, 30, Decimal("1"))
+        assert [f.name for f in dataclasses.fields(frozen)] == [
+            f.name for f in dataclasses.fields(EmployeeContext)
+        ]
+        assert frozen.calculation_date == date.today()
+        assert frozen.company_id is None
+
+
+class TestContributionColumns:
+    """Columnar storage reads back field-for-field identical contributions"""
+
+    @pytest.mark.parametrize("country_code", ["MY", "SG", "ID", "VN"])
+    def test_round_trip_bit_identical(self, country_code):
+        batch = _seed_batch(country_code)
+        originals = [
+            (index, c) for index, summary in enumerate(batch.results) for c in summary.contributions
+        ]
+
+        columns = ContributionColumns.from_batch(batch, offset=1000)
+
+        assert len(columns) == len(originals)
+        assert columns.column("position") == [index + 1000 for index, _ in originals]
+        for stored, (_, original) in zip(columns, originals):
+            assert stored == original
+            for name in ("employee_amount", "employer_amount", "total_amount", "employee_rate"):
+                value = getattr(original, name)
+                if value is not None:
+                    assert getattr(stored, name).as_tuple() == value.as_tuple()
+
+    def test_none_exponents_and_totals(self):
+        columns = ContributionColumns()
+        columns.append(0, _contribution(employee_rate=None, notes="capped"))
+        columns.append(1, _contribution(employee_amount=Decimal("1E+3"), capped=True))
+        columns.append(2, _contribution(employee_amount=Decimal("0.005")))
+
+        assert columns[0].employee_rate is None and columns[0].notes == "capped"
+        assert columns[1].employee_amount.as_tuple() == Decimal("1E+3").as_tuple()
+        assert columns[-1].employee_amount.as_tuple() == Decimal("0.005").as_tuple()
+        assert columns.column("capped") == [False, True, False]
+        assert columns.total("employee_amount") == Decimal("1495.005")
+
+    def test_rejects_non_finite(self):
+        with pytest.raises(ValueError):
+            ContributionColumns().append(0, _contribution(employee_amount=Decimal("NaN")))
+
+    def test_far_smaller_than_objects(self):
+        rows = SeedRules.from_migrations().rule_rows("MY")
+        snapshot = RuleSnapshot("MY", date(2024, 1, 1), date(2028, 12, 31), **rows)
+        calculator = StatutoryCalculator(snapshots=[snapshot])
+        employees = generate_country("MY", 2000, date(2025, 11, 1))
+        calculator.calculate_batch(employees[:10])  # Warm caches outside the measurement
+
+        tracemalloc.start()
+        try:
+            batch = calculator.calculate_batch(employees)
+            object_bytes = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        columns = ContributionColumns.from_batch(batch)
+        assert columns.nbytes / len(columns) < 100
+        assert columns.nbytes < object_bytes / 4
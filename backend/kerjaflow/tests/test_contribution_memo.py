@@ -0,0 +1,126 @@
+"""
+Test Suite: Contribution Memo
+=============================
+Memoized scheme contributions match uncached results and track snapshot versions
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from ..models.statutory import NationalityType
+from ..services.contribution_memo import ContributionMemo
+from ..services.rule_snapshot import RuleSnapshot
+from ..services.statutory_calculator import StatutoryCalculator
+from .factories import ceiling_row, employee, malaysia_rule_rows
+
+# Pay month of every employee (EPF_FOREIGN applies from October 2025)
+ON = date(2025, 11, 1)
+
+
+def _factory_floor() -> list:
+    """Many workers sharing a handful of pay bands and age brackets"""
+    return [
+        employee(
+            calculation_date=ON,
+            age=(25, 35, 59, 60, 64)[i % 5],
+            gross_salary=(Decimal("2800"), Decimal("3500"), Decimal("5000"), Decimal("7200"))[
+                i % 4
+            ],
+            nationality=(NationalityType.FOREIGN if i % 9 == 0 else NationalityType.CITIZEN),
+            company_employee_count=(None, 0, 40)[i % 3],
+        )
+        for i in range(180)
+    ]
+
+
+@pytest.fixture
+def memo_calculator(my_snapshot) -> StatutoryCalculator:
+    return StatutoryCalculator(snapshots=[my_snapshot], memo=ContributionMemo(maxsize=1000))
+
+
+class TestMemoizedResults:
+    """Cached contributions are identical to freshly calculated ones"""
+
+    def test_calculate_all_matches_uncached(self, memo_calculator, snapshot_calculator):
+        for context in _factory_floor():
+            assert memo_calculator.calculate_all(context) == snapshot_calculator.calculate_all(
+                context
+            )
+
+        stats = memo_calculator.memo.stats()
+        assert stats.hits > stats.misses
+        assert stats.size == stats.misses
+
+    def test_calculate_batch_matches_uncached(self, memo_calculator, snapshot_calculator):
+        employees = _factory_floor()
+
+        memoized = memo_calculator.calculate_batch(employees)
+
+        assert memoized.results == snapshot_calculator.calculate_batch(employees).results
+        assert memo_calculator.memo.hits > 0
+
+    def test_ages_in_one_band_share_an_entry(self, memo_calculator):
+        scheme = memo_calculator._get_applicable_schemes("MY", NationalityType.CITIZEN, ON)[0]
+
+        young = memo_calculator.calculate_scheme(employee(calculation_date=ON, age=30), scheme, ON)
+        older = memo_calculator.calculate_scheme(employee(calculation_date=ON, age=45), scheme, ON)
+        senior = memo_calculator.calculate_scheme(employee(calculation_date=ON, age=60), scheme, ON)
+
+        assert older is young
+        assert senior.tier_code == "MY_OVER60"
+        assert (memo_calculator.memo.hits, memo_calculator.memo.misses) == (1, 2)
+
+    def test_wage_base_is_part_of_the_key(self, memo_calculator):
+        memo_calculator.calculate_all(
+            employee(calculation_date=ON, gross_salary=Decimal("3000.00"))
+        )
+        second = memo_calculator.calculate_all(
+            employee(calculation_date=ON, gross_salary=Decimal("3000.01"))
+        )
+
+        assert second.contributions[0].calculation_base_amount == Decimal("3000.01")
+        assert memo_calculator.memo.hits == 0
+
+
+class TestMemoBounds:
+    """LRU bound and invalidation"""
+
+    def test_least_recently_used_entry_evicted(self, my_snapshot):
+        memo = ContributionMemo(maxsize=4)
+        calculator = StatutoryCalculator(snapshots=[my_snapshot], memo=memo)
+
+        calculator.calculate_all(employee(calculation_date=ON, gross_salary=Decimal("3000")))
+        calculator.calculate_all(employee(calculation_date=ON, gross_salary=Decimal("3100")))
+
+        assert len(memo) == 4
+        assert memo.evictions == 4
+
+    def test_new_snapshot_version_invalidates_country(self, memo_calculator):
+        memo_calculator.calculate_all(employee(calculation_date=ON))
+        assert len(memo_calculator.memo) == 4
+
+        rows = malaysia_rule_rows()
+        rows["ceiling_rows"][0] = ceiling_row(100, 2, "4000.00")
+        memo_calculator.use_snapshot(
+            RuleSnapshot("MY", date(2024, 1, 1), date(2026, 12, 31), **rows)
+        )
+
+        assert len(memo_calculator.memo) == 0
+        socso = memo_calculator.calculate_all(employee(calculation_date=ON)).contributions[1]
+        assert socso.capped and socso.applied_salary == Decimal("4000.00")
+        assert memo_calculator.memo.hits == 0
+
+    def test_same_version_keeps_entries(self, memo_calculator, my_rule_rows):
+        memo_calculator.calculate_all(employee(calculation_date=ON))
+
+        memo_calculator.use_snapshot(
+            RuleSnapshot("MY", date(2024, 1, 1), date(2026, 12, 31), **my_rule_rows)
+        )
+
+        assert len(memo_calculator.memo) == 4
+
+    def test_invalid_maxsize(self):
+        with pytest.raises(ValueError):
+            ContributionMemo(maxsize=0)
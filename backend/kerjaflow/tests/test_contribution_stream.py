@@ -0,0 +1,249 @@
+"""
+Test Suite: Contribution Streaming
+==================================
+calculate_iter chunking, sinks and backpressure (no database required)
+"""
+
+import csv
+import io
+import json
+import threading
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from ..models.statutory import NationalityType
+from ..services.contribution_stream import (
+    CONTRIBUTION_COLUMNS,
+    ContributionSink,
+    ContributionStream,
+    CsvSink,
+    DatabaseSink,
+    NdjsonSink,
+)
+from ..services.statutory_calculator import StatutoryCalculator
+from .factories import FakeConnection, employee
+
+
+def _employees(count: int):
+    """Generator of employees, as a server-side cursor would yield them"""
+    for i in range(count):
+        yield employee(
+            nationality=(NationalityType.FOREIGN if i % 5 == 0 else NationalityType.CITIZEN),
+            age=20 + i % 45,
+            gross_salary=Decimal(1500 + 50 * (i % 60)),
+            calculation_date=(date(2024, 9, 1) if i % 3 == 0 else date(2025, 11, 1)),
+            company_id=f"CO{i % 4}",
+        )
+
+
+class CollectingSink(ContributionSink):
+    def __init__(self, delay: float = 0.0):
+        self.chunks = []
+        self.delay = delay
+        self.closed = False
+
+    def write(self, chunk):
+        time.sleep(self.delay)
+        self.chunks.append(chunk)
+
+    def close(self):
+        self.closed = True
+
+
+class RecordingCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def executemany(self, query, rows):
+        self.connection.statements.append((query, list(rows)))
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+class TestCalculateIter:
+    """Chunks match calculate_batch and are pulled lazily"""
+
+    def test_chunks_match_batch(self, snapshot_calculator):
+        expected = snapshot_calculator.calculate_batch(list(_employees(250)))
+
+        chunks = list(snapshot_calculator.calculate_iter(_employees(250), chunk_size=100))
+
+        assert [(c.index, c.offset, c.size) for c in chunks] == [
+            (0, 0, 100),
+            (1, 100, 100),
+            (2, 200, 50),
+        ]
+        assert [s for c in chunks for s in c.batch.results] == expected.results
+
+    def test_input_is_consumed_lazily(self, snapshot_calculator):
+        pulled = []
+
+        def source():
+            for worker in _employees(1000):
+                pulled.append(worker)
+                yield worker
+
+        chunks = snapshot_calculator.calculate_iter(source(), chunk_size=10)
+        next(chunks)
+        assert len(pulled) == 10
+        next(chunks)
+        assert len(pulled) == 20
+
+    def test_snapshots_loaded_once_per_stream(self, my_rule_rows):
+        connection = FakeConnection(my_rule_rows)
+        calculator = StatutoryCalculator(connection)
+
+        chunks = list(calculator.calculate_iter(_employees(300), chunk_size=50))
+
+        assert sum(c.batch.succeeded for c in chunks) == 300
+        assert len(connection.queries) == 4
+        # Temporary snapshots are dropped when the stream ends
+        assert calculator.snapshot_versions == {}
+
+    def test_rejects_empty_chunks(self, snapshot_calculator):
+        with pytest.raises(ValueError):
+            next(snapshot_calculator.calculate_iter(_employees(1), chunk_size=0))
+
+
+class TestSinks:
+    """CSV, NDJSON and database output"""
+
+    def test_csv_rows_per_contribution(self, snapshot_calculator):
+        out = io.StringIO()
+        summary = ContributionStream(snapshot_calculator, CsvSink(out), chunk_size=7).run(
+            _employees(20)
+        )
+
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        assert rows[0] == list(CONTRIBUTION_COLUMNS)
+        expected = snapshot_calculator.calculate_batch(list(_employees(20)))
+        contributions = [c for s in expected.results for c in s.contributions]
+        assert len(rows) - 1 == len(contributions)
+        assert rows[1][CONTRIBUTION_COLUMNS.index("employee_amount")] == str(
+            contributions[0].employee_amount
+        )
+        assert summary.employees == 20 and summary.chunks == 3
+
+    def test_ndjson_object_per_employee(self, snapshot_calculator):
+        out = io.StringIO()
+        ContributionStream(snapshot_calculator, NdjsonSink(out), chunk_size=6).run(_employees(15))
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        expected = snapshot_calculator.calculate_batch(list(_employees(15)))
+        assert [r["position"] for r in records] == list(range(15))
+        for record, summary in zip(records, expected.results):
+            assert Decimal(record["total_employee_amount"]) == summary.total_employee_amount
+            assert record["company_id"] == summary.employee_context.company_id
+
+    def test_ndjson_reports_failures(self, snapshot_calculator):
+        out = io.StringIO()
+        employees = list(_employees(3))
+        employees[1].gross_salary = None  # Cannot be calculated
+
+        ContributionStream(snapshot_calculator, NdjsonSink(out), max_pending=0).run(employees)
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert "contributions" in records[0] and "contributions" in records[2]
+        assert records[1]["position"] == 1 and records[1]["error"]
+
+    def test_database_sink_inserts_and_commits_per_chunk(self, snapshot_calculator):
+        connection = RecordingConnection()
+        sink = DatabaseSink(connection, "payroll.kf_contribution_line")
+
+        ContributionStream(snapshot_calculator, sink, chunk_size=10).run(_employees(25))
+
+        assert connection.commits == 3
+        query, rows = connection.statements[0]
+        assert query.startswith("INSERT INTO payroll.kf_contribution_line (position, company_id")
+        assert {len(row) for row in rows} == {len(CONTRIBUTION_COLUMNS)}
+        assert {row[0] for row in rows} <= set(range(10))  # Positions of the first chunk
+
+    def test_sink_without_write_cannot_be_created(self):
+        class NoWriteSink(ContributionSink):
+            def close(self):
+                pass
+
+        with pytest.raises(TypeError):
+            NoWriteSink()
+
+    def test_database_sink_rejects_unsafe_table_names(self):
+        with pytest.raises(ValueError):
+            DatabaseSink(RecordingConnection(), "lines; DROP TABLE kf_employee")
+
+
+class TestBackpressure:
+    """Bounded queue between calculation and the sink"""
+
+    def test_slow_sink_bounds_pending_chunks(self, snapshot_calculator):
+        sink = CollectingSink(delay=0.01)
+        pulled = []
+        lead = []
+
+        def source():
+            for worker in _employees(400):
+                pulled.append(worker)
+                # Chunks pulled but not yet written: queued + one being written + one calculating
+                lead.append(len(pulled) // 10 - len(sink.chunks))
+                yield worker
+
+        summary = ContributionStream(snapshot_calculator, sink, chunk_size=10, max_pending=2).run(
+            source()
+        )
+
+        assert summary.chunks == 40 and len(sink.chunks) == 40
+        assert [c.index for c in sink.chunks] == list(range(40))
+        assert summary.max_queued <= 2
+        assert max(lead) <= 2 + 2
+        assert sink.closed
+
+    def test_sink_errors_stop_the_stream(self, snapshot_calculator):
+        class FailingSink(CollectingSink):
+            def write(self, chunk):
+                if chunk.index == 2:
+                    raise IOError("disk full")
+                super().write(chunk)
+
+        sink = FailingSink()
+        with pytest.raises(IOError, match="disk full"):
+            ContributionStream(snapshot_calculator, sink, chunk_size=10).run(_employees(10_000))
+        assert len(sink.chunks) == 2
+        assert not [t for t in threading.enumerate() if t.name == "contribution-sink"]
+
+    def test_memory_does_not_grow_with_workforce(self, snapshot_calculator):
+        def peak(count):
+            out = io.StringIO()
+
+            class DiscardingSink(NdjsonSink):
+                def write(self, chunk):
+                    super().write(chunk)
+                    out.seek(0)
+                    out.truncate()
+
+            tracemalloc.start()
+            try:
+                ContributionStream(
+                    snapshot_calculator, DiscardingSink(out), chunk_size=100, max_pending=1
+                ).run(_employees(count))
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        small, large = peak(500), peak(5000)
+        assert large < small * 1.5
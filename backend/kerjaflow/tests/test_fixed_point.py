@@ -0,0 +1,175 @@
+"""
+Test Suite: Fixed-Point Arithmetic
+==================================
+Integer minor-unit amounts must be bit-identical to the Decimal path
+"""
+
+import random
+from datetime import date
+from decimal import ROUND_DOWN, ROUND_HALF_UP, ROUND_UP, Decimal
+
+import pytest
+
+from ..models.statutory import EmployeeContext, NationalityType, RoundingMethod
+from ..services.fixed_point import FixedPointArithmetic, from_minor, round_minor, to_minor
+from ..services.rule_snapshot import RuleSnapshot, parse_rate_row
+from ..services.statutory_calculator import StatutoryCalculator
+from ..utils.seed_sql import SeedRules
+from .factories import rate_row
+
+QUANTIZE_ROUNDING = {
+    RoundingMethod.NEAREST: ROUND_HALF_UP,
+    RoundingMethod.FLOOR: ROUND_DOWN,
+    RoundingMethod.CEILING: ROUND_UP,
+}
+
+
+def _rate(employee_rate: str, employer_rate: str, **overrides):
+    return parse_rate_row(rate_row(1, 1, "T", employee_rate, employer_rate, **overrides))
+
+
+def _decimal_amounts(calculator, salary, rate, method, precision):
+    """Reference: the calculator's Decimal path"""
+    employee, employer = calculator._calculate_percentage(salary, rate)
+    employee = calculator._apply_rounding(employee, method, precision)
+    employer = calculator._apply_rounding(employer, method, precision)
+    return employee, employer, employee + employer
+
+
+class TestConversions:
+    """Minor-unit conversions and integer rounding"""
+
+    def test_to_minor_is_exact_or_declines(self):
+        assert to_minor(Decimal("4523.17")) == 452317
+        assert to_minor(Decimal("4500")) == 450000
+        assert to_minor(Decimal("4500.100")) == 450010
+        assert to_minor(Decimal("4500.005")) is None
+        assert to_minor(Decimal("12.5"), places=0) is None
+
+    def test_from_minor_matches_quantize(self):
+        assert from_minor(452317, 2).as_tuple() == Decimal("4523.17").as_tuple()
+        assert from_minor(0, 2).as_tuple() == Decimal("0").quantize(Decimal("0.01")).as_tuple()
+
+    @pytest.mark.parametrize("method", list(QUANTIZE_ROUNDING))
+    def test_round_minor_matches_quantize(self, method):
+        for value in range(0, 3000, 7):
+            for places in (1, 2, 3):
+                expected = (
+                    Decimal(value)
+                    .scaleb(-places)
+                    .quantize(Decimal(1), rounding=QUANTIZE_ROUNDING[method])
+                )
+                assert round_minor(value, 10**places, method) == int(expected)
+
+
+class TestPercentage:
+    """FixedPointArithmetic.percentage against the Decimal path"""
+
+    RATES = [
+        ("0.11", "0.13", {}),
+        ("0.055", "0.04", {}),
+        ("0.005", "0.0125", {}),
+        ("0.00375", "0.17", {}),
+        ("0", "0.02", {}),
+        ("0.01", "0.01", {"employee_fixed": "12.5"}),
+        ("0.01", "0.01", {"employer_fixed": "3.125"}),
+    ]
+    ROUNDINGS = [
+        (RoundingMethod.NEAREST, 2),
+        (RoundingMethod.NEAREST, 0),
+        (RoundingMethod.NEAREST, -2),
+        (RoundingMethod.FLOOR, 2),
+        (RoundingMethod.FLOOR, 1),
+        (RoundingMethod.CEILING, 2),
+        (RoundingMethod.CEILING, 3),
+        (RoundingMethod.NEAREST_RINGGIT, 2),
+    ]
+
+    def test_bit_identical_to_decimal(self):
+        calculator = StatutoryCalculator()
+        fixed = FixedPointArithmetic()
+        rng = random.Random(8)
+        salaries = [Decimal(rng.randrange(0, 2_000_000)).scaleb(-rng.choice([0, 1, 2]))]
+        salaries += [Decimal(rng.randrange(0, 2_000_000)).scaleb(-2) for _ in range(300)]
+        salaries += [Decimal("0"), Decimal("0.00"), Decimal("5000"), Decimal("4000.50")]
+
+        for employee_rate, employer_rate, extra in self.RATES:
+            rate = _rate(employee_rate, employer_rate, **extra)
+            for method, precision in self.ROUNDINGS:
+                for salary in salaries:
+                    expected = _decimal_amounts(calculator, salary, rate, method, precision)
+                    actual = fixed.percentage(salary, rate, method, precision)
+                    assert [a.as_tuple() for a in actual] == [e.as_tuple() for e in expected], (
+                        salary,
+                        rate.tier_code,
+                        method,
+                        precision,
+                    )
+
+    def test_declines_what_integers_cannot_reproduce(self):
+        fixed = FixedPointArithmetic()
+        rate = _rate("0.11", "0.13")
+
+        assert fixed.percentage(Decimal("100.005"), rate, RoundingMethod.NEAREST, 2) is None
+        assert fixed.percentage(Decimal("-100.00"), rate, RoundingMethod.NEAREST, 2) is None
+        assert (
+            fixed.percentage(Decimal("100"), _rate("-0.01", "0.13"), RoundingMethod.NEAREST, 2)
+            is None
+        )
+        assert fixed.percentage(Decimal("100"), rate, "NONE", 2) is None
+
+
+class TestSeedData:
+    """Calculator results with and without the fast path, over the seed data"""
+
+    @pytest.mark.parametrize("country_code", ["MY", "SG", "ID", "TH", "PH", "VN", "KH", "MM", "BN"])
+    def test_calculate_all_bit_identical(self, country_code):
+        rows = SeedRules.from_migrations().rule_rows(country_code)
+        snapshot = RuleSnapshot(country_code, date(2024, 1, 1), date(2028, 12, 31), **rows)
+        fast = StatutoryCalculator(snapshots=[snapshot])
+        reference = StatutoryCalculator(snapshots=[snapshot])
+        reference._fixed_point.percentage = lambda *args: None
+
+        rng = random.Random(country_code)
+        for _ in range(150):
+            employee = EmployeeContext(
+                country_code=country_code,
+                nationality=rng.choice(list(NationalityType)),
+                age=rng.choice([21, 30, 55, 59, 60, 62, 66, 71]),
+                gross_salary=Decimal(rng.randrange(1, 3_000_000_000)).scaleb(-2),
+                calculation_date=rng.choice(
+                    [date(2024, 9, 30), date(2025, 10, 1), date(2026, 6, 1)]
+                ),
+            )
+            expected = reference.calculate_all(employee)
+            actual = fast.calculate_all(employee)
+            assert actual == expected
+            for a, e in zip(actual.contributions, expected.contributions):
+                assert a.employee_amount.as_tuple() == e.employee_amount.as_tuple()
+                assert a.employer_amount.as_tuple() == e.employer_amount.as_tuple()
+                assert a.total_amount.as_tuple() == e.total_amount.as_tuple()
+
+
+class TestPlanCache:
+    """Integer plans are cached by tier contents, within a bound"""
+
+    def test_reloaded_snapshots_share_plans(self, my_rule_rows, my_employee_young_over5k):
+        calculator = StatutoryCalculator()
+        sizes = []
+        for _ in range(50):
+            calculator.use_snapshot(
+                RuleSnapshot("MY", date(2024, 1, 1), date(2026, 12, 31), **my_rule_rows)
+            )
+            calculator.calculate_all(my_employee_young_over5k)
+            sizes.append(len(calculator._fixed_point))
+
+        assert sizes[0] > 0
+        assert set(sizes) == {sizes[0]}
+
+    def test_bounded(self):
+        fixed = FixedPointArithmetic(maxsize=3)
+        for step in range(10):
+            rate = _rate(f"0.0{step}", "0.13")
+            assert fixed.percentage(Decimal("100"), rate, RoundingMethod.NEAREST, 2) is not None
+
+        assert len(fixed) == 3
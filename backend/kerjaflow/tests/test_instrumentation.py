@@ -0,0 +1,162 @@
+"""
+Test Suite: Calculator Instrumentation
+======================================
+Latency histograms, counters, round trips and the per-employee trace
+"""
+
+import io
+import json
+from datetime import date
+from decimal import Decimal
+
+from ..models.statutory import NationalityType
+from ..services.contribution_memo import ContributionMemo
+from ..services.instrumentation import CalculatorMetrics, Histogram
+from ..services.statutory_calculator import StatutoryCalculator
+from .factories import FakeConnection, employee
+
+
+def _workforce():
+    return [
+        employee(gross_salary=Decimal(2000 + 500 * (i % 6)), age=25 + i % 40, employee_id=f"E{i}")
+        for i in range(30)
+    ]
+
+
+class TestHistogram:
+    """Bucketed percentiles with exact count, sum, min and max"""
+
+    def test_percentiles_are_bucket_bounds(self):
+        histogram = Histogram()
+        for micros in [3] * 90 + [40] * 9 + [7000]:
+            histogram.observe(micros / 1e6)
+
+        summary = histogram.as_dict()
+        assert summary["count"] == 100
+        assert summary["min_us"] == 3.0 and summary["max_us"] == 7000.0
+        assert summary["p50_us"] == 5.0
+        assert summary["p90_us"] == 5.0
+        assert summary["p99_us"] == 50.0
+        assert histogram.percentile(1.0) == 7000.0  # Capped at the observed maximum
+
+    def test_empty(self):
+        assert Histogram().as_dict()["p50_us"] is None
+
+
+class TestCalculatorMetrics:
+    """Hooks in calculate_all, calculate_batch and calculate_scheme"""
+
+    def test_results_identical_with_and_without_metrics(self, my_snapshot):
+        plain = StatutoryCalculator(snapshots=[my_snapshot])
+        measured = StatutoryCalculator(snapshots=[my_snapshot], metrics=CalculatorMetrics(True))
+
+        for worker in _workforce():
+            assert measured.calculate_all(worker) == plain.calculate_all(worker)
+        assert measured.calculate_batch(_workforce()).results == (
+            plain.calculate_batch(_workforce()).results
+        )
+
+    def test_latency_per_method_country_and_scheme(self, snapshot_calculator):
+        metrics = snapshot_calculator.metrics = CalculatorMetrics()
+        snapshot_calculator.calculate_all(employee())
+
+        keys = set(metrics.histograms)
+        assert ("schemes", "MY", None) in keys
+        assert ("employee", "MY", None) in keys
+        for scheme in ("EPF", "SOCSO", "EIS", "SOCSO_TABLE"):
+            assert ("rate", "MY", scheme) in keys
+            assert ("amounts", "MY", scheme) in keys
+            assert ("scheme", "MY", scheme) in keys
+        assert ("table_lookup", "MY", "SOCSO_TABLE") in keys
+        assert metrics.counter("employees", "MY") == 1
+        assert metrics.counter("snapshot_hit") > 0 and metrics.counter("snapshot_miss") == 0
+
+    def test_batch_counts_employees(self, snapshot_calculator):
+        metrics = snapshot_calculator.metrics = CalculatorMetrics()
+        batch = snapshot_calculator.calculate_batch(_workforce())
+
+        assert batch.succeeded == 30
+        assert metrics.histograms[("employee", "MY", None)].count == 30
+        assert metrics.histograms[("scheme", "MY", "EPF")].count == 30
+        assert metrics.counter("failures") == 0
+
+    def test_memo_hits_and_misses(self, my_snapshot):
+        metrics = CalculatorMetrics()
+        calculator = StatutoryCalculator(
+            snapshots=[my_snapshot], memo=ContributionMemo(), metrics=metrics
+        )
+        calculator.calculate_batch([employee(employee_id=f"E{i}") for i in range(5)])
+
+        assert metrics.counter("memo_miss") == 4  # One per scheme
+        assert metrics.counter("memo_hit") == 16
+
+    def test_round_trips_per_table(self, my_rule_rows):
+        connection = FakeConnection(my_rule_rows)
+        metrics = CalculatorMetrics()
+        calculator = StatutoryCalculator(connection, metrics=metrics)
+
+        calculator.calculate_batch(_workforce())
+
+        assert len(connection.queries) == 4
+        assert metrics.round_trips == {
+            "kf_statutory_scheme": 1,
+            "kf_statutory_rate": 1,
+            "kf_statutory_ceiling": 1,
+            "kf_statutory_table_lookup": 1,
+        }
+        assert metrics.summary()["db_round_trips"]["total"] == 4
+
+    def test_calculate_scheme_is_measured(self, snapshot_calculator):
+        metrics = snapshot_calculator.metrics = CalculatorMetrics()
+        calculation_date = date(2025, 6, 30)
+        scheme = snapshot_calculator._get_applicable_schemes(
+            "MY", NationalityType.CITIZEN, calculation_date
+        )[0]
+
+        snapshot_calculator.calculate_scheme(employee(), scheme, calculation_date)
+
+        assert metrics.histograms[("scheme", "MY", scheme.code)].count == 1
+
+
+class TestTrace:
+    """Per-employee record of the rule rows chosen"""
+
+    def test_trace_names_tier_ceiling_and_band(self, snapshot_calculator):
+        metrics = snapshot_calculator.metrics = CalculatorMetrics(trace=True)
+        snapshot_calculator.calculate_all(
+            employee(gross_salary=Decimal("3500.00"), employee_id="E1")
+        )
+
+        entries = {entry.scheme_code: entry for entry in metrics.trace}
+        assert entries["SOCSO_TABLE"].table_lookup_id == 201
+        assert entries["SOCSO"].ceiling_id is not None
+        assert entries["EPF"].tier_code is not None and entries["EPF"].rate_id is not None
+        assert all(entry.employee_id == "E1" and not entry.memo_hit for entry in entries.values())
+
+    def test_trace_limit(self, snapshot_calculator):
+        metrics = snapshot_calculator.metrics = CalculatorMetrics(trace=True, trace_limit=10)
+        snapshot_calculator.calculate_batch(_workforce())
+
+        assert len(metrics.trace) == 10
+        assert metrics.trace_dropped == 110
+        assert metrics.summary()["trace"] == {"entries": 10, "dropped": 110}
+
+    def test_summary_and_trace_export(self, snapshot_calculator):
+        metrics = snapshot_calculator.metrics = CalculatorMetrics(trace=True)
+        snapshot_calculator.calculate_batch(_workforce())
+
+        out = io.StringIO()
+        metrics.write_summary(out)
+        summary = json.loads(out.getvalue())
+        assert summary["db_round_trips"] == {"total": 0}
+        row = next(row for row in summary["latency"] if row["method"] == "employee")
+        assert row["count"] == 30 and row["p50_us"] is not None
+
+        out = io.StringIO()
+        metrics.write_trace(out)
+        lines = out.getvalue().splitlines()
+        assert len(lines) == 120
+        assert json.loads(lines[0])["calculation_date"] == "2025-06-01"
+
+        metrics.reset()
+        assert metrics.summary()["latency"] == [] and metrics.trace == []
@@ -0,0 +1,132 @@
+"""
+Test Suite: Pay-Run Executor
+============================
+Sharding, ordering and progress of PayRunExecutor (no database required)
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from ..models.statutory import NationalityType
+from ..services.payrun_executor import PayRunExecutor
+from ..services.statutory_calculator import StatutoryCalculator
+from .factories import employee
+
+
+def _workforce(size: int = 90) -> list:
+    """Employees of three companies, interleaved"""
+    return [
+        employee(
+            nationality=(NationalityType.FOREIGN if i % 7 == 0 else NationalityType.CITIZEN),
+            age=20 + i % 45,
+            gross_salary=Decimal(1800 + 113 * i),
+            calculation_date=date(2025, 11, 1),
+            company_id=f"CO{i % 3}",
+        )
+        for i in range(size)
+    ]
+
+
+def _run(executor: PayRunExecutor, employees: list) -> list:
+    written = []
+    executor.run(employees, written.append)
+    return written
+
+
+class TestSharding:
+    """Shards group one company and country, numbered in input order"""
+
+    def test_shards_split_by_company_and_size(self, my_snapshot):
+        executor = PayRunExecutor(workers=1, snapshots=[my_snapshot], shard_size=10)
+
+        written = _run(executor, _workforce())
+
+        assert [r.index for r in written] == list(range(len(written)))
+        assert len(written) == 9
+        for result in written:
+            assert len(result.positions) == 10
+            assert {f"CO{p % 3}" for p in result.positions} == {result.company_id}
+            assert result.country_code == "MY"
+
+    def test_partial_shards_flushed_at_end(self, my_snapshot):
+        executor = PayRunExecutor(workers=1, snapshots=[my_snapshot], shard_size=40)
+
+        written = _run(executor, _workforce())
+
+        assert sorted(len(r.positions) for r in written) == [30, 30, 30]
+        assert [r.company_id for r in written] == ["CO0", "CO1", "CO2"]
+
+    def test_invalid_configuration(self, my_snapshot):
+        with pytest.raises(ValueError):
+            PayRunExecutor(workers=1, snapshots=[my_snapshot], shard_size=0)
+        with pytest.raises(ValueError):
+            PayRunExecutor(workers=1)
+
+
+class TestResults:
+    """Results match the calculator and do not depend on the worker count"""
+
+    def test_inline_results_match_calculate_all(self, my_snapshot):
+        employees = _workforce()
+        calculator = StatutoryCalculator(snapshots=[my_snapshot])
+        executor = PayRunExecutor(workers=1, snapshots=[my_snapshot], shard_size=8)
+
+        written = _run(executor, employees)
+
+        seen = []
+        for result in written:
+            assert result.batch.failures == []
+            for position, summary in zip(result.positions, result.batch.results):
+                assert summary == calculator.calculate_all(employees[position])
+                seen.append(position)
+        assert sorted(seen) == list(range(len(employees)))
+
+    def test_process_pool_output_is_deterministic(self, my_snapshot):
+        employees = _workforce()
+        inline = _run(PayRunExecutor(workers=1, snapshots=[my_snapshot], shard_size=7), employees)
+
+        pooled = _run(
+            PayRunExecutor(workers=2, snapshots=[my_snapshot], shard_size=7, max_pending=3),
+            employees,
+        )
+
+        assert [r.index for r in pooled] == [r.index for r in inline]
+        assert [r.positions for r in pooled] == [r.positions for r in inline]
+        assert [r.batch.results for r in pooled] == [r.batch.results for r in inline]
+
+
+class TestProgress:
+    """Progress and summary totals"""
+
+    def test_progress_reported_per_shard(self, my_snapshot):
+        reports = []
+        executor = PayRunExecutor(
+            workers=1, snapshots=[my_snapshot], shard_size=25, progress=reports.append
+        )
+
+        summary = executor.run(_workforce(), lambda result: None)
+
+        assert summary.shards == len(reports) == 6
+        assert [p.shards_written for p in reports] == list(range(1, 7))
+        assert reports[-1].employees_written == summary.employees == 90
+        assert all(p.employees_read >= p.employees_written for p in reports)
+        assert summary.failures == 0
+        assert summary.companies == {("CO0", "MY"): 30, ("CO1", "MY"): 30, ("CO2", "MY"): 30}
+
+    def test_input_consumed_lazily(self, my_snapshot):
+        employees = _workforce()
+        consumed = []
+
+        def source():
+            for worker in employees:
+                consumed.append(worker)
+                yield worker
+
+        first_write = []
+        executor = PayRunExecutor(workers=1, snapshots=[my_snapshot], shard_size=5)
+        executor.run(source(), lambda result: first_write.append(len(consumed)))
+
+        # The first full shard (CO0) is written after 13 employees were read
+        assert first_write[0] == 13
@@ -0,0 +1,175 @@
+"""
+Test Suite: Rate Bundle
+=======================
+Compiled rule bundles: round trip, integrity checks and hot swapping
+"""
+
+import os
+import stat
+import time
+from datetime import date
+
+import pytest
+
+from ..services.payrun_executor import PayRunExecutor
+from ..services.rate_bundle import (
+    RateBundle,
+    RateBundleError,
+    RateBundleWatcher,
+    build_bundle,
+    main,
+)
+from ..services.rule_snapshot import RuleSnapshot
+from ..services.statutory_calculator import StatutoryCalculator
+from ..utils.seed_sql import SeedRules
+from .factories import malaysia_rule_rows, rate_row
+from .test_payrun_executor import _run, _workforce
+
+VALID_FROM, VALID_UNTIL = date(2020, 1, 1), date(2030, 12, 31)
+
+
+@pytest.fixture(scope="module")
+def seed_snapshots():
+    seed = SeedRules.from_migrations()
+    return [
+        RuleSnapshot(code, VALID_FROM, VALID_UNTIL, **seed.rule_rows(code))
+        for code in seed.country_codes()
+    ]
+
+
+def _my_snapshot(eis_rate: str = "0.002") -> RuleSnapshot:
+    rows = malaysia_rule_rows()
+    eis = next(i for i, row in enumerate(rows["rate_rows"]) if row[0] == 31)
+    rows["rate_rows"][eis] = rate_row(
+        31, 3, "EIS_STANDARD", eis_rate, eis_rate, effective_from=date(2024, 10, 1)
+    )
+    return RuleSnapshot("MY", date(2024, 1, 1), date(2026, 12, 31), **rows)
+
+
+class TestRoundTrip:
+    """A bundle reproduces the snapshots it was built from"""
+
+    def test_seed_snapshots_survive_the_round_trip(
+        self, seed_snapshots, tmp_path, my_employee_young_over5k, sg_employee_senior_2026
+    ):
+        version = build_bundle(seed_snapshots, tmp_path / "rules.kfrb", source="seed")
+
+        with RateBundle.open(tmp_path / "rules.kfrb") as bundle:
+            assert bundle.version == version
+            assert bundle.source == "seed"
+            assert bundle.countries == sorted(s.country_code for s in seed_snapshots)
+            for original in seed_snapshots:
+                loaded = bundle.snapshot(original.country_code)
+                assert loaded.version == original.version
+                assert loaded.rows == original.rows
+                assert bundle.window(original.country_code) == (VALID_FROM, VALID_UNTIL)
+            from_bundle = StatutoryCalculator()
+            assert from_bundle.use_bundle(bundle) == bundle.countries
+
+        from_snapshots = StatutoryCalculator(snapshots=seed_snapshots)
+        for employee in (my_employee_young_over5k, sg_employee_senior_2026):
+            assert from_bundle.calculate_all(employee) == from_snapshots.calculate_all(employee)
+
+    def test_version_depends_on_rules_only(self, seed_snapshots, tmp_path):
+        first = build_bundle(seed_snapshots, tmp_path / "a.kfrb")
+        again = build_bundle(list(reversed(seed_snapshots)), tmp_path / "b.kfrb", source="x")
+
+        assert again == first
+        assert build_bundle([_my_snapshot()], tmp_path / "c.kfrb") != build_bundle(
+            [_my_snapshot("0.003")], tmp_path / "d.kfrb"
+        )
+
+    def test_snapshots_decoded_on_demand(self, seed_snapshots, tmp_path):
+        build_bundle(seed_snapshots, tmp_path / "rules.kfrb")
+
+        started = time.perf_counter()
+        bundle = RateBundle.open(tmp_path / "rules.kfrb")
+        calculator = StatutoryCalculator()
+        calculator.use_bundle(bundle, ["MY"])
+        elapsed = time.perf_counter() - started
+
+        assert list(calculator.snapshot_versions) == ["MY"]
+        assert list(bundle._snapshots) == ["MY"]
+        assert elapsed < 0.5  # Milliseconds in practice; generous for slow CI
+        bundle.close()
+
+    def test_bundle_readable_by_other_users(self, tmp_path):
+        path = tmp_path / "rules.kfrb"
+        build_bundle([_my_snapshot()], path)
+        assert stat.S_IMODE(path.stat().st_mode) == 0o644
+
+        os.chmod(path, 0o640)
+        build_bundle([_my_snapshot("0.003")], path)
+        assert stat.S_IMODE(path.stat().st_mode) == 0o640
+
+    def test_duplicate_countries_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            build_bundle([_my_snapshot(), _my_snapshot("0.003")], tmp_path / "rules.kfrb")
+
+
+class TestIntegrity:
+    """Damaged or foreign files are refused"""
+
+    def test_corrupted_payload_fails_checksum(self, seed_snapshots, tmp_path):
+        path = tmp_path / "rules.kfrb"
+        build_bundle(seed_snapshots, path)
+        data = bytearray(path.read_bytes())
+        data[-10] ^= 0x01
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(RateBundleError, match="checksum"):
+            RateBundle.open(path)
+
+    def test_not_a_bundle(self, tmp_path):
+        path = tmp_path / "rules.kfrb"
+        path.write_bytes(b"x" * 100)
+        with pytest.raises(RateBundleError):
+            RateBundle.open(path)
+        path.write_bytes(b"")
+        with pytest.raises((RateBundleError, ValueError)):
+            RateBundle.open(path)
+
+
+class TestHotSwap:
+    """Rebuilt bundles reach running calculators"""
+
+    def test_watcher_installs_rebuilt_bundle(self, tmp_path, my_employee_young_over5k):
+        path = tmp_path / "rules.kfrb"
+        build_bundle([_my_snapshot()], path)
+        calculator = StatutoryCalculator()
+        watcher = RateBundleWatcher(path, calculator)
+
+        assert watcher.check() is True
+        assert watcher.check() is False
+        before = calculator.calculate_all(my_employee_young_over5k)
+
+        build_bundle([_my_snapshot("0.003")], path)
+        assert watcher.check() is True
+        after = calculator.calculate_all(my_employee_young_over5k)
+
+        eis = [next(c for c in s.contributions if c.scheme_code == "EIS") for s in (before, after)]
+        assert eis[0].employee_amount < eis[1].employee_amount
+        assert calculator.snapshot_versions["MY"] == _my_snapshot("0.003").version
+
+    def test_payrun_workers_open_the_bundle(self, tmp_path, my_snapshot):
+        path = tmp_path / "rules.kfrb"
+        build_bundle([my_snapshot], path)
+        employees = _workforce()
+
+        from_bundle = _run(PayRunExecutor(workers=1, bundle_path=path, shard_size=7), employees)
+        from_snapshots = _run(
+            PayRunExecutor(workers=1, snapshots=[my_snapshot], shard_size=7), employees
+        )
+
+        assert [r.batch.results for r in from_bundle] == [r.batch.results for r in from_snapshots]
+
+
+class TestCommandLine:
+    def test_builds_seed_bundle(self, tmp_path, capsys):
+        path = tmp_path / "rules.kfrb"
+
+        assert main(["--output", str(path), "--countries", "MY,SG"]) == 0
+
+        with RateBundle.open(path) as bundle:
+            assert bundle.countries == ["MY", "SG"]
+            assert bundle.version in capsys.readouterr().out
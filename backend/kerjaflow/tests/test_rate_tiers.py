@@ -0,0 +1,146 @@
+"""
+Test Suite: Compiled Rate Tiers
+===============================
+Decision structure equivalence with the SQL tier query, and diagnostics
+"""
+
+import itertools
+from datetime import date
+from decimal import Decimal
+
+from ..models.statutory import EmployeeContext, NationalityType, RiskCategory
+from ..services.rate_tiers import CompiledRateTiers
+from ..services.rule_snapshot import RuleSnapshot, parse_rate_row, rate_matches
+from .factories import malaysia_rule_rows, rate_row
+
+
+def _compile(*rows) -> CompiledRateTiers:
+    return CompiledRateTiers([parse_rate_row(row) for row in rows])
+
+
+def _reference(tiers: CompiledRateTiers, employee: EmployeeContext, on: date):
+    """Linear scan in SQL priority order, the behaviour being replaced"""
+    return next((r for r in tiers.rates if rate_matches(r, employee, on)), None)
+
+
+def _indonesia_like_rows():
+    """Risk-keyed JKK tiers, headcount bands and an age/salary grid"""
+    return [
+        rate_row(1, 1, "JKK_VERY_LOW", "0", "0.0024", risk_category="VERY_LOW"),
+        rate_row(2, 1, "JKK_MEDIUM", "0", "0.0089", risk_category="MEDIUM"),
+        rate_row(3, 1, "JKK_HIGH", "0", "0.0127", risk_category="HIGH"),
+        rate_row(4, 1, "SMALL_CO", "0.01", "0.02", employee_count_max=49),
+        rate_row(5, 1, "LARGE_CO", "0.01", "0.03", employee_count_min=50),
+        rate_row(6, 1, "YOUNG_LOW", "0.02", "0.04", max_age=29, max_salary="3000"),
+        rate_row(7, 1, "YOUNG", "0.02", "0.05", max_age=29),
+        rate_row(8, 1, "SENIOR_PR", "0.01", "0.01", min_age=55, nationality_condition="PR"),
+        rate_row(9, 1, "FOREIGN", "0.005", "0.005", nationality_condition="FOREIGN",
+                 effective_from=date(2025, 10, 1)),
+        rate_row(10, 1, "OLD_RATE", "0.03", "0.03", min_salary="1000",
+                 effective_from=date(2024, 1, 1), effective_until=date(2024, 12, 31)),
+    ]  # fmt: skip
+
+
+class TestCompiledLookups:
+    def test_matches_linear_scan_everywhere(self):
+        tiers = _compile(*_indonesia_like_rows())
+
+        ages = (18, 29, 30, 54, 55, 70)
+        salaries = ("500", "999.99", "1000", "3000", "3000.01", "9000")
+        dates = (date(2023, 6, 1), date(2024, 12, 31), date(2025, 1, 1), date(2025, 10, 1))
+        nationalities = (*NationalityType, None)
+        risks = (None, RiskCategory.MEDIUM, RiskCategory.LOW)
+        headcounts = (None, 10, 49, 50, 500)
+
+        for age, salary, on, nationality, risk, headcount in itertools.product(
+            ages, salaries, dates, nationalities, risks, headcounts
+        ):
+            employee = EmployeeContext(
+                country_code="ID",
+                nationality=nationality,
+                age=age,
+                gross_salary=Decimal(salary),
+                risk_category=risk,
+                company_employee_count=headcount,
+            )
+            assert tiers.find(employee, on) == _reference(tiers, employee, on), (
+                age,
+                salary,
+                on,
+                nationality,
+                risk,
+                headcount,
+            )
+
+    def test_snapshot_uses_compiled_tiers(self, my_snapshot):
+        tiers = my_snapshot.compiled_tiers(1)
+        assert isinstance(tiers, CompiledRateTiers)
+        assert my_snapshot.compiled_tiers(999) is None
+
+    def test_empty_scheme(self):
+        tiers = _compile()
+        employee = EmployeeContext("MY", NationalityType.CITIZEN, 30, Decimal("1000"))
+        assert tiers.find(employee, date(2025, 1, 1)) is None
+        assert list(tiers.regions()) == []
+
+
+class TestInspection:
+    def test_regions_describe_tier_coverage(self):
+        snapshot = RuleSnapshot("MY", date(2025, 1, 1), date(2025, 12, 31), **malaysia_rule_rows())
+        tiers = snapshot.compiled_tiers(1)
+
+        citizen = [r.describe() for r in tiers.regions() if r.nationality is None]
+        assert citizen == [
+            "-/- date [2025-01-01, inf) age (-inf, 59] salary (-inf, 5000] "
+            "-> MY_UNDER60_UNDER5K, MY_UNDER60_OVER5K",
+            "-/- date [2025-01-01, inf) age (-inf, 59] salary (5000, inf) -> MY_UNDER60_OVER5K",
+            "-/- date [2025-01-01, inf) age [60, inf) salary (-inf, inf) -> MY_OVER60",
+        ]
+
+    def test_bounded_tier_breaks_specificity_tie(self, my_snapshot):
+        # MY_UNDER60_UNDER5K and MY_UNDER60_OVER5K tie on every original
+        # specificity column; the salary cap decides, as in the seed data
+        tiers = my_snapshot.compiled_tiers(1)
+        employee = EmployeeContext("MY", NationalityType.CITIZEN, 30, Decimal("5000.00"))
+        assert tiers.find(employee, date(2025, 6, 1)).tier_code == "MY_UNDER60_UNDER5K"
+
+    def test_seed_like_tiers_are_clean(self, my_snapshot):
+        for scheme in my_snapshot.schemes:
+            assert my_snapshot.compiled_tiers(scheme.id).diagnostics().clean
+
+    def test_overlapping_tiers_detected(self):
+        tiers = _compile(
+            rate_row(1, 1, "A", "0.11", "0.13", max_age=59),
+            rate_row(2, 1, "B", "0.11", "0.12", max_age=64),
+        )
+
+        overlaps = tiers.diagnostics().overlaps
+        assert [(a.tier_code, b.tier_code) for a, b in overlaps] == [("A", "B")]
+
+    def test_headcount_bands_are_not_overlaps(self):
+        tiers = _compile(
+            rate_row(1, 1, "SMALL", "0.01", "0.02", employee_count_max=49),
+            rate_row(2, 1, "LARGE", "0.01", "0.03", employee_count_min=50),
+        )
+        assert tiers.diagnostics().clean
+
+    def test_unreachable_tiers_detected(self, caplog):
+        rows = [
+            rate_row(1, 1, "BROAD", "0.11", "0.13", min_age=18),
+            rate_row(2, 1, "SHADOWED", "0.11", "0.12", min_age=21, employee_count_min=50),
+            rate_row(3, 1, "EMPTY_RANGE", "0.11", "0.12", min_age=60, max_age=50),
+        ]
+        diagnostics = _compile(*rows).diagnostics()
+
+        # BROAD ties with SHADOWED and wins on id wherever SHADOWED applies
+        assert sorted(rate.tier_code for rate in diagnostics.unreachable) == [
+            "EMPTY_RANGE",
+            "SHADOWED",
+        ]
+        assert [(a.tier_code, b.tier_code) for a, b in diagnostics.overlaps] == [
+            ("BROAD", "SHADOWED")
+        ]
+
+        scheme_rows = malaysia_rule_rows()["scheme_rows"][:1]
+        RuleSnapshot("MY", date(2025, 1, 1), date(2025, 12, 31), scheme_rows, rows)
+        assert "tier EMPTY_RANGE is unreachable" in caplog.text
@@ -0,0 +1,194 @@
+"""
+Test Suite: Calculation Result Store
+====================================
+Input hashing, incremental re-runs and run totals from stored results
+"""
+
+import json
+from dataclasses import replace
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from ..models.statutory import NationalityType
+from ..services.result_store import (
+    DatabaseResultStore,
+    IncrementalPayRun,
+    ResultStore,
+    input_hash,
+)
+from ..services.rule_snapshot import RuleSnapshot
+from ..services.statutory_calculator import StatutoryCalculator
+from .factories import FakeConnection, employee, malaysia_rule_rows, rate_row
+
+PAY_DATE = date(2025, 6, 30)
+
+
+def _workforce(count: int = 40):
+    return [
+        employee(
+            nationality=NationalityType.FOREIGN if i % 7 == 0 else NationalityType.CITIZEN,
+            age=22 + i % 40,
+            gross_salary=Decimal(1800 + 150 * (i % 25)),
+            employee_id=f"E{i:03d}",
+            calculation_date=PAY_DATE,
+        )
+        for i in range(count)
+    ]
+
+
+class ResultTable:
+    """Connection emulating kf_statutory_result with a dict"""
+
+    def __init__(self):
+        self.rows = {}
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params):
+        self.statements.append(query)
+        on, employee_ids = params
+        self._fetched = [self.rows[(e, on)] for e in employee_ids if (e, on) in self.rows]
+
+    def executemany(self, query, rows):
+        self.statements.append(query)
+        for row in rows:
+            self.rows[(row[0], row[1])] = row
+
+    def fetchall(self):
+        return self._fetched
+
+    def close(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+
+class TestInputHash:
+    """Normalized inputs and the rule version"""
+
+    def test_equal_amounts_hash_alike(self):
+        worker = _workforce(1)[0]
+        same = replace(worker, gross_salary=worker.gross_salary.quantize(Decimal("0.01")))
+        assert input_hash(worker, PAY_DATE, "v1") == input_hash(same, PAY_DATE, "v1")
+
+    def test_inputs_and_version_change_the_hash(self):
+        worker = _workforce(1)[0]
+        base = input_hash(worker, PAY_DATE, "v1")
+        assert input_hash(replace(worker, age=worker.age + 1), PAY_DATE, "v1") != base
+        assert input_hash(worker, date(2025, 7, 31), "v1") != base
+        assert input_hash(worker, PAY_DATE, "v2") != base
+        # Not a calculation input
+        assert input_hash(replace(worker, company_id="CO9"), PAY_DATE, "v1") == base
+
+
+class TestIncrementalPayRun:
+    """Only changed employees are recalculated and written"""
+
+    def test_rerun_without_changes_skips_everyone(self, snapshot_calculator):
+        store = ResultStore()
+        run = IncrementalPayRun(snapshot_calculator, store)
+
+        first = run.run(_workforce())
+        again = run.run(_workforce())
+
+        assert (first.calculated, first.skipped, first.changed) == (40, 0, 40)
+        assert (again.calculated, again.skipped, again.changed) == (0, 40, 0)
+        assert again.totals == first.totals
+        expected = snapshot_calculator.calculate_batch(_workforce())
+        assert first.totals.total_employee_amount == sum(
+            r.total_employee_amount for r in expected.results
+        )
+        keys = [(e.employee_id, PAY_DATE) for e in _workforce()]
+        assert store.totals(keys) == first.totals
+
+    def test_hr_edits_recalculate_only_edited_employees(self, snapshot_calculator):
+        store = ResultStore()
+        run = IncrementalPayRun(snapshot_calculator, store)
+        first = run.run(_workforce())
+
+        edited = _workforce()
+        edited[3] = replace(edited[3], gross_salary=edited[3].gross_salary + 1000)
+        edited[8] = replace(edited[8], basic_salary=Decimal("1000.00"))  # Not a wage base here
+        report = run.run(edited)
+
+        assert (report.calculated, report.skipped) == (2, 38)
+        assert report.changed == 1
+        assert report.totals.digest != first.totals.digest
+        assert report.totals == run.run(edited).totals
+
+    def test_rule_change_recalculates_everyone(self, my_rule_rows):
+        store = ResultStore()
+        before = RuleSnapshot("MY", date(2024, 1, 1), date(2026, 12, 31), **my_rule_rows)
+        IncrementalPayRun(StatutoryCalculator(snapshots=[before]), store).run(_workforce())
+
+        rows = malaysia_rule_rows()
+        eis = next(i for i, row in enumerate(rows["rate_rows"]) if row[0] == 31)
+        rows["rate_rows"][eis] = rate_row(
+            31, 3, "EIS_STANDARD", "0.003", "0.003", effective_from=date(2024, 10, 1)
+        )
+        after = RuleSnapshot("MY", date(2024, 1, 1), date(2026, 12, 31), **rows)
+        report = IncrementalPayRun(StatutoryCalculator(snapshots=[after]), store).run(_workforce())
+
+        assert report.calculated == 40
+        assert report.changed == 34  # Everyone but the 6 foreign workers pays EIS
+
+    def test_snapshot_window_does_not_change_the_hash(self, my_rule_rows):
+        store = ResultStore()
+        employees = _workforce()
+        # Database snapshot loaded over the run's own dates
+        IncrementalPayRun(StatutoryCalculator(FakeConnection(my_rule_rows)), store).run(employees)
+
+        for valid_from, valid_until in (
+            (date(2024, 1, 1), date(2026, 12, 31)),
+            (PAY_DATE, PAY_DATE),
+        ):
+            snapshot = RuleSnapshot("MY", valid_from, valid_until, **my_rule_rows)
+            calculator = StatutoryCalculator(snapshots=[snapshot])
+            report = IncrementalPayRun(calculator, store).run(employees)
+            assert report.skipped == len(employees)
+
+    def test_database_calculator_loads_rules_once(self, my_rule_rows):
+        connection = FakeConnection(my_rule_rows)
+        calculator = StatutoryCalculator(connection)
+        run = IncrementalPayRun(calculator, ResultStore())
+
+        run.run(_workforce())
+        report = run.run(_workforce())
+
+        assert report.skipped == 40
+        assert len(connection.queries) == 8  # Four per run
+        assert calculator.snapshot_versions == {}
+
+    def test_employee_id_required(self, snapshot_calculator):
+        employees = _workforce(2)
+        employees[1].employee_id = None
+        with pytest.raises(ValueError):
+            IncrementalPayRun(snapshot_calculator, ResultStore()).run(employees)
+
+
+class TestDatabaseResultStore:
+    """Upserts and lookups against kf_statutory_result"""
+
+    def test_round_trip_through_the_table(self, snapshot_calculator):
+        table = ResultTable()
+        run = IncrementalPayRun(snapshot_calculator, DatabaseResultStore(table))
+
+        first = run.run(_workforce())
+        again = run.run(_workforce())
+
+        assert again.skipped == 40 and again.totals == first.totals
+        assert table.commits == 1  # Nothing written by the second run
+        upsert = next(s for s in table.statements if s.startswith("INSERT"))
+        assert "ON CONFLICT (employee_id, calculation_date) DO UPDATE" in upsert
+        row = table.rows[("E001", PAY_DATE)]
+        assert [code for code, _, _ in json.loads(row[8])] == ["EPF", "SOCSO", "EIS", "SOCSO_TABLE"]
+
+    def test_rejects_unsafe_table_names(self):
+        with pytest.raises(ValueError):
+            DatabaseResultStore(ResultTable(), "results; DROP TABLE kf_employee")
@@ -0,0 +1,365 @@
+"""
+Test Suite: Retro Recalculation
+===============================
+Dependency index over stored contributions and incremental recalculation
+after a rule row is corrected (no database required)
+"""
+
+from dataclasses import replace
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from ..benchmarks.workforce import generate_country
+from ..models.columnar import ContributionColumns
+from ..models.statutory import EmployeeContext, NationalityType
+from ..services.retro_recalculation import (
+    DependencyIndex,
+    RetroRecalculator,
+    RuleChange,
+    diff_snapshots,
+)
+from ..services.rule_snapshot import RuleSnapshot, parse_rate_row
+from ..services.statutory_calculator import StatutoryCalculator
+from ..services.ytd_ledger import YtdLedger
+from ..utils.seed_sql import SeedRules
+from .factories import ceiling_row, rate_row, scheme_row
+
+COUNTRIES = ("MY", "SG", "ID")
+MONTHS = [date(2025, month, 28) for month in range(6, 12)]
+
+# Column positions in RATE_COLUMNS / CEILING_COLUMNS / TABLE_LOOKUP_COLUMNS
+RATE_MIN_AGE, RATE_EMPLOYEE_RATE = 4, 13
+CEILING_AMOUNT = 3
+BAND_EMPLOYEE_AMOUNT = 5
+
+
+def _with_row(rows: dict, table: str, row_id: int, column: int, value) -> dict:
+    """Copy of rule rows with one cell of one row corrected"""
+    corrected = dict(rows, **{table: []})
+    for row in rows[table]:
+        if row[0] == row_id:
+            row = list(row)
+            row[column] = value
+        corrected[table].append(tuple(row))
+    return corrected
+
+
+def _seed_rows() -> dict:
+    seed = SeedRules.from_migrations()
+    return {code: seed.rule_rows(code) for code in COUNTRIES}
+
+
+def _snapshots(rows_by_country: dict) -> dict:
+    return {
+        code: RuleSnapshot(code, date(2024, 1, 1), date(2026, 12, 31), **rows)
+        for code, rows in rows_by_country.items()
+    }
+
+
+def _history(count: int = 40):
+    """count employees per country, each paid every month of MONTHS"""
+    employees = []
+    for code in COUNTRIES:
+        for i, employee in enumerate(generate_country(code, count, MONTHS[0])):
+            for on in MONTHS:
+                employees.append(replace(employee, employee_id=f"{code}-{i}", calculation_date=on))
+    return employees
+
+
+def _stored(calculator: StatutoryCalculator, employees) -> DependencyIndex:
+    index = DependencyIndex()
+    for on in sorted({e.calculation_date for e in employees}):
+        batch = calculator.calculate_batch([e for e in employees if e.calculation_date == on])
+        for summary in batch.results:
+            index.add(summary)
+    return index
+
+
+def _amounts(summary):
+    return [(c.scheme_code, c.employee_amount, c.employer_amount) for c in summary.contributions]
+
+
+def _assert_incremental_matches_full(rows: dict, corrected: dict, country_code: str):
+    """Recalculating the affected slice gives the same history as recalculating everything"""
+    employees = _history()
+    before = _snapshots(rows)
+    after = _snapshots(corrected)
+    calculator = StatutoryCalculator(snapshots=before.values())
+    index = _stored(calculator, employees)
+
+    result = RetroRecalculator(calculator, index).apply_snapshot(
+        before[country_code], after[country_code]
+    )
+
+    full = _stored(StatutoryCalculator(snapshots=after.values()), employees)
+    originals = _stored(StatutoryCalculator(snapshots=before.values()), employees)
+    changed = set()
+    for employee in employees:
+        key = (employee.employee_id, employee.calculation_date)
+        assert _amounts(index.get(key)) == _amounts(full.get(key)), key
+        if _amounts(originals.get(key)) != _amounts(full.get(key)):
+            changed.add(key)
+    assert {diff.key for diff in result.diffs} == changed
+    return result, index
+
+
+class TestRuleIds:
+    """Contributions name the rule rows they were calculated from"""
+
+    def test_rate_ceiling_and_band_ids(self, snapshot_calculator):
+        employee = EmployeeContext(
+            "MY", NationalityType.CITIZEN, 30, Decimal("6500.00"), calculation_date=date(2025, 6, 1)
+        )
+        summary = snapshot_calculator.calculate_all(employee)
+
+        ids = {
+            c.scheme_code: (c.scheme_id, c.rate_id, c.ceiling_id, c.table_lookup_id)
+            for c in summary.contributions
+        }
+        assert ids["EPF"] == (1, 11, None, None)
+        assert ids["SOCSO"] == (2, 20, 100, None)
+        assert ids["EIS"] == (3, 31, 102, None)
+        assert ids["SOCSO_TABLE"] == (4, 40, None, None)  # 6,500 is above the last band
+
+        employee.gross_salary = Decimal("3500.00")
+        summary = snapshot_calculator.calculate_all(employee)
+        table = next(c for c in summary.contributions if c.scheme_code == "SOCSO_TABLE")
+        assert table.table_lookup_id == 201
+
+    def test_ids_survive_columnar_storage(self, snapshot_calculator):
+        employees = [
+            EmployeeContext("MY", NationalityType.CITIZEN, 25 + i, Decimal(2500 + 700 * i))
+            for i in range(6)
+        ]
+        batch = snapshot_calculator.calculate_batch(employees, date(2025, 6, 1))
+
+        columns = ContributionColumns.from_batch(batch)
+
+        assert list(columns) == [c for s in batch.results for c in s.contributions]
+        assert set(columns.column("table_lookup_id")) == {200, 201, 202, None}
+
+
+class TestDependencyIndex:
+    """Rule row -> payslip lookups"""
+
+    def test_replacing_a_key_reindexes_it(self, snapshot_calculator):
+        index = DependencyIndex()
+        employee = EmployeeContext(
+            "MY", NationalityType.CITIZEN, 30, Decimal("4500.00"), employee_id="E1"
+        )
+        index.add(snapshot_calculator.calculate_all(employee, date(2025, 6, 1)))
+        assert index.users("rate", 10) == {("E1", date(2025, 6, 1))}
+
+        employee = replace(employee, gross_salary=Decimal("5500.00"))
+        index.add(snapshot_calculator.calculate_all(employee, date(2025, 6, 1)))
+
+        assert len(index) == 1
+        assert index.users("rate", 10) == set()
+        assert index.users("rate", 11) == {("E1", date(2025, 6, 1))}
+
+    def test_summaries_without_employee_id_need_a_key(self, snapshot_calculator):
+        summary = snapshot_calculator.calculate_all(
+            EmployeeContext("MY", NationalityType.CITIZEN, 30, Decimal("4500.00"))
+        )
+        with pytest.raises(ValueError):
+            DependencyIndex().add(summary)
+        index = DependencyIndex()
+        assert index.add(summary, key="PAYSLIP-1") == "PAYSLIP-1"
+        assert "PAYSLIP-1" in index
+
+    def test_diff_snapshots_finds_changed_rows(self, my_rule_rows, my_snapshot):
+        corrected = _with_row(my_rule_rows, "rate_rows", 31, RATE_EMPLOYEE_RATE, Decimal("0.003"))
+        corrected["ceiling_rows"] = [r for r in corrected["ceiling_rows"] if r[0] != 100]
+        after = RuleSnapshot("MY", date(2024, 1, 1), date(2026, 12, 31), **corrected)
+
+        changes = diff_snapshots(my_snapshot, after)
+
+        assert [(c.kind, c.row_id) for c in changes] == [("rate", 31), ("ceiling", 100)]
+        assert changes[0].before.employee_rate == Decimal("0.002")
+        assert changes[0].after.employee_rate == Decimal("0.003")
+        assert changes[1].after is None
+
+    def test_metadata_only_edit_affects_nothing(self, my_rule_rows, snapshot_calculator):
+        index = _stored(
+            snapshot_calculator,
+            [
+                EmployeeContext(
+                    "MY", NationalityType.CITIZEN, 30, Decimal("4500.00"), employee_id="E1"
+                )
+            ],
+        )
+        before = parse_rate_row(next(r for r in my_rule_rows["rate_rows"] if r[0] == 31))
+        after = replace(before, verified_date=date(2026, 1, 5), notes="Re-verified")
+
+        assert index.affected(RuleChange("MY", "rate", before, after)) == set()
+        assert index.affected(RuleChange("MY", "rate", before, replace(after, employee_rate=0)))
+
+
+class TestIncrementalRecalculation:
+    """Only the impacted slice is recalculated, with the same outcome as a full rerun"""
+
+    def test_rate_correction_touches_only_its_users(self):
+        rows = _seed_rows()
+        eis = next(r for r in rows["MY"]["rate_rows"] if r[2] == "EIS_STANDARD")
+        corrected = dict(rows)
+        corrected["MY"] = _with_row(
+            rows["MY"], "rate_rows", eis[0], RATE_EMPLOYEE_RATE, Decimal("0.003")
+        )
+
+        result, index = _assert_incremental_matches_full(rows, corrected, "MY")
+
+        assert result.recalculated == len(index.users("rate", eis[0]))
+        assert 0 < result.recalculated < len(index) / 3
+        assert {code for diff in result.diffs for code in diff.scheme_deltas()} == {"EIS"}
+        assert result.employee_arrears > 0 and result.employer_arrears == 0
+        per_employee = result.by_employee()
+        assert sum(ee for ee, _ in per_employee.values()) == result.employee_arrears
+
+    def test_ceiling_amount_correction_skips_payslips_under_both_amounts(self):
+        rows = _seed_rows()
+        socso = next(r for r in rows["MY"]["ceiling_rows"] if r[3] == Decimal("5000.00"))
+        corrected = dict(rows)
+        corrected["MY"] = _with_row(
+            rows["MY"], "ceiling_rows", socso[0], CEILING_AMOUNT, Decimal("4000.00")
+        )
+
+        result, index = _assert_incremental_matches_full(rows, corrected, "MY")
+
+        assert result.recalculated < len(index.users("ceiling", socso[0]))
+        assert result.diffs
+
+    def test_condition_change_reaches_newly_matched_payslips(self):
+        rows = _seed_rows()
+        over60 = next(r for r in rows["MY"]["rate_rows"] if r[2] == "MY_OVER60")
+        corrected = dict(rows)
+        corrected["MY"] = _with_row(rows["MY"], "rate_rows", over60[0], RATE_MIN_AGE, 55)
+
+        result, index = _assert_incremental_matches_full(rows, corrected, "MY")
+
+        # Ages 55-59 move onto the corrected tier; only tier matches are recalculated
+        assert result.diffs
+        assert len(index.users("rate", over60[0])) <= result.recalculated < len(index) / 10
+        assert {diff.after.employee_context.age for diff in result.diffs} <= set(range(55, 60))
+
+    def test_band_amount_correction(self, my_rule_rows):
+        corrected = _with_row(
+            my_rule_rows, "table_lookup_rows", 201, BAND_EMPLOYEE_AMOUNT, Decimal("20.75")
+        )
+        before = RuleSnapshot("MY", date(2024, 1, 1), date(2026, 12, 31), **my_rule_rows)
+        after = RuleSnapshot("MY", date(2024, 1, 1), date(2026, 12, 31), **corrected)
+        calculator = StatutoryCalculator(snapshots=[before])
+        employees = [
+            EmployeeContext(
+                "MY",
+                NationalityType.CITIZEN,
+                30,
+                Decimal(2000 + 500 * i),
+                employee_id=f"E{i}",
+                calculation_date=on,
+            )
+            for i in range(6)
+            for on in MONTHS[:2]
+        ]
+        index = _stored(calculator, employees)
+
+        result = RetroRecalculator(calculator, index).apply_snapshot(before, after)
+
+        # Bands 3,000-3,999.99: salaries 3,000 and 3,500 in two months
+        assert result.recalculated == 4
+        assert [d.scheme_deltas() for d in result.diffs] == [
+            {"SOCSO_TABLE": (Decimal("1.00"), Decimal("0.00"))}
+        ] * 4
+        assert index.users("table_lookup", 201) == {d.key for d in result.diffs}
+
+
+class TestLedgerRecalculation:
+    """A correction to one month reaches the YTD-dependent months after it"""
+
+    @staticmethod
+    def _rules(extra_rates=()) -> RuleSnapshot:
+        return RuleSnapshot(
+            "SG",
+            date(2025, 1, 1),
+            date(2026, 12, 31),
+            scheme_rows=[scheme_row(1, "LEVY", "PERCENTAGE", "GROSS")],
+            rate_rows=[rate_row(20, 1, "LEVY_ALL", "0.01", "0.01"), *extra_rates],
+            ceiling_rows=[ceiling_row(200, 1, "50000.00", "ANNUAL")],
+        )
+
+    def test_inserted_rate_replays_later_months(self):
+        before = self._rules()
+        # A March-only tier for the higher paid, inserted after the fact
+        march = rate_row(
+            21,
+            1,
+            "LEVY_MAR",
+            "0.02",
+            "0.02",
+            min_salary="10000",
+            effective_from=date(2025, 3, 1),
+            effective_until=date(2025, 3, 31),
+        )
+        after = self._rules([march])
+        employees = [
+            EmployeeContext(
+                "SG",
+                NationalityType.CITIZEN,
+                35,
+                Decimal(salary),
+                employee_id=employee_id,
+                calculation_date=date(2025, month, 28),
+            )
+            for employee_id, salary in (("HIGH", "12000.00"), ("LOW", "3000.00"))
+            for month in range(1, 7)
+        ]
+        calculator = StatutoryCalculator(snapshots=[before], ledger=YtdLedger())
+        index = _stored(calculator, employees)
+
+        result = RetroRecalculator(calculator, index).apply_snapshot(before, after)
+
+        # March of HIGH matches the new tier, April-June follow through the ledger
+        assert result.recalculated == 4
+        assert [(d.key, d.employee_arrears) for d in result.diffs] == [
+            (("HIGH", date(2025, 3, 28)), Decimal("120.00"))
+        ]
+        assert calculator.ledger.stale_from("HIGH", 2025) is None
+
+        fresh = _stored(StatutoryCalculator(snapshots=[after], ledger=YtdLedger()), employees)
+        for employee in employees:
+            key = (employee.employee_id, employee.calculation_date)
+            assert _amounts(index.get(key)) == _amounts(fresh.get(key))
+
+    def test_annual_ceiling_correction(self):
+        before = self._rules()
+        rows = {name: list(before.rows[name]) for name in ("scheme", "rate", "ceiling")}
+        rows["ceiling"] = [ceiling_row(200, 1, "40000.00", "ANNUAL")]
+        after = RuleSnapshot(
+            "SG",
+            date(2025, 1, 1),
+            date(2026, 12, 31),
+            scheme_rows=rows["scheme"],
+            rate_rows=rows["rate"],
+            ceiling_rows=rows["ceiling"],
+        )
+        employees = [
+            EmployeeContext(
+                "SG",
+                NationalityType.CITIZEN,
+                35,
+                Decimal("12000.00"),
+                employee_id="E1",
+                calculation_date=date(2025, month, 28),
+            )
+            for month in range(1, 7)
+        ]
+        calculator = StatutoryCalculator(snapshots=[before], ledger=YtdLedger())
+        index = _stored(calculator, employees)
+
+        result = RetroRecalculator(calculator, index).apply_snapshot(before, after)
+
+        assert result.recalculated == 6
+        # 40,000 is reached in April instead of May
+        assert [d.calculation_date.month for d in result.diffs] == [4, 5]
+        assert result.employee_arrears == Decimal("-100.00")
@@ -0,0 +1,153 @@
+"""
+Test Suite: Rule Snapshots
+==========================
+In-memory statutory rules answering calculator lookups without SQL
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from ..models.statutory import NationalityType
+from ..services.rule_snapshot import RuleSnapshot
+from ..services.statutory_calculator import StatutoryCalculator
+from .factories import FakeConnection, ceiling_row, employee, malaysia_rule_rows
+
+
+class TestRuleSnapshotLookups:
+    """Snapshot lookups reproduce the SQL semantics"""
+
+    def test_schemes_filtered_by_date_and_nationality(self, my_snapshot):
+        citizen = my_snapshot.get_applicable_schemes(NationalityType.CITIZEN, date(2025, 6, 1))
+        assert [s.code for s in citizen] == ["EPF", "SOCSO", "EIS", "SOCSO_TABLE"]
+        assert citizen[0].country_code == "MY"
+
+        foreign = my_snapshot.get_applicable_schemes(NationalityType.FOREIGN, date(2025, 11, 1))
+        assert [s.code for s in foreign] == ["EPF_FOREIGN"]
+
+        assert my_snapshot.get_applicable_schemes(NationalityType.FOREIGN, date(2025, 6, 1)) == []
+
+    def test_most_specific_tier_wins(self, my_snapshot):
+        under5k = my_snapshot.find_matching_rate(1, employee(), date(2025, 6, 1))
+        assert under5k.tier_code == "MY_UNDER60_UNDER5K"
+
+        over5k = my_snapshot.find_matching_rate(
+            1, employee(gross_salary=Decimal("8000")), date(2025, 6, 1)
+        )
+        assert over5k.tier_code == "MY_UNDER60_OVER5K"
+
+        senior = my_snapshot.find_matching_rate(1, employee(age=62), date(2025, 6, 1))
+        assert senior.tier_code == "MY_OVER60"
+
+    def test_null_nationality_condition_matches_everyone(self, my_snapshot):
+        rate = my_snapshot.find_matching_rate(2, employee(), date(2025, 6, 1))
+        assert rate.tier_code == "SOCSO_STANDARD"
+
+    def test_date_based_rate_and_ceiling(self, my_snapshot):
+        before = date(2024, 9, 1)
+        after = date(2024, 11, 1)
+
+        assert my_snapshot.find_matching_rate(3, employee(), before).tier_code == "EIS_OLD"
+        assert my_snapshot.find_matching_rate(3, employee(), after).tier_code == "EIS_STANDARD"
+        assert my_snapshot.get_ceiling(3, before).ceiling_amount == Decimal("4000.00")
+        assert my_snapshot.get_ceiling(3, after).ceiling_amount == Decimal("6000.00")
+        assert my_snapshot.get_ceiling(3, after, "ANNUAL") is None
+
+    def test_table_band_lookup(self, my_snapshot):
+        band = my_snapshot.find_table_band(4, Decimal("3500.00"), date(2025, 6, 1))
+        assert (band.employee_amount, band.employer_amount) == (
+            Decimal("19.75"),
+            Decimal("69.05"),
+        )
+        assert my_snapshot.find_table_band(4, Decimal("9000.00"), date(2025, 6, 1)) is None
+
+    def test_covers_validity_window(self, my_snapshot):
+        assert my_snapshot.covers(date(2024, 1, 1))
+        assert my_snapshot.covers(date(2026, 12, 31))
+        assert not my_snapshot.covers(date(2027, 1, 1))
+
+    def test_invalid_window_rejected(self, my_rule_rows):
+        with pytest.raises(ValueError):
+            RuleSnapshot("MY", date(2026, 1, 1), date(2025, 1, 1), **my_rule_rows)
+
+
+class TestRuleSnapshotVersioning:
+    """Versions identify rule content"""
+
+    def test_same_rows_same_version(self, my_rule_rows):
+        first = RuleSnapshot("MY", date(2025, 1, 1), date(2025, 12, 31), **my_rule_rows)
+        second = RuleSnapshot("MY", date(2025, 1, 1), date(2025, 12, 31), **malaysia_rule_rows())
+        assert first.version == second.version
+
+    def test_changed_row_changes_version(self, my_rule_rows):
+        before = RuleSnapshot("MY", date(2025, 1, 1), date(2025, 12, 31), **my_rule_rows)
+        my_rule_rows["ceiling_rows"][0] = ceiling_row(100, 2, "6000.00")
+        after = RuleSnapshot("MY", date(2025, 1, 1), date(2025, 12, 31), **my_rule_rows)
+        assert before.version != after.version
+
+    def test_window_is_part_of_version(self, my_rule_rows):
+        first = RuleSnapshot("MY", date(2025, 1, 1), date(2025, 12, 31), **my_rule_rows)
+        second = RuleSnapshot("MY", date(2025, 1, 1), date(2026, 12, 31), **my_rule_rows)
+        assert first.version != second.version
+
+
+class TestCalculatorSnapshotMode:
+    """StatutoryCalculator answers from the snapshot with zero SQL"""
+
+    def test_calculate_all_without_database(self, snapshot_calculator):
+        result = snapshot_calculator.calculate_all(employee())
+
+        amounts = {
+            c.scheme_code: (c.employee_amount, c.employer_amount) for c in result.contributions
+        }
+        assert amounts["EPF"] == (Decimal("495.00"), Decimal("585.00"))
+        assert amounts["SOCSO"] == (Decimal("22.50"), Decimal("56.25"))
+        assert amounts["EIS"] == (Decimal("9.00"), Decimal("9.00"))
+        assert amounts["SOCSO_TABLE"] == (Decimal("24.75"), Decimal("86.65"))
+
+    def test_ceiling_applied_from_snapshot(self, snapshot_calculator):
+        result = snapshot_calculator.calculate_all(employee(gross_salary=Decimal("8000.00")))
+        eis = next(c for c in result.contributions if c.scheme_code == "EIS")
+        assert eis.capped is True
+        assert eis.applied_salary == Decimal("6000.00")
+
+    def test_load_snapshot_uses_four_queries(self, my_rule_rows):
+        connection = FakeConnection(my_rule_rows)
+        calculator = StatutoryCalculator(connection)
+        calculator.load_snapshot("MY", date(2025, 1, 1), date(2025, 12, 31))
+        assert len(connection.queries) == 4
+
+        for age in range(20, 70):
+            calculator.calculate_all(employee(age=age))
+        assert len(connection.queries) == 4
+
+    def test_uncovered_date_falls_back_to_database(self, my_snapshot):
+        calculator = StatutoryCalculator(snapshots=[my_snapshot])
+        with pytest.raises(LookupError):
+            calculator.calculate_all(employee(calculation_date=date(2030, 1, 1)))
+
+    def test_refresh_detects_changes(self, my_rule_rows):
+        connection = FakeConnection(my_rule_rows)
+        calculator = StatutoryCalculator(connection)
+        snapshot = calculator.load_snapshot("MY", date(2025, 1, 1), date(2025, 12, 31))
+
+        assert calculator.refresh_snapshot("MY") is False
+        assert calculator.snapshot_versions == {"MY": snapshot.version}
+
+        changed = malaysia_rule_rows()
+        changed["ceiling_rows"][0] = ceiling_row(100, 2, "6000.00")
+        connection.set_rows(changed)
+
+        assert calculator.refresh_snapshot("MY") is True
+        assert calculator.snapshot_versions["MY"] != snapshot.version
+
+        result = calculator.calculate_all(employee(gross_salary=Decimal("5500.00")))
+        socso = next(c for c in result.contributions if c.scheme_code == "SOCSO")
+        assert socso.capped is False
+
+    def test_invalidate_snapshot(self, snapshot_calculator):
+        snapshot_calculator.invalidate_snapshot("MY")
+        assert snapshot_calculator.snapshot_versions == {}
+        with pytest.raises(LookupError):
+            snapshot_calculator.calculate_all(employee())
@@ -0,0 +1,62 @@
+"""
+Test Suite: Seed SQL Reader
+===========================
+Rule rows read from the seed migrations without a database
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from ..services.rule_snapshot import RuleSnapshot
+from ..utils.seed_sql import SeedRules, SeedSQLError
+
+SCHEME_SQL = """
+INSERT INTO kf_statutory_scheme (
+    country_id, code, name_en, scheme_type, calculation_method, calculation_base, effective_from
+) VALUES
+((SELECT id FROM kf_country WHERE code='XX'), 'LEVY', 'It''s a levy', 'LEVY', 'PERCENTAGE',
+ 'GROSS', '2025-01-01')
+ON CONFLICT (country_id, code, effective_from) DO NOTHING;
+"""
+
+RATE_SQL = """
+INSERT INTO kf_statutory_rate (scheme_id, tier_code, employer_rate, effective_from) VALUES
+-- comment between rows
+((SELECT id FROM kf_statutory_scheme WHERE code='LEVY'), 'STANDARD', 0.00250000, '2025-01-01')
+ON CONFLICT (scheme_id, tier_code, effective_from) DO NOTHING;
+"""
+
+
+class TestSeedRules:
+    def test_reads_all_country_seeds(self):
+        rules = SeedRules.from_migrations()
+
+        assert rules.country_codes() == ["MY", "SG", "ID", "TH", "PH", "VN", "KH", "MM", "BN"]
+
+        snapshot = RuleSnapshot("MY", date(2025, 1, 1), date(2025, 12, 31), **rules.rule_rows("MY"))
+        epf = next(s for s in snapshot.schemes if s.code == "EPF")
+        senior = next(r for r in snapshot.compiled_tiers(epf.id).rates if r.min_age == 60)
+        assert senior.employee_rate == Decimal("0.05500000")
+
+    def test_defaults_conflicts_and_subselects(self):
+        rules = SeedRules()
+        rules.read(SCHEME_SQL)
+        rules.read(SCHEME_SQL)  # ON CONFLICT DO NOTHING
+        rules.read(RATE_SQL)
+
+        rows = rules.rule_rows("XX")
+        (scheme,) = rows["scheme_rows"]
+        assert scheme[:5] == (1, "XX", None, "LEVY", "It's a levy")
+        assert scheme[17:20] == ("NEAREST", 2, date(2025, 1, 1))
+        (rate,) = rows["rate_rows"]
+        assert (rate[1], rate[2], rate[14]) == (1, "STANDARD", Decimal("0.00250000"))
+
+    def test_ambiguous_subselect_rejected(self):
+        rules = SeedRules()
+        rules.read(SCHEME_SQL)
+        rules.read(SCHEME_SQL.replace("'2025-01-01'", "'2026-01-01'"))
+
+        with pytest.raises(SeedSQLError, match="matched 2 rows"):
+            rules.read(RATE_SQL)
@@ -0,0 +1,275 @@
+"""
+Test Suite: SQL Calculator
+==========================
+kf_calculate_contributions (migration 018) against the Python engine
+
+The differential tests load the migrations into a scratch schema of the
+KFLOW_DB_* test database and skip when no PostgreSQL server is reachable.
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import replace
+from datetime import date
+from decimal import Decimal
+
+import psycopg2
+import pytest
+
+from ..models.statutory import NationalityType, RiskCategory, RoundingMethod
+from ..services.rule_snapshot import (
+    CEILING_COLUMNS,
+    RATE_COLUMNS,
+    SCHEME_COLUMNS,
+    TABLE_LOOKUP_COLUMNS,
+    RuleSnapshot,
+)
+from ..services.sql_calculator import SqlCalculator
+from ..services.statutory_calculator import StatutoryCalculator
+from ..utils.seed_sql import MIGRATIONS_DIR, SEED_FILE_PATTERN, SeedRules
+from .factories import boundary_workforce, employee, malaysia_rule_rows
+
+SCHEMA_FILES = [
+    "001_create_country_tables.sql",
+    "002_create_statutory_tables.sql",
+    "003_create_rate_tables.sql",
+]
+FUNCTIONS_FILE = "018_create_bulk_contribution_functions.sql"
+
+# Dates either side of the seeded rule changes
+CALCULATION_DATES = [date(2025, 6, 30), date(2025, 10, 1), date(2026, 1, 31), date(2028, 6, 1)]
+
+
+def _result_row(index, scheme_code, employee_amount, employer_amount, scheme_id=1):
+    """kf_contribution_result row in RESULT_COLUMNS order"""
+    ee, er = Decimal(employee_amount), Decimal(employer_amount)
+    return (
+        index, scheme_id, scheme_code, f"{scheme_code} scheme", "PERCENTAGE",
+        Decimal("4500.00"), Decimal("4500.00"), False,
+        ee, er, ee + er,
+        Decimal("0.11"), Decimal("0.13"), f"{scheme_code}_TIER", None,
+        10, None, None,
+    )  # fmt: skip
+
+
+class RecordingConnection:
+    """Connection answering each statement with the next canned result set"""
+
+    def __init__(self, *result_sets):
+        self.result_sets = list(result_sets)
+        self.statements = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params):
+        self.statements.append((query, params))
+
+    def fetchall(self):
+        return self.result_sets.pop(0)
+
+    def close(self):
+        pass
+
+
+class TestSqlCalculator:
+    """Payload and result mapping (no database required)"""
+
+    def test_one_statement_per_chunk(self):
+        employees = [
+            employee(employee_id="E1", nationality=None),
+            employee(employee_id="E2", country_code="XX"),
+            employee(employee_id="E3", risk_category=RiskCategory.LOW),
+        ]
+        connection = RecordingConnection(
+            [_result_row(1, "EPF", "495.00", "585.00"), _result_row(1, "EIS", "9.00", "9.00", 3)],
+            [_result_row(1, "EPF", "495.00", "585.00")],
+        )
+
+        summaries = SqlCalculator(connection, chunk_size=2).calculate(employees)
+
+        assert len(connection.statements) == 2
+        query, (payload, period) = connection.statements[0]
+        assert "kf_calculate_contributions_json(%s::jsonb, %s)" in query
+        assert period is None
+        first = json.loads(payload)[0]
+        assert first["gross_salary"] == "4500.00" and first["nationality"] is None
+        assert first["calculation_date"] == "2025-06-01"
+        assert json.loads(connection.statements[1][1][0])[0]["risk_category"] == "LOW"
+
+        assert [s.employee_context.employee_id for s in summaries] == ["E1", "E2", "E3"]
+        assert [c.scheme_code for c in summaries[0].contributions] == ["EPF", "EIS"]
+        assert summaries[0].total_employee_amount == Decimal("504.00")
+        assert summaries[1].contributions == []  # No rows: no applicable scheme
+        assert summaries[2].contributions[0].rate_id == 10
+
+    def test_period_overrides_employee_dates(self):
+        connection = RecordingConnection([])
+
+        summaries = SqlCalculator(connection).calculate([employee()], date(2025, 11, 30))
+
+        assert connection.statements[0][1][1] == date(2025, 11, 30)
+        assert summaries[0].calculation_date == date(2025, 11, 30)
+
+    def test_invalid_chunk_size(self):
+        with pytest.raises(ValueError):
+            SqlCalculator(RecordingConnection(), chunk_size=0)
+
+
+# ============================================================================
+# DIFFERENTIAL TESTS (PostgreSQL)
+# ============================================================================
+
+
+@pytest.fixture(scope="module")
+def pg_connection():
+    try:
+        connection = psycopg2.connect(
+            host=os.getenv("KFLOW_DB_HOST", "localhost"),
+            database=os.getenv("KFLOW_DB_NAME", "kerjaflow_test"),
+            user=os.getenv("KFLOW_DB_USER", "postgres"),
+            password=os.getenv("KFLOW_DB_PASSWORD", "postgres"),
+            connect_timeout=3,
+        )
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL not reachable: {e}")
+    connection.autocommit = True
+    yield connection
+    connection.close()
+
+
+@contextmanager
+def _scratch_schema(connection, name: str, files):
+    """Apply migration files inside a throwaway schema"""
+    cursor = connection.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {name} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {name}")
+    cursor.execute(f"SET search_path TO {name}")
+    try:
+        for path in files:
+            cursor.execute(path.read_text(encoding="utf-8"))
+        yield cursor
+    finally:
+        cursor.execute("RESET search_path")
+        cursor.execute(f"DROP SCHEMA {name} CASCADE")
+        cursor.close()
+
+
+def _set_rounding(cursor, method: RoundingMethod, precision: int) -> None:
+    cursor.execute(
+        "UPDATE kf_statutory_scheme SET rounding_method = %s, rounding_precision = %s",
+        (method.value, precision),
+    )
+
+
+def _with_rounding(rows: dict, method: RoundingMethod, precision: int) -> dict:
+    """rule_rows with every scheme's rounding_method and rounding_precision replaced"""
+    schemes = [row[:17] + (method.value, precision) + row[19:] for row in rows["scheme_rows"]]
+    return dict(rows, scheme_rows=schemes)
+
+
+def _without_row_ids(summary):
+    """Contributions without rule row ids (serial ids differ between loaders)"""
+    return [
+        replace(c, scheme_id=None, rate_id=None, ceiling_id=None, table_lookup_id=None)
+        for c in summary.contributions
+    ]
+
+
+ROUNDINGS = [
+    (RoundingMethod.NEAREST, 2),
+    (RoundingMethod.FLOOR, 2),
+    (RoundingMethod.CEILING, 0),
+    (RoundingMethod.NEAREST_RINGGIT, 2),
+]
+
+
+class TestSeedDataDifferential:
+    """Python and SQL engines agree to the cent on the shipped rules"""
+
+    @pytest.fixture(scope="class")
+    def seed_database(self, pg_connection):
+        files = [MIGRATIONS_DIR / name for name in SCHEMA_FILES]
+        files.append(MIGRATIONS_DIR / "004_seed_countries.sql")
+        files.extend(sorted(MIGRATIONS_DIR.glob(SEED_FILE_PATTERN)))
+        files.append(MIGRATIONS_DIR / FUNCTIONS_FILE)
+        with _scratch_schema(pg_connection, f"kf_sql_seed_{os.getpid()}", files) as cursor:
+            yield cursor
+
+    def test_matches_python_engine(self, seed_database, pg_connection):
+        seed = SeedRules.from_migrations()
+        engine = SqlCalculator(pg_connection, chunk_size=400)
+
+        for method, precision in ROUNDINGS:
+            _set_rounding(seed_database, method, precision)
+            snapshots = [
+                RuleSnapshot(
+                    code,
+                    date(2024, 1, 1),
+                    date(2030, 12, 31),
+                    **_with_rounding(seed.rule_rows(code), method, precision),
+                )
+                for code in seed.country_codes()
+            ]
+            python = StatutoryCalculator(snapshots=snapshots)
+
+            for calculation_date in CALCULATION_DATES:
+                employees = [
+                    worker
+                    for code in seed.country_codes()
+                    for worker in boundary_workforce(code, calculation_date, 150, seed="sql-")
+                ]
+                for worker, summary in zip(employees, engine.calculate(employees)):
+                    expected = python.calculate_all(worker)
+                    context = (method, worker)
+                    assert _without_row_ids(summary) == _without_row_ids(expected), context
+                    assert summary.total_employee_amount == expected.total_employee_amount
+
+
+class TestRuleRowDifferential:
+    """Table lookups, ceiling changes and row ids on the Malaysia-like factory rules"""
+
+    @pytest.fixture(scope="class")
+    def rules_database(self, pg_connection):
+        files = [MIGRATIONS_DIR / name for name in SCHEMA_FILES + [FUNCTIONS_FILE]]
+        with _scratch_schema(pg_connection, f"kf_sql_rules_{os.getpid()}", files) as cursor:
+            cursor.execute(
+                "INSERT INTO kf_country (id, code, name_en, currency_code, currency_symbol, "
+                "default_locale, timezone) "
+                "VALUES (1, 'MY', 'Malaysia', 'MYR', 'RM', 'ms_MY', 'Asia/Kuala_Lumpur')"
+            )
+            rows = malaysia_rule_rows()
+            for table, columns, key in (
+                ("kf_statutory_scheme", SCHEME_COLUMNS, "scheme_rows"),
+                ("kf_statutory_rate", RATE_COLUMNS, "rate_rows"),
+                ("kf_statutory_ceiling", CEILING_COLUMNS, "ceiling_rows"),
+                ("kf_statutory_table_lookup", TABLE_LOOKUP_COLUMNS, "table_lookup_rows"),
+            ):
+                placeholders = ", ".join(["%s"] * len(rows[key][0]))
+                cursor.executemany(
+                    f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", rows[key]
+                )
+            yield cursor
+
+    def test_matches_python_engine_exactly(self, rules_database, pg_connection):
+        snapshot = RuleSnapshot("MY", date(2024, 1, 1), date(2026, 12, 31), **malaysia_rule_rows())
+        python = StatutoryCalculator(snapshots=[snapshot])
+        employees = [
+            employee(
+                nationality=nationality,
+                age=age,
+                gross_salary=Decimal(salary),
+                calculation_date=calculation_date,
+            )
+            for calculation_date in (date(2024, 7, 31), date(2024, 10, 31), date(2025, 11, 30))
+            for nationality in (NationalityType.CITIZEN, NationalityType.FOREIGN, None)
+            for age in (25, 59, 60)
+            for salary in ("1500.00", "2999.99", "3000.00", "4999.99", "5000.00", "5000.01", "7000")
+        ]
+
+        summaries = SqlCalculator(pg_connection).calculate(employees)
+
+        assert summaries == [python.calculate_all(worker) for worker in employees]
+        assert any(c.table_lookup_id for s in summaries for c in s.contributions)
+        assert any(c.capped for s in summaries for c in s.contributions)
@@ -0,0 +1,112 @@
+"""
+Test Suite: Wage Band Index
+===========================
+Bisection lookups over TABLE_LOOKUP wage bands
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from ..models.statutory import CalculationMethod
+from ..services.rule_snapshot import parse_table_lookup_row
+from ..services.statutory_calculator import StatutoryCalculator
+from ..services.wage_band_index import SchemeBandTable, WageBandIndex
+from .factories import FakeConnection, table_lookup_row
+
+
+def _bands(*rows):
+    return [parse_table_lookup_row(row) for row in rows]
+
+
+def _socso_like_bands(effective_from=date(2025, 1, 1), effective_until=None, step="0.25"):
+    """Sixty RM100 bands with a 1-cent gap between them, like the SOCSO First Schedule"""
+    rows = []
+    for i in range(60):
+        rows.append(
+            table_lookup_row(
+                1000 + i,
+                4,
+                f"{i * 100}.00",
+                f"{i * 100 + 99}.99",
+                str(Decimal(step) * i),
+                str(Decimal(step) * i * 3),
+                effective_from=effective_from,
+                effective_until=effective_until,
+            )
+        )
+    return _bands(*rows)
+
+
+class TestWageBandIndex:
+    def test_bisection_hits_every_band(self):
+        index = WageBandIndex(reversed(_socso_like_bands()))
+
+        assert len(index) == 60
+        assert not index.overlapping
+        for band in index.bands:
+            assert index.find(band.wage_from) is band
+            assert index.find(band.wage_to) is band
+            assert index.find((band.wage_from + band.wage_to) / 2) is band
+
+    def test_gaps_and_out_of_range(self):
+        index = WageBandIndex(_socso_like_bands())
+
+        assert index.find(Decimal("99.995")) is None
+        assert index.find(Decimal("-1")) is None
+        assert index.find(Decimal("6000.00")) is None
+        assert WageBandIndex([]).find(Decimal("100")) is None
+
+    def test_overlapping_bands_still_found(self):
+        index = WageBandIndex(
+            _bands(
+                table_lookup_row(1, 4, "0.00", "5000.00", "10.00", "30.00"),
+                table_lookup_row(2, 4, "1000.00", "1999.99", "20.00", "60.00"),
+            )
+        )
+
+        assert index.overlapping
+        assert index.find(Decimal("1500.00")).id == 2
+        # Past the narrower band, the wider earlier band still covers the salary
+        assert index.find(Decimal("2500.00")).id == 1
+
+
+class TestSchemeBandTable:
+    def test_latest_period_in_effect_wins(self):
+        table = SchemeBandTable(
+            _socso_like_bands(date(2024, 1, 1), date(2024, 9, 30), step="0.20")
+            + _socso_like_bands(date(2024, 10, 1), step="0.25")
+        )
+
+        assert [p[0] for p in table.periods] == [date(2024, 10, 1), date(2024, 1, 1)]
+        salary = Decimal("1050.00")
+        assert table.find(salary, date(2024, 9, 30)).employee_amount == Decimal("2.00")
+        assert table.find(salary, date(2024, 10, 1)).employee_amount == Decimal("2.50")
+        assert table.find(salary, date(2023, 12, 31)) is None
+
+
+class TestCalculatorBandLookups:
+    def test_snapshot_builds_band_index_lazily(self, my_snapshot):
+        assert my_snapshot._band_tables == {}
+
+        band = my_snapshot.find_table_band(4, Decimal("3000.00"), date(2025, 6, 1))
+
+        assert band.id == 201
+        assert list(my_snapshot._band_tables) == [4]
+        assert my_snapshot.band_table(4) is my_snapshot.band_table(4)
+
+    def test_database_mode_loads_bands_once_per_scheme(self, my_rule_rows, my_snapshot):
+        connection = FakeConnection(my_rule_rows)
+        calculator = StatutoryCalculator(connection)
+        scheme = next(s for s in my_snapshot.schemes if s.code == "SOCSO_TABLE")
+        assert scheme.calculation_method == CalculationMethod.TABLE_LOOKUP
+
+        for salary in ("1000.00", "3500.00", "4999.99", "9000.00"):
+            calculator._calculate_table_lookup(Decimal(salary), scheme, date(2025, 6, 1))
+        assert len(connection.queries) == 1
+
+        amounts = calculator._calculate_table_lookup(Decimal("3500.00"), scheme, date(2025, 6, 1))
+        assert amounts == (Decimal("19.75"), Decimal("69.05"))
+
+        calculator.invalidate_snapshot()
+        calculator._calculate_table_lookup(Decimal("3500.00"), scheme, date(2025, 6, 1))
+        assert len(connection.queries) == 2
@@ -0,0 +1,250 @@
+"""
+Test Suite: YTD Ledger
+======================
+ANNUAL and AW_ANNUAL ceilings enforced from year-to-date totals
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from ..models.statutory import EmployeeContext, NationalityType
+from ..services.contribution_memo import ContributionMemo
+from ..services.rule_snapshot import RuleSnapshot
+from ..services.statutory_calculator import StatutoryCalculator
+from ..services.ytd_ledger import YtdEntry, YtdLedger, YtdTotals, cap_annual
+from .factories import ceiling_row, rate_row, scheme_row
+
+
+def _rule_rows() -> dict:
+    """CPF-like scheme with OW and AW ceilings, and a levy with an annual ceiling"""
+    return {
+        "scheme_rows": [
+            scheme_row(1, "CPF", "PERCENTAGE", "ORDINARY_WAGES"),
+            scheme_row(2, "LEVY", "PERCENTAGE", "GROSS", sort_order=1),
+        ],
+        "rate_rows": [
+            rate_row(10, 1, "CPF_ALL", "0.20", "0.17"),
+            rate_row(20, 2, "LEVY_ALL", "0.01", "0.01"),
+        ],
+        "ceiling_rows": [
+            ceiling_row(100, 1, "8000.00"),
+            ceiling_row(101, 1, "102000.00", "AW_ANNUAL"),
+            ceiling_row(200, 2, "50000.00", "ANNUAL"),
+        ],
+        "table_lookup_rows": [],
+    }
+
+
+def _calculator(memo=None) -> StatutoryCalculator:
+    snapshot = RuleSnapshot("SG", date(2025, 1, 1), date(2026, 12, 31), **_rule_rows())
+    return StatutoryCalculator(snapshots=[snapshot], ledger=YtdLedger(), memo=memo)
+
+
+def _month(month: int, salary: str, bonus: str = None, employee_id: str = "E1"):
+    return EmployeeContext(
+        country_code="SG",
+        nationality=NationalityType.CITIZEN,
+        age=35,
+        gross_salary=Decimal(salary) + Decimal(bonus or 0),
+        ordinary_wages=Decimal(salary),
+        additional_wages=Decimal(bonus) if bonus else None,
+        employee_id=employee_id,
+        calculation_date=date(2025, month, 28),
+    )
+
+
+def _contribution(summary, code):
+    return next(c for c in summary.contributions if c.scheme_code == code)
+
+
+class TestCapAnnual:
+    """Ceiling arithmetic on YTD totals"""
+
+    def test_aw_ceiling_less_ordinary_wages(self):
+        ytd = YtdTotals(ordinary_wages=Decimal("88000"))
+        assert cap_annual(ytd, Decimal("8000"), Decimal("20000"), None, Decimal("102000")) == (
+            Decimal("8000"),
+            Decimal("6000"),
+        )
+        ytd.additional_wages = Decimal("6000")
+        assert cap_annual(ytd, Decimal("8000"), Decimal("20000"), None, Decimal("102000")) == (
+            Decimal("8000"),
+            Decimal("0"),
+        )
+
+    def test_annual_ceiling_caps_ordinary_then_additional(self):
+        ytd = YtdTotals(ordinary_wages=Decimal("45000"))
+        assert cap_annual(ytd, Decimal("4000"), Decimal("3000"), Decimal("50000"), None) == (
+            Decimal("4000"),
+            Decimal("1000"),
+        )
+        ytd.ordinary_wages = Decimal("51000")
+        assert cap_annual(ytd, Decimal("4000"), Decimal("0"), Decimal("50000"), None) == (
+            Decimal("0"),
+            Decimal("0"),
+        )
+
+
+class TestLedger:
+    """Running totals and retro bookkeeping"""
+
+    def test_ytd_is_months_before_period(self):
+        ledger = YtdLedger()
+        for month in (1, 2, 3):
+            ledger.post("E1", "CPF", date(2025, month, 1), YtdEntry(Decimal(1000 * month)))
+
+        assert ledger.ytd("E1", "CPF", date(2025, 4, 1)).ordinary_wages == Decimal(6000)
+        assert ledger.ytd("E1", "CPF", date(2025, 3, 1)).ordinary_wages == Decimal(3000)
+        assert ledger.ytd("E1", "CPF", date(2025, 2, 1)).ordinary_wages == Decimal(1000)
+        assert ledger.ytd("E1", "CPF", date(2026, 1, 1)).ordinary_wages == 0
+        assert ledger.stale_from("E1", 2025) is None
+
+        # Re-running the latest month replaces it; an earlier month is a retro
+        ledger.post("E1", "CPF", date(2025, 3, 1), YtdEntry(Decimal(500)))
+        assert ledger.ytd("E1", "CPF", date(2025, 4, 1)).ordinary_wages == Decimal(3500)
+        ledger.post("E1", "CPF", date(2025, 1, 1), YtdEntry(Decimal(0)))
+        assert ledger.stale_from("E1", 2025) == 1
+
+    def test_entries_round_trip(self):
+        ledger = YtdLedger()
+        ledger.post("E1", "CPF", date(2025, 2, 1), YtdEntry(Decimal(7), Decimal(1)))
+        ledger.post("E2", "LEVY", date(2025, 1, 1), YtdEntry(Decimal(9)))
+
+        rebuilt = YtdLedger.from_entries(ledger.entries())
+
+        assert list(rebuilt.entries()) == sorted(ledger.entries())
+        assert rebuilt.ytd("E1", "CPF", date(2025, 3, 1)).wages == Decimal(8)
+
+
+class TestCalculatorAnnualCeilings:
+    """The calculator reads and posts the ledger once per month"""
+
+    def test_aw_ceiling_across_a_year(self):
+        calculator = _calculator()
+        results = [calculator.calculate_all(_month(m, "9000.00")) for m in range(1, 12)]
+        december = calculator.calculate_all(_month(12, "9000.00", bonus="20000.00"))
+
+        cpf = _contribution(december, "CPF")
+        # OW capped at 8,000 a month: 96,000 for the year, leaving 6,000 of AW room
+        assert cpf.applied_salary == Decimal("14000.00")
+        assert cpf.capped is True
+        assert cpf.employee_amount == Decimal("2800.00")
+        assert all(_contribution(r, "CPF").applied_salary == Decimal("8000.00") for r in results)
+        ytd = calculator.ledger.ytd("E1", "CPF", date(2026, 1, 1))
+        assert ytd.additional_wages == 0  # New year starts empty
+
+    def test_annual_ceiling_stops_contributions(self):
+        calculator = _calculator()
+        levies = [
+            _contribution(calculator.calculate_all(_month(m, "12000.00")), "LEVY")
+            for m in range(1, 7)
+        ]
+
+        assert [levy.applied_salary for levy in levies] == [
+            Decimal("12000.00"),
+            Decimal("12000.00"),
+            Decimal("12000.00"),
+            Decimal("12000.00"),
+            Decimal("2000.00"),
+            Decimal("0.00"),
+        ]
+        assert levies[4].capped and levies[5].employee_amount == Decimal("0.00")
+
+    def test_rerun_of_a_month_is_idempotent(self):
+        calculator = _calculator()
+        calculator.calculate_all(_month(1, "9000.00"))
+        first = calculator.calculate_all(_month(2, "9000.00", bonus="1000.00"))
+        again = calculator.calculate_all(_month(2, "9000.00", bonus="1000.00"))
+
+        assert first == again
+        assert calculator.ledger.ytd("E1", "CPF", date(2025, 3, 1)).wages == Decimal("17000.00")
+
+    def test_without_employee_id_nothing_changes(self):
+        calculator = _calculator()
+        employee = _month(1, "9000.00", bonus="5000.00")
+        employee.employee_id = None
+
+        summary = calculator.calculate_all(employee)
+
+        assert _contribution(summary, "CPF").applied_salary == Decimal("8000.00")
+        assert list(calculator.ledger.entries()) == []
+
+    def test_memo_is_bypassed_for_ledger_schemes(self):
+        calculator = _calculator(memo=ContributionMemo())
+        levies = [
+            _contribution(calculator.calculate_all(_month(m, "12000.00")), "LEVY")
+            for m in range(1, 7)
+        ]
+        assert levies[5].applied_salary == Decimal("0.00")
+
+    def test_batch_uses_the_ledger(self):
+        calculator = _calculator()
+        batch = calculator.calculate_batch(
+            [_month(1, "30000.00", employee_id="A"), _month(1, "30000.00", employee_id="B")]
+        )
+        assert batch.succeeded == 2
+        batch = calculator.calculate_batch([_month(2, "30000.00", employee_id="A")])
+        assert _contribution(batch.results[0], "LEVY").applied_salary == Decimal("20000.00")
+
+
+class TestRetroReplay:
+    """Corrections replay the corrected month and the months after it"""
+
+    def test_replay_only_affected_months(self):
+        calculator = _calculator()
+        for month in range(1, 7):
+            calculator.calculate_all(_month(month, "9000.00"))
+        before = {m: calculator.ledger.entry("E1", "LEVY", date(2025, m, 1)) for m in range(1, 7)}
+
+        # March was underpaid: 12,000 instead of 9,000
+        corrections = calculator.replay_ytd(_month(3, "12000.00"))
+
+        periods = sorted({c.period.month for c in corrections})
+        assert periods == [3, 6]  # April/May unchanged; June hits the annual ceiling sooner
+        levy = {c.period.month: c for c in corrections if c.scheme_code == "LEVY"}
+        assert levy[3].employee_delta == Decimal("30.00")
+        assert levy[6].employee_delta == Decimal("-30.00")
+        for month in (1, 2):
+            assert calculator.ledger.entry("E1", "LEVY", date(2025, month, 1)) is before[month]
+        assert calculator.ledger.ytd("E1", "LEVY", date(2025, 7, 1)).wages == Decimal("50000.00")
+        assert calculator.ledger.stale_from("E1", 2025) is None
+
+    def test_entries_of_schemes_that_stop_applying_are_removed(self):
+        calculator = _calculator()
+        for month in range(1, 7):
+            calculator.calculate_all(_month(month, "9000.00"))
+
+        # March was a foreign worker month: neither scheme applies
+        corrected = _month(3, "9000.00")
+        corrected.nationality = NationalityType.FOREIGN
+        corrections = calculator.replay_ytd(corrected)
+
+        march = {c.scheme_code: c for c in corrections if c.period.month == 3}
+        assert sorted(march) == ["CPF", "LEVY"]
+        assert all(c.current is None for c in march.values())
+        assert march["LEVY"].employee_delta == Decimal("-90.00")
+        assert calculator.ledger.entry("E1", "LEVY", date(2025, 3, 1)) is None
+        june = next(c for c in corrections if c.period.month == 6 and c.scheme_code == "LEVY")
+        assert june.current.wages == Decimal("9000.00")  # No longer capped at 5,000
+        assert calculator.ledger.ytd("E1", "LEVY", date(2025, 7, 1)).wages == Decimal("45000.00")
+
+    def test_rebuilt_ledger_needs_contexts_to_replay(self):
+        calculator = _calculator()
+        for month in range(1, 7):
+            calculator.calculate_all(_month(month, "9000.00"))
+        calculator.ledger = YtdLedger.from_entries(calculator.ledger.entries())
+
+        with pytest.raises(LookupError):
+            calculator.replay_ytd(_month(3, "12000.00"))
+
+        for month in range(4, 7):
+            calculator.ledger.remember(_month(month, "9000.00"), date(2025, month, 28))
+        corrections = calculator.replay_ytd(_month(3, "12000.00"))
+        assert sorted({c.period.month for c in corrections}) == [3, 6]
+
+    def test_replay_requires_a_ledger(self):
+        calculator = StatutoryCalculator()
+        with pytest.raises(ValueError):
+            calculator.replay_ytd(_month(1, "1000.00"))
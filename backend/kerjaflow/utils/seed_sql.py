@@ -0,0 +1,315 @@
+"""
+Seed SQL Reader
+===============
+Read statutory rule rows straight from the seed migrations (005-013)
+
+Used to build rule snapshots without a database, e.g. for differential
+tests of the calculation engines against the shipped seed data.
+"""
+
+import re
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# database/migrations, relative to backend/kerjaflow/utils
+MIGRATIONS_DIR = Path(__file__).resolve().parents[3] / "database" / "migrations"
+
+SEED_FILE_PATTERN = "0[01][0-9]_seed_*_statutory.sql"
+
+# Column order and defaults (from 002/003) of the rows handed to RuleSnapshot
+SCHEME_FIELDS: Tuple[Tuple[str, object], ...] = (
+    ("id", None),
+    ("country_id", None),
+    ("authority_id", None),
+    ("code", None),
+    ("name_en", None),
+    ("name_local", None),
+    ("description", None),
+    ("scheme_type", None),
+    ("calculation_method", None),
+    ("calculation_base", None),
+    ("employee_contribution", True),
+    ("employer_contribution", True),
+    ("citizen_applicable", True),
+    ("pr_applicable", True),
+    ("foreign_worker_applicable", False),
+    ("member_number_required", True),
+    ("member_number_label", None),
+    ("rounding_method", "NEAREST"),
+    ("rounding_precision", 2),
+    ("effective_from", None),
+    ("effective_until", None),
+    ("legal_reference", None),
+    ("notes", None),
+    ("sort_order", 0),
+)
+
+RATE_FIELDS: Tuple[str, ...] = (
+    "id", "scheme_id", "tier_code", "tier_description",
+    "min_age", "max_age", "min_salary", "max_salary",
+    "nationality_condition", "pr_year_condition",
+    "risk_category", "employee_count_min", "employee_count_max",
+    "employee_rate", "employer_rate", "employee_fixed", "employer_fixed", "total_rate",
+    "effective_from", "effective_until",
+    "source_reference", "verified_date", "notes",
+)  # fmt: skip
+
+CEILING_FIELDS: Tuple[str, ...] = (
+    "id", "scheme_id", "ceiling_type", "ceiling_amount", "min_amount",
+    "effective_from", "effective_until",
+)  # fmt: skip
+
+TABLE_LOOKUP_FIELDS: Tuple[str, ...] = (
+    "id", "scheme_id", "wage_from", "wage_to", "category",
+    "employee_amount", "employer_amount", "effective_from", "effective_until",
+)  # fmt: skip
+
+# ON CONFLICT targets of the seed inserts
+UNIQUE_KEYS: Dict[str, Tuple[str, ...]] = {
+    "kf_statutory_authority": ("country_id", "code"),
+    "kf_statutory_scheme": ("country_id", "code", "effective_from"),
+    "kf_statutory_rate": ("scheme_id", "tier_code", "effective_from"),
+    "kf_statutory_ceiling": ("scheme_id", "ceiling_type", "effective_from"),
+    "kf_statutory_table_lookup": (
+        "scheme_id",
+        "wage_from",
+        "wage_to",
+        "category",
+        "effective_from",
+    ),
+}
+
+DATE_COLUMNS = {"effective_from", "effective_until", "verified_date"}
+INTEGER_COLUMNS = {
+    "min_age",
+    "max_age",
+    "pr_year_condition",
+    "employee_count_min",
+    "employee_count_max",
+    "rounding_precision",
+    "sort_order",
+}
+
+_TOKEN = re.compile(
+    r"""
+    (?P<comment>--[^\n]*)
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<number>-?\d+(?:\.\d+)?)
+    | (?P<word>[A-Za-z_][A-Za-z_0-9.]*)
+    | (?P<symbol>[(),;=*])
+    | (?P<space>\s+)
+    """,
+    re.VERBOSE,
+)
+
+
+class SeedSQLError(ValueError):
+    """Seed file contains SQL this reader does not understand"""
+
+
+def _tokenize(sql: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    while position < len(sql):
+        match = _TOKEN.match(sql, position)
+        if match is None:
+            raise SeedSQLError(f"Unexpected character {sql[position]!r} at offset {position}")
+        kind = match.lastgroup
+        if kind == "string":
+            tokens.append((kind, match.group()[1:-1].replace("''", "'")))
+        elif kind not in ("comment", "space"):
+            tokens.append((kind, match.group()))
+        position = match.end()
+    return tokens
+
+
+class SeedRules:
+    """
+    Rule rows collected from seed migrations, as the database would hold them
+
+    Ids are assigned in insertion order like SERIAL columns. Country
+    references resolve to the country code itself, and ON CONFLICT DO
+    NOTHING duplicates are dropped.
+    """
+
+    def __init__(self):
+        self.tables: Dict[str, List[dict]] = {table: [] for table in UNIQUE_KEYS}
+        self._keys: Dict[str, set] = {table: set() for table in UNIQUE_KEYS}
+
+    @classmethod
+    def from_migrations(cls, paths: Optional[Iterable[Path]] = None) -> "SeedRules":
+        """
+        Read the country seed migrations
+
+        Args:
+            paths: Seed files to read (default: 005-013 in database/migrations)
+        """
+        if paths is None:
+            paths = sorted(MIGRATIONS_DIR.glob(SEED_FILE_PATTERN))
+        rules = cls()
+        for path in paths:
+            rules.read(Path(path).read_text(encoding="utf-8"), source=Path(path).name)
+        return rules
+
+    def read(self, sql: str, source: str = "<sql>") -> None:
+        """Apply every INSERT into a statutory table found in a SQL script"""
+        tokens = _tokenize(sql)
+        i = 0
+        while i < len(tokens):
+            if tokens[i][1].upper() == "INSERT" and tokens[i + 1][1].upper() == "INTO":
+                try:
+                    i = self._insert(tokens, i + 2)
+                except (IndexError, KeyError, ValueError) as e:
+                    raise SeedSQLError(f"{source}: {e}") from e
+            else:
+                i += 1
+
+    def country_codes(self) -> List[str]:
+        """Countries with at least one scheme, in seed order"""
+        return list(dict.fromkeys(s["country_id"] for s in self.tables["kf_statutory_scheme"]))
+
+    def rule_rows(self, country_code: str) -> Dict[str, List[tuple]]:
+        """
+        Rows of one country in the column order RuleSnapshot expects
+
+        Returns:
+            Dict with scheme_rows, rate_rows, ceiling_rows and table_lookup_rows
+        """
+        schemes = [s for s in self.tables["kf_statutory_scheme"] if s["country_id"] == country_code]
+        scheme_ids = {s["id"] for s in schemes}
+
+        def rows(table: str, fields: Tuple[str, ...]) -> List[tuple]:
+            return [
+                tuple(record.get(f) for f in fields)
+                for record in self.tables[table]
+                if record["scheme_id"] in scheme_ids
+            ]
+
+        return {
+            "scheme_rows": [
+                tuple(s.get(name, default) for name, default in SCHEME_FIELDS) for s in schemes
+            ],
+            "rate_rows": rows("kf_statutory_rate", RATE_FIELDS),
+            "ceiling_rows": rows("kf_statutory_ceiling", CEILING_FIELDS),
+            "table_lookup_rows": rows("kf_statutory_table_lookup", TABLE_LOOKUP_FIELDS),
+        }
+
+    def _insert(self, tokens: List[Tuple[str, str]], i: int) -> int:
+        table = tokens[i][1]
+        i += 1
+        columns, i = self._name_list(tokens, i)
+        if tokens[i][1].upper() != "VALUES":
+            raise SeedSQLError(f"Only INSERT ... VALUES is supported ({table})")
+        i += 1
+
+        records = []
+        while True:
+            values, i = self._value_list(tokens, i)
+            if len(values) != len(columns):
+                raise SeedSQLError(
+                    f"{table}: {len(values)} values for {len(columns)} columns: {values}"
+                )
+            records.append(dict(zip(columns, values)))
+            if tokens[i][1] != ",":
+                break
+            i += 1
+
+        # Skip the ON CONFLICT clause
+        while tokens[i][1] != ";":
+            i += 1
+
+        if table in self.tables:
+            for record in records:
+                self._add(table, record)
+        return i + 1
+
+    def _add(self, table: str, record: dict) -> None:
+        record = {column: self._convert(column, value) for column, value in record.items()}
+        key = tuple(record.get(column) for column in UNIQUE_KEYS[table])
+        if key in self._keys[table]:
+            return
+        self._keys[table].add(key)
+        record["id"] = len(self.tables[table]) + 1
+        self.tables[table].append(record)
+
+    @staticmethod
+    def _convert(column: str, value):
+        if value is None:
+            return None
+        if column in DATE_COLUMNS:
+            return date.fromisoformat(value)
+        if column in INTEGER_COLUMNS:
+            return int(value)
+        return value
+
+    @staticmethod
+    def _name_list(tokens: List[Tuple[str, str]], i: int) -> Tuple[List[str], int]:
+        if tokens[i][1] != "(":
+            raise SeedSQLError("Expected column list")
+        names = []
+        i += 1
+        while tokens[i][1] != ")":
+            if tokens[i][1] != ",":
+                names.append(tokens[i][1])
+            i += 1
+        return names, i + 1
+
+    def _value_list(self, tokens: List[Tuple[str, str]], i: int) -> Tuple[list, int]:
+        if tokens[i][1] != "(":
+            raise SeedSQLError(f"Expected '(' before values, got {tokens[i][1]!r}")
+        values = []
+        i += 1
+        while True:
+            value, i = self._value(tokens, i)
+            values.append(value)
+            if tokens[i][1] == ")":
+                return values, i + 1
+            if tokens[i][1] != ",":
+                raise SeedSQLError(f"Expected ',' between values, got {tokens[i][1]!r}")
+            i += 1
+
+    def _value(self, tokens: List[Tuple[str, str]], i: int):
+        kind, text = tokens[i]
+        if kind == "string":
+            return text, i + 1
+        if kind == "number":
+            return Decimal(text), i + 1
+        if kind == "word" and text.upper() in ("NULL", "TRUE", "FALSE"):
+            return {"NULL": None, "TRUE": True, "FALSE": False}[text.upper()], i + 1
+        if text == "(" and tokens[i + 1][1].upper() == "SELECT":
+            return self._subselect(tokens, i + 1)
+        raise SeedSQLError(f"Unsupported value {text!r}")
+
+    def _subselect(self, tokens: List[Tuple[str, str]], i: int):
+        """Resolve (SELECT id FROM table WHERE col = 'x' [AND col = 'y'])"""
+        words = []
+        while tokens[i][1] != ")":
+            words.append(tokens[i])
+            i += 1
+        texts = [text for _, text in words]
+        if [t.upper() for t in texts[:3]] != ["SELECT", "ID", "FROM"] or texts[
+            4
+        ].upper() != "WHERE":
+            raise SeedSQLError(f"Unsupported subselect: {' '.join(texts)}")
+        table = texts[3]
+
+        conditions = {}
+        rest = words[5:]
+        for j in range(0, len(rest), 4):
+            column, equals, (_, value) = rest[j][1], rest[j + 1][1], rest[j + 2]
+            if equals != "=" or (j + 3 < len(rest) and rest[j + 3][1].upper() != "AND"):
+                raise SeedSQLError(f"Unsupported subselect: {' '.join(texts)}")
+            conditions[column] = self._convert(column, value)
+
+        if table == "kf_country":
+            return conditions["code"], i + 1
+        matches = [
+            record["id"]
+            for record in self.tables[table]
+            if all(record.get(column) == value for column, value in conditions.items())
+        ]
+        if len(matches) != 1:
+            raise SeedSQLError(f"Subselect on {table} {conditions} matched {len(matches)} rows")
+        return matches[0], i + 1
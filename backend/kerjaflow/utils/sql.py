@@ -0,0 +1,22 @@
+"""
+SQL Helpers
+===========
+Checks for values interpolated into SQL text rather than passed as parameters
+"""
+
+import re
+
+# A table or column name, optionally schema-qualified
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?")
+
+
+def validate_identifier(name: str) -> str:
+    """
+    Return name if it is a plain (optionally schema-qualified) SQL identifier
+
+    Raises:
+        ValueError: If name could inject SQL when formatted into a statement
+    """
+    if not isinstance(name, str) or not _IDENTIFIER.fullmatch(name):
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return name
@@ -4,14 +4,20 @@ Handles:
 1. Cambodia LPDP draft law monitoring
 2. Cambodia NSSF pension rate scheduled increase (Oct 2027)
 3. Brunei PDPO grace period tracking
+4. What-if costing of scheduled or proposed rate changes
 """
 
 import logging
-from dataclasses import dataclass
+import os
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 # ============================================================================
 # PART 1: DATABASE MODELS (Odoo-style)
@@ -100,6 +106,7 @@ CREATE TABLE IF NOT EXISTS kf_compliance_alert (
     alert_type VARCHAR(50) NOT NULL,  -- 'rate_change', 'law_enacted', 'deadline', 'action_required'
     severity VARCHAR(20) NOT NULL,    -- 'critical', 'warning', 'info'
     country_code VARCHAR(2),
+    contribution_type VARCHAR(50),    -- rate_change alerts only
     title VARCHAR(255) NOT NULL,
     message TEXT NOT NULL,
 
@@ -122,6 +129,25 @@ CREATE TABLE IF NOT EXISTS kf_compliance_alert (
 CREATE INDEX idx_compliance_alert_unread
 ON kf_compliance_alert(is_read, severity, trigger_date);
 
+-- Natural key: generate_rate_change_alerts upserts on it
+CREATE UNIQUE INDEX uq_compliance_alert_natural_key
+ON kf_compliance_alert(alert_type, country_code, contribution_type, trigger_date);
+
+-- ============================================================================
+-- Table: kf_migration_checkpoint
+-- Purpose: Tables already copied and verified by RegionMigrationEngine
+--          (lives in the TARGET regional database)
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS kf_migration_checkpoint (
+    country_code VARCHAR(2) NOT NULL,
+    table_name VARCHAR(63) NOT NULL,
+    row_count BIGINT NOT NULL,
+    checksum VARCHAR(40) NOT NULL,
+    source_snapshot VARCHAR(64),
+    completed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (country_code, table_name)
+);
+
 -- ============================================================================
 -- Pre-load Cambodia NSSF Future Rates
 -- ============================================================================
@@ -220,11 +246,81 @@ class StatutoryRateService:
     """
     Service for retrieving statutory rates with automatic date-based selection.
     Handles scheduled future rates (like Cambodia NSSF Oct 2027 increase).
+
+    Rates change a few times a year, so the whole kf_statutory_rate table is
+    loaded once into a timeline per (country_code, contribution_type) and
+    as-of lookups are answered by bisecting effective_from. The timeline is
+    reloaded after signal_change() (called once a transaction that created,
+    wrote or deleted kf.statutory.rate records commits) or refresh(). Changes
+    committed by other processes (Odoo workers, cron) are noticed by comparing
+    the table's row count and latest write_date with those seen at load time,
+    at most once per check_interval seconds.
     """
 
-    def __init__(self, db_connection):
+    # Bumped by signal_change(); a service whose timeline was loaded under an
+    # older generation reloads on its next lookup
+    _generation = 0
+
+    def __init__(self, db_connection, check_interval: float = 30.0):
+        """
+        Args:
+            db_connection: Database connection object
+            check_interval: Seconds a loaded timeline is trusted before the
+                table is checked for changes made by other processes
+        """
         self.db = db_connection
+        self.check_interval = check_interval
         self.logger = logging.getLogger("kerjaflow.statutory")
+        self._timeline: Optional[Dict[tuple, Tuple[List[date], List[StatutoryRate]]]] = None
+        self._types_by_country: Dict[str, List[str]] = {}
+        self._loaded_generation = None
+        self._loaded_stamp: Optional[tuple] = None
+        self._checked_at = 0.0
+
+    @classmethod
+    def signal_change(cls):
+        """
+        Mark the rate timeline of every service in this process as stale
+
+        Call after the change has committed (e.g. from cr.postcommit), so a
+        reload cannot pick up the rows from before it.
+        """
+        cls._generation += 1
+
+    def refresh(self):
+        """Reload the rate timeline from kf_statutory_rate now"""
+        # Row count and latest write_date come from the same snapshot as the rows
+        query = """
+            SELECT
+                country_code, contribution_type,
+                employee_rate, employer_rate, salary_cap, currency_code,
+                effective_from, effective_to, is_scheduled, notes,
+                count(*) OVER (), max(write_date) OVER ()
+            FROM kf_statutory_rate
+            ORDER BY country_code, contribution_type, effective_from
+        """
+        generation = StatutoryRateService._generation
+        rows = self.db.execute(query).fetchall()
+        timeline: Dict[tuple, Tuple[List[date], List[StatutoryRate]]] = {}
+        for row in rows:
+            rate = self._row_to_rate(row)
+            starts, rates = timeline.setdefault(
+                (rate.country_code, rate.contribution_type), ([], [])
+            )
+            index = bisect_right(starts, rate.effective_from)
+            starts.insert(index, rate.effective_from)
+            rates.insert(index, rate)
+
+        types_by_country: Dict[str, List[str]] = {}
+        for country_code, contribution_type in sorted(timeline):
+            types_by_country.setdefault(country_code, []).append(contribution_type)
+
+        self._timeline = timeline
+        self._types_by_country = types_by_country
+        self._loaded_generation = generation
+        self._loaded_stamp = (rows[0][10], rows[0][11]) if rows else (0, None)
+        self._checked_at = time.monotonic()
+        self.logger.info(f"Loaded {len(timeline)} statutory rate timelines")
 
     def get_rate(
         self, country_code: str, contribution_type: str, effective_date: date = None
@@ -249,38 +345,8 @@ class StatutoryRateService:
         if effective_date is None:
             effective_date = date.today()
 
-        query = """
-            SELECT
-                country_code, contribution_type,
-                employee_rate, employer_rate, salary_cap, currency_code,
-                effective_from, effective_to, is_scheduled, notes
-            FROM kf_statutory_rate
-            WHERE country_code = %s
-              AND contribution_type = %s
-              AND effective_from <= %s
-              AND (effective_to IS NULL OR effective_to >= %s)
-            ORDER BY effective_from DESC
-            LIMIT 1
-        """
-
-        result = self.db.execute(
-            query, (country_code, contribution_type, effective_date, effective_date)
-        ).fetchone()
-
-        if result:
-            return StatutoryRate(
-                country_code=result[0],
-                contribution_type=result[1],
-                employee_rate=Decimal(str(result[2])),
-                employer_rate=Decimal(str(result[3])),
-                salary_cap=Decimal(str(result[4])) if result[4] else None,
-                currency_code=result[5],
-                effective_from=result[6],
-                effective_to=result[7],
-                is_scheduled=result[8],
-                notes=result[9],
-            )
-        return None
+        intervals = self._rate_timeline().get((country_code, contribution_type))
+        return self._as_of(intervals, effective_date) if intervals else None
 
     def get_all_rates_for_country(
         self, country_code: str, effective_date: date = None, include_future: bool = False
@@ -294,59 +360,31 @@ class StatutoryRateService:
             include_future: If True, also return scheduled future rates
 
         Returns:
-            List of StatutoryRate objects
+            List of StatutoryRate objects, one per contribution type, ordered
+            by contribution type
         """
         if effective_date is None:
             effective_date = date.today()
 
-        if include_future:
-            query = """
-                SELECT DISTINCT ON (contribution_type)
-                    country_code, contribution_type,
-                    employee_rate, employer_rate, salary_cap, currency_code,
-                    effective_from, effective_to, is_scheduled, notes
-                FROM kf_statutory_rate
-                WHERE country_code = %s
-                  AND (effective_from <= %s OR is_scheduled = TRUE)
-                ORDER BY contribution_type, effective_from DESC
-            """
-        else:
-            query = """
-                SELECT
-                    country_code, contribution_type,
-                    employee_rate, employer_rate, salary_cap, currency_code,
-                    effective_from, effective_to, is_scheduled, notes
-                FROM kf_statutory_rate
-                WHERE country_code = %s
-                  AND effective_from <= %s
-                  AND (effective_to IS NULL OR effective_to >= %s)
-                ORDER BY contribution_type
-            """
-
-        results = self.db.execute(
-            query,
-            (
-                (country_code, effective_date, effective_date)
-                if not include_future
-                else (country_code, effective_date)
-            ),
-        ).fetchall()
-
-        return [
-            StatutoryRate(
-                country_code=r[0],
-                contribution_type=r[1],
-                employee_rate=Decimal(str(r[2])),
-                employer_rate=Decimal(str(r[3])),
-                salary_cap=Decimal(str(r[4])) if r[4] else None,
-                currency_code=r[5],
-                effective_from=r[6],
-                effective_to=r[7],
-                is_scheduled=r[8],
-                notes=r[9],
-            )
-            for r in results
-        ]
+        timeline = self._rate_timeline()
+        rates = []
+        for contribution_type in self._types_by_country.get(country_code, []):
+            intervals = timeline[(country_code, contribution_type)]
+            if include_future:
+                # Latest rate that has started or is scheduled
+                rate = next(
+                    (
+                        r
+                        for r in reversed(intervals[1])
+                        if r.effective_from <= effective_date or r.is_scheduled
+                    ),
+                    None,
+                )
+            else:
+                rate = self._as_of(intervals, effective_date)
+            if rate is not None:
+                rates.append(rate)
+        return rates
 
     def get_upcoming_rate_changes(self, days_ahead: int = 90) -> List[Dict[str, Any]]:
         """
@@ -405,6 +443,47 @@ class StatutoryRateService:
             for r in results
         ]
 
+    def _rate_timeline(self) -> Dict[tuple, Tuple[List[date], List[StatutoryRate]]]:
+        if self._timeline is None or self._loaded_generation != StatutoryRateService._generation:
+            self.refresh()
+        elif time.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = time.monotonic()
+            if self._table_stamp() != self._loaded_stamp:
+                self.refresh()
+        return self._timeline
+
+    def _table_stamp(self) -> tuple:
+        """(row count, latest write_date) of kf_statutory_rate"""
+        row = self.db.execute("SELECT count(*), max(write_date) FROM kf_statutory_rate").fetchone()
+        return (row[0], row[1]) if row else (0, None)
+
+    @staticmethod
+    def _as_of(
+        intervals: Tuple[List[date], List[StatutoryRate]], effective_date: date
+    ) -> Optional[StatutoryRate]:
+        """Latest rate started on or before effective_date that has not expired by then"""
+        starts, rates = intervals
+        for index in range(bisect_right(starts, effective_date) - 1, -1, -1):
+            rate = rates[index]
+            if rate.effective_to is None or rate.effective_to >= effective_date:
+                return rate
+        return None
+
+    @staticmethod
+    def _row_to_rate(row) -> StatutoryRate:
+        return StatutoryRate(
+            country_code=row[0],
+            contribution_type=row[1],
+            employee_rate=Decimal(str(row[2])),
+            employer_rate=Decimal(str(row[3])),
+            salary_cap=Decimal(str(row[4])) if row[4] else None,
+            currency_code=row[5],
+            effective_from=row[6],
+            effective_to=row[7],
+            is_scheduled=row[8],
+            notes=row[9],
+        )
+
 
 # ============================================================================
 # PART 3: REGULATORY MONITORING SERVICE
@@ -688,57 +767,67 @@ class ComplianceAlertService:
             for r in results
         ]
 
-    def generate_rate_change_alerts(self, days_ahead: int = 90):
+    def generate_rate_change_alerts(self, days_ahead: int = 90) -> Dict[str, int]:
         """
         Generate alerts for upcoming statutory rate changes.
         Called by scheduled job.
+
+        All upcoming changes are written with one upsert keyed on
+        (alert_type, country_code, contribution_type, trigger_date), so re-runs
+        are idempotent: an alert is only updated when its severity or text
+        changes (e.g. escalation to critical inside 30 days), and read or
+        acknowledged flags are kept.
+
+        Returns:
+            Dict with the number of alerts 'created' and 'updated'
         """
         rate_service = StatutoryRateService(self.db)
         upcoming = rate_service.get_upcoming_rate_changes(days_ahead)
+        if not upcoming:
+            return {"created": 0, "updated": 0}
 
+        rows = {}
         for change in upcoming:
-            # Check if alert already exists
-            existing = self.db.execute(
-                """
-                SELECT id FROM kf_compliance_alert
-                WHERE alert_type = 'rate_change'
-                  AND country_code = %s
-                  AND title LIKE %s
-                  AND trigger_date = %s
-            """,
-                (
-                    change["country_code"],
-                    f"%{change['contribution_type']}%",
-                    change["effective_from"],
-                ),
-            ).fetchone()
-
-            if not existing:
-                severity = "warning" if change["days_until_effective"] > 30 else "critical"
-
-                self.db.execute(
-                    """
-                    INSERT INTO kf_compliance_alert (
-                        alert_type, severity, country_code, title, message, trigger_date
-                    ) VALUES (%s, %s, %s, %s, %s, %s)
-                """,
-                    (
-                        "rate_change",
-                        severity,
-                        change["country_code"],
-                        f"{change['country_name']} {change['contribution_type']} Rate Change",
-                        f"Rate change effective {change['effective_from']}: "
-                        f"Employee {change['current_employee_rate']}% → {change['new_employee_rate']}%, "
-                        f"Employer {change['current_employer_rate']}% → {change['new_employer_rate']}%. "
-                        f"{change['notes'] or ''}",
-                        change["effective_from"],
-                    ),
-                )
+            severity = "warning" if change["days_until_effective"] > 30 else "critical"
+            key = (change["country_code"], change["contribution_type"], change["effective_from"])
+            rows[key] = (
+                "rate_change",
+                severity,
+                change["country_code"],
+                change["contribution_type"],
+                f"{change['country_name']} {change['contribution_type']} Rate Change",
+                f"Rate change effective {change['effective_from']}: "
+                f"Employee {change['current_employee_rate']}% → {change['new_employee_rate']}%, "
+                f"Employer {change['current_employer_rate']}% → {change['new_employer_rate']}%. "
+                f"{change['notes'] or ''}",
+                change["effective_from"],
+            )
 
-                self.logger.info(
-                    f"Created rate change alert for {change['country_code']} "
-                    f"{change['contribution_type']}"
-                )
+        query = f"""
+            INSERT INTO kf_compliance_alert (
+                alert_type, severity, country_code, contribution_type,
+                title, message, trigger_date
+            ) VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(rows))}
+            ON CONFLICT (alert_type, country_code, contribution_type, trigger_date)
+            DO UPDATE SET
+                severity = EXCLUDED.severity,
+                title = EXCLUDED.title,
+                message = EXCLUDED.message
+            WHERE (kf_compliance_alert.severity, kf_compliance_alert.title,
+                   kf_compliance_alert.message)
+                IS DISTINCT FROM (EXCLUDED.severity, EXCLUDED.title, EXCLUDED.message)
+            RETURNING (xmax = 0) AS created
+        """
+        params = [value for row in rows.values() for value in row]
+        written = self.db.execute(query, params).fetchall()
+
+        created = sum(1 for (is_new,) in written if is_new)
+        counts = {"created": created, "updated": len(written) - created}
+        self.logger.info(
+            f"Rate change alerts for {len(rows)} upcoming changes: "
+            f"{counts['created']} created, {counts['updated']} updated"
+        )
+        return counts
 
 
 # ============================================================================
@@ -863,7 +952,9 @@ def daily_compliance_check(db_connection):
 
     # Generate rate change alerts
     alert_service = ComplianceAlertService(db_connection)
-    alert_service.generate_rate_change_alerts(days_ahead=90)
+    alerts = alert_service.generate_rate_change_alerts(days_ahead=90)
+
+    logger.info(f"Rate change alerts: {alerts['created']} created, {alerts['updated']} updated")
 
     logger.info("Daily compliance check completed")
 
@@ -907,6 +998,378 @@ def weekly_regulatory_report(db_connection):
 # ============================================================================
 
 
+# Employee data moved when a country gets its own regional database, in
+# dependency order: table -> tables it references
+MIGRATION_TABLES: Dict[str, Tuple[str, ...]] = {
+    "kf_employee": (),
+    "kf_user": ("kf_employee",),
+    "kf_foreign_worker_detail": ("kf_employee",),
+    "kf_document": ("kf_employee", "kf_user"),
+    "kf_payslip": ("kf_employee", "kf_user"),
+    "kf_payslip_line": ("kf_payslip",),
+    "kf_leave_balance": ("kf_employee",),
+    "kf_leave_request": ("kf_employee", "kf_document", "kf_user"),
+    "kf_notification": ("kf_user", "kf_leave_request", "kf_payslip"),
+    "kf_audit_log": ("kf_user",),
+}
+
+# How a table's rows belong to a country: (column, parent table), down to
+# kf_employee.country_code
+MIGRATION_SCOPE: Dict[str, Tuple[str, str]] = {
+    "kf_user": ("employee_id", "kf_employee"),
+    "kf_foreign_worker_detail": ("employee_id", "kf_employee"),
+    "kf_document": ("employee_id", "kf_employee"),
+    "kf_payslip": ("employee_id", "kf_employee"),
+    "kf_payslip_line": ("payslip_id", "kf_payslip"),
+    "kf_leave_balance": ("employee_id", "kf_employee"),
+    "kf_leave_request": ("employee_id", "kf_employee"),
+    "kf_notification": ("user_id", "kf_user"),
+    "kf_audit_log": ("user_id", "kf_user"),
+}
+
+
+def migration_scope_filter(table: str) -> str:
+    """
+    WHERE clause selecting a country's rows of a migration table.
+
+    The country code is left as the %(country)s placeholder.
+    """
+    if table == "kf_employee":
+        return "country_code = %(country)s"
+    column, parent = MIGRATION_SCOPE[table]
+    return f"{column} IN (SELECT id FROM {parent} WHERE {migration_scope_filter(parent)})"
+
+
+class MigrationVerificationError(Exception):
+    """Row count or content checksum differs between source and target"""
+
+
+@dataclass
+class TableMigration:
+    """Outcome of migrating one table"""
+
+    table: str
+    status: str  # 'copied', 'resumed' (checkpoint found), 'failed', 'blocked'
+    rows: int = 0
+    checksum: Optional[str] = None
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class MigrationReport:
+    """Outcome of a RegionMigrationEngine run"""
+
+    country_code: str
+    snapshot: Optional[str] = None  # Exported source snapshot all tables were read from
+    tables: Dict[str, TableMigration] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return all(t.status in ("copied", "resumed") for t in self.tables.values())
+
+    @property
+    def rows(self) -> int:
+        return sum(t.rows for t in self.tables.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "country_code": self.country_code,
+            "snapshot": self.snapshot,
+            "ok": self.ok,
+            "rows": self.rows,
+            "tables": {
+                name: {
+                    "status": t.status,
+                    "rows": t.rows,
+                    "checksum": t.checksum,
+                    "seconds": round(t.seconds, 3),
+                    "error": t.error,
+                }
+                for name, t in self.tables.items()
+            },
+        }
+
+
+class RegionMigrationEngine:
+    """
+    Streams a country's employee data from the source (hub) database to its
+    new regional database.
+
+    - Every table is copied with COPY ... (FORMAT binary), piped from the
+      source connection straight into the target one through an OS pipe, so
+      client memory stays constant whatever the table size.
+    - Tables run in parallel on `workers` threads, each table starting once
+      the tables it references are done (MIGRATION_TABLES).
+    - All source reads share one exported snapshot, so the copy is consistent
+      across tables even while the hub keeps taking writes.
+    - Each table is copied, verified and checkpointed in one target
+      transaction: row count and an order-independent MD5 checksum of the
+      rows must match the source, otherwise nothing is committed.
+      kf_migration_checkpoint records verified tables and a re-run skips them.
+
+    Connections are made with the given factories (e.g.
+    functools.partial(psycopg2.connect, dsn)); each worker uses its own pair.
+    The target must already have the KerjaFlow schema and the checkpoint table.
+    Rows referencing themselves (kf_employee.manager_id) need the target's
+    foreign keys to be deferrable or triggers disabled for the load.
+
+    Example:
+        engine = RegionMigrationEngine(
+            partial(psycopg2.connect, hub_dsn), partial(psycopg2.connect, kh_dsn), "KH"
+        )
+        report = engine.run()
+        report.ok, report.rows
+    """
+
+    COPY_CHUNK = 64 * 1024
+
+    def __init__(
+        self,
+        source_connect: Callable[[], Any],
+        target_connect: Callable[[], Any],
+        country_code: str,
+        tables: Optional[List[str]] = None,
+        workers: int = 4,
+    ):
+        unknown = sorted(set(tables or []) - set(MIGRATION_TABLES))
+        if unknown:
+            raise ValueError(f"Not migration tables: {', '.join(unknown)}")
+        self.source_connect = source_connect
+        self.target_connect = target_connect
+        self.country_code = country_code
+        self.tables = [t for t in MIGRATION_TABLES if tables is None or t in tables]
+        self.workers = workers
+        self.logger = logging.getLogger("kerjaflow.migration")
+
+    def run(self, restart: bool = False) -> MigrationReport:
+        """
+        Migrate every table that has no checkpoint yet.
+
+        Args:
+            restart: Delete the country's rows and checkpoints in the target
+                first and copy everything again
+
+        Returns:
+            MigrationReport; tables whose dependencies failed are 'blocked'
+        """
+        report = MigrationReport(self.country_code)
+        if restart:
+            self._reset()
+        done = self._checkpoints()
+        for table in self.tables:
+            if table in done:
+                rows, checksum = done[table]
+                report.tables[table] = TableMigration(table, "resumed", rows, checksum)
+
+        pending = [t for t in self.tables if t not in done]
+        if not pending:
+            return report
+
+        coordinator = self.source_connect()
+        try:
+            # The exported snapshot stays valid while this transaction is open
+            coordinator.set_session(isolation_level="REPEATABLE READ", readonly=True)
+            cursor = coordinator.cursor()
+            cursor.execute("SELECT pg_export_snapshot()")
+            report.snapshot = cursor.fetchone()[0]
+            self._run_tables(pending, report)
+        finally:
+            coordinator.close()
+
+        self.logger.info(
+            f"Migrated {self.country_code}: {report.rows} rows in {len(report.tables)} tables, "
+            f"ok={report.ok}"
+        )
+        return report
+
+    def _run_tables(self, pending: List[str], report: MigrationReport) -> None:
+        selected = set(self.tables)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running = {}
+            while pending or running:
+                for table in list(pending):
+                    states = [
+                        report.tables[d].status if d in report.tables else None
+                        for d in MIGRATION_TABLES[table]
+                        if d in selected
+                    ]
+                    if any(state in ("failed", "blocked") for state in states):
+                        pending.remove(table)
+                        report.tables[table] = TableMigration(table, "blocked")
+                    elif all(state in ("copied", "resumed") for state in states):
+                        pending.remove(table)
+                        running[pool.submit(self._migrate_table, table, report.snapshot)] = table
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    table = running.pop(future)
+                    try:
+                        report.tables[table] = future.result()
+                    except Exception as e:  # Could not even connect
+                        report.tables[table] = TableMigration(table, "failed", error=str(e))
+
+    def _migrate_table(self, table: str, snapshot: str) -> TableMigration:
+        started = time.monotonic()
+        source = self.source_connect()
+        target = self.target_connect()
+        try:
+            source.set_session(isolation_level="REPEATABLE READ", readonly=True)
+            source_cursor = source.cursor()
+            source_cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+            target_cursor = target.cursor()
+            for cursor in (source_cursor, target_cursor):
+                # Same text rendering on both sides for the checksums
+                cursor.execute(
+                    "SET LOCAL TimeZone = 'UTC'; SET LOCAL DateStyle = 'ISO, YMD'; "
+                    "SET LOCAL extra_float_digits = 3"
+                )
+
+            columns = self._columns(target_cursor, table)
+            where = target_cursor.mogrify(
+                migration_scope_filter(table), {"country": self.country_code}
+            ).decode()
+            select = f"SELECT {columns} FROM {table} WHERE {where}"
+
+            target_cursor.execute(f"DELETE FROM {table} WHERE {where}")
+            self._stream_copy(
+                source_cursor,
+                f"COPY ({select}) TO STDOUT (FORMAT binary)",
+                target_cursor,
+                f"COPY {table} ({columns}) FROM STDIN (FORMAT binary)",
+            )
+
+            expected = self._checksum(source_cursor, columns, table, where)
+            copied = self._checksum(target_cursor, columns, table, where)
+            if copied != expected:
+                raise MigrationVerificationError(
+                    f"{table}: source {expected[0]} rows/{expected[1]}, "
+                    f"target {copied[0]} rows/{copied[1]}"
+                )
+
+            target_cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+            )
+            target_cursor.execute(
+                """
+                INSERT INTO kf_migration_checkpoint (
+                    country_code, table_name, row_count, checksum, source_snapshot
+                ) VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (country_code, table_name) DO UPDATE SET
+                    row_count = EXCLUDED.row_count,
+                    checksum = EXCLUDED.checksum,
+                    source_snapshot = EXCLUDED.source_snapshot,
+                    completed_at = CURRENT_TIMESTAMP
+            """,
+                (self.country_code, table, expected[0], expected[1], snapshot),
+            )
+            target.commit()
+            self.logger.info(f"Migrated {table}: {expected[0]} rows")
+            return TableMigration(
+                table, "copied", expected[0], expected[1], time.monotonic() - started
+            )
+        except Exception as e:
+            target.rollback()
+            self.logger.error(f"Migration of {table} failed: {e}")
+            return TableMigration(table, "failed", seconds=time.monotonic() - started, error=str(e))
+        finally:
+            source.close()
+            target.close()
+
+    def _stream_copy(self, source_cursor, copy_out: str, target_cursor, copy_in: str) -> None:
+        """Pipe COPY TO STDOUT on the source into COPY FROM STDIN on the target"""
+        read_fd, write_fd = os.pipe()
+        reader = os.fdopen(read_fd, "rb")
+        writer = os.fdopen(write_fd, "wb", buffering=self.COPY_CHUNK)
+        exported: List[BaseException] = []
+
+        def export():
+            try:
+                source_cursor.copy_expert(copy_out, writer, size=self.COPY_CHUNK)
+            except BaseException as e:
+                exported.append(e)
+            finally:
+                try:
+                    writer.close()
+                except OSError:
+                    pass  # Target stopped reading; its error is reported
+
+        exporter = threading.Thread(target=export, name="kf-migration-export", daemon=True)
+        exporter.start()
+        try:
+            target_cursor.copy_expert(copy_in, reader, size=self.COPY_CHUNK)
+        except Exception:
+            reader.close()
+            exporter.join()
+            # A failed export truncates the stream; report the cause, not the symptom
+            if exported and not isinstance(exported[0], BrokenPipeError):
+                raise exported[0]
+            raise
+        reader.close()
+        exporter.join()
+        if exported:
+            raise exported[0]
+
+    def _checksum(self, cursor, columns: str, table: str, where: str) -> Tuple[int, str]:
+        """Row count and order-independent sum of per-row MD5 prefixes"""
+        cursor.execute(f"""
+            SELECT COUNT(*),
+                   COALESCE(SUM(('x' || LEFT(MD5(ROW({columns})::text), 15))::bit(60)::bigint), 0)
+            FROM {table}
+            WHERE {where}
+        """)
+        count, digest = cursor.fetchone()
+        return int(count), str(digest)
+
+    def _columns(self, cursor, table: str) -> str:
+        cursor.execute(
+            """
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s
+            ORDER BY ordinal_position
+        """,
+            (table,),
+        )
+        names = [row[0] for row in cursor.fetchall()]
+        if not names:
+            raise ValueError(f"Table {table} does not exist in the target database")
+        return ", ".join('"' + name.replace('"', '""') + '"' for name in names)
+
+    def _checkpoints(self) -> Dict[str, Tuple[int, str]]:
+        target = self.target_connect()
+        try:
+            cursor = target.cursor()
+            cursor.execute(
+                """
+                SELECT table_name, row_count, checksum FROM kf_migration_checkpoint
+                WHERE country_code = %s
+            """,
+                (self.country_code,),
+            )
+            return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+        finally:
+            target.close()
+
+    def _reset(self) -> None:
+        target = self.target_connect()
+        try:
+            cursor = target.cursor()
+            for table in reversed(self.tables):
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE {migration_scope_filter(table)}",
+                    {"country": self.country_code},
+                )
+            cursor.execute(
+                "DELETE FROM kf_migration_checkpoint WHERE country_code = %s AND table_name = ANY(%s)",
+                (self.country_code, self.tables),
+            )
+            target.commit()
+        finally:
+            target.close()
+
+
 class DataMigrationService:
     """
     Service to handle data migration when new data residency laws are enacted.
@@ -917,50 +1380,253 @@ class DataMigrationService:
         self.db = db_connection
         self.logger = logging.getLogger("kerjaflow.migration")
 
-    def estimate_migration_scope(self, country_code: str) -> Dict[str, Any]:
+    # Rows to aim for when sampling a table; tables this small are counted
+    SAMPLE_ROWS = 10000
+    # Rows ANALYZE samples per unit of statistics target (30,000 at the default 100)
+    ANALYZE_ROWS_PER_TARGET = 300
+    Z_95 = 1.96
+
+    def estimate_migration_scope(
+        self, country_code: str, exact: bool = False, sample_rows: int = None, seed: int = 0
+    ) -> Dict[str, Any]:
         """
         Estimate the scope of data migration if local storage becomes required.
-        """
-        tables_to_migrate = [
-            "kf_employee",
-            "kf_user",
-            "kf_foreign_worker_detail",
-            "kf_document",
-            "kf_payslip",
-            "kf_payslip_line",
-            "kf_leave_balance",
-            "kf_leave_request",
-            "kf_notification",
-            "kf_audit_log",
-        ]
 
+        Nothing is counted in full: row counts and on-disk sizes come from
+        pg_class and pg_total_relation_size, the country's share of
+        kf_employee from its pg_stats most common values, and the share of
+        every other table from a TABLESAMPLE SYSTEM block sample. Each table
+        gets a 95% confidence interval (a cluster-sample interval over the
+        sampled blocks). Tables smaller than the sample are counted exactly.
+
+        Args:
+            country_code: Country whose data would move
+            exact: Count every table with its full scope filter instead (slow
+                on a production hub; see start_exact_scope)
+            sample_rows: Rows to sample per table (defaults to SAMPLE_ROWS)
+            seed: TABLESAMPLE REPEATABLE seed
+
+        Returns:
+            Dict with per-table estimates, totals and their intervals
+        """
+        started = time.monotonic()
+        sample_rows = sample_rows or self.SAMPLE_ROWS
         scope = {
             "country_code": country_code,
+            "method": "exact" if exact else "estimate",
+            "confidence": 1.0 if exact else 0.95,
             "tables": {},
             "total_records": 0,
+            "total_records_low": 0,
+            "total_records_high": 0,
             "estimated_size_mb": 0,
+            "estimated_copy_mb": 0,
         }
 
-        for table in tables_to_migrate:
-            count_query = f"""
-                SELECT COUNT(*) FROM {table}
-                WHERE country_code = %s OR
-                      employee_id IN (
-                          SELECT id FROM kf_employee WHERE country_code = %s
-                      )
-            """
+        statistics = self._table_statistics()
+        for table in MIGRATION_TABLES:
+            if table not in statistics:
+                self.logger.warning(f"Could not estimate {table}: no such table")
+                scope["tables"][table] = "unknown"
+                continue
             try:
-                count = self.db.execute(count_query, (country_code, country_code)).fetchone()[0]
-                scope["tables"][table] = count
-                scope["total_records"] += count
+                estimate = self._estimate_table(
+                    table, statistics[table], country_code, exact, sample_rows, seed
+                )
             except Exception as e:
-                self.logger.warning(f"Could not count {table}: {e}")
+                self.logger.warning(f"Could not estimate {table}: {e}")
                 scope["tables"][table] = "unknown"
+                continue
+            scope["tables"][table] = estimate
+            scope["total_records"] += estimate["records"]
+            scope["total_records_low"] += estimate["records_low"]
+            scope["total_records_high"] += estimate["records_high"]
+            scope["estimated_size_mb"] += estimate["size_mb"]
+            scope["estimated_copy_mb"] += estimate["copy_mb"]
+
+        scope["seconds"] = round(time.monotonic() - started, 3)
+        return scope
+
+    def start_exact_scope(self, country_code: str, connect: Callable[[], Any]) -> Future:
+        """
+        Count the scope exactly in a background thread.
 
-        # Rough estimate: 1KB per record average
-        scope["estimated_size_mb"] = scope["total_records"] / 1024
+        Args:
+            country_code: Country whose data would move
+            connect: Returns a connection like db_connection; counting gets
+                its own, closed when done
 
-        return scope
+        Returns:
+            Future resolving to estimate_migration_scope(country_code, exact=True)
+        """
+
+        def count():
+            connection = connect()
+            try:
+                return DataMigrationService(connection).estimate_migration_scope(
+                    country_code, exact=True
+                )
+            finally:
+                connection.close()
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kf-migration-scope")
+        future = executor.submit(count)
+        executor.shutdown(wait=False)
+        return future
+
+    def _table_statistics(self) -> Dict[str, Tuple[float, int, int, int]]:
+        """table -> (reltuples, relpages, pg_total_relation_size, pg_stats row width)"""
+        rows = self.db.execute(
+            """
+            SELECT c.relname, c.reltuples, c.relpages, pg_total_relation_size(c.oid),
+                   COALESCE((SELECT SUM(s.avg_width) FROM pg_stats s
+                             WHERE s.schemaname = n.nspname AND s.tablename = c.relname), 0)
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = current_schema()
+              AND c.relkind IN ('r', 'p')
+              AND c.relname = ANY(%s)
+        """,
+            (list(MIGRATION_TABLES),),
+        ).fetchall()
+        return {r[0]: (float(r[1]), int(r[2]), int(r[3]), int(r[4])) for r in rows}
+
+    def _estimate_table(
+        self,
+        table: str,
+        statistics: Tuple[float, int, int, int],
+        country_code: str,
+        exact: bool,
+        sample_rows: int,
+        seed: int,
+    ) -> Dict[str, Any]:
+        reltuples, relpages, total_bytes, row_width = statistics
+        scope_filter = migration_scope_filter(table)
+
+        if exact or reltuples <= sample_rows:  # Includes never analyzed (-1)
+            total, matched = self.db.execute(
+                f"SELECT COUNT(*), COUNT(*) FILTER (WHERE {scope_filter}) FROM {table}",
+                {"country": country_code},
+            ).fetchone()
+            rows, low, high, method = total, matched, matched, "exact"
+        else:
+            rows, method = reltuples, "sample"
+            interval = None
+            if table == "kf_employee":
+                interval = self._employee_share(country_code, reltuples)
+            if interval is not None:
+                method = "statistics"
+            else:
+                interval = self._sampled_share(
+                    table, scope_filter, country_code, relpages, reltuples, sample_rows, seed
+                )
+            share, share_low, share_high = interval
+            matched = round(share * rows)
+            low = round(share_low * rows)
+            high = round(share_high * rows)
+
+        bytes_per_row = total_bytes / rows if rows > 0 else row_width
+
+        def mb(records, width):
+            return round(records * width / (1024 * 1024), 3)
+
+        return {
+            "records": int(matched),
+            "records_low": int(low),
+            "records_high": int(high),
+            "size_mb": mb(matched, bytes_per_row),
+            "copy_mb": mb(matched, row_width),
+            "table_rows": int(max(rows, 0)),
+            "method": method,
+        }
+
+    def _employee_share(
+        self, country_code: str, reltuples: float
+    ) -> Optional[Tuple[float, float, float]]:
+        """Country's share of kf_employee from the planner's most common values"""
+        row = self.db.execute("""
+            SELECT s.most_common_vals::text::text[], s.most_common_freqs,
+                   COALESCE(NULLIF(a.attstattarget, -1),
+                            current_setting('default_statistics_target')::int)
+            FROM pg_stats s
+            JOIN pg_namespace n ON n.nspname = s.schemaname
+            JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = s.tablename
+            JOIN pg_attribute a ON a.attrelid = c.oid AND a.attname = s.attname
+            WHERE s.schemaname = current_schema()
+              AND s.tablename = 'kf_employee' AND s.attname = 'country_code'
+        """).fetchone()
+        if not row or not row[0] or country_code not in row[0]:
+            return None
+        share = float(row[1][row[0].index(country_code)])
+        analyzed = min(reltuples, self.ANALYZE_ROWS_PER_TARGET * row[2])
+        if analyzed >= reltuples:
+            return share, share, share  # ANALYZE read every row
+        return self._wilson(share, analyzed)
+
+    def _sampled_share(
+        self,
+        table: str,
+        scope_filter: str,
+        country_code: str,
+        relpages: int,
+        reltuples: float,
+        sample_rows: int,
+        seed: int,
+    ) -> Tuple[float, float, float]:
+        """Country's share of a table from a block sample, with a 95% interval"""
+        percent = min(100.0, 100.0 * sample_rows / reltuples)
+        blocks = self.db.execute(
+            f"""
+            SELECT COUNT(*), COUNT(*) FILTER (WHERE {scope_filter})
+            FROM {table} TABLESAMPLE SYSTEM (%(percent)s) REPEATABLE (%(seed)s)
+            GROUP BY (ctid::text::point)[0]
+        """,
+            {"country": country_code, "percent": percent, "seed": seed},
+        ).fetchall()
+        sampled = sum(b[0] for b in blocks)
+        matched = sum(b[1] for b in blocks)
+        if sampled == 0:
+            return 0.0, 0.0, 1.0
+        # Rule of three: no (or only) matches in n rows bounds the rest by 3/n
+        if matched == 0:
+            return 0.0, 0.0, min(1.0, 3 / sampled)
+        if matched == sampled:
+            return 1.0, max(0.0, 1 - 3 / sampled), 1.0
+        share = matched / sampled
+        if len(blocks) < 2:
+            return self._wilson(share, sampled)
+
+        # Ratio estimator over sampled blocks (rows of a block are not independent)
+        k = len(blocks)
+        mean_rows = sampled / k
+        variance = sum((b[1] - share * b[0]) ** 2 for b in blocks) / (k * (k - 1) * mean_rows**2)
+        half = self.Z_95 * variance**0.5
+        return share, max(0.0, share - half), min(1.0, share + half)
+
+    def _wilson(self, share: float, n: int) -> Tuple[float, float, float]:
+        z2 = self.Z_95**2
+        centre = (share + z2 / (2 * n)) / (1 + z2 / n)
+        half = self.Z_95 * (share * (1 - share) / n + z2 / (4 * n * n)) ** 0.5 / (1 + z2 / n)
+        return share, max(0.0, centre - half), min(1.0, centre + half)
+
+    def migrate(
+        self,
+        country_code: str,
+        source_connect: Callable[[], Any],
+        target_connect: Callable[[], Any],
+        workers: int = 4,
+        restart: bool = False,
+    ) -> MigrationReport:
+        """
+        Move a country's data to its regional database (plan step 4).
+
+        Resumable: tables verified by an earlier, interrupted run are skipped.
+        See RegionMigrationEngine.
+        """
+        engine = RegionMigrationEngine(
+            source_connect, target_connect, country_code, workers=workers
+        )
+        return engine.run(restart=restart)
 
     def generate_migration_plan(self, country_code: str) -> Dict[str, Any]:
         """
@@ -993,8 +1659,10 @@ class DataMigrationService:
                 {
                     "step": 4,
                     "action": "Migrate data",
-                    "details": f'Export {scope["total_records"]} records from Vietnam VPS, '
-                    f'import to Cambodia VPS (~{scope["estimated_size_mb"]:.1f} MB)',
+                    "details": f'Stream ~{scope["total_records"]} records '
+                    f'({scope["total_records_low"]}-{scope["total_records_high"]}) from Vietnam VPS '
+                    f'to Cambodia VPS (~{scope["estimated_size_mb"]:.1f} MB) with '
+                    "DataMigrationService.migrate (resumable, checksum-verified)",
                     "estimated_time": "2-4 hours",
                 },
                 {
@@ -1017,7 +1685,287 @@ class DataMigrationService:
 
 
 # ============================================================================
-# PART 8: EXAMPLE USAGE
+# PART 8: RATE CHANGE SIMULATION (what-if costing)
+# ============================================================================
+
+
+@dataclass
+class SimulationEmployee:
+    """Employee as priced by the rate change simulator"""
+
+    employee_id: int
+    company_id: Optional[int]
+    country_code: str
+    department_id: Optional[int]
+    gross_salary: Decimal
+
+
+@dataclass
+class CostDelta:
+    """Statutory cost of a group of employees under current and future rates"""
+
+    headcount: int = 0
+    current_employee_cost: Decimal = Decimal("0")
+    current_employer_cost: Decimal = Decimal("0")
+    future_employee_cost: Decimal = Decimal("0")
+    future_employer_cost: Decimal = Decimal("0")
+
+    @property
+    def employee_delta(self) -> Decimal:
+        return self.future_employee_cost - self.current_employee_cost
+
+    @property
+    def employer_delta(self) -> Decimal:
+        return self.future_employer_cost - self.current_employer_cost
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "headcount": self.headcount,
+            "current_employee_cost": float(self.current_employee_cost),
+            "current_employer_cost": float(self.current_employer_cost),
+            "future_employee_cost": float(self.future_employee_cost),
+            "future_employer_cost": float(self.future_employer_cost),
+            "employee_delta": float(self.employee_delta),
+            "employer_delta": float(self.employer_delta),
+        }
+
+
+@dataclass
+class RateChangeSimulation:
+    """Workforce cost under current and future rate sets, per group"""
+
+    current_date: date
+    future_date: date
+    # (country_code, contribution_type) -> (current rate, future rate); either may be None
+    rate_changes: Dict[tuple, tuple]
+    total: CostDelta
+    by_country: Dict[str, CostDelta]
+    by_company: Dict[Optional[int], CostDelta]
+    by_department: Dict[Optional[int], CostDelta]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Dashboard/report form (amounts as floats, like PayrollCalculator)"""
+
+        def rate_pair(pair):
+            return [
+                (
+                    {
+                        "employee_rate": float(r.employee_rate),
+                        "employer_rate": float(r.employer_rate),
+                    }
+                    if r
+                    else None
+                )
+                for r in pair
+            ]
+
+        return {
+            "current_date": self.current_date.isoformat(),
+            "future_date": self.future_date.isoformat(),
+            "rate_changes": [
+                {"country_code": country, "contribution_type": ctype, "rates": rate_pair(pair)}
+                for (country, ctype), pair in self.rate_changes.items()
+            ],
+            "total": self.total.as_dict(),
+            "by_country": {k: v.as_dict() for k, v in self.by_country.items()},
+            "by_company": {k: v.as_dict() for k, v in self.by_company.items()},
+            "by_department": {k: v.as_dict() for k, v in self.by_department.items()},
+        }
+
+
+class RateChangeSimulator:
+    """
+    Re-price the whole workforce under current and future statutory rates.
+
+    Uses the same rules as PayrollCalculator (rate% of the salary, capped at
+    salary_cap), but never loops over it per employee: a contribution is
+    linear in the rate, so each group only needs the sum of its salaries
+    capped at each distinct cap. One pass over the workforce accumulates
+    those sums, and every rate set is then priced with a handful of
+    multiplications per group. Results equal the sum of per-employee
+    PayrollCalculator amounts (exact Decimal arithmetic, no rounding).
+
+    The future rate set is the kf_statutory_rate rows in effect on
+    future_date (so scheduled rows such as the Cambodia NSSF Oct 2027
+    step-up apply automatically), optionally with an ad-hoc overlay of
+    proposed rates replacing rows of the same contribution type.
+    """
+
+    def __init__(self, db_connection):
+        self.db = db_connection
+        self.rate_service = StatutoryRateService(db_connection)
+        self.logger = logging.getLogger("kerjaflow.simulation")
+
+    def load_workforce(
+        self, country_codes: Optional[List[str]] = None, as_of: date = None
+    ) -> List[SimulationEmployee]:
+        """
+        Load employees still employed on as_of (defaults to today).
+        Monthly basic salary is the contribution base, as on the payslip.
+        """
+        if as_of is None:
+            as_of = date.today()
+
+        query = """
+            SELECT id, company_id, country_code, department_id, basic_salary
+            FROM kf_employee
+            WHERE status = 'ACTIVE'
+              AND (resign_date IS NULL OR resign_date >= %s)
+        """
+        params: List[Any] = [as_of]
+        if country_codes:
+            query += " AND country_code = ANY(%s)"
+            params.append(list(country_codes))
+        query += " ORDER BY id"
+
+        return [
+            SimulationEmployee(
+                employee_id=r[0],
+                company_id=r[1],
+                country_code=r[2],
+                department_id=r[3],
+                gross_salary=Decimal(str(r[4] or 0)),
+            )
+            for r in self.db.execute(query, params).fetchall()
+        ]
+
+    def simulate(
+        self,
+        future_date: date = None,
+        overlay: Optional[List[StatutoryRate]] = None,
+        workforce: Optional[List[SimulationEmployee]] = None,
+        current_date: date = None,
+    ) -> RateChangeSimulation:
+        """
+        Compare the workforce cost under current and future rates.
+
+        Args:
+            future_date: Date whose rates form the future set (defaults to
+                current_date, i.e. current rates plus the overlay)
+            overlay: Proposed rates replacing the future set's rows with the
+                same (country_code, contribution_type); new types are added
+            workforce: Employees to price (defaults to load_workforce())
+            current_date: Date of the baseline rates (defaults to today)
+
+        Returns:
+            RateChangeSimulation with totals per country, company and department
+
+        Example:
+            # Cost of the Cambodia NSSF pension step-up (2% -> 4%)
+            result = simulator.simulate(future_date=date(2027, 10, 1))
+            result.by_company[company_id].employer_delta
+        """
+        if current_date is None:
+            current_date = date.today()
+        if future_date is None:
+            future_date = current_date
+        if workforce is None:
+            workforce = self.load_workforce(as_of=current_date)
+
+        countries = sorted({e.country_code for e in workforce})
+        current_rates = {c: self._rates(c, current_date) for c in countries}
+        future_rates = {c: self._rates(c, future_date) for c in countries}
+        for rate in overlay or []:
+            if rate.country_code in future_rates:
+                future_rates[rate.country_code][rate.contribution_type] = rate
+
+        # Distinct caps per country (None = uncapped)
+        caps = {
+            c: sorted(
+                {r.salary_cap for r in (*current_rates[c].values(), *future_rates[c].values())},
+                key=lambda cap: (cap is None, cap or 0),
+            )
+            for c in countries
+        }
+
+        # One pass: per group, headcount and sum of salaries capped at each cap
+        group_sums: Dict[tuple, Dict[Optional[Decimal], Decimal]] = {}
+        headcounts: Dict[tuple, int] = {}
+        for employee in workforce:
+            keys = (
+                ("total", None),
+                ("country", employee.country_code),
+                ("company", employee.company_id),
+                ("department", employee.department_id),
+            )
+            salary = employee.gross_salary
+            for key in keys:
+                group = (key, employee.country_code)
+                sums = group_sums.get(group)
+                if sums is None:
+                    sums = group_sums[group] = dict.fromkeys(
+                        caps[employee.country_code], Decimal(0)
+                    )
+                    headcounts[group] = 0
+                headcounts[group] += 1
+                for cap in sums:
+                    sums[cap] += salary if cap is None or salary <= cap else cap
+
+        totals: Dict[tuple, CostDelta] = {}
+        for group, sums in group_sums.items():
+            key, country = group
+            delta = totals.setdefault(key, CostDelta())
+            delta.headcount += headcounts[group]
+            for rate in current_rates[country].values():
+                delta.current_employee_cost += sums[rate.salary_cap] * rate.employee_rate / 100
+                delta.current_employer_cost += sums[rate.salary_cap] * rate.employer_rate / 100
+            for rate in future_rates[country].values():
+                delta.future_employee_cost += sums[rate.salary_cap] * rate.employee_rate / 100
+                delta.future_employer_cost += sums[rate.salary_cap] * rate.employer_rate / 100
+
+        rate_changes = {}
+        for country in countries:
+            for ctype in sorted(set(current_rates[country]) | set(future_rates[country])):
+                now = current_rates[country].get(ctype)
+                then = future_rates[country].get(ctype)
+                if (now and (now.employee_rate, now.employer_rate, now.salary_cap)) != (
+                    then and (then.employee_rate, then.employer_rate, then.salary_cap)
+                ):
+                    rate_changes[(country, ctype)] = (now, then)
+
+        def by(kind: str) -> Dict[Any, CostDelta]:
+            return {k[1]: v for k, v in totals.items() if k[0] == kind}
+
+        self.logger.info(
+            f"Simulated {len(workforce)} employees in {len(countries)} countries: "
+            f"{current_date} -> {future_date}, {len(rate_changes)} rate changes"
+        )
+
+        return RateChangeSimulation(
+            current_date=current_date,
+            future_date=future_date,
+            rate_changes=rate_changes,
+            total=totals.get(("total", None), CostDelta()),
+            by_country=by("country"),
+            by_company=by("company"),
+            by_department=by("department"),
+        )
+
+    def simulate_upcoming_changes(
+        self, days_ahead: int = 90, workforce: Optional[List[SimulationEmployee]] = None
+    ) -> List[RateChangeSimulation]:
+        """Simulate every distinct effective date of upcoming scheduled rate changes"""
+        upcoming = self.rate_service.get_upcoming_rate_changes(days_ahead)
+        countries = sorted({change["country_code"] for change in upcoming})
+        if not countries:
+            return []
+        if workforce is None:
+            workforce = self.load_workforce(countries)
+
+        return [
+            self.simulate(future_date=effective_from, workforce=workforce)
+            for effective_from in sorted({change["effective_from"] for change in upcoming})
+        ]
+
+    def _rates(self, country_code: str, on: date) -> Dict[str, StatutoryRate]:
+        return {
+            rate.contribution_type: rate
+            for rate in self.rate_service.get_all_rates_for_country(country_code, on)
+        }
+
+
+# ============================================================================
+# PART 9: EXAMPLE USAGE
 # ============================================================================
 
 if __name__ == "__main__":
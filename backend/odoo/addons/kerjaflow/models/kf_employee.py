@@ -497,6 +497,10 @@ class KfEmployee(models.Model):
         """
         Calculate all statutory deductions for given payslip date.
 
+        Thin wrapper over calculate_statutory_deductions_batch; payroll jobs
+        should call the batch method on the whole recordset instead of
+        looping over this one.
+
         Args:
             payslip_date: Date of the payslip (CRITICAL: not today's date!)
 
@@ -504,48 +508,112 @@ class KfEmployee(models.Model):
             Dict with employee and employer contributions
         """
         self.ensure_one()
-        if not self.basic_salary:
-            return {"employee": Decimal("0"), "employer": Decimal("0"), "details": []}
+        return self.calculate_statutory_deductions_batch(payslip_date)[self.id]
 
-        # Get all applicable rates for this country
-        StatutoryRate = self.env["kf.statutory.rate"]
-        rates = StatutoryRate.search(
+    def calculate_statutory_deductions_batch(self, payslip_date):
+        """
+        Calculate statutory deductions for every employee in the recordset.
+
+        Applicable rates are read once per (country, payslip date) and indexed
+        by country; salaries are read once and each employee is priced in a
+        single pass.
+
+        Args:
+            payslip_date: Date of the payslip (CRITICAL: not today's date!)
+
+        Returns:
+            Dict of employee id -> the calculate_statutory_deductions breakdown
+
+        Example:
+            employees = self.env["kf.employee"].search([("status", "=", "ACTIVE")])
+            deductions = employees.calculate_statutory_deductions_batch(date(2025, 6, 30))
+        """
+        records = self.read(["country_code", "basic_salary"], load=False)
+        rates_by_country = self._statutory_rate_index(
+            {record["country_code"] for record in records if record["basic_salary"]},
+            payslip_date,
+        )
+
+        result = {}
+        for record in records:
+            if not record["basic_salary"]:
+                result[record["id"]] = {
+                    "employee": Decimal("0"),
+                    "employer": Decimal("0"),
+                    "details": [],
+                }
+                continue
+
+            salary = Decimal(str(record["basic_salary"]))
+            employee_total = Decimal("0")
+            employer_total = Decimal("0")
+            details = []
+
+            for rate in rates_by_country.get(record["country_code"], ()):
+                applicable_salary = salary
+                if rate["salary_cap"] is not None and applicable_salary > rate["salary_cap"]:
+                    applicable_salary = rate["salary_cap"]
+
+                employee_amount = applicable_salary * rate["employee_fraction"]
+                employer_amount = applicable_salary * rate["employer_fraction"]
+
+                employee_total += employee_amount
+                employer_total += employer_amount
+
+                details.append(
+                    {
+                        "type": rate["contribution_type"],
+                        "employee_rate": rate["employee_rate"],
+                        "employer_rate": rate["employer_rate"],
+                        "employee_amount": float(employee_amount),
+                        "employer_amount": float(employer_amount),
+                    }
+                )
+
+            result[record["id"]] = {
+                "employee": float(employee_total),
+                "employer": float(employer_total),
+                "details": details,
+            }
+
+        return result
+
+    @api.model
+    def _statutory_rate_index(self, country_codes, payslip_date):
+        """
+        Applicable kf.statutory.rate rows per country for a payslip date.
+
+        One search_read covers every country; rates and caps are converted to
+        Decimal here so the per-employee loop does no conversions.
+
+        Returns:
+            Dict of country_code -> list of rate dicts, in kf.statutory.rate order
+        """
+        index = {country_code: [] for country_code in country_codes}
+        if not index:
+            return index
+
+        rates = self.env["kf.statutory.rate"].search_read(
             [
-                ("country_code", "=", self.country_code),
+                ("country_code", "in", list(index)),
                 ("effective_from", "<=", payslip_date),
                 "|",
                 ("effective_to", "=", False),
                 ("effective_to", ">=", payslip_date),
-            ]
+            ],
+            ["country_code", "contribution_type", "employee_rate", "employer_rate", "salary_cap"],
         )
-
-        employee_total = Decimal("0")
-        employer_total = Decimal("0")
-        details = []
-
         for rate in rates:
-            applicable_salary = Decimal(str(self.basic_salary))
-            if rate.salary_cap and applicable_salary > Decimal(str(rate.salary_cap)):
-                applicable_salary = Decimal(str(rate.salary_cap))
-
-            employee_amount = applicable_salary * (Decimal(str(rate.employee_rate)) / 100)
-            employer_amount = applicable_salary * (Decimal(str(rate.employer_rate)) / 100)
-
-            employee_total += employee_amount
-            employer_total += employer_amount
-
-            details.append(
+            index[rate["country_code"]].append(
                 {
-                    "type": rate.contribution_type,
-                    "employee_rate": rate.employee_rate,
-                    "employer_rate": rate.employer_rate,
-                    "employee_amount": float(employee_amount),
-                    "employer_amount": float(employer_amount),
+                    "contribution_type": rate["contribution_type"],
+                    "employee_rate": rate["employee_rate"],
+                    "employer_rate": rate["employer_rate"],
+                    "employee_fraction": Decimal(str(rate["employee_rate"])) / 100,
+                    "employer_fraction": Decimal(str(rate["employer_rate"])) / 100,
+                    "salary_cap": (
+                        Decimal(str(rate["salary_cap"])) if rate["salary_cap"] else None
+                    ),
                 }
             )
-
-        return {
-            "employee": float(employee_total),
-            "employer": float(employer_total),
-            "details": details,
-        }
+        return index
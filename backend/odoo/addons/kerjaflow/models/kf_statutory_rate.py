@@ -18,6 +18,8 @@ from decimal import Decimal
 
 from odoo import api, fields, models
 
+from .compliance import StatutoryRateService
+
 _logger = logging.getLogger(__name__)
 
 
@@ -151,6 +153,25 @@ class KfStatutoryRate(models.Model):
         ),
     ]
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Override create to refresh cached rate timelines once committed."""
+        records = super().create(vals_list)
+        self.env.cr.postcommit.add(StatutoryRateService.signal_change)
+        return records
+
+    def write(self, vals):
+        """Override write to refresh cached rate timelines once committed."""
+        result = super().write(vals)
+        self.env.cr.postcommit.add(StatutoryRateService.signal_change)
+        return result
+
+    def unlink(self):
+        """Override unlink to refresh cached rate timelines once committed."""
+        result = super().unlink()
+        self.env.cr.postcommit.add(StatutoryRateService.signal_change)
+        return result
+
     @api.model
     def get_rate(self, country_code, contribution_type, effective_date=None):
         """
@@ -331,3 +331,62 @@ class TestForeignWorkerDetail(KerjaFlowTestCase):
         )
 
         self.assertEqual(foreign_detail.days_to_expiry, 30)
+
+
+@tagged("kerjaflow", "-at_install", "post_install")
+class TestStatutoryDeductions(KerjaFlowTestCase):
+    """Test recordset-level statutory deductions on kf.employee."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.country_my = cls.env["kf.country.config"].create(
+            {"country_code": "MY", "country_name": "Malaysia", "currency_code": "MYR"}
+        )
+        Rate = cls.env["kf.statutory.rate"]
+        for contribution_type, employee_rate, employer_rate, cap, effective_from in [
+            ("EPF", 11.0, 13.0, 0.0, date(2024, 1, 1)),
+            ("EIS", 0.2, 0.2, 4000.0, date(2024, 1, 1)),
+            ("EIS", 0.2, 0.2, 6000.0, date(2024, 10, 1)),
+        ]:
+            Rate.create(
+                {
+                    "country_id": cls.country_my.id,
+                    "contribution_type": contribution_type,
+                    "employee_rate": employee_rate,
+                    "employer_rate": employer_rate,
+                    "salary_cap": cap,
+                    "effective_from": effective_from,
+                }
+            )
+        Rate.search(
+            [("contribution_type", "=", "EIS"), ("salary_cap", "=", 4000.0)]
+        ).effective_to = date(2024, 9, 30)
+        (cls.employee | cls.manager_employee).write({"country_id": cls.country_my.id})
+
+    def test_batch_matches_single_record(self):
+        """Test batch breakdown equals the per-employee wrapper."""
+        employees = self.employee | self.manager_employee
+        payslip_date = date(2024, 10, 31)
+        batch = employees.calculate_statutory_deductions_batch(payslip_date)
+        self.assertEqual(set(batch), set(employees.ids))
+        for employee in employees:
+            self.assertEqual(
+                batch[employee.id], employee.calculate_statutory_deductions(payslip_date)
+            )
+
+    def test_batch_uses_payslip_date_rates(self):
+        """Test EIS cap follows the payslip date, not today."""
+        before = self.manager_employee.calculate_statutory_deductions(date(2024, 9, 30))
+        after = self.manager_employee.calculate_statutory_deductions(date(2024, 10, 31))
+        eis_before = next(d for d in before["details"] if d["type"] == "EIS")
+        eis_after = next(d for d in after["details"] if d["type"] == "EIS")
+        self.assertAlmostEqual(eis_before["employee_amount"], 8.0)
+        self.assertAlmostEqual(eis_after["employee_amount"], 12.0)
+        self.assertAlmostEqual(after["employee"], 15000 * 0.11 + 12.0)
+
+    def test_batch_zero_salary(self):
+        """Test employees without salary get an empty breakdown."""
+        self.employee.basic_salary = 0
+        result = self.employee.calculate_statutory_deductions_batch(date(2024, 10, 31))
+        self.assertEqual(result[self.employee.id]["details"], [])
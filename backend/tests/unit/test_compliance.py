@@ -0,0 +1,722 @@
+# -*- coding: utf-8 -*-
+"""
+KerjaFlow Compliance Service Unit Tests
+=======================================
+
+Rate change simulation in odoo/addons/kerjaflow/models/compliance.py.
+compliance.py has no Odoo imports, so it is loaded straight from its file.
+"""
+
+import hashlib
+import importlib.util
+import os
+import random
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+COMPLIANCE_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "odoo", "addons", "kerjaflow", "models", "compliance.py"
+)
+
+_spec = importlib.util.spec_from_file_location("kerjaflow_compliance", COMPLIANCE_PATH)
+compliance = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(compliance)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeComplianceDB:
+    """Answers the compliance.py queries from in-memory rows"""
+
+    def __init__(self, rates, employees=()):
+        # (country, type, ee%, er%, cap, currency, from, to, is_scheduled, notes)
+        self.rates = list(rates)
+        # (id, company_id, country_code, department_id, basic_salary)
+        self.employees = list(employees)
+        # Latest kf_statutory_rate write_date
+        self.write_date = datetime(2026, 1, 1)
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if "FROM kf_employee" in query:
+            countries = params[1] if len(params) > 1 else None
+            return FakeResult([e for e in self.employees if countries is None or e[2] in countries])
+        if "FROM kf_statutory_rate" in query and "ORDER BY country_code" in query:
+            stamp = (len(self.rates), self.write_date)
+            return FakeResult(sorted((r + stamp for r in self.rates), key=lambda r: r[:2] + r[6:7]))
+        if "FROM kf_statutory_rate" in query and "max(write_date)" in query:
+            return FakeResult([(len(self.rates), self.write_date)])
+        raise AssertionError(f"Unexpected query: {query}")
+
+
+def _rate_rows():
+    return [
+        ("KH", "NSSF_PENSION", 2.0, 2.0, 1200000, "KHR",
+         date(2022, 10, 1), date(2027, 9, 30), False, None),
+        ("KH", "NSSF_PENSION", 4.0, 4.0, 1200000, "KHR",
+         date(2027, 10, 1), None, True, "Phase 2"),
+        ("KH", "NSSF_HEALTH", 1.3, 1.3, 1200000, "KHR", date(2022, 1, 1), None, False, None),
+        ("MY", "EIS", 0.2, 0.2, 6000, "MYR", date(2024, 10, 1), None, False, None),
+    ]  # fmt: skip
+
+
+def _employees(count=400, seed=9):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        country = "KH" if i % 3 else "MY"
+        salary = rng.randrange(300000, 3000000) if country == "KH" else rng.randrange(1500, 12000)
+        rows.append((i + 1, 1 + i % 4, country, 10 + i % 7, Decimal(salary)))
+    return rows
+
+
+def _reference(db, rows, on):
+    """Per-employee PayrollCalculator totals, summed"""
+    calculator = compliance.PayrollCalculator(db)
+    employee = employer = 0.0
+    for row in rows:
+        result = calculator.calculate_statutory_deductions(row[2], row[4], on)
+        employee += result["total_employee_deduction"]
+        employer += result["total_employer_contribution"]
+    return employee, employer
+
+
+class TestRateChangeSimulator:
+    """What-if costing of scheduled and proposed rate changes"""
+
+    def test_scheduled_step_up_matches_per_employee_calculation(self):
+        employees = _employees()
+        db = FakeComplianceDB(_rate_rows(), employees)
+        simulator = compliance.RateChangeSimulator(db)
+
+        result = simulator.simulate(future_date=date(2027, 10, 1), current_date=date(2026, 1, 1))
+
+        current = _reference(db, employees, date(2026, 1, 1))
+        future = _reference(db, employees, date(2027, 10, 1))
+        assert float(result.total.current_employee_cost) == pytest.approx(current[0])
+        assert float(result.total.current_employer_cost) == pytest.approx(current[1])
+        assert float(result.total.future_employee_cost) == pytest.approx(future[0])
+        assert float(result.total.future_employer_cost) == pytest.approx(future[1])
+        assert result.total.headcount == len(employees)
+        assert list(result.rate_changes) == [("KH", "NSSF_PENSION")]
+
+    def test_deltas_per_country_company_and_department(self):
+        employees = _employees()
+        db = FakeComplianceDB(_rate_rows(), employees)
+
+        result = compliance.RateChangeSimulator(db).simulate(
+            future_date=date(2027, 10, 1), current_date=date(2026, 1, 1)
+        )
+
+        assert result.by_country["MY"].employer_delta == 0
+        assert result.by_country["KH"].employer_delta > 0
+        # Pension doubles; every KH employee is capped at or below 1.2M
+        kh = [e for e in employees if e[2] == "KH"]
+        pension_base = sum(min(e[4], Decimal(1200000)) for e in kh)
+        assert result.by_country["KH"].employee_delta == pension_base * Decimal("0.02")
+
+        for groups in (result.by_company, result.by_department):
+            assert sum(g.headcount for g in groups.values()) == len(employees)
+            assert sum(g.employer_delta for g in groups.values()) == result.total.employer_delta
+
+        company_1 = [e for e in kh if e[1] == 1]
+        assert result.by_company[1].employer_delta == sum(
+            min(e[4], Decimal(1200000)) for e in company_1
+        ) * Decimal("0.02")
+
+    def test_overlay_replaces_future_rates(self):
+        employees = _employees(60)
+        db = FakeComplianceDB(_rate_rows(), employees)
+        proposed_eis = compliance.StatutoryRate(
+            country_code="MY",
+            contribution_type="EIS",
+            employee_rate=Decimal("0.3"),
+            employer_rate=Decimal("0.3"),
+            salary_cap=Decimal("6000"),
+            currency_code="MYR",
+            effective_from=date(2027, 1, 1),
+            effective_to=None,
+        )
+
+        result = compliance.RateChangeSimulator(db).simulate(
+            overlay=[proposed_eis], current_date=date(2026, 1, 1)
+        )
+
+        my_base = sum(min(e[4], Decimal(6000)) for e in employees if e[2] == "MY")
+        assert result.future_date == result.current_date
+        assert result.by_country["MY"].employer_delta == my_base * Decimal("0.1") / 100
+        assert result.by_country["KH"].employer_delta == 0
+        assert list(result.rate_changes) == [("MY", "EIS")]
+        assert result.as_dict()["by_country"]["MY"]["headcount"] == len(
+            [e for e in employees if e[2] == "MY"]
+        )
+
+    def test_rates_loaded_once(self):
+        employees = _employees(5000)
+        db = FakeComplianceDB(_rate_rows(), employees)
+
+        compliance.RateChangeSimulator(db).simulate(
+            future_date=date(2027, 10, 1), current_date=date(2026, 1, 1)
+        )
+
+        # Workforce + one rate timeline load
+        assert len(db.queries) == 2
+
+
+class TestStatutoryRateTimeline:
+    """As-of lookups answered from the in-memory rate timeline"""
+
+    def test_scheduled_kh_increase_resolves_without_queries(self):
+        db = FakeComplianceDB(_rate_rows())
+        service = compliance.StatutoryRateService(db)
+
+        before = service.get_rate("KH", "NSSF_PENSION", date(2027, 9, 30))
+        after = service.get_rate("KH", "NSSF_PENSION", date(2027, 10, 1))
+        for day in range(1, 29):
+            service.get_all_rates_for_country("KH", date(2027, 2, day))
+
+        assert before.employee_rate == Decimal("2.0") and not before.is_scheduled
+        assert after.employee_rate == Decimal("4.0") and after.is_scheduled
+        assert service.get_rate("KH", "NSSF_PENSION", date(2022, 9, 30)) is None
+        assert service.get_rate("MY", "NSSF_PENSION", date(2027, 10, 1)) is None
+        assert len(db.queries) == 1
+
+    def test_all_rates_for_country(self):
+        service = compliance.StatutoryRateService(FakeComplianceDB(_rate_rows()))
+
+        current = service.get_all_rates_for_country("KH", date(2026, 1, 1))
+        future = service.get_all_rates_for_country("KH", date(2026, 1, 1), include_future=True)
+
+        assert [(r.contribution_type, r.employee_rate) for r in current] == [
+            ("NSSF_HEALTH", Decimal("1.3")),
+            ("NSSF_PENSION", Decimal("2.0")),
+        ]
+        assert [(r.contribution_type, r.employee_rate) for r in future] == [
+            ("NSSF_HEALTH", Decimal("1.3")),
+            ("NSSF_PENSION", Decimal("4.0")),
+        ]
+
+    def test_expired_rate_leaves_a_gap(self):
+        rates = _rate_rows() + [
+            ("MY", "EPF", 11.0, 13.0, None, "MYR", date(2020, 1, 1), date(2023, 12, 31), False, None),
+            ("MY", "EPF", 11.0, 12.0, None, "MYR", date(2024, 6, 1), None, False, None),
+        ]  # fmt: skip
+        service = compliance.StatutoryRateService(FakeComplianceDB(rates))
+
+        assert service.get_rate("MY", "EPF", date(2023, 12, 31)).employer_rate == Decimal("13.0")
+        assert service.get_rate("MY", "EPF", date(2024, 3, 1)) is None
+        assert service.get_rate("MY", "EPF", date(2024, 6, 1)).employer_rate == Decimal("12.0")
+
+    def test_change_signal_reloads(self):
+        db = FakeComplianceDB(_rate_rows())
+        service = compliance.StatutoryRateService(db)
+        assert service.get_rate("MY", "EIS", date(2026, 1, 1)).salary_cap == Decimal("6000")
+
+        db.rates.append(("MY", "EIS", 0.2, 0.2, 7000, "MYR", date(2026, 1, 1), None, True, None))
+        assert service.get_rate("MY", "EIS", date(2026, 1, 1)).salary_cap == Decimal("6000")
+
+        compliance.StatutoryRateService.signal_change()
+        assert service.get_rate("MY", "EIS", date(2026, 1, 1)).salary_cap == Decimal("7000")
+        assert service.get_rate("MY", "EIS", date(2025, 12, 31)).salary_cap == Decimal("6000")
+        assert len(db.queries) == 2
+
+    def test_commits_from_other_processes_reload(self):
+        db = FakeComplianceDB(_rate_rows())
+        service = compliance.StatutoryRateService(db, check_interval=0)
+        assert service.get_rate("MY", "EIS", date(2026, 1, 1)).salary_cap == Decimal("6000")
+        assert service.get_rate("MY", "EIS", date(2026, 1, 1)).salary_cap == Decimal("6000")
+        assert len(db.queries) == 2  # Load, then an unchanged stamp
+
+        # Another worker edits a rate in place: only write_date moves
+        db.rates[-1] = db.rates[-1][:4] + (7000,) + db.rates[-1][5:]
+        db.write_date = datetime(2026, 3, 1)
+        assert service.get_rate("MY", "EIS", date(2026, 1, 1)).salary_cap == Decimal("7000")
+
+        # ... or deletes one: only the row count moves
+        del db.rates[-1]
+        assert service.get_rate("MY", "EIS", date(2026, 1, 1)) is None
+
+    def test_stamp_checked_once_per_interval(self):
+        db = FakeComplianceDB(_rate_rows())
+        service = compliance.StatutoryRateService(db, check_interval=3600)
+        service.get_rate("MY", "EIS", date(2026, 1, 1))
+
+        db.write_date = datetime(2026, 3, 1)
+        for _ in range(50):
+            service.get_rate("MY", "EIS", date(2026, 1, 1))
+
+        assert len(db.queries) == 1
+
+
+class FakeAlertDB:
+    """Upcoming rate changes plus a kf_compliance_alert table keyed on its natural key"""
+
+    def __init__(self, upcoming):
+        # (country, name, type, ee%, er%, effective_from, notes, current ee%, current er%)
+        self.upcoming = list(upcoming)
+        self.alerts = {}
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if "JOIN kf_country_config" in query:
+            return FakeResult(self.upcoming)
+        if "INSERT INTO kf_compliance_alert" in query:
+            assert (
+                "ON CONFLICT (alert_type, country_code, contribution_type, trigger_date)" in query
+            )
+            written = []
+            for i in range(0, len(params), 7):
+                row = tuple(params[i : i + 7])  # noqa: E203
+                key = (row[0], row[2], row[3], row[6])
+                existing = self.alerts.get(key)
+                if existing is None:
+                    self.alerts[key] = row
+                    written.append((True,))
+                elif existing[1] != row[1] or existing[4:6] != row[4:6]:
+                    self.alerts[key] = row
+                    written.append((False,))
+            return FakeResult(written)
+        raise AssertionError(f"Unexpected query: {query}")
+
+
+class TestRateChangeAlerts:
+    """Set-based, idempotent rate change alert generation"""
+
+    def _upcoming(self, days):
+        on = date.today() + timedelta(days=days)
+        return [
+            ("KH", "Cambodia", "NSSF_PENSION", 4.0, 4.0, on, "Phase 2", 2.0, 2.0),
+            ("MY", "Malaysia", "EIS", 0.3, 0.3, on, None, 0.2, 0.2),
+        ]
+
+    def test_rerun_is_idempotent(self):
+        db = FakeAlertDB(self._upcoming(60))
+        service = compliance.ComplianceAlertService(db)
+
+        assert service.generate_rate_change_alerts() == {"created": 2, "updated": 0}
+        assert service.generate_rate_change_alerts() == {"created": 0, "updated": 0}
+        assert len(db.alerts) == 2
+        # One read and one upsert per run
+        assert len(db.queries) == 4
+        alert = db.alerts[("rate_change", "KH", "NSSF_PENSION", date.today() + timedelta(60))]
+        assert alert[1] == "warning"
+        assert alert[4] == "Cambodia NSSF_PENSION Rate Change"
+
+    def test_changed_notes_update_in_place(self):
+        db = FakeAlertDB(self._upcoming(45))
+        service = compliance.ComplianceAlertService(db)
+        service.generate_rate_change_alerts()
+
+        db.upcoming = self._upcoming(45)
+        db.upcoming[1] = db.upcoming[1][:6] + ("Gazetted",) + db.upcoming[1][7:]
+        assert service.generate_rate_change_alerts() == {"created": 0, "updated": 1}
+        assert len(db.alerts) == 2
+
+    def test_no_upcoming_changes(self):
+        db = FakeAlertDB([])
+        result = compliance.ComplianceAlertService(db).generate_rate_change_alerts()
+        assert result == {"created": 0, "updated": 0}
+        assert len(db.queries) == 1
+
+
+class ScheduledEngine(compliance.RegionMigrationEngine):
+    """Engine whose tables 'copy' by sleeping, recording start and finish order"""
+
+    def __init__(self, fail=(), **kwargs):
+        super().__init__(None, None, "KH", **kwargs)
+        self.fail = set(fail)
+        self.events = []
+        self.lock = threading.Lock()
+        self.active = self.max_active = 0
+
+    def _migrate_table(self, table, snapshot):
+        with self.lock:
+            self.events.append(("start", table))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+            self.events.append(("end", table))
+        if table in self.fail:
+            return compliance.TableMigration(table, "failed", error="boom")
+        return compliance.TableMigration(table, "copied", rows=1)
+
+
+class TestRegionMigration:
+    """Dependency-ordered, parallel, streaming table migration"""
+
+    def test_scope_filters_follow_ownership(self):
+        assert compliance.migration_scope_filter("kf_employee") == "country_code = %(country)s"
+        assert compliance.migration_scope_filter("kf_payslip_line") == (
+            "payslip_id IN (SELECT id FROM kf_payslip WHERE employee_id IN "
+            "(SELECT id FROM kf_employee WHERE country_code = %(country)s))"
+        )
+        for table, dependencies in compliance.MIGRATION_TABLES.items():
+            tables = list(compliance.MIGRATION_TABLES)
+            assert all(tables.index(d) < tables.index(table) for d in dependencies)
+
+    def test_tables_start_after_their_dependencies(self):
+        engine = ScheduledEngine(workers=4)
+        report = compliance.MigrationReport("KH", "snap")
+
+        engine._run_tables(list(engine.tables), report)
+
+        assert report.ok and report.rows == len(compliance.MIGRATION_TABLES)
+        position = {event: i for i, event in enumerate(engine.events)}
+        for table, dependencies in compliance.MIGRATION_TABLES.items():
+            for dependency in dependencies:
+                assert position[("end", dependency)] < position[("start", table)]
+        assert engine.max_active > 1
+
+    def test_failure_blocks_dependents_only(self):
+        engine = ScheduledEngine(fail={"kf_payslip"})
+        report = compliance.MigrationReport("KH", "snap")
+
+        engine._run_tables(list(engine.tables), report)
+
+        statuses = {name: t.status for name, t in report.tables.items()}
+        assert statuses["kf_payslip"] == "failed"
+        assert statuses["kf_payslip_line"] == "blocked"
+        assert statuses["kf_notification"] == "blocked"
+        assert statuses["kf_audit_log"] == "copied"
+        assert not report.ok
+
+    def test_unknown_tables_rejected(self):
+        with pytest.raises(ValueError):
+            compliance.RegionMigrationEngine(None, None, "KH", tables=["kf_company"])
+
+    def test_stream_copy_pipes_in_chunks(self):
+        payload = os.urandom(3 * 1024 * 1024)
+        received = hashlib.sha256()
+        largest_read = []
+
+        class Source:
+            def copy_expert(self, sql, file, size=8192):
+                for i in range(0, len(payload), 1000):
+                    file.write(payload[i : i + 1000])  # noqa: E203
+
+        class Target:
+            def copy_expert(self, sql, file, size=8192):
+                while True:
+                    chunk = file.read(size)
+                    if not chunk:
+                        break
+                    largest_read.append(len(chunk))
+                    received.update(chunk)
+
+        engine = compliance.RegionMigrationEngine(None, None, "KH")
+        engine._stream_copy(Source(), "COPY out", Target(), "COPY in")
+
+        assert received.hexdigest() == hashlib.sha256(payload).hexdigest()
+        assert max(largest_read) <= engine.COPY_CHUNK
+
+    def test_stream_copy_reports_export_failure(self):
+        class Source:
+            def copy_expert(self, sql, file, size=8192):
+                file.write(b"PGCOPY")
+                raise RuntimeError("source connection lost")
+
+        class Target:
+            def copy_expert(self, sql, file, size=8192):
+                file.read()
+                raise RuntimeError("unexpected EOF in COPY data")
+
+        engine = compliance.RegionMigrationEngine(None, None, "KH")
+        with pytest.raises(RuntimeError, match="source connection lost"):
+            engine._stream_copy(Source(), "COPY out", Target(), "COPY in")
+
+    def test_stream_copy_reports_target_failure(self):
+        class Source:
+            def copy_expert(self, sql, file, size=8192):
+                for _ in range(1000):
+                    file.write(b"x" * 65536)
+
+        class Target:
+            def copy_expert(self, sql, file, size=8192):
+                file.read(size)
+                raise RuntimeError("violates check constraint")
+
+        engine = compliance.RegionMigrationEngine(None, None, "KH")
+        with pytest.raises(RuntimeError, match="check constraint"):
+            engine._stream_copy(Source(), "COPY out", Target(), "COPY in")
+
+
+MIGRATION_SCHEMA = """
+    DROP TABLE IF EXISTS kf_payslip_line, kf_payslip, kf_user, kf_employee,
+        kf_migration_checkpoint;
+    CREATE TABLE kf_employee (
+        id SERIAL PRIMARY KEY, country_code VARCHAR(2), full_name TEXT,
+        basic_salary NUMERIC(15, 2), hire_date DATE, updated_at TIMESTAMPTZ
+    );
+    CREATE TABLE kf_user (
+        id SERIAL PRIMARY KEY, employee_id INTEGER REFERENCES kf_employee(id), email TEXT
+    );
+    CREATE TABLE kf_payslip (
+        id SERIAL PRIMARY KEY, employee_id INTEGER REFERENCES kf_employee(id),
+        net_salary DOUBLE PRECISION, pdf BYTEA
+    );
+    CREATE TABLE kf_payslip_line (
+        id SERIAL PRIMARY KEY, payslip_id INTEGER REFERENCES kf_payslip(id),
+        code TEXT, amount NUMERIC(15, 2)
+    );
+    CREATE TABLE kf_migration_checkpoint (
+        country_code VARCHAR(2) NOT NULL, table_name VARCHAR(63) NOT NULL,
+        row_count BIGINT NOT NULL, checksum VARCHAR(40) NOT NULL,
+        source_snapshot VARCHAR(64),
+        completed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (country_code, table_name)
+    );
+"""
+
+MIGRATION_SEED = """
+    INSERT INTO kf_employee (country_code, full_name, basic_salary, hire_date, updated_at)
+    SELECT CASE WHEN i % 3 = 0 THEN 'VN' ELSE 'KH' END, 'Employee ' || i, 1000 + i,
+           DATE '2020-01-01' + i, TIMESTAMPTZ '2025-01-01 08:00+07' + i * INTERVAL '1 hour'
+    FROM generate_series(1, 300) i;
+    INSERT INTO kf_user (employee_id, email)
+    SELECT id, 'user' || id || '@example.com' FROM kf_employee;
+    INSERT INTO kf_payslip (employee_id, net_salary, pdf)
+    SELECT e.id, e.basic_salary * 0.89 + m / 7.0, decode(md5(e.id::text || m), 'hex')
+    FROM kf_employee e, generate_series(1, 12) m;
+    INSERT INTO kf_payslip_line (payslip_id, code, amount)
+    SELECT p.id, c, p.net_salary / 10 FROM kf_payslip p, unnest(ARRAY['EPF', 'SOCSO']) c;
+"""
+
+MIGRATION_DSNS = (
+    os.getenv("KFLOW_MIGRATION_SOURCE_DSN"),
+    os.getenv("KFLOW_MIGRATION_TARGET_DSN"),
+)
+
+
+@pytest.mark.skipif(
+    not all(MIGRATION_DSNS),
+    reason="Set KFLOW_MIGRATION_SOURCE_DSN and KFLOW_MIGRATION_TARGET_DSN (two scratch databases)",
+)
+class TestRegionMigrationPostgres:
+    """End to end between two local Postgres databases"""
+
+    TABLES = ["kf_employee", "kf_user", "kf_payslip", "kf_payslip_line"]
+
+    def _connect(self, dsn):
+        psycopg2 = pytest.importorskip("psycopg2")
+        return lambda: psycopg2.connect(dsn)
+
+    def _execute(self, connect, sql):
+        connection = connect()
+        try:
+            connection.cursor().execute(sql)
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _fetch(self, connect, sql):
+        connection = connect()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(sql)
+            return cursor.fetchall()
+        finally:
+            connection.close()
+
+    def test_migrate_verify_and_resume(self):
+        source, target = (self._connect(dsn) for dsn in MIGRATION_DSNS)
+        self._execute(source, MIGRATION_SCHEMA + MIGRATION_SEED)
+        self._execute(target, MIGRATION_SCHEMA)
+        self._execute(
+            target, "ALTER TABLE kf_payslip ADD CONSTRAINT low_pay CHECK (net_salary < 1000)"
+        )
+        engine = compliance.RegionMigrationEngine(source, target, "KH", tables=self.TABLES)
+
+        interrupted = engine.run()
+
+        statuses = {name: t.status for name, t in interrupted.tables.items()}
+        assert statuses == {
+            "kf_employee": "copied",
+            "kf_user": "copied",
+            "kf_payslip": "failed",
+            "kf_payslip_line": "blocked",
+        }
+        assert self._fetch(target, "SELECT COUNT(*) FROM kf_payslip") == [(0,)]
+
+        self._execute(target, "ALTER TABLE kf_payslip DROP CONSTRAINT low_pay")
+        resumed = engine.run()
+
+        statuses = {name: t.status for name, t in resumed.tables.items()}
+        assert statuses == {
+            "kf_employee": "resumed",
+            "kf_user": "resumed",
+            "kf_payslip": "copied",
+            "kf_payslip_line": "copied",
+        }
+        assert resumed.ok
+        assert resumed.tables["kf_employee"].rows == 200
+        assert resumed.tables["kf_payslip_line"].rows == 200 * 12 * 2
+        for table in self.TABLES:
+            query = f"SELECT md5(string_agg(t::text, '' ORDER BY id)) FROM {table} t"
+            where = compliance.migration_scope_filter(table) % {"country": "'KH'"}
+            assert self._fetch(target, query) == self._fetch(source, f"{query} WHERE {where}")
+        next_id = "SELECT nextval('kf_payslip_id_seq') > MAX(id) FROM kf_payslip"
+        assert self._fetch(target, next_id) == [(True,)]
+
+        assert {t.status for t in engine.run().tables.values()} == {"resumed"}
+        assert engine.run(restart=True).ok
+
+
+class FakeStatsDB:
+    """Planner statistics and block samples over synthetic per-block row counts"""
+
+    def __init__(self, seed=3, statistics_target=100):
+        rng = random.Random(seed)
+        self.statistics_target = statistics_target
+        # table -> [(rows in block, KH rows in block)]
+        self.blocks = {
+            "kf_employee": [(50, rng.choice((8, 10, 12))) for _ in range(1000)],
+            "kf_user": [(50, 10) for _ in range(100)],
+            # Payslips interleave countries within blocks
+            "kf_payslip": [(40, sum(rng.random() < 0.2 for _ in range(40))) for _ in range(6000)],
+            # Audit rows arrive in bursts per company: whole blocks are KH or not
+            "kf_audit_log": [(80, 80 if rng.random() < 0.3 else 0) for _ in range(5000)],
+        }
+        self.queries = []
+        self.closed = False
+
+    def truth(self, table):
+        return sum(b[1] for b in self.blocks[table])
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if "FROM pg_class" in query:
+            return FakeResult(
+                [
+                    (table, float(sum(b[0] for b in blocks)), len(blocks), len(blocks) * 8192, 120)
+                    for table, blocks in self.blocks.items()
+                ]
+            )
+        if "most_common_vals" in query:
+            return FakeResult([(["MY", "KH", "VN"], [0.6, 0.2, 0.15], self.statistics_target)])
+        if "TABLESAMPLE" in query:
+            table = re.search(r"FROM (\w+) TABLESAMPLE", query).group(1)
+            rng = random.Random(params["seed"])
+            chosen = [b for b in self.blocks[table] if rng.random() < params["percent"] / 100]
+            return FakeResult(chosen)
+        if "COUNT(*) FILTER" in query:
+            table = re.findall(r"FROM (\w+)", query)[-1]
+            blocks = self.blocks[table]
+            return FakeResult([(sum(b[0] for b in blocks), self.truth(table))])
+        raise AssertionError(f"Unexpected query: {query}")
+
+    def close(self):
+        self.closed = True
+
+
+class TestMigrationScopeEstimate:
+    """Statistics and block samples instead of COUNT(*) per table"""
+
+    def test_intervals_cover_the_true_counts(self):
+        db = FakeStatsDB()
+        scope = compliance.DataMigrationService(db).estimate_migration_scope("KH")
+
+        for table in ("kf_payslip", "kf_audit_log"):
+            estimate = scope["tables"][table]
+            assert estimate["method"] == "sample"
+            assert estimate["records_low"] <= db.truth(table) <= estimate["records_high"]
+        payslips = scope["tables"]["kf_payslip"]["records"]
+        assert abs(payslips - db.truth("kf_payslip")) < 0.05 * db.truth("kf_payslip")
+        employees = scope["tables"]["kf_employee"]
+        assert employees["method"] == "statistics"
+        assert employees["records"] == 10000
+        assert employees["records_low"] < 10000 < employees["records_high"]
+        assert scope["tables"]["kf_user"] == {
+            "records": 1000,
+            "records_low": 1000,
+            "records_high": 1000,
+            "size_mb": round(1000 * 8192 / 50 / 1024 / 1024, 3),
+            "copy_mb": round(1000 * 120 / 1024 / 1024, 3),
+            "table_rows": 5000,
+            "method": "exact",
+        }
+        assert scope["tables"]["kf_document"] == "unknown"
+        assert scope["total_records_low"] <= scope["total_records"] <= scope["total_records_high"]
+
+    def test_clustered_table_gets_a_wider_interval(self):
+        scope = compliance.DataMigrationService(FakeStatsDB()).estimate_migration_scope("KH")
+
+        def relative_width(table):
+            estimate = scope["tables"][table]
+            return (estimate["records_high"] - estimate["records_low"]) / estimate["table_rows"]
+
+        assert relative_width("kf_audit_log") > 2 * relative_width("kf_payslip")
+
+    def test_large_tables_are_never_counted(self):
+        db = FakeStatsDB()
+        compliance.DataMigrationService(db).estimate_migration_scope("KH")
+
+        counted = [q for q in db.queries if "COUNT(*) FILTER" in q and "TABLESAMPLE" not in q]
+        assert len(counted) == 1 and "FROM kf_user" in counted[0]
+        assert len(db.queries) == 5  # Statistics, MCV, user count, two samples
+
+    def test_employee_interval_follows_the_statistics_target(self):
+        def employees(target):
+            db = FakeStatsDB(statistics_target=target)
+            scope = compliance.DataMigrationService(db).estimate_migration_scope("KH")
+            estimate = scope["tables"]["kf_employee"]
+            return estimate["records_low"], estimate["records"], estimate["records_high"]
+
+        low, _, high = employees(100)
+        narrow_low, _, narrow_high = employees(150)
+        # 50,000 rows: a target of 1000 makes ANALYZE read them all
+        assert employees(1000) == (10000, 10000, 10000)
+        assert low < narrow_low < 10000 < narrow_high < high
+
+    def test_degenerate_samples_use_the_rule_of_three(self):
+        db = FakeStatsDB()
+        db.blocks["kf_payslip"] = [(40, 0)] * 6000
+        db.blocks["kf_user"] = [(50, 50)] * 6000
+        service = compliance.DataMigrationService(db)
+
+        # A 100% sample reads every block: n = 240,000 and 300,000
+        assert service._sampled_share("kf_payslip", "x", "KH", 6000, 240000.0, 240000, 0) == (
+            0.0,
+            0.0,
+            3 / 240000,
+        )
+        assert service._sampled_share("kf_user", "x", "KH", 6000, 300000.0, 300000, 0) == (
+            1.0,
+            1 - 3 / 300000,
+            1.0,
+        )
+
+    def test_exact_scope_runs_in_the_background(self):
+        db = FakeStatsDB()
+        future = compliance.DataMigrationService(FakeStatsDB()).start_exact_scope("KH", lambda: db)
+
+        scope = future.result(timeout=5)
+
+        assert scope["method"] == "exact"
+        for table in ("kf_employee", "kf_payslip", "kf_audit_log"):
+            assert scope["tables"][table]["records"] == db.truth(table)
+        assert db.closed
+
+    def test_migration_plan_quotes_the_range(self):
+        plan = compliance.DataMigrationService(FakeStatsDB()).generate_migration_plan("KH")
+        scope = plan["scope"]
+        assert f"({scope['total_records_low']}-{scope['total_records_high']})" in (
+            plan["steps"][3]["details"]
+        )
@@ -63,7 +63,7 @@ INSERT INTO kf_statutory_rate (
 ((SELECT id FROM kf_statutory_scheme WHERE code='EPF' AND effective_from='2025-01-01'),
  'MY_OVER60', 'Malaysian/PR, Age ≥ 60',
  'ALL', 60, NULL, NULL,
- 0.055000 00, 0.04000000,
+ 0.05500000, 0.04000000,
  '2025-01-01', '2099-12-31', 'EPF Third Schedule', '2025-12-27')
 
 ON CONFLICT (scheme_id, tier_code, effective_from) DO NOTHING;
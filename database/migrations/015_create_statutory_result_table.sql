@@ -0,0 +1,36 @@
+-- ============================================================================
+-- Migration: 015_create_statutory_result_table.sql
+-- KerjaFlow ASEAN Statutory Framework
+-- Purpose: Content-addressed calculation results for idempotent pay-run re-runs
+-- Date: 2026-10-18
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS kf_statutory_result (
+    employee_id VARCHAR(64) NOT NULL,
+    calculation_date DATE NOT NULL,
+    country_code VARCHAR(2) NOT NULL,
+
+    -- SHA-256 of the normalized calculation inputs and the rule snapshot version
+    input_hash CHAR(64) NOT NULL,
+    rule_version CHAR(64),
+    -- SHA-256 of the calculated amounts and the rule rows behind them
+    result_hash CHAR(64) NOT NULL,
+
+    total_employee_amount DECIMAL(15,2) NOT NULL,
+    total_employer_amount DECIMAL(15,2) NOT NULL,
+    contributions JSONB NOT NULL,  -- [[scheme_code, employee_amount, employer_amount], ...]
+
+    calculated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (employee_id, calculation_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_statutory_result_date
+    ON kf_statutory_result(calculation_date, country_code);
+
+COMMENT ON TABLE kf_statutory_result IS 'Stored statutory calculations; a re-run recalculates only rows whose input_hash changed';
+COMMENT ON COLUMN kf_statutory_result.rule_version IS 'RuleSnapshot.version the result was calculated with (NULL: live SQL lookups)';
+
+COMMIT;
@@ -0,0 +1,35 @@
+-- ============================================================================
+-- Migration: 016_compliance_alert_natural_key.sql
+-- KerjaFlow ASEAN Statutory Framework
+-- Purpose: Natural key on kf_compliance_alert for set-based, idempotent
+--          rate change alert generation
+-- Date: 2026-10-18
+-- ============================================================================
+
+BEGIN;
+
+ALTER TABLE kf_compliance_alert
+    ADD COLUMN IF NOT EXISTS contribution_type VARCHAR(50);
+
+-- Backfill generated rate change alerts ("<Country> <TYPE> Rate Change")
+UPDATE kf_compliance_alert
+SET contribution_type = substring(title FROM '^.* ([A-Z_]+) Rate Change$')
+WHERE alert_type = 'rate_change'
+  AND contribution_type IS NULL
+  AND title ~ '^.* [A-Z_]+ Rate Change$';
+
+-- Keep the oldest of any duplicates left by the old check-then-insert loop
+DELETE FROM kf_compliance_alert a
+USING kf_compliance_alert b
+WHERE a.alert_type = b.alert_type
+  AND a.country_code = b.country_code
+  AND a.contribution_type = b.contribution_type
+  AND a.trigger_date = b.trigger_date
+  AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_compliance_alert_natural_key
+    ON kf_compliance_alert(alert_type, country_code, contribution_type, trigger_date);
+
+COMMENT ON COLUMN kf_compliance_alert.contribution_type IS 'Statutory contribution type of rate_change alerts (part of the natural key)';
+
+COMMIT;
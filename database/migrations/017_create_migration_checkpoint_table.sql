@@ -0,0 +1,27 @@
+-- ============================================================================
+-- Migration: 017_create_migration_checkpoint_table.sql
+-- KerjaFlow ASEAN Statutory Framework
+-- Purpose: Per-table checkpoints of cross-region data migrations
+--          (created in the TARGET regional database)
+-- Date: 2026-10-18
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS kf_migration_checkpoint (
+    country_code VARCHAR(2) NOT NULL,
+    table_name VARCHAR(63) NOT NULL,
+
+    -- Verified against the source inside the copying transaction
+    row_count BIGINT NOT NULL,
+    checksum VARCHAR(40) NOT NULL,  -- Sum of per-row MD5 prefixes
+    source_snapshot VARCHAR(64),    -- pg_export_snapshot() the rows were read from
+
+    completed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (country_code, table_name)
+);
+
+COMMENT ON TABLE kf_migration_checkpoint IS 'Tables copied and verified by RegionMigrationEngine; a re-run skips them';
+
+COMMIT;
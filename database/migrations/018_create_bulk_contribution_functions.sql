@@ -0,0 +1,393 @@
+-- ============================================================================
+-- Migration: 018_create_bulk_contribution_functions.sql
+-- KerjaFlow ASEAN Statutory Framework
+-- Purpose: Set-returning functions computing statutory contributions for a
+--          whole set of employees in one statement
+-- Date: 2026-10-18
+-- ============================================================================
+--
+-- The functions reproduce StatutoryCalculator.calculate_all
+-- (backend/kerjaflow/services/statutory_calculator.py) over the scheme, rate,
+-- ceiling and table lookup tables:
+--
+--   kf_contribution_schemes      employee x applicable scheme, wage base and
+--                                MONTHLY ceiling
+--   kf_contribution_tiers        ... plus the winning rate tier
+--   kf_calculate_contributions   ... plus the table lookup band and the
+--                                rounded amounts, one row per contribution
+--
+-- Each function is a single SELECT in LANGUAGE sql, so the planner inlines
+-- the chain into one query joining the input set to the rule tables: no
+-- per-employee round trips, whatever the number of employees.
+--
+-- Annual ceilings (ANNUAL, AW_ANNUAL) depend on the year-to-date ledger and
+-- are not applied here.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. INPUT AND RESULT TYPES
+-- ============================================================================
+
+-- Recreated with the functions below that depend on them
+DROP TYPE IF EXISTS kf_contribution_input CASCADE;
+DROP TYPE IF EXISTS kf_contribution_result CASCADE;
+
+CREATE TYPE kf_contribution_input AS (
+    employee_ref VARCHAR(64),       -- Caller's key, returned unchanged
+    country_code VARCHAR(2),
+    nationality VARCHAR(10),        -- CITIZEN, PR, FOREIGN; NULL or ALL: every scheme
+    age INTEGER,
+    gross_salary NUMERIC,
+    basic_salary NUMERIC,
+    ordinary_wages NUMERIC,
+    additional_wages NUMERIC,
+    risk_category VARCHAR(30),
+    company_employee_count INTEGER,
+    calculation_date DATE           -- Used when no period is passed
+);
+
+CREATE TYPE kf_contribution_result AS (
+    employee_index INTEGER,         -- 1-based position in the input
+    employee_ref VARCHAR(64),
+    country_code VARCHAR(2),
+    calculation_date DATE,
+    scheme_id INTEGER,
+    scheme_code VARCHAR(30),
+    scheme_name VARCHAR(200),
+    calculation_method calculation_method,
+    calculation_base_amount NUMERIC,
+    applied_salary NUMERIC,
+    capped BOOLEAN,
+    employee_amount NUMERIC,
+    employer_amount NUMERIC,
+    total_amount NUMERIC,
+    employee_rate NUMERIC,
+    employer_rate NUMERIC,
+    tier_code VARCHAR(50),
+    tier_description VARCHAR(300),
+    rate_id INTEGER,
+    ceiling_id INTEGER,
+    table_lookup_id INTEGER
+);
+
+COMMENT ON TYPE kf_contribution_input IS 'One employee passed to kf_calculate_contributions';
+COMMENT ON TYPE kf_contribution_result IS 'One contribution returned by kf_calculate_contributions';
+
+-- ============================================================================
+-- 2. ROUNDING
+-- ============================================================================
+
+-- NEAREST rounds half away from zero, FLOOR towards zero and CEILING away
+-- from zero, like Decimal ROUND_HALF_UP, ROUND_DOWN and ROUND_UP. A negative
+-- precision rounds to units, as Decimal.quantize does.
+CREATE OR REPLACE FUNCTION kf_round_contribution(
+    p_amount NUMERIC,
+    p_method VARCHAR,
+    p_precision INTEGER
+)
+RETURNS NUMERIC AS $$
+    SELECT CASE p_method
+        WHEN 'NEAREST' THEN round(p_amount, GREATEST(p_precision, 0))
+        WHEN 'NEAREST_RINGGIT' THEN round(p_amount, 0)
+        WHEN 'FLOOR' THEN trunc(p_amount, GREATEST(p_precision, 0))
+        WHEN 'CEILING' THEN round(
+            sign(p_amount)
+                * ceil(abs(p_amount) * power(10::NUMERIC, GREATEST(p_precision, 0)))
+                / power(10::NUMERIC, GREATEST(p_precision, 0)),
+            GREATEST(p_precision, 0)
+        )
+        ELSE p_amount
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ============================================================================
+-- 3. APPLICABLE SCHEMES, WAGE BASE AND MONTHLY CEILING
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION kf_contribution_schemes(
+    p_employees kf_contribution_input[],
+    p_period DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    employee_index INTEGER,
+    employee_ref VARCHAR(64),
+    country_code VARCHAR(2),
+    calculation_date DATE,
+    nationality VARCHAR(10),
+    age INTEGER,
+    gross_salary NUMERIC,
+    risk_category VARCHAR(30),
+    company_employee_count INTEGER,
+    scheme_id INTEGER,
+    scheme_code VARCHAR(30),
+    scheme_name VARCHAR(200),
+    sort_order SMALLINT,
+    calculation_method calculation_method,
+    rounding_method VARCHAR(20),
+    rounding_precision SMALLINT,
+    base_amount NUMERIC,
+    ceiling_id INTEGER,
+    applied_salary NUMERIC,
+    capped BOOLEAN
+) AS $$
+    SELECT DISTINCT ON (e.n, s.id)
+        e.n::INTEGER,
+        e.employee_ref,
+        e.country_code,
+        d.on_date,
+        e.nationality,
+        e.age,
+        e.gross_salary,
+        e.risk_category,
+        e.company_employee_count,
+        s.id,
+        s.code,
+        s.name_en,
+        s.sort_order,
+        s.calculation_method,
+        s.rounding_method,
+        s.rounding_precision,
+        w.amount,
+        ce.id,
+        CASE WHEN w.amount > ce.ceiling_amount THEN ce.ceiling_amount ELSE w.amount END,
+        COALESCE(w.amount > ce.ceiling_amount, false)
+    FROM unnest(p_employees) WITH ORDINALITY AS e(
+        employee_ref, country_code, nationality, age, gross_salary, basic_salary,
+        ordinary_wages, additional_wages, risk_category, company_employee_count,
+        calculation_date, n
+    )
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(p_period, e.calculation_date, CURRENT_DATE) AS on_date
+    ) d
+    JOIN kf_country c ON c.code = e.country_code
+    JOIN kf_statutory_scheme s
+      ON s.country_id = c.id
+     AND s.is_active = true
+     AND s.effective_from <= d.on_date
+     AND (s.effective_until IS NULL OR s.effective_until >= d.on_date)
+     AND CASE e.nationality
+             WHEN 'CITIZEN' THEN s.citizen_applicable
+             WHEN 'PR' THEN s.pr_applicable
+             WHEN 'FOREIGN' THEN s.foreign_worker_applicable
+             ELSE true
+         END
+    -- Unset or zero wage components fall back as in _get_calculation_base
+    CROSS JOIN LATERAL (
+        SELECT CASE s.calculation_base
+                   WHEN 'BASIC' THEN COALESCE(NULLIF(e.basic_salary, 0), e.gross_salary)
+                   WHEN 'ORDINARY_WAGES' THEN COALESCE(NULLIF(e.ordinary_wages, 0), e.gross_salary)
+                   WHEN 'ADDITIONAL_WAGES' THEN COALESCE(e.additional_wages, 0)
+                   ELSE e.gross_salary
+               END AS amount
+    ) w
+    LEFT JOIN kf_statutory_ceiling ce
+      ON ce.scheme_id = s.id
+     AND ce.ceiling_type = 'MONTHLY'
+     AND ce.effective_from <= d.on_date
+     AND (ce.effective_until IS NULL OR ce.effective_until >= d.on_date)
+    ORDER BY e.n, s.id, ce.effective_from DESC, ce.id
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- 4. RATE TIER MATCHING
+-- ============================================================================
+
+-- Same conditions and priority as StatutoryCalculator._find_matching_rate:
+-- most specific tier first, then the latest effective_from, then bounded
+-- tiers before open-ended ones. Zero salary bounds and rates count as unset,
+-- as they do when rate rows are parsed; an unknown headcount is 0 against
+-- employee_count_min and 999999 against employee_count_max.
+CREATE OR REPLACE FUNCTION kf_contribution_tiers(
+    p_employees kf_contribution_input[],
+    p_period DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    employee_index INTEGER,
+    employee_ref VARCHAR(64),
+    country_code VARCHAR(2),
+    calculation_date DATE,
+    scheme_id INTEGER,
+    scheme_code VARCHAR(30),
+    scheme_name VARCHAR(200),
+    sort_order SMALLINT,
+    calculation_method calculation_method,
+    rounding_method VARCHAR(20),
+    rounding_precision SMALLINT,
+    base_amount NUMERIC,
+    ceiling_id INTEGER,
+    applied_salary NUMERIC,
+    capped BOOLEAN,
+    rate_id INTEGER,
+    tier_code VARCHAR(50),
+    tier_description VARCHAR(300),
+    employee_rate NUMERIC,
+    employer_rate NUMERIC,
+    employee_fixed NUMERIC,
+    employer_fixed NUMERIC
+) AS $$
+    SELECT DISTINCT ON (cs.employee_index, cs.scheme_id)
+        cs.employee_index,
+        cs.employee_ref,
+        cs.country_code,
+        cs.calculation_date,
+        cs.scheme_id,
+        cs.scheme_code,
+        cs.scheme_name,
+        cs.sort_order,
+        cs.calculation_method,
+        cs.rounding_method,
+        cs.rounding_precision,
+        cs.base_amount,
+        cs.ceiling_id,
+        cs.applied_salary,
+        cs.capped,
+        r.id,
+        r.tier_code,
+        r.tier_description,
+        NULLIF(r.employee_rate, 0),
+        NULLIF(r.employer_rate, 0),
+        NULLIF(r.employee_fixed, 0),
+        NULLIF(r.employer_fixed, 0)
+    FROM kf_contribution_schemes(p_employees, p_period) cs
+    JOIN kf_statutory_rate r
+      ON r.scheme_id = cs.scheme_id
+     AND r.effective_from <= cs.calculation_date
+     AND (r.effective_until IS NULL OR r.effective_until >= cs.calculation_date)
+     AND (r.min_age IS NULL OR r.min_age <= cs.age)
+     AND (r.max_age IS NULL OR r.max_age >= cs.age)
+     AND (NULLIF(r.min_salary, 0) IS NULL OR r.min_salary <= cs.gross_salary)
+     AND (NULLIF(r.max_salary, 0) IS NULL OR r.max_salary >= cs.gross_salary)
+     AND COALESCE(NULLIF(r.nationality_condition, ''), 'ALL') IN ('ALL', cs.nationality)
+     AND (NULLIF(r.risk_category, '') IS NULL OR r.risk_category = cs.risk_category)
+     AND (r.employee_count_min IS NULL
+          OR r.employee_count_min <= COALESCE(NULLIF(cs.company_employee_count, 0), 0))
+     AND (r.employee_count_max IS NULL
+          OR r.employee_count_max >= COALESCE(NULLIF(cs.company_employee_count, 0), 999999))
+    ORDER BY
+        cs.employee_index,
+        cs.scheme_id,
+        r.min_age IS NULL,
+        NULLIF(r.min_salary, 0) IS NULL,
+        COALESCE(NULLIF(r.nationality_condition, ''), 'ALL') = 'ALL',
+        r.effective_from DESC,
+        r.max_age IS NULL,
+        NULLIF(r.max_salary, 0) IS NULL,
+        r.id
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- 5. AMOUNTS
+-- ============================================================================
+
+-- Percentage schemes: applied salary times the tier rates, a non-zero fixed
+-- amount replacing the product. Table lookup schemes: the band covering the
+-- wage base (not the capped salary) in the latest period in effect, zero when
+-- the table has a gap. Schemes without a matching tier and FORMULA or
+-- FIXED_AMOUNT schemes yield no row, as calculate_all yields no contribution.
+CREATE OR REPLACE FUNCTION kf_calculate_contributions(
+    p_employees kf_contribution_input[],
+    p_period DATE DEFAULT NULL
+)
+RETURNS SETOF kf_contribution_result AS $$
+    SELECT
+        t.employee_index,
+        t.employee_ref,
+        t.country_code,
+        t.calculation_date,
+        t.scheme_id,
+        t.scheme_code,
+        t.scheme_name,
+        t.calculation_method,
+        t.base_amount,
+        t.applied_salary,
+        t.capped,
+        a.employee_amount,
+        a.employer_amount,
+        a.employee_amount + a.employer_amount,
+        t.employee_rate,
+        t.employer_rate,
+        t.tier_code,
+        t.tier_description,
+        t.rate_id,
+        t.ceiling_id,
+        t.band_id
+    FROM (
+        SELECT DISTINCT ON (ct.employee_index, ct.scheme_id)
+            ct.*,
+            b.id AS band_id,
+            b.employee_amount AS band_employee_amount,
+            b.employer_amount AS band_employer_amount
+        FROM kf_contribution_tiers(p_employees, p_period) ct
+        LEFT JOIN kf_statutory_table_lookup b
+          ON ct.calculation_method = 'TABLE_LOOKUP'
+         AND b.scheme_id = ct.scheme_id
+         AND b.effective_from <= ct.calculation_date
+         AND (b.effective_until IS NULL OR b.effective_until >= ct.calculation_date)
+         AND b.wage_from <= ct.base_amount
+         AND b.wage_to >= ct.base_amount
+        WHERE ct.calculation_method IN ('PERCENTAGE', 'TIERED_PERCENTAGE', 'TABLE_LOOKUP')
+        ORDER BY
+            ct.employee_index,
+            ct.scheme_id,
+            b.effective_from DESC,
+            b.wage_from DESC,
+            b.wage_to DESC,
+            b.id DESC
+    ) t
+    CROSS JOIN LATERAL (
+        SELECT
+            kf_round_contribution(
+                CASE WHEN t.calculation_method = 'TABLE_LOOKUP'
+                     THEN COALESCE(t.band_employee_amount, 0)
+                     ELSE COALESCE(t.employee_fixed, t.applied_salary * COALESCE(t.employee_rate, 0))
+                END,
+                t.rounding_method,
+                t.rounding_precision
+            ) AS employee_amount,
+            kf_round_contribution(
+                CASE WHEN t.calculation_method = 'TABLE_LOOKUP'
+                     THEN COALESCE(t.band_employer_amount, 0)
+                     ELSE COALESCE(t.employer_fixed, t.applied_salary * COALESCE(t.employer_rate, 0))
+                END,
+                t.rounding_method,
+                t.rounding_precision
+            ) AS employer_amount
+    ) a
+    ORDER BY t.employee_index, COALESCE(t.sort_order, 0), t.scheme_code COLLATE "C"
+$$ LANGUAGE sql STABLE;
+
+-- JSON entry point for clients: an array of objects keyed like
+-- kf_contribution_input (missing keys are NULL), in input order
+CREATE OR REPLACE FUNCTION kf_calculate_contributions_json(
+    p_employees JSONB,
+    p_period DATE DEFAULT NULL
+)
+RETURNS SETOF kf_contribution_result AS $$
+    SELECT *
+    FROM kf_calculate_contributions(
+        ARRAY(
+            SELECT jsonb_populate_record(NULL::kf_contribution_input, x.value)
+            FROM jsonb_array_elements(p_employees) WITH ORDINALITY AS x(value, n)
+            ORDER BY x.n
+        ),
+        p_period
+    )
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION kf_calculate_contributions(kf_contribution_input[], DATE) IS
+    'Statutory contributions of a set of employees (p_period overrides each calculation_date)';
+COMMENT ON FUNCTION kf_calculate_contributions_json(JSONB, DATE) IS
+    'kf_calculate_contributions over a JSON array of kf_contribution_input objects';
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION QUERIES
+-- ============================================================================
+-- SELECT scheme_code, tier_code, employee_amount, employer_amount
+-- FROM kf_calculate_contributions_json(
+--     '[{"employee_ref": "E1", "country_code": "MY", "nationality": "CITIZEN",
+--        "age": 30, "gross_salary": 4500}]',
+--     '2025-06-30'
+-- );